@@ -217,7 +217,10 @@ def uninstall_app_command(
 
 @app.command("status")
 def app_status(
-    app_id: Optional[str] = typer.Option(None, "--id", help="ID de l'application à vérifier (optionnel)")
+    app_id: Optional[str] = typer.Option(None, "--id", help="ID de l'application à vérifier (optionnel)"),
+    status: Optional[str] = typer.Option(None, "--status", help="Filtrer par statut (ex: deployed, failed)"),
+    platform: Optional[str] = typer.Option(None, "--platform", help="Filtrer par plateforme"),
+    since: Optional[str] = typer.Option(None, "--since", help="Installées depuis une durée (30m, 24h, 7d, 2w) ou une date ISO")
 ):
     """
     Affiche le statut des applications installées
@@ -258,8 +261,15 @@ def app_status(
                     value = "********"
                 console.print(f"  [cyan]{key}:[/cyan] {value}")
     else:
-        # Lister toutes les applications
-        apps = list_app_deployments()
+        # Lister les applications (requête indexée du registre)
+        from cloudya.utils.deployment_registry import parse_since
+        
+        since_date = parse_since(since) if since else None
+        if since and since_date is None:
+            console.print(f"[red]Valeur invalide pour --since: {since}[/red]")
+            return
+        
+        apps = list_app_deployments(status=status, platform=platform, since=since_date)
         
         if not apps:
             console.print("[yellow]Aucune application installée trouvée.[/yellow]")
@@ -4,33 +4,18 @@ import requests
 import os
 import sys
 import json
-import configparser
 from pathlib import Path
 import getpass
 
+from cloudya.utils.config import load_ini_config
+
 # Configuration
 CONFIG_DIR = Path.home() / ".cloudya"
 CONFIG_FILE = CONFIG_DIR / "config.ini"
 
 def get_config():
     """Charge la configuration ou crée une configuration par défaut"""
-    # Créer le répertoire de configuration s'il n'existe pas
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    
-    config = configparser.ConfigParser()
-    
-    # Si le fichier de configuration existe, le charger
-    if CONFIG_FILE.exists():
-        config.read(CONFIG_FILE)
-    else:
-        # Sinon, créer une configuration par défaut
-        config['api'] = {
-            'url': 'https://api.cloudya.ai'  # URL par défaut
-        }
-        with open(CONFIG_FILE, 'w') as f:
-            config.write(f)
-    
-    return config
+    return load_ini_config(create=True)
 
 def get_token():
     """Récupère le token d'API depuis la configuration ou les variables d'environnement"""
@@ -4,11 +4,12 @@ import requests
 import os
 import sys
 import json
-import configparser
 from pathlib import Path
 import time
 from datetime import datetime
 
+from cloudya.utils.config import load_ini_config
+
 # Bibliothèques pour le TUI
 try:
     from textual.app import App, ComposeResult
@@ -29,18 +30,7 @@ CONFIG_FILE = CONFIG_DIR / "config.ini"
 
 def get_config():
     """Charge la configuration"""
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    
-    config = configparser.ConfigParser()
-    if CONFIG_FILE.exists():
-        config.read(CONFIG_FILE)
-    else:
-        # Créer une config par défaut
-        config['api'] = {'url': 'https://api.cloudya.ai'}
-        with open(CONFIG_FILE, 'w') as f:
-            config.write(f)
-    
-    return config
+    return load_ini_config(create=True)
 
 def get_token():
     """Récupère le token d'API"""
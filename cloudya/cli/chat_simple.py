@@ -4,23 +4,16 @@ import argparse
 import requests
 import os
 import sys
-import configparser
 from pathlib import Path
+
+from cloudya.utils.config import load_ini_config
 import json
 
 CONFIG_DIR = Path.home() / ".cloudya"
 CONFIG_FILE = CONFIG_DIR / "config.ini"
 
 def get_config():
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    config = configparser.ConfigParser()
-    if CONFIG_FILE.exists():
-        config.read(CONFIG_FILE)
-    else:
-        config['api'] = {'url': 'https://api.cloudya.ai'}
-        with open(CONFIG_FILE, 'w') as f:
-            config.write(f)
-    return config
+    return load_ini_config(create=True)
 
 def get_token():
     token = os.environ.get("CLOUDYA_API_TOKEN")
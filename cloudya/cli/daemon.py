@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import typer
+import datetime
+from rich.console import Console
+
+from cloudya.utils import daemon as cloudya_daemon
+
+app = typer.Typer(help="Gérer le démon Cloudya (exécution rapide des commandes)")
+console = Console()
+
+@app.command("start")
+def start_daemon(
+    foreground: bool = typer.Option(False, "--foreground", "-f", help="Rester au premier plan (journal sur la console)")
+):
+    """
+    Démarre le démon Cloudya
+    """
+    if not cloudya_daemon.is_supported():
+        console.print("[red]Le démon n'est pas supporté sur cette plateforme.[/red]")
+        raise typer.Exit(1)
+
+    status = cloudya_daemon.ping()
+    if status:
+        console.print(f"[yellow]Le démon est déjà démarré (PID {status['pid']}).[/yellow]")
+        return
+
+    if foreground:
+        cloudya_daemon.serve()
+        return
+
+    with console.status("[bold green]Démarrage du démon...[/bold green]"):
+        pid = cloudya_daemon.start_background()
+
+    if not pid:
+        console.print("[red]Impossible de démarrer le démon.[/red]")
+        console.print(f"Consultez le journal: [cyan]{cloudya_daemon.get_log_file()}[/cyan]")
+        raise typer.Exit(1)
+
+    console.print(f"[green]Démon démarré (PID {pid}).[/green]")
+    console.print(f"Socket: [cyan]{cloudya_daemon.get_socket_path()}[/cyan]")
+
+@app.command("stop")
+def stop_daemon():
+    """
+    Arrête le démon Cloudya
+    """
+    if not cloudya_daemon.ping():
+        console.print("[yellow]Le démon n'est pas démarré.[/yellow]")
+        return
+
+    if cloudya_daemon.stop():
+        console.print("[green]Démon arrêté.[/green]")
+    else:
+        console.print("[red]Impossible d'arrêter le démon.[/red]")
+        raise typer.Exit(1)
+
+@app.command("restart")
+def restart_daemon():
+    """
+    Redémarre le démon Cloudya
+    """
+    cloudya_daemon.stop()
+    start_daemon(foreground=False)
+
+@app.command("status")
+def daemon_status():
+    """
+    Affiche l'état du démon Cloudya
+    """
+    status = cloudya_daemon.ping()
+
+    if not status:
+        console.print("[yellow]Le démon n'est pas démarré.[/yellow] Les commandes s'exécutent en mode autonome.")
+        raise typer.Exit(1)
+
+    started_at = datetime.datetime.fromtimestamp(status["started_at"]).isoformat(timespec="seconds")
+
+    console.print("[bold green]Démon en cours d'exécution[/bold green]")
+    console.print(f"[bold]PID:[/bold] {status['pid']}")
+    console.print(f"[bold]Socket:[/bold] {status['socket']}")
+    console.print(f"[bold]Démarré le:[/bold] {started_at}")
+    console.print(f"[bold]Requêtes servies:[/bold] {status['requests']}")
+    console.print(f"[bold]Rechargements:[/bold] {status['refreshes']}")
+
+if __name__ == "__main__":
+    app()
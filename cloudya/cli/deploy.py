@@ -3,7 +3,7 @@ import typer
 import os
 import sys
 import yaml
-import json
+import time
 from pathlib import Path
 from typing import Optional
 from rich.console import Console
@@ -18,8 +18,12 @@ from cloudya.utils.terraform import (
     get_available_templates,
     get_template_info,
     prepare_deployment,
+    compute_fingerprint,
+    find_matching_deployment,
+    update_deployment_status,
     run_terraform
 )
+from cloudya.utils.deploy_pipeline import run_stages
 
 app = typer.Typer(help="Déployer des infrastructures avec Terraform")
 console = Console()
@@ -60,14 +64,61 @@ def list_templates():
         for template in provider_templates:
             console.print(f" - [cyan]{template['path']}[/cyan] ({template['description']})")
 
+def _resolve_params(template_info, params):
+    """
+    Analyse les paramètres de la ligne de commande et complète les paramètres requis
+    
+    Args:
+        template_info: Informations du template
+        params: Paramètres au format key1=value1,key2=value2
+        
+    Returns:
+        Dictionnaire des paramètres
+    """
+    params_dict = {}
+    if params:
+        for pair in params.split(","):
+            if "=" in pair:
+                key, value = pair.split("=", 1)
+                params_dict[key.strip()] = value.strip()
+    
+    # Vérifier les paramètres requis
+    missing_params = []
+    for param in template_info.get("parameters", []):
+        if param.get("required", False) and param["name"] not in params_dict:
+            # Si le paramètre a une valeur par défaut, l'utiliser
+            if "default" in param:
+                params_dict[param["name"]] = param["default"]
+            else:
+                missing_params.append(param)
+    
+    # Demander les paramètres manquants
+    if missing_params:
+        console.print("[yellow]Paramètres requis manquants:[/yellow]")
+        for param in missing_params:
+            value = Prompt.ask(
+                f"{param['description']} ({param['name']})",
+                default="" if "default" not in param else str(param["default"])
+            )
+            params_dict[param["name"]] = value
+    
+    return params_dict
+
 @app.command("template")
 def deploy_template(
     template_name: str = typer.Argument(..., help="Nom du template à déployer"),
     params: str = typer.Option(None, "--params", "-p", help="Paramètres au format key1=value1,key2=value2"),
-    auto_approve: bool = typer.Option(False, "--auto-approve", "-y", help="Approuver automatiquement le plan Terraform")
+    auto_approve: bool = typer.Option(False, "--auto-approve", "-y", help="Approuver automatiquement le plan Terraform"),
+    offline: Optional[bool] = typer.Option(None, "--offline/--online", help="Installer les providers depuis le miroir local uniquement"),
+    reuse: Optional[bool] = typer.Option(None, "--reuse/--no-reuse", help="Réutiliser un déploiement existant aux entrées identiques (défaut: demander, automatique avec -y)"),
+    refresh: bool = typer.Option(False, "--refresh", help="Réappliquer le déploiement réutilisé (init, plan et apply)")
 ):
     """
     Déploie un template Terraform avec des paramètres
+    
+    Si un déploiement actif a exactement les mêmes entrées (fichiers du
+    template, paramètres, version de Terraform, verrouillage des providers),
+    il est réutilisé sans relancer init ni plan, sauf avec --refresh.
     """
     # Analyser le nom du template pour déterminer le provider
     parts = template_name.split('/')
@@ -105,57 +156,23 @@ def deploy_template(
             ]
         }
     
-    # Analyser les paramètres
-    params_dict = {}
-    if params:
-        for pair in params.split(","):
-            if "=" in pair:
-                key, value = pair.split("=", 1)
-                params_dict[key.strip()] = value.strip()
-    
-    # Vérifier les paramètres requis
-    missing_params = []
-    for param in template_info.get("parameters", []):
-        if param.get("required", False) and param["name"] not in params_dict:
-            # Si le paramètre a une valeur par défaut, l'utiliser
-            if "default" in param:
-                params_dict[param["name"]] = param["default"]
-            else:
-                missing_params.append(param)
-    
-    # Demander les paramètres manquants
-    if missing_params:
-        console.print("[yellow]Paramètres requis manquants:[/yellow]")
-        for param in missing_params:
-            value = Prompt.ask(
-                f"{param['description']} ({param['name']})",
-                default="" if "default" not in param else str(param["default"])
-            )
-            params_dict[param["name"]] = value
-    
-    # Connecter au provider approprié
-    console.print(f"[bold]Connexion au provider: [cyan]{provider.upper()}[/cyan][/bold]")
-    
-    try:
-        # Appeler la fonction de connexion correspondante
-        if provider == "aws":
-            aws.connect()
-        elif provider == "gcp":
-            gcp.connect()
-        elif provider == "azure":
-            azure.connect()
-        elif provider == "openstack":
-            openstack.connect()
-        elif provider == "proxmox":
-            proxmox.connect()
-        elif provider == "vmware":
-            vmware.connect()
-        elif provider == "nutanix":
-            nutanix.connect()
-    except Exception as e:
-        console.print(f"[red]Erreur lors de la connexion au provider {provider}: {e}[/red]")
-        if not Confirm.ask("Continuer quand même avec le déploiement?"):
-            return
+    # Analyser les paramètres et demander les paramètres requis manquants
+    params_dict = _resolve_params(template_info, params)
+    
+    # Rechercher un déploiement aux entrées identiques
+    fingerprint = compute_fingerprint(template_name, params_dict)
+    existing = find_matching_deployment(fingerprint) if fingerprint and reuse is not False else None
+    if existing:
+        console.print(f"[cyan]Un déploiement aux entrées identiques existe déjà: {existing['id']} ({existing['status']})[/cyan]")
+        if reuse is None and not auto_approve:
+            reuse = Confirm.ask("Voulez-vous réutiliser ce déploiement?", default=True)
+        if reuse is not False:
+            if not refresh:
+                console.print("[green]Entrées inchangées: init, plan et apply ignorés (--refresh pour réappliquer).[/green]")
+                _print_deployment_summary(existing["dir"])
+                return
+        else:
+            existing = None
     
     # Préparer le déploiement
     console.print(f"\n[bold]Préparation du déploiement du template: [cyan]{template_name}[/cyan][/bold]")
@@ -164,8 +181,14 @@ def deploy_template(
         console.print(f" - [green]{key}:[/green] {value}")
     
     try:
-        # Préparer le déploiement (créer le répertoire de travail et copier les fichiers)
-        deployment_dir = prepare_deployment(template_name, params_dict)
+        if existing:
+            # Réappliquer le déploiement existant (--refresh)
+            console.print(f"[bold]Réapplication du déploiement existant: [cyan]{existing['id']}[/cyan][/bold]")
+        
+        # Vérifier les credentials du provider pendant la préparation et l'initialisation
+        stages = run_stages(provider, template_name, params_dict, fingerprint,
+                            existing["dir"] if existing else None, offline)
+        deployment_dir = stages.deployment_dir
         
         if not deployment_dir:
             # Simuler le déploiement pour la démonstration
@@ -197,32 +220,182 @@ def deploy_template(
             
             return
         
+        console.print(f"[dim]Étapes: {stages.describe_timings()}[/dim]")
+        
+        if not stages.initialized:
+            console.print("[bold red]Erreur lors du déploiement.[/bold red]")
+            return
+        
+        if stages.provider_ok:
+            console.print(f"[green]Provider {provider.upper()}:[/green] {stages.provider_message}")
+        elif not _connect_provider(provider, stages.provider_message):
+            update_deployment_status(deployment_dir, "cancelled")
+            return
+        
         # Exécuter Terraform
-        success = run_terraform(deployment_dir, auto_approve)
+        success = run_terraform(deployment_dir, auto_approve, offline, initialized=True)
         
         if success:
             console.print("[bold green]Déploiement réussi ![/bold green]")
-            
-            # Afficher les informations du déploiement
-            metadata_file = os.path.join(deployment_dir, "metadata.json")
-            if os.path.exists(metadata_file):
-                with open(metadata_file, "r") as f:
-                    metadata = json.load(f)
-                
-                console.print(f"[bold]ID du déploiement:[/bold] {metadata.get('id', 'inconnu')}")
-                console.print(f"[bold]Date:[/bold] {metadata.get('created_at', 'inconnue')}")
-                
-                # Afficher les outputs si disponibles
-                if "outputs" in metadata:
-                    console.print("\n[bold]Outputs:[/bold]")
-                    for key, value in metadata["outputs"].items():
-                        console.print(f" - [green]{key}:[/green] {value}")
+            _print_deployment_summary(deployment_dir)
         else:
             console.print("[bold red]Erreur lors du déploiement.[/bold red]")
             
     except Exception as e:
         console.print(f"[red]Erreur lors du déploiement: {e}[/red]")
 
+def _connect_provider(provider, reason):
+    """
+    Connexion interactive au provider, quand la vérification des credentials a échoué
+    
+    Args:
+        provider: Nom du provider
+        reason: Raison de l'échec de la vérification
+        
+    Returns:
+        True pour continuer le déploiement, False pour l'annuler
+    """
+    console.print(f"[yellow]Credentials {provider.upper()} non vérifiés: {reason}[/yellow]")
+    console.print(f"[bold]Connexion au provider: [cyan]{provider.upper()}[/cyan][/bold]")
+    
+    try:
+        # Appeler la fonction de connexion correspondante
+        if provider == "aws":
+            aws.connect()
+        elif provider == "gcp":
+            gcp.connect()
+        elif provider == "azure":
+            azure.connect()
+        elif provider == "openstack":
+            openstack.connect()
+        elif provider == "proxmox":
+            proxmox.connect()
+        elif provider == "vmware":
+            vmware.connect()
+        elif provider == "nutanix":
+            nutanix.connect()
+    except Exception as e:
+        console.print(f"[red]Erreur lors de la connexion au provider {provider}: {e}[/red]")
+        if not Confirm.ask("Continuer quand même avec le déploiement?"):
+            return False
+    return True
+
+def _print_deployment_summary(deployment_dir):
+    """
+    Affiche l'ID, la date et les outputs d'un déploiement
+    """
+    from cloudya.utils.deployment_journal import load_state
+    
+    metadata = load_state(deployment_dir)
+    if metadata is None:
+        return
+    
+    console.print(f"[bold]ID du déploiement:[/bold] {metadata.get('id', 'inconnu')}")
+    console.print(f"[bold]Date:[/bold] {metadata.get('created_at', 'inconnue')}")
+    
+    # Afficher les outputs si disponibles
+    if "outputs" in metadata:
+        console.print("\n[bold]Outputs:[/bold]")
+        for key, value in metadata["outputs"].items():
+            console.print(f" - [green]{key}:[/green] {value}")
+
+@app.command("plan")
+def plan_template(
+    template_name: str = typer.Argument(..., help="Nom du template à planifier"),
+    params: str = typer.Option(None, "--params", "-p", help="Paramètres au format key1=value1,key2=value2"),
+    offline: Optional[bool] = typer.Option(None, "--offline/--online", help="Installer les providers depuis le miroir local uniquement")
+):
+    """
+    Prépare un déploiement et enregistre son plan Terraform sans l'appliquer
+    
+    Le plan est appliqué plus tard avec 'deploy apply <id>', sans nouvelle
+    planification tant que l'état et les entrées n'ont pas changé.
+    """
+    from cloudya.utils.terraform import plan_deployment
+    
+    template_info = get_template_info(template_name)
+    if not template_info:
+        console.print(f"[red]Template '{template_name}' non trouvé.[/red]")
+        raise typer.Exit(1)
+    
+    params_dict = _resolve_params(template_info, params)
+    
+    fingerprint = compute_fingerprint(template_name, params_dict)
+    existing = find_matching_deployment(fingerprint) if fingerprint else None
+    if existing:
+        console.print(f"[cyan]Remarque: le déploiement {existing['id']} ({existing['status']}) a déjà ces entrées.[/cyan]")
+    
+    deployment_dir = prepare_deployment(template_name, params_dict, fingerprint)
+    if not deployment_dir:
+        console.print(f"[red]Impossible de préparer le déploiement de '{template_name}'.[/red]")
+        raise typer.Exit(1)
+    
+    deployment_id = os.path.basename(deployment_dir)
+    if not plan_deployment(deployment_dir, offline):
+        console.print("[bold red]Erreur lors de la planification.[/bold red]")
+        raise typer.Exit(1)
+    
+    console.print(f"\n[bold]Plan enregistré pour le déploiement:[/bold] {deployment_id}")
+    console.print(f"Appliquez-le avec: [cyan]cloudya deploy apply {deployment_id[:8]}[/cyan]")
+
+@app.command("apply")
+def apply_plan(
+    deployment_id: str = typer.Argument(..., help="ID du déploiement (ou préfixe non ambigu)"),
+    auto_approve: bool = typer.Option(False, "--auto-approve", "-y", help="Appliquer sans confirmation"),
+    offline: Optional[bool] = typer.Option(None, "--offline/--online", help="Installer les providers depuis le miroir local uniquement")
+):
+    """
+    Applique le plan enregistré par 'deploy plan'
+    
+    Si l'état Terraform ou les entrées du déploiement ont changé depuis le
+    plan, le déploiement est planifié à nouveau avant l'application.
+    """
+    from cloudya.utils.terraform import apply_deployment, get_deployment_dir
+    
+    deployment_dir = get_deployment_dir(deployment_id)
+    if not deployment_dir:
+        console.print(f"[red]Déploiement '{deployment_id}' non trouvé.[/red]")
+        raise typer.Exit(1)
+    
+    if not apply_deployment(deployment_dir, auto_approve, offline):
+        raise typer.Exit(1)
+    
+    console.print("[bold green]Déploiement réussi ![/bold green]")
+    _print_deployment_summary(deployment_dir)
+
+@app.command("update")
+def update_deployment(
+    deployment_id: str = typer.Argument(..., help="ID du déploiement (ou préfixe non ambigu)"),
+    params: str = typer.Option(..., "--params", "-p", help="Paramètres modifiés au format key1=value1,key2=value2"),
+    auto_approve: bool = typer.Option(False, "--auto-approve", "-y", help="Appliquer sans confirmation"),
+    full: bool = typer.Option(False, "--full", help="Planifier tout le déploiement (sans -target)"),
+    offline: Optional[bool] = typer.Option(None, "--offline/--online", help="Installer les providers depuis le miroir local uniquement")
+):
+    """
+    Met à jour les paramètres d'un déploiement existant
+    
+    Seules les ressources qui dépendent des variables modifiées sont
+    planifiées et appliquées, sauf si le graphe de dépendances est ambigu.
+    """
+    from cloudya.utils.terraform import get_deployment_dir, update_deployment as run_update
+    
+    deployment_dir = get_deployment_dir(deployment_id)
+    if not deployment_dir:
+        console.print(f"[red]Déploiement '{deployment_id}' non trouvé.[/red]")
+        raise typer.Exit(1)
+    
+    params_dict = _resolve_params({}, params)
+    if not params_dict:
+        console.print("[red]Aucun paramètre valide (format attendu: key1=value1,key2=value2).[/red]")
+        raise typer.Exit(1)
+    
+    if not run_update(deployment_dir, params_dict, auto_approve, full, offline):
+        console.print("[bold red]Erreur lors de la mise à jour.[/bold red]")
+        raise typer.Exit(1)
+    
+    console.print("[bold green]Mise à jour terminée ![/bold green]")
+    _print_deployment_summary(deployment_dir)
+
 @app.command("destroy")
 def destroy_deployment(
     deployment_id: str = typer.Argument(..., help="ID du déploiement à détruire"),
@@ -303,14 +476,32 @@ def destroy_deployment(
         console.print(f"[red]Erreur lors de la destruction: {e}[/red]")
 
 @app.command("list-deployments")
-def list_deployments():
+def list_deployments(
+    status: Optional[str] = typer.Option(None, "--status", help="Filtrer par statut (ex: deployed, failed_apply)"),
+    provider: Optional[str] = typer.Option(None, "--provider", help="Filtrer par provider (ex: aws)"),
+    since: Optional[str] = typer.Option(None, "--since", help="Créés depuis une durée (30m, 24h, 7d, 2w) ou une date ISO"),
+    limit: Optional[int] = typer.Option(None, "--limit", "-n", help="Nombre maximal de déploiements (les plus récents)"),
+    rescan: bool = typer.Option(False, "--rescan", help="Relire les métadonnées modifiées hors de Cloudya")
+):
     """
-    Liste tous les déploiements
+    Liste les déploiements
     """
     from cloudya.utils.terraform import list_deployments
+    from cloudya.utils import deployment_registry
     
-    # Récupérer tous les déploiements
-    deployments = list_deployments()
+    since_date = None
+    if since:
+        since_date = deployment_registry.parse_since(since)
+        if since_date is None:
+            console.print(f"[red]Valeur invalide pour --since: {since}[/red]")
+            raise typer.Exit(1)
+    
+    if rescan:
+        stats = deployment_registry.sync(deployment_registry.TERRAFORM, full=True)
+        console.print(f"[dim]Registre: {stats['added']} ajouté(s), {stats['updated']} mis à jour, {stats['removed']} supprimé(s)[/dim]")
+    
+    # Récupérer les déploiements (requête indexée)
+    deployments = list_deployments(status=status, provider=provider, since=since_date, limit=limit)
     
     if not deployments:
         console.print("[yellow]Aucun déploiement trouvé.[/yellow]")
@@ -340,5 +531,332 @@ def list_deployments():
     # Afficher la table
     console.print(table)
 
+def _format_size(size):
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if size < 1024 or unit == "Go":
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+
+@app.command("cache")
+def show_cache(
+    clear: bool = typer.Option(False, "--clear", help="Vider le cache d'initialisation"),
+    plugins: bool = typer.Option(False, "--plugins", help="Avec --clear, supprimer aussi les providers")
+):
+    """
+    Affiche l'état du cache partagé des providers et modules Terraform
+    """
+    from cloudya.utils import terraform_cache
+    
+    if clear:
+        terraform_cache.clear(plugins=plugins)
+        console.print("[green]Cache Terraform vidé.[/green]")
+        return
+    
+    info = terraform_cache.cache_info()
+    
+    from rich.table import Table
+    table = Table(title="Cache Terraform")
+    table.add_column("Élément", style="cyan")
+    table.add_column("Valeur", style="white")
+    
+    table.add_row("Providers (TF_PLUGIN_CACHE_DIR)", info["plugin_dir"])
+    table.add_row("Taille des providers", _format_size(info["plugins_size"]))
+    table.add_row("Miroir hors ligne", info["mirror_dir"])
+    table.add_row("Mode hors ligne", "oui" if info["offline"] else "non")
+    table.add_row("Initialisations en cache", str(info["init_entries"]))
+    table.add_row("Taille des initialisations", _format_size(info["init_size"]))
+    
+    labels = {"init": "Succès init (.terraform)", "providers": "Succès providers"}
+    for section, label in labels.items():
+        stats = info["stats"][section]
+        rate = terraform_cache.hit_rate(stats)
+        value = "aucune donnée" if rate is None else f"{rate:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})"
+        table.add_row(label, value)
+    
+    console.print(table)
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+
+@app.command("batch")
+def deploy_batch(
+    batch_file: str = typer.Argument(..., help="Fichier de lot (YAML ou JSON)"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-j", help="Nombre de commandes Terraform simultanées"),
+    continue_on_error: bool = typer.Option(False, "--continue-on-error", help="Poursuivre les déploiements indépendants après un échec"),
+    plan_only: bool = typer.Option(False, "--plan-only", help="S'arrêter après le plan Terraform"),
+    auto_approve: bool = typer.Option(False, "--auto-approve", "-y", help="Ne pas demander de confirmation"),
+    offline: Optional[bool] = typer.Option(None, "--offline/--online", help="Installer les providers depuis le miroir local uniquement"),
+    refresh: bool = typer.Option(False, "--refresh", help="Réappliquer aussi les déploiements aux entrées inchangées")
+):
+    """
+    Déploie un lot de templates en parallèle en respectant leurs dépendances
+    
+    Les déploiements dont les entrées n'ont pas changé depuis un déploiement
+    réussi sont réutilisés sans lancer Terraform, sauf avec --refresh.
+    """
+    from cloudya.utils.terraform import check_terraform
+    from cloudya.utils.terraform_batch import BatchError, BatchRunner, PHASES, load_batch
+    
+    try:
+        items, options = load_batch(batch_file)
+    except BatchError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    
+    workers = workers or options["workers"]
+    policy = "continue" if continue_on_error else options["policy"]
+    
+    console.print(f"[bold]Lot:[/bold] {len(items)} déploiement(s), {workers} en parallèle, politique {policy}")
+    for item in items:
+        dependencies = f" [dim](après {', '.join(item.depends_on)})[/dim]" if item.depends_on else ""
+        console.print(f" - [cyan]{item.name}[/cyan]: {item.template}{dependencies}")
+    
+    if not check_terraform():
+        raise typer.Exit(1)
+    
+    if not plan_only and not auto_approve:
+        if not Confirm.ask("Les plans seront appliqués sans confirmation individuelle. Continuer?"):
+            console.print("[yellow]Déploiement annulé.[/yellow]")
+            return
+    
+    def progress(item, message):
+        style = "red" if item.status == "failed" else "yellow" if item.status == "skipped" else "green"
+        console.print(f"[{style}]{item.name}[/{style}]: {message}")
+    
+    runner = BatchRunner(items, workers=workers, policy=policy, plan_only=plan_only,
+                         offline=offline, progress=progress, refresh=refresh)
+    started = time.monotonic()
+    success = runner.run()
+    elapsed = time.monotonic() - started
+    
+    from rich.table import Table
+    table = Table(title=f"Résumé du lot ({_format_duration(elapsed)})")
+    table.add_column("Nom", style="cyan")
+    table.add_column("Statut", style="white")
+    for phase in PHASES:
+        table.add_column(phase, justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Erreur", style="red")
+    
+    for item in items:
+        status_style = {"deployed": "green", "planned": "green", "unchanged": "green", "failed": "red"}.get(item.status, "yellow")
+        table.add_row(
+            item.name,
+            f"[{status_style}]{item.status}[/{status_style}]",
+            *[_format_duration(item.timings.get(phase)) for phase in PHASES],
+            _format_duration(sum(item.timings.values())) if item.timings else "-",
+            item.error or ""
+        )
+    
+    console.print(table)
+    
+    console.print("\n[bold]Journaux:[/bold]")
+    for item in items:
+        if item.log_file and os.path.exists(item.log_file):
+            console.print(f" - [cyan]{item.name}[/cyan]: {item.log_file}")
+    
+    if not success:
+        raise typer.Exit(1)
+
+@app.command("drift")
+def detect_drift(
+    provider: Optional[str] = typer.Option(None, "--provider", help="Vérifier uniquement un provider (ex: aws)"),
+    since: Optional[str] = typer.Option(None, "--since", help="Déploiements créés depuis une durée (30m, 24h, 7d, 2w) ou une date ISO"),
+    limit: Optional[int] = typer.Option(None, "--limit", "-n", help="Nombre maximal de déploiements (les plus récents)"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-j", help="Nombre de vérifications simultanées"),
+    per_provider: Optional[int] = typer.Option(None, "--per-provider", help="Vérifications simultanées par provider"),
+    max_age: str = typer.Option("6h", "--max-age", help="Ne pas revérifier les déploiements vérifiés depuis moins de cette durée"),
+    force: bool = typer.Option(False, "--force", "-f", help="Revérifier tous les déploiements")
+):
+    """
+    Détecte la dérive des déploiements actifs (terraform plan -refresh-only)
+    """
+    from cloudya.utils.terraform import check_terraform, list_deployments
+    from cloudya.utils import deployment_registry
+    from cloudya.utils.terraform_drift import run_checks, select_checks, sort_report
+    
+    since_date = None
+    if since:
+        since_date = deployment_registry.parse_since(since)
+        if since_date is None:
+            console.print(f"[red]Valeur invalide pour --since: {since}[/red]")
+            raise typer.Exit(1)
+    if deployment_registry.parse_since(max_age) is None:
+        console.print(f"[red]Valeur invalide pour --max-age: {max_age}[/red]")
+        raise typer.Exit(1)
+    
+    deployments = [
+        deployment for deployment in list_deployments(provider=provider, since=since_date, limit=limit)
+        if deployment.get("status") in deployment_registry.ACTIVE_STATUSES
+    ]
+    if not deployments:
+        console.print("[yellow]Aucun déploiement actif trouvé.[/yellow]")
+        return
+    
+    checks = select_checks(deployments, max_age=max_age, force=force)
+    pending = [check for check in checks if not check.cached]
+    console.print(f"[bold]Dérive:[/bold] {len(checks)} déploiement(s), {len(pending)} à vérifier, "
+                  f"{len(checks) - len(pending)} vérifié(s) depuis moins de {max_age}")
+    
+    if pending:
+        if not check_terraform():
+            raise typer.Exit(1)
+        
+        def progress(check):
+            style = {"drifted": "yellow", "error": "red"}.get(check.status, "green")
+            console.print(f"[{style}]{check.deployment_id[:8]}[/{style}]: {check.status} ({_format_duration(check.duration)})")
+        
+        started = time.monotonic()
+        checks = run_checks(checks, workers=workers, per_provider=per_provider, progress=progress)
+        elapsed = f" en {_format_duration(time.monotonic() - started)}"
+    else:
+        checks = sort_report(checks)
+        elapsed = ""
+    
+    from rich.table import Table
+    table = Table(title=f"Rapport de dérive{elapsed}")
+    table.add_column("ID", style="cyan")
+    table.add_column("Template", style="green")
+    table.add_column("Statut", style="white")
+    table.add_column("Ressources", overflow="fold")
+    table.add_column("Durée", justify="right")
+    table.add_column("Vérifié le", style="dim")
+    
+    for check in checks:
+        status_style = {"drifted": "yellow", "error": "red"}.get(check.status, "green")
+        if check.status == "drifted":
+            details = ", ".join(item["address"] for item in check.drift) or "?"
+        else:
+            details = check.error or ""
+        table.add_row(
+            check.deployment_id[:8],
+            check.template,
+            f"[{status_style}]{check.status}[/{status_style}]",
+            details,
+            _format_duration(check.duration),
+            (check.checked_at or "")[5:16].replace("T", " ")
+        )
+    
+    console.print(table)
+    
+    drifted = sum(1 for check in checks if check.status == "drifted")
+    errors = sum(1 for check in checks if check.status == "error")
+    console.print(f"[bold]{drifted}[/bold] en dérive, [bold]{errors}[/bold] en erreur, "
+                  f"[bold]{len(checks) - drifted - errors}[/bold] à jour")
+    if drifted or errors:
+        raise typer.Exit(2 if drifted else 1)
+
+@app.command("history")
+def show_history(
+    deployment_id: str = typer.Argument(..., help="ID du déploiement (ou préfixe non ambigu)")
+):
+    """
+    Affiche l'historique des phases d'un déploiement (init, plan, apply...)
+    """
+    from cloudya.utils.terraform import get_deployment_dir, get_deployment_history
+    
+    deployment_dir = get_deployment_dir(deployment_id)
+    if not deployment_dir:
+        console.print(f"[red]Déploiement '{deployment_id}' non trouvé.[/red]")
+        raise typer.Exit(1)
+    
+    entries = get_deployment_history(deployment_dir)
+    if not entries:
+        console.print("[yellow]Aucun événement enregistré pour ce déploiement.[/yellow]")
+        return
+    
+    from rich.table import Table
+    table = Table(title=f"Historique du déploiement {os.path.basename(deployment_dir)}")
+    table.add_column("Date", style="dim")
+    table.add_column("Statut", style="cyan")
+    table.add_column("Durée", justify="right")
+    
+    for entry in entries:
+        status_style = "red" if entry["status"].startswith("failed") else "green" if entry["status"] == "deployed" else "white"
+        table.add_row(
+            (entry["at"] or "").replace("T", " ")[:19],
+            f"[{status_style}]{entry['status']}[/{status_style}]",
+            _format_duration(entry["duration"])
+        )
+    
+    console.print(table)
+
+@app.command("show-plan")
+def show_plan(
+    deployment_id: str = typer.Argument(..., help="ID du déploiement (ou préfixe non ambigu)"),
+    action: Optional[str] = typer.Option(None, "--action", "-a", help="Filtrer par action (create, update, replace, delete, read)"),
+    resource_type: Optional[str] = typer.Option(None, "--type", "-t", help="Filtrer par type de ressource"),
+    module: Optional[str] = typer.Option(None, "--module", "-m", help="Filtrer par module ((racine) pour le module racine)"),
+    destructive: bool = typer.Option(False, "--destructive", "-d", help="Seulement les suppressions et remplacements"),
+    page: int = typer.Option(1, "--page", help="Page à afficher"),
+    page_size: int = typer.Option(50, "--page-size", help="Changements par page"),
+    show_all: bool = typer.Option(False, "--all", help="Tout afficher dans le pager")
+):
+    """
+    Affiche le détail du dernier plan d'un déploiement, page par page
+    
+    Le plan est lu dans l'export 'terraform show -json' conservé dans le
+    déploiement (créé s'il manque et qu'un plan sauvegardé existe).
+    """
+    import itertools
+    from cloudya.utils import plan_summary
+    from cloudya.utils.terraform import get_deployment_dir, PLAN_FILE
+    
+    deployment_dir = get_deployment_dir(deployment_id)
+    if not deployment_dir:
+        console.print(f"[red]Déploiement '{deployment_id}' non trouvé.[/red]")
+        raise typer.Exit(1)
+    
+    summary = plan_summary.load_summary(deployment_dir)
+    if summary is None and os.path.isfile(os.path.join(deployment_dir, PLAN_FILE)):
+        with console.status("[bold green]Export du plan (terraform show -json)...[/bold green]"):
+            summary = plan_summary.analyze(get_terraform_path(), deployment_dir, PLAN_FILE)
+    if summary is None:
+        console.print("[yellow]Aucun plan enregistré pour ce déploiement.[/yellow]")
+        raise typer.Exit(1)
+    
+    plan_path = os.path.join(deployment_dir, plan_summary.PLAN_JSON_FILE)
+    changes = (
+        change for change in plan_summary.iter_changes(plan_path, action, resource_type, module)
+        if change["action"] != "noop" or action == "noop"
+    )
+    if destructive:
+        changes = (change for change in changes if change["action"] in plan_summary.DESTRUCTIVE_ACTIONS)
+    
+    page_size = max(1, page_size)
+    page = max(1, page)
+    if show_all:
+        selected = list(changes)
+        total = len(selected)
+    else:
+        # Un seul parcours de l'export : la page demandée est conservée, le reste seulement compté
+        skipped = sum(1 for _change in itertools.islice(changes, (page - 1) * page_size))
+        selected = list(itertools.islice(changes, page_size))
+        total = skipped + len(selected) + sum(1 for _change in changes)
+    
+    if not total:
+        console.print("[yellow]Aucun changement ne correspond aux filtres.[/yellow]")
+        return
+    
+    pages = (total + page_size - 1) // page_size
+    title = f"Plan du déploiement {os.path.basename(deployment_dir)}"
+    if not show_all:
+        title += f" (page {min(page, pages)}/{pages})"
+    table = plan_summary.changes_table(selected, title)
+    
+    if show_all:
+        with console.pager(styles=True):
+            console.print(table)
+        return
+    
+    console.print(table)
+    console.print(f"[dim]{total} changement(s)[/dim]")
+    if page < pages:
+        console.print(f"[dim]Suite: --page {page + 1} (ou --all pour tout afficher dans le pager)[/dim]")
+
 if __name__ == "__main__":
     app()
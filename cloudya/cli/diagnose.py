@@ -8,6 +8,7 @@ import shutil
 import datetime
 from pathlib import Path
 
+from cloudya.utils import toolchain
 from cloudya.utils.system import collect_logs, check_service_status, check_cpu_usage, check_memory_usage, check_disk_usage
 
 app = typer.Typer(help="Diagnostiquer les problèmes d'infrastructure")
@@ -164,6 +165,17 @@ def diagnose(
                 console.print(f"[green]✓ {service}: En cours d'exécution[/green]")
             else:
                 console.print(f"[red]✗ {service}: Arrêté ou non trouvé[/red]")
+        
+        # Outils utilisés par Cloudya (versions en cache, sondées une fois par binaire)
+        with console.status("Vérification des outils..."):
+            tools = toolchain.list_tools()
+        
+        console.print("\n[bold]Outils:[/bold]")
+        for name, tool in tools.items():
+            if tool:
+                console.print(f"[green]✓ {name}: {tool.version or 'version inconnue'}[/green] [dim]({tool.path})[/dim]")
+            else:
+                console.print(f"[yellow]! {name}: non installé[/yellow]")
 
 @app.command("local")
 def local_diagnose(
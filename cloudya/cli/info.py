@@ -4,19 +4,17 @@ import requests
 import os
 import sys
 import json
-import configparser
 from pathlib import Path
 
+from cloudya.utils.config import load_ini_config
+
 # Configuration
 CONFIG_DIR = Path.home() / ".cloudya"
 CONFIG_FILE = CONFIG_DIR / "config.ini"
 
 def get_config():
     """Charge la configuration"""
-    config = configparser.ConfigParser()
-    if CONFIG_FILE.exists():
-        config.read(CONFIG_FILE)
-    return config
+    return load_ini_config()
 
 def get_token():
     """Récupère le token d'API"""
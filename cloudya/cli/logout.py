@@ -2,9 +2,10 @@
 import argparse
 import os
 import sys
-import configparser
 from pathlib import Path
 
+from cloudya.utils.config import load_ini_config
+
 # Configuration
 CONFIG_DIR = Path.home() / ".cloudya"
 CONFIG_FILE = CONFIG_DIR / "config.ini"
@@ -20,8 +21,7 @@ def main():
         return 0
     
     # Charger la configuration
-    config = configparser.ConfigParser()
-    config.read(CONFIG_FILE)
+    config = load_ini_config()
     
     # Supprimer le token s'il existe
     if 'auth' in config and 'token' in config['auth']:
@@ -7,6 +7,7 @@ Inspiré de la structure d'Ansible
 import os
 import sys
 import subprocess
+import importlib
 from pathlib import Path
 
 def get_cli_directory():
@@ -14,15 +15,19 @@ def get_cli_directory():
     return Path(__file__).parent.absolute()
 
 def list_available_commands():
-    """Liste les commandes CLI disponibles"""
-    cli_dir = get_cli_directory()
-    commands = []
+    """Liste les commandes CLI disponibles (depuis le registre, sans import)"""
+    from cloudya.utils.command_registry import list_commands
+    return list_commands()
+
+def command_exists(command):
+    """Vérifie si une commande peut être exécutée"""
+    from cloudya.utils.command_registry import get_command, HIDDEN_COMMANDS
     
-    for file in cli_dir.glob("*.py"):
-        if file.name not in ["__init__.py", "main.py"]:
-            commands.append(file.stem)
+    if get_command(command):
+        return True
     
-    return sorted(commands)
+    # Scripts présents mais masqués de la liste (ex: maintenance)
+    return command in HIDDEN_COMMANDS and (get_cli_directory() / f"{command}.py").exists()
 
 def show_help():
     """Affiche l'aide principale"""
@@ -51,25 +56,105 @@ def show_help():
 
 def get_command_description(command):
     """Retourne la description d'une commande"""
-    descriptions = {
-        "template": "Gérer les templates (list, show, install, remove)",
-        "chat": "Interface de chat avec l'assistant IA",
-        "deploy": "Déployer des infrastructures avec Terraform",
-        "app": "Gérer les applications avec Ansible/Docker",
-        "stack": "Déployer des stacks complètes",
-        "monitor": "Surveiller les ressources système",
-        "diagnose": "Diagnostiquer les problèmes",
-        "connect": "Se connecter aux providers cloud",
-        "login": "Se connecter à l'API Cloudya",
-        "logout": "Se déconnecter de l'API Cloudya", 
-        "register": "S'inscrire à l'API Cloudya",
-        "info": "Afficher les informations de compte",
-        "configure": "Configurer Cloudya",
-        "ask": "Poser une question à l'IA",
-        "hello": "Commandes de test",
-        "chat_simple": "Chat simple en mode texte"
-    }
-    return descriptions.get(command, "")
+    from cloudya.utils.command_registry import get_command_description as registry_description
+    return registry_description(command)
+
+BUILTIN_COMMANDS = ["help", "version", "completion"]
+
+BASH_COMPLETION = """_cloudya_complete() {
+    local IFS=$'\\n'
+    COMPREPLY=($(cloudya __complete "${COMP_WORDS[@]:1:$COMP_CWORD}"))
+}
+complete -o default -F _cloudya_complete cloudya
+"""
+
+ZSH_COMPLETION = """#compdef cloudya
+_cloudya() {
+    local -a completions
+    completions=("${(@f)$(cloudya __complete "${(@)words[2,$CURRENT]}")}")
+    compadd -a completions
+}
+compdef _cloudya cloudya
+"""
+
+def show_completion(shell):
+    """Affiche le script de complétion pour un shell"""
+    scripts = {"bash": BASH_COMPLETION, "zsh": ZSH_COMPLETION}
+    
+    if shell not in scripts:
+        print("Usage: cloudya completion [bash|zsh]")
+        print()
+        print("Exemple:")
+        print('  eval "$(cloudya completion bash)"')
+        return 1
+    
+    print(scripts[shell], end="")
+    return 0
+
+def complete_words(words):
+    """Affiche les complétions possibles, une par ligne"""
+    from cloudya.utils.command_registry import complete
+    
+    for candidate in complete(words, builtins=BUILTIN_COMMANDS):
+        print(candidate)
+    return 0
+
+def use_subprocess():
+    """Indique si les commandes doivent être exécutées dans un sous-processus"""
+    return os.environ.get("CLOUDYA_SUBPROCESS") == "1"
+
+def _exit_code(code):
+    """Convertit le code d'un SystemExit comme le ferait l'interpréteur"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    # sys.exit("message") affiche le message sur stderr et retourne 1
+    print(code, file=sys.stderr)
+    return 1
+
+def run_command_inprocess(command, command_file, args):
+    """
+    Exécute une commande CLI dans le processus courant
+    
+    Le module de la commande est importé puis son application typer (app)
+    ou sa fonction main() argparse est appelée avec le même sys.argv que
+    lors d'une exécution en sous-processus, afin de conserver le nom du
+    programme, l'analyse des arguments et les codes de sortie.
+    
+    Args:
+        command: Nom de la commande (ex: deploy)
+        command_file: Chemin du fichier de la commande
+        args: Arguments de la commande
+        
+    Returns:
+        Code de sortie de la commande
+    """
+    saved_argv = sys.argv
+    sys.argv = [str(command_file)] + list(args)
+    
+    try:
+        module = importlib.import_module(f"cloudya.cli.{command}")
+        
+        # Application typer : même nom de programme qu'en sous-processus
+        typer_app = getattr(module, "app", None)
+        if callable(typer_app):
+            return _exit_code(typer_app(prog_name=Path(command_file).name))
+        
+        # Commande argparse : main() lit sys.argv
+        entry_point = getattr(module, "main", None)
+        if callable(entry_point):
+            return _exit_code(entry_point())
+        
+        print(f"❌ Erreur: La commande '{command}' n'a pas de point d'entrée.")
+        return 1
+        
+    except SystemExit as e:
+        return _exit_code(e.code)
+    finally:
+        sys.argv = saved_argv
+        sys.stdout.flush()
+        sys.stderr.flush()
 
 def execute_command(command, args):
     """Exécute une commande CLI"""
@@ -88,11 +173,17 @@ def execute_command(command, args):
         show_help()
         return 0
     
+    if command == "completion":
+        return show_completion(args[0] if args else None)
+    
+    if command == "__complete":
+        return complete_words(args)
+    
     # Vérifier si la commande existe
     cli_dir = get_cli_directory()
     command_file = cli_dir / f"{command}.py"
     
-    if not command_file.exists():
+    if not command_exists(command):
         print(f"❌ Erreur: Commande '{command}' inconnue.")
         print()
         available = list_available_commands()
@@ -111,9 +202,13 @@ def execute_command(command, args):
         if debug:
             print(f"🐛 Debug: Exécution de {command_file} avec args: {args}")
         
-        # Exécuter le module CLI
-        result = subprocess.run([sys.executable, str(command_file)] + args)
-        return result.returncode
+        # Le mode sous-processus reste disponible en repli explicite
+        if use_subprocess():
+            result = subprocess.run([sys.executable, str(command_file)] + args)
+            return result.returncode
+        
+        # Exécuter le module CLI dans le processus courant
+        return run_command_inprocess(command, command_file, args)
         
     except KeyboardInterrupt:
         print("\n⚠️ Commande interrompue par l'utilisateur.")
@@ -136,6 +231,14 @@ def main():
     command = sys.argv[1]
     args = sys.argv[2:] if len(sys.argv) > 2 else []
     
+    # Passer par le démon s'il est démarré (repli transparent sinon)
+    if not use_subprocess():
+        from cloudya.utils.daemon import DAEMON_BYPASS, run_via_daemon
+        if command not in DAEMON_BYPASS:
+            returncode = run_via_daemon(sys.argv[1:])
+            if returncode is not None:
+                return returncode
+    
     # Exécuter la commande
     return execute_command(command, args)
 
@@ -7,7 +7,6 @@ from typing import Optional, List
 import os
 import sys
 import time
-import json
 import yaml
 from pathlib import Path
 
@@ -294,9 +293,8 @@ def deploy_stack(
         console.print("[bold green]Déploiement de l'infrastructure réussi ![/bold green]")
         
         # Récupérer l'ID du déploiement
-        metadata_file = os.path.join(deployment_dir, "metadata.json")
-        with open(metadata_file, "r") as f:
-            metadata = json.load(f)
+        from cloudya.utils.deployment_journal import load_state
+        metadata = load_state(deployment_dir) or {}
         
         infra_deployment_id = metadata.get("id")
         console.print(f"[bold]ID du déploiement d'infrastructure:[/bold] {infra_deployment_id}")
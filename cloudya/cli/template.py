@@ -32,9 +32,13 @@ Usage: cloudya template COMMAND [OPTIONS]
 Commandes:
   list                     Liste tous les templates disponibles
   list CATEGORY           Liste les templates d'une catégorie
+  search QUERY            Recherche floue (noms, descriptions, paramètres)
   show NAME               Affiche un template
   show NAME --category=CAT Affiche un template dans une catégorie
   install NAME URL        Installe un template depuis une URL
+  sync [REPO]             Synchronise les dépôts de templates configurés
+  validate --all          Valide tous les templates Terraform (manifest, fmt, validate)
+  validate PROVIDER/NAME  Valide un template Terraform
   remove NAME             Supprime un template utilisateur
   info NAME               Affiche les informations d'un template
   paths                   Affiche les chemins de recherche
@@ -42,8 +46,12 @@ Commandes:
 Exemples:
   cloudya template list
   cloudya template list terraform/aws
+  cloudya template search "wordpress mysql"
   cloudya template show vpc --category=terraform/aws
   cloudya template install my-vpc https://raw.githubusercontent.com/.../vpc.tf
+  cloudya template sync
+  cloudya template sync official --workers=16
+  cloudya template validate --all --workers=8
   cloudya template remove my-vpc
   cloudya template info wordpress --category=apps
 
@@ -98,6 +106,30 @@ def list_templates(category=None):
     except Exception as e:
         console.print(f"[red]Erreur lors de la liste des templates: {e}[/red]")
 
+def search_templates(query, limit=20):
+    """Recherche des templates par correspondance floue"""
+    try:
+        results = template_manager.search_templates(query, limit)
+    except Exception as e:
+        console.print(f"[red]❌ Erreur lors de la recherche: {e}[/red]")
+        return
+    
+    if not results:
+        console.print(f"[yellow]Aucun template ne correspond à '{query}'[/yellow]")
+        return
+    
+    table = Table(title=f"🔎 Résultats pour '{query}'")
+    table.add_column("Score", style="yellow", justify="right", width=6)
+    table.add_column("Type", style="green")
+    table.add_column("Nom", style="cyan")
+    table.add_column("Catégorie", style="white")
+    table.add_column("Description", style="dim")
+    
+    for result in results:
+        table.add_row(f"{result.score:.2f}", result.kind, result.name, result.category, result.description)
+    
+    console.print(table)
+
 def show_template(name, category=None):
     """Affiche le contenu d'un template"""
     try:
@@ -146,6 +178,93 @@ def install_template(name, url, category=None):
     except Exception as e:
         console.print(f"[red]❌ Erreur lors de l'installation: {e}[/red]")
 
+def sync_templates(name=None, workers=None, force=False):
+    """Synchronise les dépôts de templates configurés"""
+    names = [name] if name else None
+    
+    try:
+        with console.status("[bold green]Synchronisation des dépôts de templates...[/bold green]"):
+            results = template_manager.sync_repositories(names, workers=workers, force=force)
+    except Exception as e:
+        console.print(f"[red]❌ Erreur lors de la synchronisation: {e}[/red]")
+        return False
+    
+    if not results:
+        console.print("[yellow]⚠️ Aucun dépôt de templates à synchroniser[/yellow]")
+        return False
+    
+    table = Table(title="🔄 Synchronisation des templates")
+    table.add_column("Dépôt", style="cyan")
+    table.add_column("Téléchargés", style="green", justify="right")
+    table.add_column("Inchangés", style="white", justify="right")
+    table.add_column("Erreurs", style="red", justify="right")
+    table.add_column("Transféré", style="yellow", justify="right")
+    
+    for stats in results:
+        table.add_row(stats['name'], str(stats['downloaded']), str(stats['unchanged']),
+                      str(stats['failed']), f"{stats['bytes']} octets")
+    
+    console.print(table)
+    
+    errors = [error for stats in results for error in stats['errors']]
+    for error in errors[:10]:
+        console.print(f"  [red]•[/red] {error}")
+    if len(errors) > 10:
+        console.print(f"  ... et {len(errors) - 10} autre(s) erreur(s)")
+    
+    console.print(f"   Emplacement: {template_manager.search_paths[1]}")
+    return not errors
+
+def _print_validation(result):
+    """Affiche un template invalide dès que son résultat est connu"""
+    if result['status'] != 'valid':
+        console.print(f"[red]❌ {result['template']}[/red]: {result['errors'][0] if result['errors'] else result['status']}")
+
+def validate_templates(name=None, workers=None, force=False):
+    """Valide les templates Terraform du catalogue"""
+    from cloudya.utils.template_validation import validate_templates as run_validation
+    
+    try:
+        with console.status("[bold green]Validation des templates Terraform...[/bold green]"):
+            results = run_validation([name] if name else None, workers=workers, force=force,
+                                     progress=_print_validation)
+    except Exception as e:
+        console.print(f"[red]❌ Erreur lors de la validation: {e}[/red]")
+        return False
+    
+    if not results:
+        console.print(f"[yellow]⚠️ Aucun template Terraform {'nommé ' + name if name else 'à valider'}[/yellow]")
+        return False
+    
+    table = Table(title="🔎 Validation des templates Terraform")
+    table.add_column("Template", style="cyan")
+    table.add_column("Statut")
+    table.add_column("Durée", justify="right")
+    table.add_column("Détails")
+    
+    styles = {"valid": "green", "invalid": "red", "error": "yellow"}
+    for result in results:
+        style = styles.get(result['status'], "white")
+        duration = "cache" if result['cached'] else f"{result['duration']:.1f}s"
+        details = "; ".join(result['errors'][:2])
+        if len(result['errors']) > 2:
+            details += f" (+{len(result['errors']) - 2})"
+        if result['warnings']:
+            details += f"{' ' if details else ''}[dim]{len(result['warnings'])} avertissement(s)[/dim]"
+        table.add_row(result['template'], f"[{style}]{result['status']}[/{style}]", duration, details)
+    
+    console.print(table)
+    
+    failed = [result for result in results if result['status'] != 'valid']
+    cached = sum(1 for result in results if result['cached'])
+    console.print(f"   {len(results) - len(failed)}/{len(results)} template(s) valide(s), {cached} depuis le cache")
+    if name:
+        for error in results[0]['errors']:
+            console.print(f"  [red]•[/red] {error}")
+        for warning in results[0]['warnings']:
+            console.print(f"  [yellow]•[/yellow] {warning}")
+    return not failed
+
 def remove_template(name, category=None):
     """Supprime un template utilisateur"""
     console.print(f"🗑️  Suppression du template '[cyan]{name}[/cyan]'")
@@ -179,6 +298,8 @@ def show_template_info(name, category=None):
         table.add_row("Chemin", info['path'])
         if info['size']:
             table.add_row("Taille", f"{info['size']} octets")
+        if info.get('sha256'):
+            table.add_row("SHA-256", info['sha256'])
         
         console.print(table)
         
@@ -246,6 +367,9 @@ def main():
     parser.add_argument("url", nargs="?", help="URL source (pour install)")
     parser.add_argument("--category", "-c", help="Catégorie du template")
     parser.add_argument("--force", "-f", action="store_true", help="Forcer l'opération")
+    parser.add_argument("--workers", "-j", type=int, help="Téléchargements (sync) ou validations (validate) simultanés")
+    parser.add_argument("--all", "-a", action="store_true", help="Valider tous les templates (pour validate)")
+    parser.add_argument("--limit", "-n", type=int, default=20, help="Nombre maximal de résultats (pour search)")
     
     args = parser.parse_args()
     
@@ -260,6 +384,12 @@ def main():
         if command == "list":
             list_templates(args.name)  # args.name sert de catégorie pour list
             
+        elif command == "search":
+            if not args.name:
+                console.print("[red]❌ Texte de recherche requis pour 'search'[/red]")
+                return 1
+            search_templates(args.name, args.limit)
+            
         elif command == "show":
             if not args.name:
                 console.print("[red]❌ Nom du template requis pour 'show'[/red]")
@@ -273,6 +403,17 @@ def main():
                 return 1
             install_template(args.name, args.url, args.category)
             
+        elif command == "sync":
+            if not sync_templates(args.name, args.workers, args.force):
+                return 1
+            
+        elif command == "validate":
+            if not args.name and not args.all:
+                console.print("[red]❌ Nom du template (provider/template) ou --all requis pour 'validate'[/red]")
+                return 1
+            if not validate_templates(None if args.all else args.name, args.workers, args.force):
+                return 1
+            
         elif command == "remove":
             if not args.name:
                 console.print("[red]❌ Nom du template requis pour 'remove'[/red]")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Moteur de rendu Jinja2 des templates Cloudya
+
+Le loader suit la même hiérarchie que CloudyaTemplateManager (templates
+utilisateur, système puis package) et s'appuie sur son index : résoudre un
+template ou un {% include %} ne coûte qu'une consultation de dictionnaire.
+
+Les templates compilés sont conservés dans un FileSystemBytecodeCache sous
+le répertoire de cache XDG. Jinja2 les identifie par nom et les invalide
+par empreinte du source : un template inchangé n'est jamais recompilé d'une
+exécution à l'autre.
+"""
+
+import os
+from pathlib import Path
+
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, TemplateNotFound
+
+BYTECODE_CACHE_DIR = "jinja2"
+
+class CloudyaTemplateLoader(BaseLoader):
+    """Loader Jinja2 basé sur la hiérarchie XDG du gestionnaire de templates"""
+
+    def __init__(self, manager):
+        """
+        Args:
+            manager: Instance de CloudyaTemplateManager
+        """
+        self.manager = manager
+
+    def get_source(self, environment, template):
+        # Nom exact (ex: 'apps/wordpress.yml.j2') puis nom sans extension
+        extensions = self.manager.config['templates']['extensions']
+        candidates = [template] + [f"{template}{ext}" for ext in extensions]
+
+        entry = self.manager.find_template(candidates)
+        if entry is None:
+            raise TemplateNotFound(template)
+
+        source = entry.path.read_text(encoding='utf-8')
+
+        if entry.source == 'package':
+            # Les templates du package ne changent qu'avec sa version
+            return source, f"cloudya.templates/{entry.name}", lambda: True
+
+        filename = str(entry.path)
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            mtime = None
+
+        def uptodate():
+            try:
+                return os.path.getmtime(filename) == mtime
+            except OSError:
+                return False
+
+        return source, filename, uptodate
+
+def create_environment(manager) -> Environment:
+    """
+    Crée l'environnement Jinja2 des templates Cloudya
+
+    Args:
+        manager: Instance de CloudyaTemplateManager
+
+    Returns:
+        Environnement Jinja2 avec cache de bytecode persistant
+    """
+    cache_dir = Path(manager.cache_dir) / BYTECODE_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    return Environment(
+        loader=CloudyaTemplateLoader(manager),
+        bytecode_cache=FileSystemBytecodeCache(str(cache_dir)),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        auto_reload=True
+    )
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Index persistant des templates Cloudya
+
+L'index est stocké dans le répertoire de cache XDG (~/.cache/cloudya) et
+associe, pour chaque source (user_config, user_data, system), les fichiers
+de templates à leur taille, date de modification et empreinte SHA-256.
+
+Il est validé par les dates de modification des répertoires : seuls les
+répertoires modifiés depuis la dernière validation sont relus, et seuls les
+fichiers nouveaux ou modifiés sont rehachés. Les recherches (résolution,
+listing, informations) deviennent ainsi de simples consultations de
+dictionnaires, sans parcours du disque. Modifier un fichier sur place ne
+change pas la date de son répertoire : les index dont le contenu compte
+(check_files) revérifient aussi chaque fichier indexé.
+
+Les templates du package (cloudya.templates) sont parcourus via
+importlib.resources, ce qui fonctionne aussi depuis une wheel zippée ou une
+zipapp. Le résultat est mémorisé par version installée du package.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from importlib.resources import files
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+INDEX_NAME = "templates-index.json"
+INDEX_VERSION = 1
+
+PACKAGE_INDEX_NAME = "package-templates.json"
+PACKAGE_TEMPLATES = "cloudya.templates"
+
+class TemplateEntry(NamedTuple):
+    """Fichier de template trouvé dans l'index"""
+    source: str
+    name: str
+    path: Path  # Traversable pour les templates du package
+    size: int
+    sha256: str
+
+def _hash_file(path) -> str:
+    """Calcule l'empreinte SHA-256 d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def strip_extension(filename: str, extensions: Sequence[str]) -> Optional[str]:
+    """Retire la première extension de template reconnue (ou None)"""
+    for ext in extensions:
+        if filename.endswith(ext):
+            return filename[:-len(ext)]
+    return None
+
+class TemplateIndex:
+    """Index des templates sur disque, validé par les mtimes des répertoires"""
+
+    def __init__(self, index_file: Path, sources: Sequence[Tuple[str, Path]], check_files: bool = False):
+        """
+        Args:
+            index_file: Chemin du fichier d'index (dans le cache)
+            sources: Liste ordonnée (nom de la source, répertoire racine)
+            check_files: Revérifier aussi la taille et la date de chaque
+                fichier indexé (un stat par fichier et par processus)
+        """
+        self.index_file = Path(index_file)
+        self.sources = [(name, Path(root)) for name, root in sources]
+        self.check_files = check_files
+        self._data = None
+        self._files: Dict[str, Dict[str, dict]] = {}
+        self._validated_pid = None
+        self._extensions = None
+        self.fingerprint = None
+
+    def invalidate(self):
+        """Force une revalidation lors de la prochaine consultation"""
+        self._validated_pid = None
+
+    def _load(self) -> dict:
+        """Charge l'index depuis le cache"""
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"version": INDEX_VERSION, "extensions": [], "sources": {}}
+
+    def _save(self, data: dict):
+        """Écrit l'index de façon atomique"""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(self.index_file.name + f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"Impossible d'écrire l'index des templates: {e}")
+
+    def _scan_dir(self, directory: str, mtime: int, previous: Optional[dict], extensions: Sequence[str]) -> dict:
+        """Relit un seul répertoire, en réutilisant les empreintes inchangées"""
+        old_files = previous["files"] if previous else {}
+        subdirs = []
+        files = {}
+
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                    continue
+                if not entry.is_file() or strip_extension(entry.name, extensions) is None:
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            old = old_files.get(entry.name)
+            if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime_ns:
+                files[entry.name] = old
+                continue
+
+            try:
+                sha256 = _hash_file(entry.path)
+            except OSError:
+                continue
+            files[entry.name] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": sha256}
+
+        return {"mtime": mtime, "subdirs": sorted(subdirs), "files": files}
+
+    @staticmethod
+    def _files_changed(directory: str, entry: dict) -> bool:
+        """Vérifie si un fichier indexé a été modifié sur place (taille ou date)"""
+        for filename, meta in entry["files"].items():
+            try:
+                stat = os.stat(os.path.join(directory, filename))
+            except OSError:
+                return True
+            if stat.st_size != meta["size"] or stat.st_mtime_ns != meta["mtime"]:
+                return True
+        return False
+
+    def _refresh_source(self, root: Path, previous: dict, extensions: Sequence[str]) -> Tuple[dict, bool]:
+        """
+        Revalide une source en ne relisant que les répertoires modifiés
+
+        Avec check_files, les fichiers déjà indexés des répertoires inchangés
+        sont aussi revérifiés (taille et date de modification).
+
+        Returns:
+            Tuple (répertoires indexés, True si quelque chose a changé)
+        """
+        old_dirs = previous.get("dirs", {}) if previous.get("root") == str(root) else {}
+        dirs = {}
+        changed = False
+        stack = [""]
+
+        while stack:
+            rel = stack.pop()
+            directory = os.path.join(root, rel) if rel else str(root)
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                changed = changed or rel in old_dirs
+                continue
+
+            entry = old_dirs.get(rel)
+            if entry is None or entry["mtime"] != mtime or \
+                    (self.check_files and self._files_changed(directory, entry)):
+                entry = self._scan_dir(directory, mtime, entry, extensions)
+                changed = True
+
+            dirs[rel] = entry
+            stack.extend(f"{rel}/{name}" if rel else name for name in entry["subdirs"])
+
+        if len(dirs) != len(old_dirs):
+            changed = True
+
+        return dirs, changed
+
+    def refresh(self, extensions: Sequence[str], force: bool = False):
+        """
+        Valide l'index (une fois par processus) et le reconstruit si besoin
+
+        Args:
+            extensions: Extensions de templates reconnues
+            force: Revalider même si l'index a déjà été validé
+        """
+        extensions = list(extensions)
+        if not force and self._validated_pid == os.getpid() and self._extensions == extensions:
+            return
+
+        data = self._data if self._data is not None else self._load()
+        if data.get("extensions") != extensions:
+            data = {"version": INDEX_VERSION, "extensions": extensions, "sources": {}}
+            changed = True
+        else:
+            changed = False
+
+        sources = {}
+        for name, root in self.sources:
+            dirs, source_changed = self._refresh_source(root, data["sources"].get(name, {}), extensions)
+            sources[name] = {"root": str(root), "dirs": dirs}
+            changed = changed or source_changed
+
+        data["sources"] = sources
+        if changed:
+            self._save(data)
+
+        self._data = data
+        self._extensions = extensions
+        self._files = {
+            name: {
+                (f"{rel}/{filename}" if rel else filename): meta
+                for rel, entry in source["dirs"].items()
+                for filename, meta in entry["files"].items()
+            }
+            for name, source in sources.items()
+        }
+        self._validated_pid = os.getpid()
+
+        # Empreinte de l'état indexé (change dès qu'un répertoire ou un fichier indexé change)
+        digest = hashlib.sha1(json.dumps(extensions).encode("utf-8"))
+        for name, source in sources.items():
+            for rel, entry in sorted(source["dirs"].items()):
+                digest.update(f"{name}\0{rel}\0{entry['mtime']}\n".encode("utf-8"))
+                for filename, meta in sorted(entry["files"].items()):
+                    digest.update(f"{filename}\0{meta['mtime']}\0{meta['size']}\n".encode("utf-8"))
+        self.fingerprint = digest.hexdigest()
+
+    def entries(self, source: str) -> Dict[str, dict]:
+        """Retourne les fichiers indexés d'une source {chemin relatif: métadonnées}"""
+        return self._files.get(source, {})
+
+    def lookup(self, candidates: Sequence[str]) -> Optional[TemplateEntry]:
+        """
+        Retourne le premier fichier existant parmi les candidats
+
+        Les sources sont parcourues par ordre de priorité, puis les candidats
+        dans l'ordre fourni.
+
+        Args:
+            candidates: Chemins relatifs avec extension (ex: 'terraform/aws/vpc.tf')
+
+        Returns:
+            TemplateEntry ou None
+        """
+        for name, root in self.sources:
+            files = self._files.get(name, {})
+            for candidate in candidates:
+                meta = files.get(candidate)
+                if meta is not None:
+                    return TemplateEntry(name, candidate, root / candidate, meta["size"], meta["sha256"])
+        return None
+
+    def names(self, source: str, category: str = None) -> List[str]:
+        """
+        Liste les noms de templates d'une source (sans extension)
+
+        Args:
+            source: Nom de la source
+            category: Filtrer par catégorie (optionnel)
+
+        Returns:
+            Liste triée des noms de templates
+        """
+        files = self._files.get(source, {})
+        extensions = self._extensions or []
+
+        if category:
+            category = category.strip("/")
+            prefix = category + "/"
+            dirs = self._data["sources"].get(source, {}).get("dirs", {})
+            if category not in dirs:
+                return []
+            paths = [path for path in files if path.startswith(prefix)]
+        else:
+            paths = files
+
+        return sorted(strip_extension(path, extensions) for path in paths)
+
+def get_package_version() -> str:
+    """Retourne la version installée de Cloudya"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            return version("cloudya")
+        except PackageNotFoundError:
+            pass
+    except ImportError:
+        pass
+
+    from cloudya import __version__
+    return __version__
+
+def _walk_resources(root) -> Dict[str, dict]:
+    """Parcourt récursivement un Traversable (répertoire ou archive zip)"""
+    resources = {}
+    stack = [("", root)]
+
+    while stack:
+        prefix, directory = stack.pop()
+        for child in directory.iterdir():
+            name = child.name
+            # Ignorer le code du package lui-même
+            if name == "__pycache__" or (name.startswith("__") and name.endswith(".py")):
+                continue
+            rel = f"{prefix}{name}"
+            if child.is_dir():
+                stack.append((rel + "/", child))
+            elif child.is_file():
+                data = child.read_bytes()
+                resources[rel] = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+    return resources
+
+class PackageTemplates:
+    """Templates fournis par le package, mémorisés par version installée"""
+
+    def __init__(self, cache_file: Path, package: str = PACKAGE_TEMPLATES):
+        """
+        Args:
+            cache_file: Fichier de cache (dans le répertoire de cache XDG)
+            package: Package contenant les templates
+        """
+        self.cache_file = Path(cache_file)
+        self.package = package
+        self._root = None
+        self._resources = None
+
+    def root(self):
+        """Retourne la racine Traversable des templates du package (ou None)"""
+        if self._root is None:
+            try:
+                self._root = files(self.package)
+            except (ImportError, TypeError):
+                return None
+        return self._root
+
+    def cache_key(self) -> Optional[str]:
+        """Clé de cache : version installée et emplacement du package"""
+        root = self.root()
+        if root is None:
+            return None
+        return f"{get_package_version()}:{root}"
+
+    def resources(self) -> Dict[str, dict]:
+        """
+        Retourne la table chemin relatif -> métadonnées des templates du package
+
+        Le parcours n'a lieu qu'une fois par version installée : le résultat
+        est conservé en mémoire et dans le cache.
+        """
+        if self._resources is not None:
+            return self._resources
+
+        key = self.cache_key()
+        if key is None:
+            self._resources = {}
+            return self._resources
+
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == INDEX_VERSION and cached.get("key") == key:
+                self._resources = cached["resources"]
+                return self._resources
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            self._resources = _walk_resources(self.root())
+        except OSError as e:
+            print(f"Erreur lors du parcours des templates du package: {e}")
+            self._resources = {}
+            return self._resources
+
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(self.cache_file.name + f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "key": key, "resources": self._resources}, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Impossible d'écrire le cache des templates du package: {e}")
+
+        return self._resources
+
+    def lookup(self, candidates: Sequence[str]) -> Optional[TemplateEntry]:
+        """
+        Retourne le premier template du package parmi les candidats
+
+        Args:
+            candidates: Chemins relatifs avec extension
+
+        Returns:
+            TemplateEntry ou None
+        """
+        resources = self.resources()
+        for candidate in candidates:
+            meta = resources.get(candidate)
+            if meta is not None:
+                return TemplateEntry("package", candidate, self.root().joinpath(*candidate.split("/")),
+                                     meta["size"], meta["sha256"])
+        return None
+
+    def names(self, extensions: Sequence[str], category: str = None) -> List[str]:
+        """
+        Liste les noms de templates du package (sans extension)
+
+        Args:
+            extensions: Extensions de templates reconnues
+            category: Filtrer par catégorie (optionnel)
+
+        Returns:
+            Liste triée des noms de templates
+        """
+        prefix = category.strip("/") + "/" if category else ""
+        names = (strip_extension(path, extensions) for path in self.resources() if path.startswith(prefix))
+        return sorted(name for name in names if name is not None)
@@ -5,18 +5,26 @@ Suit l'architecture hybride recommandée avec hiérarchie XDG
 """
 
 import os
-import yaml
 import json
+import hashlib
 from pathlib import Path
-from typing import List, Dict, Optional, Union
-from importlib.resources import files
+from typing import List, Dict, Union
 import shutil
-import requests
+
+from cloudya.utils.config import load_templates_config, default_templates_config
+from cloudya.template_index import TemplateIndex, PackageTemplates, INDEX_NAME, PACKAGE_INDEX_NAME
 
 class TemplateNotFoundError(Exception):
     """Exception levée quand un template n'est pas trouvé"""
     pass
 
+# Noms des sources, dans l'ordre de search_paths
+SOURCE_NAMES = ['user_config', 'user_data', 'system']
+
+# Catégories internes (fichiers générés par Cloudya) : résolues par render()
+# mais absentes des listings et de la recherche
+INTERNAL_CATEGORIES = ['skeletons']
+
 class CloudyaTemplateManager:
     """Gestionnaire de templates avec résolution hiérarchique"""
     
@@ -51,35 +59,21 @@ class CloudyaTemplateManager:
         self.config_dir.mkdir(parents=True, exist_ok=True)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Index persistant des templates (dans le cache)
+        self.index = TemplateIndex(self.cache_dir / INDEX_NAME, list(zip(SOURCE_NAMES, self.search_paths)))
+        self.package_templates = PackageTemplates(self.cache_dir / PACKAGE_INDEX_NAME)
+        self._environment = None
+        self._search = None
     
     def load_config(self):
         """Charge la configuration des templates"""
-        config_file = self.config_dir / 'config.yaml'
-        
-        # Configuration par défaut
-        self.config = {
-            'templates': {
-                'default_engine': 'jinja2',
-                'extensions': ['.j2', '.yaml', '.yml', '.tf', '.py'],
-            },
-            'repositories': [
-                {
-                    'name': 'official',
-                    'url': 'https://github.com/acorvez/cloudya-templates',
-                    'branch': 'main'
-                }
-            ]
-        }
-        
-        # Charger la config utilisateur si elle existe
-        if config_file.exists():
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    user_config = yaml.safe_load(f)
-                    if user_config:
-                        self.config.update(user_config)
-            except Exception as e:
-                print(f"Erreur lors du chargement de la config: {e}")
+        # Configuration par défaut complétée par la config utilisateur (mise en cache)
+        try:
+            self.config = load_templates_config()
+        except Exception as e:
+            print(f"Erreur lors du chargement de la config: {e}")
+            self.config = default_templates_config()
     
     def resolve_template(self, template_name: str, category: str = None) -> str:
         """
@@ -92,37 +86,103 @@ class CloudyaTemplateManager:
         Returns:
             Contenu du template
         """
-        # Construire les chemins possibles
-        if category:
-            template_paths = [f"{category}/{template_name}", template_name]
-        else:
-            template_paths = [template_name]
+        template_paths = self._template_paths(template_name, category)
         
-        # Extensions possibles
+        # Recherche dans les chemins utilisateur/système puis fallback sur le package
+        entry = self._lookup(template_paths)
+        if entry:
+            return entry.path.read_text(encoding='utf-8')
+        
+        raise TemplateNotFoundError(f"Template '{template_name}' not found in category '{category}'")
+    
+    def _template_index(self) -> TemplateIndex:
+        """Retourne l'index des templates, validé pour ce processus"""
+        self.index.refresh(self.config['templates']['extensions'])
+        return self.index
+    
+    @staticmethod
+    def _template_paths(template_name: str, category: str = None) -> List[str]:
+        """
+        Chemins candidats (sans extension) d'un template
+        
+        Le nom seul sert de repli, sauf pour les catégories internes : un
+        template utilisateur du même nom ne doit pas remplacer un squelette.
+        """
+        if not category:
+            return [template_name]
+        if category.strip('/').split('/')[0] in INTERNAL_CATEGORIES:
+            return [f"{category}/{template_name}"]
+        return [f"{category}/{template_name}", template_name]
+    
+    def _lookup(self, template_paths: List[str]):
+        """Cherche un template par nom (sans extension) dans la hiérarchie"""
         extensions = self.config['templates']['extensions']
+        return self.find_template([f"{template_path}{ext}" for template_path in template_paths for ext in extensions])
+    
+    def find_template(self, candidates: List[str]):
+        """
+        Cherche le premier fichier existant parmi les candidats
         
-        # Recherche dans les chemins utilisateur/système
-        for search_path in self.search_paths:
-            for template_path in template_paths:
-                for ext in extensions:
-                    full_path = search_path / f"{template_path}{ext}"
-                    if full_path.exists():
-                        return full_path.read_text(encoding='utf-8')
+        Args:
+            candidates: Chemins relatifs avec extension (ex: 'apps/wordpress.yml')
         
-        # Fallback sur les templates du package
-        try:
-            package_templates = files("cloudya.templates")
-            for template_path in template_paths:
-                for ext in extensions:
-                    try:
-                        template_file = package_templates / f"{template_path}{ext}"
-                        return template_file.read_text(encoding='utf-8')
-                    except FileNotFoundError:
-                        continue
-        except Exception:
-            pass
+        Returns:
+            TemplateEntry ou None
+        """
+        entry = self._template_index().lookup(candidates)
+        if entry and not entry.path.is_file():
+            # Fichier supprimé depuis la validation : revalider l'index
+            self.index.refresh(self.config['templates']['extensions'], force=True)
+            entry = self.index.lookup(candidates)
+        
+        if entry is None:
+            entry = self.package_templates.lookup(candidates)
+        return entry
+    
+    def get_environment(self):
+        """Retourne l'environnement Jinja2 (créé une fois par processus)"""
+        if self._environment is None:
+            from cloudya.template_engine import create_environment
+            self._environment = create_environment(self)
+        return self._environment
+    
+    def render(self, template_name: str, category: str = None, context: Dict = None) -> str:
+        """
+        Rend un template Jinja2 en suivant la hiérarchie de priorité
         
-        raise TemplateNotFoundError(f"Template '{template_name}' not found in category '{category}'")
+        Args:
+            template_name: Nom du template (ex: 'playbook.yml', 'vpc')
+            category: Catégorie optionnelle (ex: 'skeletons/ansible')
+            context: Variables disponibles dans le template
+        
+        Returns:
+            Contenu rendu
+        """
+        template_paths = self._template_paths(template_name, category)
+        
+        entry = self._lookup(template_paths)
+        if entry is None:
+            raise TemplateNotFoundError(f"Template '{template_name}' not found in category '{category}'")
+        
+        template = self.get_environment().get_template(entry.name)
+        return template.render(**(context or {}))
+    
+    def search_templates(self, query: str, limit: int = 20) -> List:
+        """
+        Recherche floue dans le catalogue (templates, manifests Terraform et applications)
+        
+        Args:
+            query: Texte recherché
+            limit: Nombre maximal de résultats
+        
+        Returns:
+            Liste de SearchResult triée par pertinence
+        """
+        if self._search is None:
+            from cloudya.template_search import TemplateSearch
+            from cloudya.utils.config import get_snapshot
+            self._search = TemplateSearch(self, get_snapshot().templates_dir)
+        return self._search.search(query, limit)
     
     def list_templates(self, category: str = None) -> Dict[str, List[str]]:
         """
@@ -141,65 +201,28 @@ class CloudyaTemplateManager:
             'package': []
         }
         
-        source_names = ['user_config', 'user_data', 'system']
+        # Consulter l'index (seuls les répertoires modifiés sont relus)
+        index = self._template_index()
+        for source in SOURCE_NAMES:
+            templates[source] = index.names(source, category)
         
-        # Scanner les répertoires
-        for i, search_path in enumerate(self.search_paths):
-            if search_path.exists():
-                templates[source_names[i]] = self._scan_directory(search_path, category)
+        # Templates du package (parcourus une fois par version installée)
+        templates['package'] = self._scan_package_templates(self.package_templates, category)
         
-        # Scanner les templates du package
-        try:
-            package_templates = files("cloudya.templates")
-            templates['package'] = self._scan_package_templates(package_templates, category)
-        except Exception:
-            pass
+        # Les squelettes ne sont listés que si leur catégorie est demandée explicitement
+        if not category or category.strip('/').split('/')[0] not in INTERNAL_CATEGORIES:
+            for source, names in templates.items():
+                templates[source] = [name for name in names if name.split('/')[0] not in INTERNAL_CATEGORIES]
         
         return templates
     
-    def _scan_directory(self, directory: Path, category: str = None) -> List[str]:
-        """Scanne un répertoire pour trouver les templates"""
-        templates = []
-        
-        if category:
-            scan_dir = directory / category
-            if not scan_dir.exists():
-                return templates
-        else:
-            scan_dir = directory
-        
-        extensions = self.config['templates']['extensions']
-        
-        for template_file in scan_dir.rglob('*'):
-            if template_file.is_file() and any(template_file.name.endswith(ext) for ext in extensions):
-                # Calculer le nom relatif
-                rel_path = template_file.relative_to(directory)
-                template_name = str(rel_path)
-                
-                # Supprimer l'extension
-                for ext in extensions:
-                    if template_name.endswith(ext):
-                        template_name = template_name[:-len(ext)]
-                        break
-                
-                templates.append(template_name)
-        
-        return sorted(templates)
-    
-    def _scan_package_templates(self, package_templates, category: str = None) -> List[str]:
+    def _scan_package_templates(self, package_templates: PackageTemplates, category: str = None) -> List[str]:
         """Scanne les templates du package"""
-        templates = []
-        
-        # Cette implémentation dépend de la structure du package
-        # Pour l'instant, retourner une liste simulée
-        return [
-            'terraform/aws/vpc',
-            'terraform/aws/eks',
-            'terraform/gcp/vpc',
-            'apps/wordpress',
-            'apps/nextcloud',
-            'config/cloudya'
-        ]
+        try:
+            return package_templates.names(self.config['templates']['extensions'], category)
+        except Exception as e:
+            print(f"Erreur lors du scan des templates du package: {e}")
+            return []
     
     def install_template(self, template_name: str, source_url: str, category: str = None) -> bool:
         """
@@ -213,21 +236,23 @@ class CloudyaTemplateManager:
         Returns:
             True si réussi
         """
+        from cloudya.template_sync import create_session, download_file
+        
         try:
-            # Télécharger le template
-            response = requests.get(source_url, timeout=30)
-            response.raise_for_status()
-            
             # Déterminer le chemin de destination (templates utilisateur)
             dest_dir = self.search_paths[1]  # ~/.local/share/cloudya/templates
             if category:
                 dest_dir = dest_dir / category
             
-            dest_dir.mkdir(parents=True, exist_ok=True)
+            # Conserver l'extension de l'URL si c'est une extension de template
+            url_name = source_url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+            extension = next((ext for ext in self.config['templates']['extensions'] if url_name.endswith(ext)), '.j2')
             
-            # Sauvegarder le template
-            template_file = dest_dir / f"{template_name}.j2"
-            template_file.write_text(response.text, encoding='utf-8')
+            # Télécharger le template (écriture en streaming puis renommage atomique)
+            template_file = dest_dir / f"{template_name}{extension}"
+            with create_session(1) as session:
+                download_file(session, source_url, template_file)
+            self.index.invalidate()
             
             print(f"Template '{template_name}' installé dans {template_file}")
             return True
@@ -236,6 +261,31 @@ class CloudyaTemplateManager:
             print(f"Erreur lors de l'installation du template: {e}")
             return False
     
+    def sync_repositories(self, names: List[str] = None, workers: int = None, force: bool = False, progress=None) -> List[Dict]:
+        """
+        Synchronise les dépôts de templates configurés
+        
+        Args:
+            names: Noms des dépôts à synchroniser (tous par défaut)
+            workers: Nombre maximal de téléchargements simultanés
+            force: Ignorer les validateurs HTTP et tout retélécharger
+            progress: Callback appelé pour chaque fichier traité
+        
+        Returns:
+            Liste des statistiques par dépôt
+        """
+        from cloudya.template_sync import TemplateSync, STATE_NAME, DEFAULT_WORKERS
+        
+        repositories = [
+            repository for repository in self.config.get('repositories', [])
+            if repository.get('url') and (not names or repository.get('name') in names)
+        ]
+        
+        syncer = TemplateSync(self.search_paths[1], self.cache_dir / STATE_NAME, workers or DEFAULT_WORKERS)
+        results = syncer.sync(repositories, force=force, progress=progress)
+        self.index.invalidate()
+        return results
+    
     def remove_template(self, template_name: str, category: str = None) -> bool:
         """
         Supprime un template utilisateur
@@ -258,6 +308,7 @@ class CloudyaTemplateManager:
                 template_file = template_path / f"{template_name}{ext}"
                 if template_file.exists():
                     template_file.unlink()
+                    self.index.invalidate()
                     print(f"Template '{template_name}' supprimé")
                     return True
         
@@ -282,33 +333,30 @@ class CloudyaTemplateManager:
             'source': None,
             'path': None,
             'size': None,
+            'sha256': None,
             'content_preview': None
         }
         
-        # Chercher le template
-        try:
-            content = self.resolve_template(template_name, category)
-            info['found'] = True
-            info['content_preview'] = content[:200] + "..." if len(content) > 200 else content
-            
-            # Trouver le chemin source
-            for i, search_path in enumerate(self.search_paths):
-                template_paths = [f"{category}/{template_name}" if category else template_name]
-                for template_path in template_paths:
-                    for ext in self.config['templates']['extensions']:
-                        full_path = search_path / f"{template_path}{ext}"
-                        if full_path.exists():
-                            info['source'] = ['user_config', 'user_data', 'system'][i]
-                            info['path'] = str(full_path)
-                            info['size'] = full_path.stat().st_size
-                            break
-            
-            if not info['source']:
-                info['source'] = 'package'
-                info['path'] = 'cloudya.templates'
-                
-        except TemplateNotFoundError:
-            pass
+        template_paths = self._template_paths(template_name, category)
+        
+        # Une seule consultation de l'index donne source, chemin, taille et empreinte
+        entry = self._lookup(template_paths)
+        if not entry:
+            return info
+        
+        # Taille et empreinte du contenu lu (l'index ne revérifie pas les
+        # fichiers modifiés sur place)
+        data = entry.path.read_bytes()
+        content = data.decode('utf-8')
+        info['found'] = True
+        info['source'] = entry.source
+        if entry.source == 'package':
+            info['path'] = f"cloudya.templates/{entry.name}"
+        else:
+            info['path'] = str(entry.path)
+        info['size'] = len(data)
+        info['sha256'] = hashlib.sha256(data).hexdigest()
+        info['content_preview'] = content[:200] + "..." if len(content) > 200 else content
         
         return info
     
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Recherche floue dans le catalogue de templates Cloudya
+
+Le catalogue indexé regroupe :
+
+- les templates Terraform (manifest.yaml sous <templates_dir>/terraform)
+- les applications (manifest.yaml sous <templates_dir>/apps)
+- les templates du gestionnaire (user_config, user_data, system, package)
+
+Chaque document est découpé en trigrammes (nom, catégorie, description et
+noms des paramètres, avec un poids par champ). Les listes de trigrammes
+sont stockées dans une base SQLite à côté du cache des templates
+(~/.cache/cloudya/search.db). Une recherche ne lit que les lignes des
+trigrammes de la requête, et la base est mise à jour incrémentalement :
+seuls les manifests dont l'empreinte a changé sont relus.
+"""
+
+import os
+import re
+import math
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from cloudya.template_index import TemplateIndex
+
+SEARCH_DB_NAME = "search.db"
+MANIFEST_INDEX_NAME = "manifests-index.json"
+MANIFEST_FILE = "manifest.yaml"
+# À incrémenter quand la composition du catalogue change (force une mise à jour)
+CATALOG_VERSION = 2
+
+# Poids des champs dans le score
+FIELD_WEIGHTS = {"name": 3, "category": 2, "description": 1, "parameters": 1}
+MAX_WEIGHT = max(FIELD_WEIGHTS.values())
+
+# Proportion minimale des trigrammes de la requête présents dans un résultat
+MIN_COVERAGE = 0.3
+# Nombre minimal de trigrammes communs (un seul trigramme complété comme
+# "  m" correspondrait à tous les mots commençant par la même lettre)
+MIN_MATCHES = 2
+
+# Nombre de candidats relus avant le classement final
+CANDIDATE_FACTOR = 10
+MIN_CANDIDATES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    title TEXT,
+    category TEXT,
+    description TEXT,
+    parameters TEXT,
+    source TEXT,
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    key TEXT NOT NULL,
+    weight INTEGER NOT NULL,
+    PRIMARY KEY (trigram, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_key ON trigrams (key);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class SearchResult(NamedTuple):
+    """Résultat de recherche"""
+    score: float
+    kind: str
+    name: str
+    title: str
+    category: str
+    description: str
+    source: str
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[0-9a-zà-ÿ]+", (text or "").lower())
+
+def trigrams(text: str) -> set:
+    """
+    Découpe un texte en trigrammes (mots complétés comme pg_trgm)
+
+    Args:
+        text: Texte à découper
+
+    Returns:
+        Ensemble de trigrammes
+    """
+    result = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+def _document_trigrams(document: Dict) -> Dict[str, int]:
+    """Trigrammes d'un document avec le poids maximal de leurs champs"""
+    weights = {}
+    fields = {
+        "name": f"{document['name']} {document.get('title') or ''}",
+        "category": document.get("category") or "",
+        "description": document.get("description") or "",
+        "parameters": document.get("parameters") or "",
+    }
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for trigram in trigrams(text):
+            if weights.get(trigram, 0) < weight:
+                weights[trigram] = weight
+    return weights
+
+def _read_manifest(path: Path) -> Dict:
+    import yaml
+
+    try:
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or {}
+    except Exception as e:
+        print(f"Erreur lors de la lecture du manifest {path}: {e}")
+        return {}
+
+def _parameter_names(manifest: Dict) -> str:
+    names = []
+    for parameter in manifest.get("parameters") or []:
+        if isinstance(parameter, dict) and parameter.get("name"):
+            names.append(str(parameter["name"]))
+    return " ".join(names)
+
+class TemplateSearch:
+    """Index de recherche par trigrammes du catalogue de templates"""
+
+    def __init__(self, manager, templates_dir: str):
+        """
+        Args:
+            manager: Instance de CloudyaTemplateManager
+            templates_dir: Répertoire des templates Cloudya (~/.cloudya/templates)
+        """
+        self.manager = manager
+        self.templates_dir = Path(templates_dir)
+        self.db_path = Path(manager.cache_dir) / SEARCH_DB_NAME
+        self.manifests = TemplateIndex(
+            Path(manager.cache_dir) / MANIFEST_INDEX_NAME,
+            [("terraform", self.templates_dir / "terraform"), ("apps", self.templates_dir / "apps")],
+            # Un manifest modifié sur place doit être réindexé (un fichier par template)
+            check_files=True
+        )
+        self._connection = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.db_path))
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _current_documents(self) -> Dict[str, tuple]:
+        """
+        Liste les documents du catalogue et leur signature
+
+        Returns:
+            Dictionnaire {clé: (signature, fonction construisant le document)}
+        """
+        documents = {}
+
+        # Manifests Terraform et applications (empreintes fournies par l'index)
+        self.manifests.refresh([MANIFEST_FILE])
+        for kind, root in self.manifests.sources:
+            for rel_path, meta in self.manifests.entries(kind).items():
+                if os.path.basename(rel_path) != MANIFEST_FILE:
+                    continue
+                name = os.path.dirname(rel_path)
+                if not name or (kind == "apps" and "/" in name):
+                    continue
+                documents[f"{kind}:{name}"] = (
+                    meta["sha256"],
+                    lambda kind=kind, name=name, path=root / rel_path: self._manifest_document(kind, name, path)
+                )
+
+        # Templates du gestionnaire (toutes sources)
+        for source, names in self.manager.list_templates().items():
+            for name in names:
+                documents[f"template:{source}:{name}"] = (
+                    "",
+                    lambda source=source, name=name: {
+                        "kind": "template",
+                        "name": name,
+                        "title": os.path.basename(name),
+                        "category": os.path.dirname(name),
+                        "description": "",
+                        "parameters": "",
+                        "source": source
+                    }
+                )
+
+        return documents
+
+    def _manifest_document(self, kind: str, name: str, path: Path) -> Dict:
+        manifest = _read_manifest(path)
+        if kind == "terraform":
+            category = f"terraform/{manifest.get('provider', name.split('/')[0])}"
+        else:
+            category = "apps"
+        return {
+            "kind": kind,
+            "name": name,
+            "title": str(manifest.get("name", os.path.basename(name))),
+            "category": category,
+            "description": str(manifest.get("description", "")),
+            "parameters": _parameter_names(manifest),
+            "source": "manifest"
+        }
+
+    def update(self) -> Dict[str, int]:
+        """
+        Met à jour l'index de recherche (incrémental)
+
+        Returns:
+            Nombre de documents ajoutés et supprimés
+        """
+        connection = self.connect()
+
+        # Rien à faire si aucun manifest ni template indexé n'a changé depuis la dernière
+        # mise à jour (l'empreinte couvre la taille et la date de chaque fichier)
+        self.manifests.refresh([MANIFEST_FILE])
+        self.manager.index.refresh(self.manager.config['templates']['extensions'])
+        token = f"{CATALOG_VERSION}:{self.manifests.fingerprint}:{self.manager.index.fingerprint}:{self.manager.package_templates.cache_key()}"
+        stored = connection.execute("SELECT value FROM meta WHERE key = 'catalog'").fetchone()
+        if stored and stored[0] == token:
+            return {"added": 0, "removed": 0}
+
+        current = self._current_documents()
+        indexed = dict(connection.execute("SELECT key, signature FROM documents"))
+
+        removed = [key for key, signature in indexed.items()
+                   if key not in current or current[key][0] != signature]
+        added = [key for key, (signature, _build) in current.items()
+                 if indexed.get(key) != signature]
+
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('catalog', ?)", (token,))
+            for key in removed:
+                connection.execute("DELETE FROM trigrams WHERE key = ?", (key,))
+                connection.execute("DELETE FROM documents WHERE key = ?", (key,))
+
+            for key in added:
+                signature, build = current[key]
+                document = build()
+                connection.execute(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, document["kind"], document["name"], document["title"], document["category"],
+                     document["description"], document["parameters"], document["source"], signature)
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO trigrams VALUES (?, ?, ?)",
+                    [(trigram, key, weight) for trigram, weight in _document_trigrams(document).items()]
+                )
+
+        return {"added": len(added), "removed": len([key for key in removed if key not in current])}
+
+    def search(self, query: str, limit: int = 20) -> List[SearchResult]:
+        """
+        Recherche floue classée par pertinence
+
+        Args:
+            query: Texte recherché
+            limit: Nombre maximal de résultats
+
+        Returns:
+            Liste de SearchResult triée par score décroissant
+        """
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return []
+
+        self.update()
+        connection = self.connect()
+
+        # 1. Agrégation sur la seule table des trigrammes (index couvrant)
+        placeholders = ",".join("?" * len(query_trigrams))
+        minimum = min(len(query_trigrams), max(MIN_MATCHES, math.ceil(len(query_trigrams) * MIN_COVERAGE)))
+        candidates = connection.execute(
+            f"""
+            SELECT key, SUM(weight) AS total
+            FROM trigrams
+            WHERE trigram IN ({placeholders})
+            GROUP BY key
+            HAVING COUNT(*) >= ?
+            ORDER BY total DESC
+            LIMIT ?
+            """,
+            (*query_trigrams, minimum, max(limit * CANDIDATE_FACTOR, MIN_CANDIDATES))
+        ).fetchall()
+        if not candidates:
+            return []
+
+        # 2. Lecture des seuls documents candidats
+        totals = dict(candidates)
+        rows = connection.execute(
+            f"""
+            SELECT key, kind, name, title, category, description, source
+            FROM documents
+            WHERE key IN ({",".join("?" * len(totals))})
+            """,
+            tuple(totals)
+        ).fetchall()
+
+        needle = query.strip().lower()
+        results = []
+        for key, kind, name, title, category, description, source in rows:
+            score = totals[key] / (MAX_WEIGHT * len(query_trigrams))
+            # Bonus pour une correspondance exacte dans le nom
+            if needle and (needle in name.lower() or needle in (title or "").lower()):
+                score += 1.0
+            results.append(SearchResult(round(score, 3), kind, name, title or "", category or "",
+                                        description or "", source or ""))
+
+        results.sort(key=lambda result: (-result.score, result.name))
+        return results[:limit]
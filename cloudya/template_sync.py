@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Synchronisation des dépôts de templates Cloudya
+
+Chaque dépôt déclaré dans la section 'repositories' de la configuration des
+templates publie un index (index.json par défaut) listant ses fichiers :
+
+    {"files": ["terraform/aws/vpc.tf", "apps/wordpress.yml", ...]}
+
+La synchronisation télécharge l'index puis les fichiers avec une session HTTP
+partagée (pool de connexions) et une concurrence bornée. Chaque réponse est
+écrite en streaming dans un fichier temporaire puis renommée atomiquement
+dans ~/.local/share/cloudya/templates.
+
+Les validateurs HTTP (ETag, Last-Modified) sont conservés dans le cache :
+une resynchronisation envoie des requêtes conditionnelles et un catalogue
+inchangé ne transfère presque aucun octet (réponses 304).
+"""
+
+import os
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+STATE_NAME = "sync-state.json"
+STATE_VERSION = 1
+DEFAULT_INDEX = "index.json"
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 65536
+TIMEOUT = 30
+
+class SyncResult(NamedTuple):
+    """Résultat du téléchargement d'un fichier"""
+    path: str
+    status: str  # 'downloaded', 'unchanged' ou 'failed'
+    bytes: int
+    validators: Dict[str, str]
+    error: Optional[str] = None
+
+def get_raw_base_url(repository: Dict) -> str:
+    """
+    Retourne l'URL de base des fichiers bruts d'un dépôt
+
+    Les dépôts GitHub sont servis par raw.githubusercontent.com ; toute autre
+    URL est utilisée telle quelle (serveur HTTP statique).
+    """
+    url = repository['url'].rstrip('/')
+    parsed = urlparse(url)
+
+    if parsed.netloc in ("github.com", "www.github.com"):
+        owner_repo = parsed.path.strip('/')
+        if owner_repo.endswith('.git'):
+            owner_repo = owner_repo[:-4]
+        branch = repository.get('branch', 'main')
+        return f"https://raw.githubusercontent.com/{owner_repo}/{branch}/"
+
+    return url + '/'
+
+def create_session(workers: int = DEFAULT_WORKERS) -> requests.Session:
+    """Crée une session HTTP dont le pool accepte 'workers' connexions simultanées"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers['User-Agent'] = 'cloudya-template-sync'
+    return session
+
+def conditional_headers(validators: Optional[Dict]) -> Dict[str, str]:
+    """Construit les en-têtes de revalidation (If-None-Match / If-Modified-Since)"""
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def _validators(response) -> Dict[str, str]:
+    validators = {}
+    if response.headers.get('ETag'):
+        validators['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        validators['last_modified'] = response.headers['Last-Modified']
+    return validators
+
+def download_file(session, url: str, destination: Path, validators: Optional[Dict] = None):
+    """
+    Télécharge un fichier en streaming et le renomme atomiquement
+
+    Args:
+        session: Session HTTP
+        url: URL du fichier
+        destination: Chemin de destination
+        validators: Validateurs de la version locale (ETag, Last-Modified)
+
+    Returns:
+        Tuple (modifié, octets transférés, nouveaux validateurs)
+    """
+    destination = Path(destination)
+    headers = conditional_headers(validators) if destination.exists() else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 304:
+            return False, 0, dict(validators or {})
+        response.raise_for_status()
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=destination.parent, prefix=f".{destination.name}.", suffix=".tmp")
+        transferred = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    transferred += len(chunk)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        return True, transferred, _validators(response)
+
+def _safe_relative_path(path: str) -> Optional[str]:
+    """Refuse les chemins absolus ou sortant du répertoire de destination"""
+    parts = [part for part in path.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or path.startswith('/'):
+        return None
+    return '/'.join(parts)
+
+class TemplateSync:
+    """Synchronise les dépôts de templates vers le répertoire utilisateur"""
+
+    def __init__(self, destination: Path, state_file: Path, workers: int = DEFAULT_WORKERS):
+        """
+        Args:
+            destination: Répertoire des templates partagés (~/.local/share/cloudya/templates)
+            state_file: Fichier d'état (validateurs HTTP) dans le cache
+            workers: Nombre maximal de téléchargements simultanés
+        """
+        self.destination = Path(destination)
+        self.state_file = Path(state_file)
+        self.workers = max(1, workers)
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"version": STATE_VERSION, "resources": {}, "indexes": {}}
+
+    def _save_state(self):
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_name(self.state_file.name + f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            print(f"Impossible d'écrire l'état de synchronisation: {e}")
+
+    def fetch_index(self, session, repository: Dict, force: bool = False) -> List[str]:
+        """
+        Récupère la liste des fichiers d'un dépôt (requête conditionnelle)
+
+        Returns:
+            Liste des chemins relatifs publiés par le dépôt
+        """
+        url = get_raw_base_url(repository) + repository.get('index', DEFAULT_INDEX)
+        cached = self.state["indexes"].get(url)
+
+        headers = {} if force or not cached else conditional_headers(cached.get('validators'))
+        response = session.get(url, headers=headers, timeout=TIMEOUT)
+
+        if response.status_code == 304 and cached:
+            return cached['files']
+        response.raise_for_status()
+
+        data = response.json()
+        entries = data.get('files', []) if isinstance(data, dict) else data
+        files = []
+        for entry in entries:
+            path = entry.get('path') if isinstance(entry, dict) else entry
+            if isinstance(path, str):
+                files.append(path)
+
+        self.state["indexes"][url] = {"files": files, "validators": _validators(response)}
+        return files
+
+    def _sync_file(self, session, base_url: str, path: str, force: bool) -> SyncResult:
+        url = base_url + path
+        with self._lock:
+            validators = None if force else self.state["resources"].get(url)
+
+        try:
+            changed, transferred, new_validators = download_file(session, url, self.destination / path, validators)
+        except (requests.RequestException, OSError) as e:
+            return SyncResult(path, 'failed', 0, {}, str(e))
+
+        return SyncResult(path, 'downloaded' if changed else 'unchanged', transferred, new_validators)
+
+    def sync_repository(self, session, repository: Dict, force: bool = False, progress=None) -> Dict:
+        """
+        Synchronise un dépôt
+
+        Args:
+            session: Session HTTP partagée
+            repository: Entrée de la section 'repositories'
+            force: Ignorer les validateurs et tout retélécharger
+            progress: Callback appelé avec chaque SyncResult
+
+        Returns:
+            Statistiques de synchronisation
+        """
+        stats = {"name": repository.get('name', repository['url']), "downloaded": 0,
+                 "unchanged": 0, "failed": 0, "bytes": 0, "errors": []}
+
+        try:
+            paths = self.fetch_index(session, repository, force)
+        except (requests.RequestException, ValueError) as e:
+            stats["errors"].append(f"index: {e}")
+            stats["failed"] += 1
+            return stats
+
+        base_url = get_raw_base_url(repository)
+        safe_paths = []
+        for path in paths:
+            safe_path = _safe_relative_path(path)
+            if safe_path is None:
+                stats["errors"].append(f"{path}: chemin refusé")
+                stats["failed"] += 1
+            else:
+                safe_paths.append(safe_path)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._sync_file, session, base_url, path, force) for path in safe_paths]
+            for future in as_completed(futures):
+                result = future.result()
+                stats[result.status] += 1
+                stats["bytes"] += result.bytes
+                if result.error:
+                    stats["errors"].append(f"{result.path}: {result.error}")
+                elif result.validators:
+                    with self._lock:
+                        self.state["resources"][base_url + result.path] = result.validators
+                if progress:
+                    progress(result)
+
+        return stats
+
+    def sync(self, repositories: List[Dict], force: bool = False, progress=None) -> List[Dict]:
+        """
+        Synchronise tous les dépôts configurés
+
+        Args:
+            repositories: Liste des dépôts (section 'repositories')
+            force: Ignorer les validateurs et tout retélécharger
+            progress: Callback appelé avec chaque SyncResult
+
+        Returns:
+            Liste des statistiques par dépôt
+        """
+        self.destination.mkdir(parents=True, exist_ok=True)
+        results = []
+
+        with create_session(self.workers) as session:
+            for repository in repositories:
+                results.append(self.sync_repository(session, repository, force, progress))
+
+        self._save_state()
+        return results
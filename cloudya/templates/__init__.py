@@ -0,0 +1,3 @@
+"""
+Templates intégrés au package Cloudya (accessibles via importlib.resources)
+"""
@@ -0,0 +1,11 @@
+# VPC AWS généré par Cloudya
+resource "aws_vpc" "main" {
+  cidr_block           = "{{ vpc_cidr | default('10.0.0.0/16') }}"
+  enable_dns_hostnames = true
+  enable_dns_support   = true
+
+  tags = {
+    Name = "{{ vpc_name | default('cloudya-vpc') }}"
+    Environment = "{{ environment | default('dev') }}"
+  }
+}
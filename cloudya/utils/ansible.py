@@ -18,6 +18,7 @@ from .ansible_inventory import prepare_inventory
 # SUPPRIMÉ: from .ansible_apps import get_available_apps, get_app_info
 # SUPPRIMÉ: from .ansible_deployment import (...)
 from .ansible_instances import get_terraform_instances, select_instance
+from .config import get_snapshot, ensure_dir
 
 console = Console()
 
@@ -25,14 +26,7 @@ def get_ansible_path():
     """
     Récupère le chemin vers l'exécutable Ansible
     """
-    # Charger la configuration
-    from .config import load_config
-    config = load_config()
-    
-    # Récupérer le chemin configuré ou utiliser 'ansible-playbook' par défaut
-    ansible_path = config.get("ansible_path", "ansible-playbook")
-    
-    return ansible_path
+    return get_snapshot().ansible_path
 
 def get_cloudya_dir():
     """
@@ -44,37 +38,20 @@ def get_templates_dir():
     """
     Récupère le répertoire des templates d'applications
     """
-    from .config import load_config
-    config = load_config()
-    
-    templates_dir = config.get("templates_dir", os.path.expanduser("~/.cloudya/templates"))
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(templates_dir, exist_ok=True)
-    
-    return templates_dir
+    # Créer le répertoire s'il n'existe pas (une fois par processus)
+    return ensure_dir(get_snapshot().templates_dir)
 
 def get_apps_dir():
     """
     Récupère le répertoire des applications
     """
-    apps_dir = os.path.join(get_templates_dir(), "apps")
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(apps_dir, exist_ok=True)
-    
-    return apps_dir
+    return ensure_dir(os.path.join(get_templates_dir(), "apps"))
 
 def get_app_deployments_dir():
     """
     Récupère le répertoire des déploiements d'applications
     """
-    app_deployments_dir = os.path.join(get_cloudya_dir(), "app_deployments")
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(app_deployments_dir, exist_ok=True)
-    
-    return app_deployments_dir
+    return ensure_dir(os.path.join(get_cloudya_dir(), "app_deployments"))
 
 def determine_target(platform):
     """
@@ -87,8 +64,7 @@ def determine_target(platform):
         Instance cible ou None si aucune trouvée
     """
     # Filtrer les instances par plateforme
-    instances = get_terraform_instances()
-    platform_instances = [i for i in instances if i["platform"].lower() == platform.lower()]
+    platform_instances = get_terraform_instances(platform)
     
     if not platform_instances:
         console.print(f"[yellow]Aucune instance trouvée pour la plateforme '{platform}'.[/yellow]")
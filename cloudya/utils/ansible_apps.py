@@ -5,23 +5,18 @@ import os
 import yaml
 from rich.console import Console
 
+from .config import get_snapshot, ensure_dir
+
 console = Console()
 
 def get_apps_dir():
     """
     Récupère le répertoire des applications (copie de la fonction pour éviter l'import circulaire)
     """
-    # Charger la configuration
-    from .config import load_config
-    config = load_config()
-    
-    templates_dir = config.get("templates_dir", os.path.expanduser("~/.cloudya/templates"))
-    apps_dir = os.path.join(templates_dir, "apps")
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(apps_dir, exist_ok=True)
+    apps_dir = os.path.join(get_snapshot().templates_dir, "apps")
     
-    return apps_dir
+    # Créer le répertoire s'il n'existe pas (une fois par processus)
+    return ensure_dir(apps_dir)
 
 def get_available_apps():
     """
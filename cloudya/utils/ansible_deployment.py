@@ -3,16 +3,16 @@ Module pour le déploiement d'applications
 """
 import os
 import subprocess
-import json
 import yaml
-import shutil
 import datetime
 import uuid
 import tempfile
 from rich.console import Console
 
+from . import toolchain, deployment_registry, deployment_journal
 from .ansible import get_ansible_path, get_apps_dir, get_app_deployments_dir
 from .ansible_apps import get_app_info
+from .artifacts import populate_directory
 
 console = Console()
 
@@ -40,200 +40,35 @@ def prepare_app_deployment(app_name, platform, params, instance):
     
     # Créer le répertoire de déploiement
     app_deployments_dir = get_app_deployments_dir()
+    root_signature = deployment_registry.directory_signature(app_deployments_dir)
     deployment_dir = os.path.join(app_deployments_dir, deployment_id)
     os.makedirs(deployment_dir, exist_ok=True)
     
     # Copier les fichiers de l'application si elle existe réellement
     app_dir = os.path.join(get_apps_dir(), app_info["name"].lower())
     if os.path.exists(app_dir):
-        for item in os.listdir(app_dir):
-            if item != "manifest.yaml":  # Exclure le manifest
-                source = os.path.join(app_dir, item)
-                destination = os.path.join(deployment_dir, item)
-                
-                if os.path.isdir(source):
-                    shutil.copytree(source, destination)
-                else:
-                    shutil.copy2(source, destination)
+        # Liens vers le magasin d'artefacts (les métadonnées sont écrites ci-dessous)
+        populate_directory(app_dir, deployment_dir, exclude={"manifest.yaml"})
     else:
-        # Créer des fichiers minimaux pour la démonstration
-        if app_info["type"] == "ansible":
-            # Créer un playbook Ansible minimal
-            with open(os.path.join(deployment_dir, "playbook.yml"), "w") as f:
-                f.write(f"---\n")
-                f.write(f"- name: Install {app_info['name']}\n")
-                f.write(f"  hosts: target\n")
-                f.write(f"  become: yes\n")
-                f.write(f"  vars:\n")
-                
-                # Ajouter les variables du déploiement
-                for key, value in params.items():
-                    if isinstance(value, str):
-                        f.write(f"    {key}: \"{value}\"\n")
-                    else:
-                        f.write(f"    {key}: {value}\n")
-                
-                f.write(f"\n  tasks:\n")
-                f.write(f"    - name: Update apt cache\n")
-                f.write(f"      apt:\n")
-                f.write(f"        update_cache: yes\n")
-                f.write(f"        cache_valid_time: 3600\n")
-                
-                # Ajouter des tâches spécifiques à l'application
-                if app_name.lower() == "wordpress":
-                    f.write(f"\n    - name: Install Apache\n")
-                    f.write(f"      apt:\n")
-                    f.write(f"        name: apache2\n")
-                    f.write(f"        state: present\n")
-                    
-                    f.write(f"\n    - name: Install MySQL\n")
-                    f.write(f"      apt:\n")
-                    f.write(f"        name: mysql-server\n")
-                    f.write(f"        state: present\n")
-                    
-                    f.write(f"\n    - name: Install PHP\n")
-                    f.write(f"      apt:\n")
-                    f.write(f"        name:\n")
-                    f.write(f"          - php\n")
-                    f.write(f"          - php-mysql\n")
-                    f.write(f"          - php-curl\n")
-                    f.write(f"          - php-gd\n")
-                    f.write(f"        state: present\n")
-                    
-                    f.write(f"\n    - name: Download WordPress\n")
-                    f.write(f"      get_url:\n")
-                    f.write(f"        url: https://wordpress.org/latest.tar.gz\n")
-                    f.write(f"        dest: /tmp/wordpress.tar.gz\n")
-                    
-                    f.write(f"\n    - name: Extract WordPress\n")
-                    f.write(f"      unarchive:\n")
-                    f.write(f"        src: /tmp/wordpress.tar.gz\n")
-                    f.write(f"        dest: /var/www/html\n")
-                    f.write(f"        remote_src: yes\n")
-                elif app_name.lower() == "lamp":
-                    f.write(f"\n    - name: Install LAMP stack\n")
-                    f.write(f"      apt:\n")
-                    f.write(f"        name:\n")
-                    f.write(f"          - apache2\n")
-                    f.write(f"          - mysql-server\n")
-                    f.write(f"          - php\n")
-                    f.write(f"          - php-mysql\n")
-                    f.write(f"        state: present\n")
-                else:
-                    f.write(f"\n    - name: Install {app_info['name']}\n")
-                    f.write(f"      debug:\n")
-                    f.write(f"        msg: \"Installation simulée de {app_info['name']}\"\n")
+        # Générer des fichiers minimaux pour la démonstration (templates skeletons/*)
+        from cloudya.template_manager import template_manager
+        
+        context = {
+            "app_name": app_name.lower(),
+            "app_label": app_info["name"],
+            "params": params
+        }
         
+        if app_info["type"] == "ansible":
+            files = {"playbook.yml": "skeletons/ansible"}
         elif app_info["type"] == "docker":
-            # Créer un playbook Ansible pour installer Docker
-            with open(os.path.join(deployment_dir, "playbook.yml"), "w") as f:
-                f.write(f"---\n")
-                f.write(f"- name: Install Docker and {app_info['name']}\n")
-                f.write(f"  hosts: target\n")
-                f.write(f"  become: yes\n")
-                f.write(f"  vars:\n")
-                
-                # Ajouter les variables du déploiement
-                for key, value in params.items():
-                    if isinstance(value, str):
-                        f.write(f"    {key}: \"{value}\"\n")
-                    else:
-                        f.write(f"    {key}: {value}\n")
-                
-                f.write(f"\n  tasks:\n")
-                f.write(f"    - name: Update apt cache\n")
-                f.write(f"      apt:\n")
-                f.write(f"        update_cache: yes\n")
-                f.write(f"        cache_valid_time: 3600\n")
-                
-                # Installer Docker
-                f.write(f"\n    - name: Install required packages\n")
-                f.write(f"      apt:\n")
-                f.write(f"        name:\n")
-                f.write(f"          - apt-transport-https\n")
-                f.write(f"          - ca-certificates\n")
-                f.write(f"          - curl\n")
-                f.write(f"          - gnupg\n")
-                f.write(f"          - lsb-release\n")
-                f.write(f"        state: present\n")
-                
-                f.write(f"\n    - name: Add Docker GPG key\n")
-                f.write(f"      apt_key:\n")
-                f.write(f"        url: https://download.docker.com/linux/ubuntu/gpg\n")
-                f.write(f"        state: present\n")
-                
-                f.write(f"\n    - name: Add Docker repository\n")
-                f.write(f"      apt_repository:\n")
-                f.write(f"        repo: deb [arch=amd64] https://download.docker.com/linux/ubuntu {{ ansible_distribution_release }} stable\n")
-                f.write(f"        state: present\n")
-                
-                f.write(f"\n    - name: Install Docker CE\n")
-                f.write(f"      apt:\n")
-                f.write(f"        name:\n")
-                f.write(f"          - docker-ce\n")
-                f.write(f"          - docker-ce-cli\n")
-                f.write(f"          - containerd.io\n")
-                f.write(f"        state: present\n")
-                
-                f.write(f"\n    - name: Install Docker Compose\n")
-                f.write(f"      get_url:\n")
-                f.write(f"        url: https://github.com/docker/compose/releases/download/v2.10.2/docker-compose-Linux-x86_64\n")
-                f.write(f"        dest: /usr/local/bin/docker-compose\n")
-                f.write(f"        mode: '0755'\n")
-                
-                f.write(f"\n    - name: Create app directory\n")
-                f.write(f"      file:\n")
-                f.write(f"        path: /opt/{app_name.lower()}\n")
-                f.write(f"        state: directory\n")
-                
-                f.write(f"\n    - name: Copy docker-compose.yml\n")
-                f.write(f"      copy:\n")
-                f.write(f"        src: docker-compose.yml\n")
-                f.write(f"        dest: /opt/{app_name.lower()}/docker-compose.yml\n")
-                
-                f.write(f"\n    - name: Deploy with Docker Compose\n")
-                f.write(f"      shell: cd /opt/{app_name.lower()} && docker-compose up -d\n")
-            
-            # Créer un fichier docker-compose.yml minimal
-            with open(os.path.join(deployment_dir, "docker-compose.yml"), "w") as f:
-                f.write(f"version: '3'\n\n")
-                f.write(f"services:\n")
-                
-                if app_name.lower() == "nextcloud":
-                    f.write(f"  app:\n")
-                    f.write(f"    image: nextcloud\n")
-                    f.write(f"    ports:\n")
-                    f.write(f"      - \"80:80\"\n")
-                    f.write(f"    volumes:\n")
-                    f.write(f"      - nextcloud:/var/www/html\n")
-                    f.write(f"    environment:\n")
-                    f.write(f"      - MYSQL_DATABASE=nextcloud\n")
-                    f.write(f"      - MYSQL_USER=nextcloud\n")
-                    f.write(f"      - MYSQL_PASSWORD={params.get('db_password', 'nextcloud')}\n")
-                    f.write(f"      - MYSQL_HOST=db\n")
-                    
-                    f.write(f"\n  db:\n")
-                    f.write(f"    image: mariadb\n")
-                    f.write(f"    volumes:\n")
-                    f.write(f"      - db:/var/lib/mysql\n")
-                    f.write(f"    environment:\n")
-                    f.write(f"      - MYSQL_ROOT_PASSWORD={params.get('db_password', 'nextcloud')}\n")
-                    f.write(f"      - MYSQL_DATABASE=nextcloud\n")
-                    f.write(f"      - MYSQL_USER=nextcloud\n")
-                    f.write(f"      - MYSQL_PASSWORD={params.get('db_password', 'nextcloud')}\n")
-                    
-                    f.write(f"\nvolumes:\n")
-                    f.write(f"  nextcloud:\n")
-                    f.write(f"  db:\n")
-                else:
-                    f.write(f"  {app_name.lower()}:\n")
-                    f.write(f"    image: {app_name.lower()}\n")
-                    f.write(f"    ports:\n")
-                    f.write(f"      - \"80:80\"\n")
-                    f.write(f"    volumes:\n")
-                    f.write(f"      - {app_name.lower()}-data:/data\n")
-                    f.write(f"\nvolumes:\n")
-                    f.write(f"  {app_name.lower()}-data:\n")
+            files = {"playbook.yml": "skeletons/docker", "docker-compose.yml": "skeletons/docker"}
+        else:
+            files = {}
+        
+        for filename, category in files.items():
+            with open(os.path.join(deployment_dir, filename), "w") as f:
+                f.write(template_manager.render(filename, category, context))
     
     # Créer le fichier de métadonnées
     metadata = {
@@ -252,8 +87,9 @@ def prepare_app_deployment(app_name, platform, params, instance):
         "created_at": datetime.datetime.now().isoformat()
     }
     
-    with open(os.path.join(deployment_dir, "metadata.json"), 'w') as f:
-        json.dump(metadata, f, indent=2)
+    # Premier événement du journal, inclus dans l'instantané
+    metadata["journal_offset"] = deployment_journal.append(deployment_dir, {"type": "status", "status": "prepared"})
+    deployment_registry.write_metadata(deployment_dir, metadata, deployment_registry.APP, root_signature)
     
     return {
         "id": deployment_id,
@@ -275,9 +111,7 @@ def deploy_ansible_app(deployment_dir, inventory_file):
     ansible_path = get_ansible_path()
     
     # Vérifier si ansible-playbook est installé
-    try:
-        subprocess.run([ansible_path, "--version"], check=True, capture_output=True, text=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not toolchain.is_available(ansible_path):
         console.print("[red]Ansible n'est pas installé ou n'est pas dans le PATH.[/red]")
         console.print("Installez Ansible via: pip install ansible")
         return False
@@ -288,15 +122,8 @@ def deploy_ansible_app(deployment_dir, inventory_file):
         console.print(f"[red]Playbook non trouvé: {playbook_path}[/red]")
         return False
     
-    # Mettre à jour le statut
-    metadata_path = os.path.join(deployment_dir, "metadata.json")
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
-    
-    metadata["status"] = "deploying"
-    
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    # Mettre à jour le statut (ajout au journal du déploiement)
+    deployment_registry.update(deployment_dir, {"status": "deploying"}, deployment_registry.APP)
     
     # Exécuter ansible-playbook
     with console.status("[bold green]Déploiement de l'application avec Ansible...[/bold green]"):
@@ -314,21 +141,17 @@ def deploy_ansible_app(deployment_dir, inventory_file):
             console.print(result.stdout)
             
             # Mettre à jour le statut
-            metadata["status"] = "deployed"
-            metadata["deployed_at"] = datetime.datetime.now().isoformat()
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            deployment_registry.update(deployment_dir, {
+                "status": "deployed",
+                "deployed_at": datetime.datetime.now().isoformat()
+            }, deployment_registry.APP)
             
             return True
         except subprocess.CalledProcessError as e:
             console.print(f"[red]Erreur lors du déploiement Ansible:[/red] {e.stderr}")
             
             # Mettre à jour le statut
-            metadata["status"] = "failed"
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            deployment_registry.update(deployment_dir, {"status": "failed"}, deployment_registry.APP)
             
             return False
 
@@ -351,61 +174,33 @@ def get_app_deployment(app_id):
     Récupère les informations d'un déploiement d'application
     
     Args:
-        app_id: ID du déploiement
+        app_id: ID du déploiement (ou préfixe non ambigu)
         
     Returns:
         Dictionnaire des informations du déploiement ou None si non trouvé
     """
-    app_deployments_dir = get_app_deployments_dir()
-    deployment_dir = os.path.join(app_deployments_dir, app_id)
-    
-    if not os.path.exists(deployment_dir):
-        return None
-    
-    # Lire le fichier de métadonnées
-    metadata_path = os.path.join(deployment_dir, "metadata.json")
+    deployment_dir = deployment_registry.resolve_dir(deployment_registry.APP, app_id)
     
-    if not os.path.exists(metadata_path):
+    if not deployment_dir:
         return None
     
-    try:
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        
-        return metadata
-    except Exception as e:
-        console.print(f"[yellow]Erreur lors de la lecture des métadonnées {metadata_path}: {str(e)}[/yellow]")
-        return None
+    # Instantané des métadonnées et événements du journal
+    return deployment_journal.load_state(deployment_dir)
 
-def list_app_deployments():
+def list_app_deployments(status=None, platform=None, since=None, limit=None):
     """
-    Liste tous les déploiements d'applications
+    Liste les déploiements d'applications (registre indexé)
+    
+    Args:
+        status: Filtrer par statut
+        platform: Filtrer par plateforme
+        since: Date ISO minimale de création
+        limit: Nombre maximal de déploiements (les plus récents)
     
     Returns:
         Liste des déploiements
     """
-    deployments = []
-    app_deployments_dir = get_app_deployments_dir()
-    
-    if not os.path.exists(app_deployments_dir):
-        return deployments
-    
-    for item in os.listdir(app_deployments_dir):
-        deployment_dir = os.path.join(app_deployments_dir, item)
-        
-        if os.path.isdir(deployment_dir):
-            metadata_path = os.path.join(deployment_dir, "metadata.json")
-            
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                    
-                    deployments.append(metadata)
-                except Exception as e:
-                    console.print(f"[yellow]Erreur lors de la lecture des métadonnées {metadata_path}: {str(e)}[/yellow]")
-    
-    return deployments
+    return deployment_registry.list_deployments(deployment_registry.APP, status, platform, since, limit)
 
 def uninstall_app(app_id):
     """
@@ -425,17 +220,8 @@ def uninstall_app(app_id):
         return False
     
     # Mettre à jour le statut
-    app_deployments_dir = get_app_deployments_dir()
-    deployment_dir = os.path.join(app_deployments_dir, app_id)
-    metadata_path = os.path.join(deployment_dir, "metadata.json")
-    
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
-    
-    metadata["status"] = "uninstalling"
-    
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    deployment_dir = deployment_registry.resolve_dir(deployment_registry.APP, app_id)
+    deployment_registry.update(deployment_dir, {"status": "uninstalling"}, deployment_registry.APP)
     
     # Pour une vraie implémentation, il faudrait créer un playbook Ansible pour désinstaller l'application
     # Mais pour cette démo, on simule une désinstallation réussie
@@ -446,11 +232,10 @@ def uninstall_app(app_id):
         time.sleep(2)
         
         # Mettre à jour le statut
-        metadata["status"] = "uninstalled"
-        metadata["uninstalled_at"] = datetime.datetime.now().isoformat()
-        
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        deployment_registry.update(deployment_dir, {
+            "status": "uninstalled",
+            "uninstalled_at": datetime.datetime.now().isoformat()
+        }, deployment_registry.APP)
     
     console.print("[green]Application désinstallée avec succès![/green]")
     return True
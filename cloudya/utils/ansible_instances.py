@@ -7,60 +7,25 @@ from rich.console import Console
 from rich.prompt import IntPrompt, Confirm
 from rich.table import Table
 
-# Importer le module terraform pour accéder aux déploiements
-from .terraform import list_deployments
+# Registre des déploiements (instances indexées)
+from . import deployment_registry
 
 console = Console()
 
-def get_terraform_instances():
+def get_terraform_instances(platform=None):
     """
     Récupère la liste des instances déployées via Terraform
     
+    Les instances sont extraites des outputs à l'enregistrement de chaque
+    déploiement : la liste est une requête indexée du registre.
+    
+    Args:
+        platform: Plateforme à filtrer (optionnel)
+    
     Returns:
         Liste des instances déployées
     """
-    instances = []
-    
-    # Récupérer tous les déploiements Terraform
-    deployments = list_deployments()
-    
-    for deployment in deployments:
-        # Ignorer les déploiements non déployés ou détruits
-        if deployment.get("status") not in ["deployed", "updated"]:
-            continue
-        
-        # Récupérer les outputs du déploiement
-        outputs = deployment.get("outputs", {})
-        
-        # Extraire les instances des outputs
-        # La structure dépend du template utilisé, mais nous cherchons des outputs
-        # contenant des informations sur les instances (ip, id, etc.)
-        for output_name, output_value in outputs.items():
-            if isinstance(output_value, dict) and ("ip" in output_value or "address" in output_value or "host" in output_value):
-                # Il s'agit probablement d'une instance
-                instance = {
-                    "name": output_name,
-                    "deployment_id": deployment.get("id"),
-                    "template": deployment.get("template"),
-                    "ip": output_value.get("ip") or output_value.get("address") or output_value.get("host"),
-                    "id": output_value.get("id", ""),
-                    "platform": deployment.get("template", "").split("/")[0] if "/" in deployment.get("template", "") else "",
-                    "created_at": deployment.get("created_at")
-                }
-                instances.append(instance)
-            elif isinstance(output_value, str) and (output_name.endswith("_ip") or output_name.endswith("_address") or output_name.endswith("_host")):
-                # Il s'agit probablement d'une adresse IP directe
-                instance_name = output_name.replace("_ip", "").replace("_address", "").replace("_host", "")
-                instance = {
-                    "name": instance_name,
-                    "deployment_id": deployment.get("id"),
-                    "template": deployment.get("template"),
-                    "ip": output_value,
-                    "id": "",
-                    "platform": deployment.get("template", "").split("/")[0] if "/" in deployment.get("template", "") else "",
-                    "created_at": deployment.get("created_at")
-                }
-                instances.append(instance)
+    instances = deployment_registry.list_instances(platform)
     
     # Si aucune instance n'est trouvée, utiliser des instances fictives pour la démonstration
     if not instances and os.environ.get("CLOUDYA_DEMO_MODE") == "1":
@@ -94,6 +59,9 @@ def get_terraform_instances():
             }
         ]
     
+    if platform:
+        instances = [instance for instance in instances if instance["platform"].lower() == platform.lower()]
+    
     return instances
 
 def select_instance(platform=None):
@@ -106,12 +74,8 @@ def select_instance(platform=None):
     Returns:
         Instance sélectionnée ou None si aucune sélection
     """
-    # Récupérer les instances déployées
-    instances = get_terraform_instances()
-    
-    # Filtrer par plateforme si spécifiée
-    if platform:
-        instances = [instance for instance in instances if instance["platform"] == platform]
+    # Récupérer les instances déployées (filtrées par plateforme si spécifiée)
+    instances = get_terraform_instances(platform)
     
     if not instances:
         console.print("[yellow]Aucune instance déployée trouvée.[/yellow]")
@@ -0,0 +1,258 @@
+"""
+Magasin d'artefacts adressé par contenu
+
+Les fichiers des templates et des applications sont stockés une seule fois
+dans ~/.cloudya/store/blobs, sous le nom de leur empreinte SHA-256. Les
+répertoires de déploiement sont ensuite construits par liens physiques
+(ou reflinks, ou copies en dernier recours si le magasin est sur un autre
+système de fichiers) au lieu de recopier tout le template à chaque fois.
+
+Les blobs sont en lecture seule : un fichier lié dans un déploiement ne
+peut pas être modifié en place par erreur. Les fichiers que Cloudya
+réécrit (terraform.tfvars, metadata.json, playbooks générés) ne sont
+jamais liés et sont toujours écrits à neuf dans le déploiement. La
+configuration Terraform (EDITABLE_SUFFIXES), que l'utilisateur ou
+'terraform fmt' peuvent réécrire sur place, est clonée ou copiée plutôt
+que liée.
+
+La lecture seule n'arrête pas root : la taille et la date de chaque blob
+sont mémorisées, et un blob modifié depuis est revérifié (et remplacé si
+son contenu ne correspond plus à son empreinte) avant d'être réutilisé.
+
+Le contenu d'un répertoire source est décrit par un manifeste mis en cache
+(taille, date de modification et inode de chaque fichier) : seuls les
+fichiers modifiés depuis la dernière utilisation sont rehachés.
+"""
+import os
+import json
+import errno
+import shutil
+import hashlib
+import tempfile
+
+# Fichiers réécrits par Cloudya dans chaque déploiement : jamais liés au magasin
+MUTABLE_FILES = {"terraform.tfvars", "metadata.json"}
+
+# Fichiers modifiables sur place dans un déploiement : clonés ou copiés, jamais liés
+EDITABLE_SUFFIXES = (".tf", ".tf.json")
+
+MANIFEST_VERSION = 1
+
+# ioctl Linux de clonage de fichier (reflink) : FICLONE = _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+def get_store_dir():
+    """
+    Récupère le répertoire du magasin d'artefacts
+    """
+    return os.path.join(os.path.expanduser("~/.cloudya"), "store")
+
+def _blob_path(digest, executable=False):
+    """Chemin d'un blob (les fichiers exécutables ont leur propre blob)"""
+    name = digest + (".x" if executable else "")
+    return os.path.join(get_store_dir(), "blobs", digest[:2], name)
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _blob_stat(blob):
+    """Taille et date de modification d'un blob (None s'il est absent)"""
+    try:
+        stat = os.stat(blob)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _blob_intact(blob, digest):
+    """Vérifie qu'un blob existant correspond toujours à son empreinte"""
+    try:
+        return _hash_file(blob) == digest
+    except OSError:
+        return False
+
+def store_file(path, executable=False):
+    """
+    Ajoute un fichier au magasin
+
+    Un blob existant dont le contenu ne correspond plus à son empreinte
+    (modifié en place via un lien physique) est remplacé.
+
+    Args:
+        path: Chemin du fichier source
+        executable: Conserver le bit d'exécution
+
+    Returns:
+        Empreinte SHA-256 du contenu
+    """
+    digest = _hash_file(path)
+    blob = _blob_path(digest, executable)
+
+    if not os.path.exists(blob) or not _blob_intact(blob, digest):
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob), suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, 0o555 if executable else 0o444)
+            os.replace(tmp_path, blob)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    return digest
+
+def _manifest_path(source, exclude):
+    key = hashlib.sha256(f"{os.path.abspath(source)}\0{sorted(exclude)}".encode("utf-8")).hexdigest()
+    return os.path.join(get_store_dir(), "trees", f"{key}.json")
+
+def _load_manifest(path):
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+def ingest_directory(source, exclude=()):
+    """
+    Ajoute le contenu d'un répertoire au magasin
+
+    Args:
+        source: Répertoire source (template ou application)
+        exclude: Noms de premier niveau à ignorer
+
+    Returns:
+        Manifeste {"dirs": [...], "files": {chemin: {...}}}
+    """
+    exclude = set(exclude)
+    manifest_path = _manifest_path(source, exclude)
+    previous = _load_manifest(manifest_path) or {"files": {}}
+    previous_files = previous["files"]
+
+    dirs = []
+    files = {}
+    changed = False
+
+    for root, dirnames, filenames in os.walk(source):
+        rel_root = os.path.relpath(root, source)
+        rel_root = "" if rel_root == "." else rel_root
+
+        if not rel_root:
+            dirnames[:] = [d for d in dirnames if d not in exclude]
+            filenames = [f for f in filenames if f not in exclude]
+        dirnames.sort()
+
+        for dirname in dirnames:
+            dirs.append(os.path.join(rel_root, dirname))
+
+        for filename in sorted(filenames):
+            rel_path = os.path.join(rel_root, filename)
+            full_path = os.path.join(root, filename)
+            stat = os.stat(full_path)
+            executable = bool(stat.st_mode & 0o111)
+            key = [stat.st_size, stat.st_mtime_ns, stat.st_ino, executable]
+
+            cached = previous_files.get(rel_path)
+            if cached and cached["key"] == key and \
+                    cached.get("blob") == _blob_stat(_blob_path(cached["sha256"], executable)):
+                files[rel_path] = cached
+                continue
+
+            digest = store_file(full_path, executable)
+            files[rel_path] = {"key": key, "sha256": digest, "executable": executable,
+                               "blob": _blob_stat(_blob_path(digest, executable))}
+            changed = True
+
+    manifest = {"version": MANIFEST_VERSION, "source": os.path.abspath(source), "dirs": dirs, "files": files}
+
+    if changed or set(previous_files) != set(files) or previous.get("dirs") != dirs:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        # Nom temporaire unique : plusieurs threads peuvent ingérer le même template
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(manifest_path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    return manifest
+
+def _reflink(source, destination):
+    """Clone un fichier (copy-on-write) si le système de fichiers le permet"""
+    import fcntl
+
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(destination)
+            raise
+
+def _link_or_copy(blob, destination, executable, link=True):
+    """Lien physique (si link), sinon reflink, sinon copie"""
+    if link:
+        try:
+            os.link(blob, destination)
+            return "link"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EACCES, errno.ENOTSUP):
+                raise
+
+    # Les reflinks et copies sont indépendants du magasin : ils restent modifiables
+    try:
+        _reflink(blob, destination)
+        method = "reflink"
+    except (OSError, ImportError):
+        shutil.copyfile(blob, destination)
+        method = "copy"
+
+    os.chmod(destination, 0o755 if executable else 0o644)
+    return method
+
+def materialize(manifest, destination):
+    """
+    Construit un répertoire à partir d'un manifeste du magasin
+
+    Args:
+        manifest: Manifeste retourné par ingest_directory
+        destination: Répertoire de destination (existant ou non)
+
+    Returns:
+        Dictionnaire {méthode: nombre de fichiers}
+    """
+    os.makedirs(destination, exist_ok=True)
+    for rel_dir in manifest["dirs"]:
+        os.makedirs(os.path.join(destination, rel_dir), exist_ok=True)
+
+    methods = {}
+    for rel_path, entry in manifest["files"].items():
+        target = os.path.join(destination, rel_path)
+        method = _link_or_copy(_blob_path(entry["sha256"], entry["executable"]), target, entry["executable"],
+                               link=not rel_path.endswith(EDITABLE_SUFFIXES))
+        methods[method] = methods.get(method, 0) + 1
+
+    return methods
+
+def populate_directory(source, destination, exclude=()):
+    """
+    Remplit un répertoire de déploiement à partir d'un répertoire source
+
+    Les fichiers de MUTABLE_FILES sont toujours exclus : l'appelant les
+    écrit lui-même.
+
+    Args:
+        source: Répertoire du template ou de l'application
+        destination: Répertoire de déploiement
+        exclude: Noms de premier niveau supplémentaires à ignorer
+
+    Returns:
+        Dictionnaire {méthode: nombre de fichiers}
+    """
+    manifest = ingest_directory(source, set(exclude) | MUTABLE_FILES)
+    return materialize(manifest, destination)
@@ -0,0 +1,337 @@
+"""
+Registre des commandes CLI de Cloudya
+
+Le registre décrit les commandes disponibles (nom, description, sous-commandes
+et options) sans importer les modules de commandes. Il est généré une fois
+au build (ou à l'installation) dans cloudya/cli/commands.json par analyse
+statique du code source :
+
+    python -m cloudya.utils.command_registry
+
+L'aide, la liste des commandes et la complétion shell lisent ce manifeste.
+Si le manifeste est absent ou ne correspond plus aux fichiers présents
+(arbre de développement), il est reconstruit en mémoire.
+"""
+import os
+import sys
+import json
+import ast
+from pathlib import Path
+
+MANIFEST_NAME = "commands.json"
+MANIFEST_VERSION = 1
+
+# Scripts exécutables mais masqués de l'aide et de la complétion
+HIDDEN_COMMANDS = {"patch_chat"}
+
+# Modules du répertoire cli qui ne sont pas des commandes utilisateur
+INTERNAL_MODULES = {"__init__", "main"} | HIDDEN_COMMANDS
+
+_registry = None
+
+def get_cli_directory():
+    """Retourne le répertoire contenant les modules CLI"""
+    return Path(__file__).resolve().parent.parent / "cli"
+
+def get_manifest_path(cli_dir=None):
+    """Retourne le chemin du manifeste des commandes"""
+    return Path(cli_dir or get_cli_directory()) / MANIFEST_NAME
+
+def _list_modules(cli_dir):
+    """Liste les modules Python du répertoire cli (un seul listdir)"""
+    try:
+        names = os.listdir(cli_dir)
+    except OSError:
+        return []
+    return sorted(name[:-3] for name in names if name.endswith(".py"))
+
+def _literal(node):
+    """Retourne la valeur d'une constante AST ou None"""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, SyntaxError, TypeError):
+        return None
+
+def _call_name(node):
+    """Retourne le nom qualifié d'un appel (ex: typer.Option)"""
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        if isinstance(func.value, ast.Name):
+            return f"{func.value.id}.{func.attr}"
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return ""
+
+def _keyword(node, name):
+    """Retourne la valeur littérale d'un argument nommé d'un appel"""
+    for keyword in node.keywords:
+        if keyword.arg == name:
+            return _literal(keyword.value)
+    return None
+
+def _typer_parameters(function):
+    """Extrait les options et arguments d'une commande typer"""
+    options = []
+    arguments = []
+
+    positional = function.args.args
+    defaults = [None] * (len(positional) - len(function.args.defaults)) + list(function.args.defaults)
+
+    for arg, default in zip(positional, defaults):
+        if isinstance(default, ast.Call) and _call_name(default).endswith("Option"):
+            flags = [_literal(a) for a in default.args[1:]]
+            flags = [f for f in flags if isinstance(f, str) and f.startswith("-")]
+            if not flags:
+                flags = ["--" + arg.arg.replace("_", "-")]
+            options.append({"flags": flags, "help": _keyword(default, "help") or ""})
+        else:
+            help_text = ""
+            if isinstance(default, ast.Call) and _call_name(default).endswith("Argument"):
+                help_text = _keyword(default, "help") or ""
+            arguments.append({"name": arg.arg, "help": help_text})
+
+    return options, arguments
+
+def _first_line(docstring):
+    """Retourne la première ligne non vide d'une docstring"""
+    for line in (docstring or "").splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+def _describe_typer(tree, typer_call):
+    """Décrit une commande basée sur typer"""
+    subcommands = []
+
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        for decorator in node.decorator_list:
+            if not (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)):
+                continue
+            if decorator.func.attr != "command":
+                continue
+
+            name = _literal(decorator.args[0]) if decorator.args else None
+            if not isinstance(name, str):
+                name = _keyword(decorator, "name") or node.name.replace("_", "-")
+
+            options, arguments = _typer_parameters(node)
+            subcommands.append({
+                "name": name,
+                "help": _keyword(decorator, "help") or _first_line(ast.get_docstring(node)),
+                "options": options,
+                "arguments": arguments
+            })
+
+    return {
+        "kind": "typer",
+        "description": _keyword(typer_call, "help") or "",
+        "subcommands": subcommands,
+        "options": []
+    }
+
+def _describe_argparse(tree, parser_call):
+    """Décrit une commande basée sur argparse"""
+    options = []
+    choices = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "add_argument":
+            flags = [_literal(a) for a in node.args]
+            flags = [f for f in flags if isinstance(f, str) and f.startswith("-")]
+            if flags:
+                options.append({"flags": flags, "help": _keyword(node, "help") or ""})
+
+        # Sous-commandes dispatchées à la main : command == "list", command in [...]
+        if isinstance(node, ast.Compare) and isinstance(node.left, ast.Name) and node.left.id == "command":
+            for comparator in node.comparators:
+                value = _literal(comparator)
+                values = value if isinstance(value, (list, tuple)) else [value]
+                for item in values:
+                    if isinstance(item, str) and not item.startswith("-") and item not in choices:
+                        choices.append(item)
+
+    return {
+        "kind": "argparse",
+        "description": _keyword(parser_call, "description") or "",
+        "subcommands": [{"name": name, "help": "", "options": [], "arguments": []} for name in choices],
+        "options": options
+    }
+
+def describe_module(path):
+    """
+    Décrit une commande par analyse statique de son fichier source
+
+    Args:
+        path: Chemin du module de la commande
+
+    Returns:
+        Dictionnaire décrivant la commande
+    """
+    path = Path(path)
+    description = {
+        "name": path.stem,
+        "kind": "script",
+        "description": "",
+        "subcommands": [],
+        "options": []
+    }
+
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    except (OSError, SyntaxError, ValueError):
+        return description
+
+    typer_call = None
+    parser_call = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            name = _call_name(node)
+            if name == "typer.Typer" and typer_call is None:
+                typer_call = node
+            elif name.endswith("ArgumentParser") and parser_call is None:
+                parser_call = node
+
+    if typer_call is not None:
+        description.update(_describe_typer(tree, typer_call))
+    elif parser_call is not None:
+        description.update(_describe_argparse(tree, parser_call))
+    else:
+        description["description"] = _first_line(ast.get_docstring(tree))
+
+    return description
+
+def build_manifest(cli_dir=None):
+    """
+    Construit le manifeste des commandes à partir des sources
+
+    Args:
+        cli_dir: Répertoire des modules CLI
+
+    Returns:
+        Dictionnaire du manifeste
+    """
+    cli_dir = Path(cli_dir or get_cli_directory())
+    modules = _list_modules(cli_dir)
+
+    commands = {}
+    for module in modules:
+        if module in INTERNAL_MODULES:
+            continue
+        commands[module] = describe_module(cli_dir / f"{module}.py")
+
+    return {
+        "version": MANIFEST_VERSION,
+        "modules": modules,
+        "commands": commands
+    }
+
+def write_manifest(path=None, cli_dir=None):
+    """
+    Génère et écrit le manifeste des commandes
+
+    Args:
+        path: Chemin de destination (par défaut cloudya/cli/commands.json)
+        cli_dir: Répertoire des modules CLI à analyser
+
+    Returns:
+        Chemin du manifeste écrit
+    """
+    path = Path(path or get_manifest_path(cli_dir))
+    manifest = build_manifest(cli_dir)
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+    return path
+
+def load_registry():
+    """
+    Charge le registre des commandes (mis en cache dans le processus)
+
+    Returns:
+        Dictionnaire du manifeste
+    """
+    global _registry
+
+    if _registry is not None:
+        return _registry
+
+    cli_dir = get_cli_directory()
+    manifest = None
+
+    try:
+        with open(get_manifest_path(cli_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+
+    # Manifeste absent, d'une autre version ou désynchronisé des sources
+    if (
+        not manifest
+        or manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("modules") != _list_modules(cli_dir)
+    ):
+        manifest = build_manifest(cli_dir)
+
+    _registry = manifest
+    return _registry
+
+def list_commands():
+    """Retourne la liste triée des noms de commandes"""
+    return sorted(load_registry()["commands"])
+
+def get_command(name):
+    """Retourne la description d'une commande ou None"""
+    return load_registry()["commands"].get(name)
+
+def get_command_description(name):
+    """Retourne la description courte d'une commande"""
+    command = get_command(name)
+    return command.get("description", "") if command else ""
+
+def complete(words, builtins=()):
+    """
+    Calcule les complétions pour une ligne de commande
+
+    Args:
+        words: Mots saisis après 'cloudya', le dernier étant en cours de saisie
+        builtins: Commandes intégrées supplémentaires
+
+    Returns:
+        Liste des complétions possibles
+    """
+    words = list(words) or [""]
+    current = words[-1]
+    previous = words[:-1]
+
+    if not previous:
+        candidates = list_commands() + list(builtins)
+        return sorted(c for c in set(candidates) if c.startswith(current))
+
+    command = get_command(previous[0])
+    if not command:
+        return []
+
+    subcommands = {sub["name"]: sub for sub in command.get("subcommands", [])}
+    selected = next((subcommands[w] for w in previous[1:] if w in subcommands), None)
+
+    candidates = []
+    if current.startswith("-") or selected is not None or not subcommands:
+        option_sources = command.get("options", []) + (selected or {}).get("options", [])
+        for option in option_sources:
+            candidates.extend(option["flags"])
+        candidates.append("--help")
+    else:
+        candidates.extend(subcommands)
+
+    return sorted(c for c in set(candidates) if c.startswith(current))
+
+if __name__ == "__main__":
+    target = write_manifest(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"Manifeste des commandes écrit dans {target}")
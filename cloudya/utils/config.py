@@ -1,9 +1,36 @@
 """
 Module de configuration pour Cloudya
+
+Toute la configuration passe par un instantané unique (ConfigSnapshot) qui
+regroupe les fichiers suivants :
+
+- ~/.cloudya/config.json       configuration générale (chemins, outils)
+- ~/.cloudya/config.ini        API et authentification
+- ~/.cloudya/credentials.yaml  préférences des providers
+- $XDG_CONFIG_HOME/cloudya/config.yaml  configuration des templates
+
+Chaque fichier n'est relu que si sa signature (mtime, taille, inode) a
+changé : un même processus peut donc appeler load_config() autant de fois
+que nécessaire sans relire ni reparser les fichiers.
 """
 import os
 import json
+import copy
+import configparser
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+DEFAULT_API_URL = "https://api.cloudya.ai"
+
+PROVIDERS = ["aws", "gcp", "azure", "openstack", "proxmox", "vmware", "nutanix"]
+
+# Signature d'un fichier : (mtime_ns, taille, inode) ou None s'il n'existe pas
+FileSignature = Optional[Tuple[int, int, int]]
+
+_file_cache: Dict[str, Tuple[FileSignature, Any]] = {}
+_snapshot = None
+_ensured_dirs = set()
 
 def get_cloudya_dir():
     """
@@ -11,68 +38,311 @@ def get_cloudya_dir():
     """
     return os.path.expanduser("~/.cloudya")
 
+def get_config_file():
+    """
+    Récupère le chemin du fichier de configuration générale
+    """
+    return os.path.join(get_cloudya_dir(), "config.json")
+
+def get_ini_file():
+    """
+    Récupère le chemin du fichier de configuration de l'API
+    """
+    return os.path.join(get_cloudya_dir(), "config.ini")
+
+def get_credentials_file():
+    """
+    Récupère le chemin du fichier des credentials
+    """
+    return os.path.join(get_cloudya_dir(), "credentials.yaml")
+
+def get_xdg_config_dir():
+    """
+    Récupère le répertoire de configuration XDG de Cloudya
+    """
+    xdg_config_home = os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config")
+    return os.path.join(str(xdg_config_home), "cloudya")
+
+def get_templates_config_file():
+    """
+    Récupère le chemin du fichier de configuration des templates (XDG)
+    """
+    return os.path.join(get_xdg_config_dir(), "config.yaml")
+
+def default_config():
+    """
+    Retourne la configuration générale par défaut
+    """
+    return {
+        "terraform_path": "terraform",
+        "ansible_path": "ansible-playbook",
+        "templates_dir": os.path.expanduser("~/.cloudya/templates"),
+        "deployments_dir": os.path.expanduser("~/.cloudya/deployments"),
+        "log_level": "INFO"
+    }
+
+def default_credentials():
+    """
+    Retourne la configuration des credentials par défaut
+    """
+    return {provider: {} for provider in PROVIDERS}
+
+def default_templates_config():
+    """
+    Retourne la configuration des templates par défaut
+    """
+    return {
+        'templates': {
+            'default_engine': 'jinja2',
+            'extensions': ['.j2', '.yaml', '.yml', '.tf', '.py'],
+        },
+        'repositories': [
+            {
+                'name': 'official',
+                'url': 'https://github.com/acorvez/cloudya-templates',
+                'branch': 'main'
+            }
+        ]
+    }
+
+def _freeze(value):
+    """Rend une structure imbriquée immuable"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Retourne une copie modifiable d'une structure figée"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return copy.copy(value)
+
+class ConfigSnapshot(NamedTuple):
+    """Instantané immuable de toute la configuration de Cloudya"""
+
+    config: Mapping[str, Any]
+    ini: Mapping[str, Mapping[str, str]]
+    credentials: Mapping[str, Any]
+    templates: Mapping[str, Any]
+    signature: Tuple[Tuple[str, FileSignature], ...]
+
+    @property
+    def terraform_path(self) -> str:
+        return self.config.get("terraform_path", "terraform")
+
+    @property
+    def ansible_path(self) -> str:
+        return self.config.get("ansible_path", "ansible-playbook")
+
+    @property
+    def templates_dir(self) -> str:
+        return self.config.get("templates_dir", os.path.expanduser("~/.cloudya/templates"))
+
+    @property
+    def deployments_dir(self) -> str:
+        return self.config.get("deployments_dir", os.path.expanduser("~/.cloudya/deployments"))
+
+    @property
+    def api_url(self) -> str:
+        return self.ini.get("api", {}).get("url", DEFAULT_API_URL)
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.ini.get("auth", {}).get("token")
+
+def _file_signature(path) -> FileSignature:
+    """Calcule la signature d'un fichier"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _read_yaml(path):
+    import yaml
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+def _read_ini(path):
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    return {section: dict(parser[section]) for section in parser.sections()}
+
+def _load_file(path, signature, reader, fallback):
+    """Lit un fichier si sa signature a changé depuis la dernière lecture"""
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    if signature is None:
+        value = fallback()
+    else:
+        try:
+            value = reader(path)
+        except Exception as e:
+            print(f"Erreur lors du chargement de la configuration {path}: {e}")
+            value = fallback()
+
+    if value is None:
+        value = fallback()
+
+    value = _freeze(value)
+    _file_cache[path] = (signature, value)
+    return value
+
+def get_snapshot() -> ConfigSnapshot:
+    """
+    Retourne l'instantané courant de la configuration
+
+    Seuls les fichiers dont la signature a changé sont relus.
+
+    Returns:
+        ConfigSnapshot
+    """
+    global _snapshot
+
+    sources = (
+        (get_config_file(), _read_json, default_config),
+        (get_ini_file(), _read_ini, dict),
+        (get_credentials_file(), _read_yaml, default_credentials),
+        (get_templates_config_file(), _read_yaml, dict),
+    )
+    signature = tuple((path, _file_signature(path)) for path, _reader, _fallback in sources)
+
+    if _snapshot is not None and _snapshot.signature == signature:
+        return _snapshot
+
+    values = [
+        _load_file(path, file_signature, reader, fallback)
+        for (path, reader, fallback), (_path, file_signature) in zip(sources, signature)
+    ]
+
+    # Configuration des templates : valeurs par défaut complétées par l'utilisateur
+    templates = default_templates_config()
+    templates.update(thaw(values[3]))
+
+    _snapshot = ConfigSnapshot(
+        config=values[0],
+        ini=values[1],
+        credentials=values[2],
+        templates=_freeze(templates),
+        signature=signature
+    )
+    return _snapshot
+
+def invalidate():
+    """
+    Oublie l'instantané et les répertoires déjà créés (ex: démon)
+    """
+    global _snapshot
+    _snapshot = None
+    _file_cache.clear()
+    _ensured_dirs.clear()
+
+def ensure_dir(path):
+    """
+    Crée un répertoire une seule fois par processus
+
+    Args:
+        path: Chemin du répertoire
+
+    Returns:
+        Le chemin du répertoire
+    """
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+    return path
+
 def load_config():
     """
     Charge la configuration de Cloudya
-    
+
     Returns:
         Dictionnaire de configuration
     """
-    config_dir = get_cloudya_dir()
-    config_file = os.path.join(config_dir, "config.json")
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(config_dir, exist_ok=True)
-    
+    config_file = get_config_file()
+
     # Créer le fichier de configuration s'il n'existe pas
     if not os.path.exists(config_file):
-        default_config = {
-            "terraform_path": "terraform",
-            "ansible_path": "ansible-playbook",
-            "templates_dir": os.path.expanduser("~/.cloudya/templates"),
-            "log_level": "INFO"
-        }
-        
-        with open(config_file, "w") as f:
-            json.dump(default_config, f, indent=2)
-        
-        return default_config
-    
-    # Charger la configuration
-    try:
-        with open(config_file, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Erreur lors du chargement de la configuration: {e}")
-        return {
-            "terraform_path": "terraform",
-            "ansible_path": "ansible-playbook",
-            "templates_dir": os.path.expanduser("~/.cloudya/templates"),
-            "log_level": "INFO"
-        }
+        config = default_config()
+        save_config(config)
+        return config
+
+    return thaw(get_snapshot().config)
 
 def save_config(config):
     """
     Sauvegarde la configuration de Cloudya
-    
+
     Args:
         config: Dictionnaire de configuration
-        
+
     Returns:
         True si la sauvegarde a réussi, False sinon
     """
     config_dir = get_cloudya_dir()
-    config_file = os.path.join(config_dir, "config.json")
-    
+    config_file = get_config_file()
+
     # Créer le répertoire s'il n'existe pas
-    os.makedirs(config_dir, exist_ok=True)
-    
+    ensure_dir(config_dir)
+
     # Sauvegarder la configuration
     try:
         with open(config_file, "w") as f:
             json.dump(config, f, indent=2)
-        
+
         return True
     except Exception as e:
         print(f"Erreur lors de la sauvegarde de la configuration: {e}")
         return False
+
+def load_ini_config(create=False):
+    """
+    Charge la configuration de l'API (config.ini)
+
+    Args:
+        create: Créer le fichier avec l'URL par défaut s'il n'existe pas
+
+    Returns:
+        ConfigParser modifiable
+    """
+    ini_file = get_ini_file()
+
+    if create and not os.path.exists(ini_file):
+        ensure_dir(get_cloudya_dir())
+        config = configparser.ConfigParser()
+        config['api'] = {'url': DEFAULT_API_URL}
+        with open(ini_file, 'w') as f:
+            config.write(f)
+        return config
+
+    config = configparser.ConfigParser()
+    config.read_dict(thaw(get_snapshot().ini))
+    return config
+
+def get_api_token():
+    """
+    Récupère le token d'API depuis l'environnement ou la configuration
+    """
+    return os.environ.get("CLOUDYA_API_TOKEN") or get_snapshot().token
+
+def load_credentials():
+    """
+    Charge la configuration des credentials (copie modifiable)
+    """
+    return thaw(get_snapshot().credentials)
+
+def load_templates_config():
+    """
+    Charge la configuration des templates (copie modifiable)
+    """
+    return thaw(get_snapshot().templates)
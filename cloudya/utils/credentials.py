@@ -3,53 +3,31 @@ Utilitaires de gestion des credentials pour les différents fournisseurs cloud
 """
 import os
 import yaml
-import platform
+import warnings
 import subprocess
 from pathlib import Path
 from rich.console import Console
 from rich.prompt import Confirm
 
+from . import toolchain
+from .config import get_credentials_file, default_credentials, load_credentials, ensure_dir
+
 console = Console()
 
 def load_credentials_config():
     """Charge la configuration des credentials"""
-    config_dir = Path.home() / ".cloudya"
-    credentials_file = config_dir / "credentials.yaml"
-    
-    # Créer le répertoire de configuration s'il n'existe pas
-    if not config_dir.exists():
-        config_dir.mkdir(parents=True, exist_ok=True)
+    credentials_file = Path(get_credentials_file())
     
     # Créer le fichier de credentials s'il n'existe pas
     if not credentials_file.exists():
-        default_config = {
-            "aws": {},
-            "gcp": {},
-            "azure": {},
-            "openstack": {},
-            "proxmox": {},
-            "vmware": {},
-            "nutanix": {}
-        }
+        default_config = default_credentials()
+        ensure_dir(str(credentials_file.parent))
         with open(credentials_file, "w") as f:
             yaml.dump(default_config, f)
         return default_config
         
-    # Charger la configuration existante
-    try:
-        with open(credentials_file, "r") as f:
-            return yaml.safe_load(f)
-    except Exception as e:
-        console.print(f"[red]Erreur lors du chargement des credentials: {e}[/red]")
-        return {
-            "aws": {},
-            "gcp": {},
-            "azure": {},
-            "openstack": {},
-            "proxmox": {},
-            "vmware": {},
-            "nutanix": {}
-        }
+    # Charger la configuration existante (relue seulement si le fichier a changé)
+    return load_credentials()
 
 def save_credentials_config(config):
     """Sauvegarde la configuration des credentials"""
@@ -70,19 +48,68 @@ def save_credentials_config(config):
         return False
 
 def is_command_available(command):
-    """Vérifie si une commande est disponible sur le système"""
-    if platform.system() == "Windows":
-        try:
-            subprocess.run(["where", command], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
-    else:
+    """Vérifie si une commande est disponible sur le système (sans lancer de processus)"""
+    return toolchain.is_available(command)
+
+# Durée maximale d'une vérification non interactive des credentials (secondes)
+CHECK_TIMEOUT = 20
+
+def run_check(command, env=None, timeout=CHECK_TIMEOUT):
+    """
+    Exécute une commande de vérification des credentials sans interaction
+    
+    Args:
+        command: Commande (liste d'arguments)
+        env: Variables d'environnement
+        timeout: Durée maximale (secondes)
+        
+    Returns:
+        Tuple (succès, message : sortie ou erreur)
+    """
+    if not is_command_available(command[0]):
+        return False, f"{command[0]} n'est pas installé ou n'est pas dans le PATH"
+    try:
+        result = subprocess.run(command, env=env, stdin=subprocess.DEVNULL, capture_output=True,
+                                text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, f"{command[0]} n'a pas répondu en {timeout}s"
+    except OSError as e:
+        return False, str(e)
+    if result.returncode != 0:
+        lines = (result.stderr or result.stdout).strip().splitlines()
+        return False, lines[-1] if lines else f"code de retour {result.returncode}"
+    return True, result.stdout.strip()
+
+def http_check(url, accepted=(200,), timeout=CHECK_TIMEOUT, verify=True, **kwargs):
+    """
+    Vérifie une API HTTP(S) sans interaction
+    
+    Args:
+        url: URL à interroger (GET)
+        accepted: Codes HTTP considérés comme un succès
+        timeout: Durée maximale (secondes)
+        verify: Vérification du certificat (booléen ou chemin d'un bundle CA),
+            voir le paramètre 'verify_ssl' du provider
+        **kwargs: Arguments supplémentaires de requests.get (auth, headers...)
+        
+    Returns:
+        Tuple (succès, message)
+    """
+    import requests
+    import urllib3
+    
+    # Avertissement de certificat masqué pour cette seule requête, et seulement
+    # si la vérification a été désactivée explicitement
+    with warnings.catch_warnings():
+        if verify is False:
+            warnings.simplefilter("ignore", urllib3.exceptions.InsecureRequestWarning)
         try:
-            subprocess.run(["which", command], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+            response = requests.get(url, timeout=timeout, verify=verify, **kwargs)
+        except requests.RequestException as e:
+            return False, str(e)
+    if response.status_code not in accepted:
+        return False, f"HTTP {response.status_code}"
+    return True, f"HTTP {response.status_code}"
 
 def install_python_module(module_name, extra_modules=None):
     """Installe un module Python si nécessaire"""
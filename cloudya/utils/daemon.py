@@ -0,0 +1,601 @@
+"""
+Démon Cloudya : serveur chaud et client léger sur socket Unix
+
+Le démon (optionnel) importe une fois les modules lourds (typer, rich,
+requests, providers...) et garde les structures de configuration et de
+templates en mémoire. Chaque requête du client est exécutée dans un
+processus fils obtenu par fork() du démon chaud : le fils reçoit les
+descripteurs stdin/stdout/stderr du client (SCM_RIGHTS), son répertoire
+courant et son environnement, puis exécute la commande comme en mode
+autonome et renvoie le code de sortie.
+
+Le client n'utilise que la bibliothèque standard. Si le démon ne répond
+pas, la commande est exécutée normalement, sans message.
+
+Ce module ne doit importer que des modules légers au chargement.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import struct
+
+# Commandes toujours exécutées hors démon (TUI plein écran, gestion du démon)
+DAEMON_BYPASS = {"daemon", "chat", "help", "--help", "-h", "version", "--version", "-v", "completion", "__complete"}
+
+CONNECT_TIMEOUT = 0.5
+HEADER_TIMEOUT = 5.0
+
+_FDS = [0, 1, 2]
+
+def get_cloudya_dir():
+    """
+    Récupère le répertoire de base de Cloudya
+    """
+    return os.path.expanduser("~/.cloudya")
+
+def get_socket_path():
+    """
+    Récupère le chemin du socket du démon
+    """
+    return os.environ.get("CLOUDYA_DAEMON_SOCKET") or os.path.join(get_cloudya_dir(), "daemon.sock")
+
+def get_pid_file():
+    """
+    Récupère le chemin du fichier PID du démon
+    """
+    return os.path.join(get_cloudya_dir(), "daemon.pid")
+
+def get_log_file():
+    """
+    Récupère le chemin du journal du démon
+    """
+    return os.path.join(get_cloudya_dir(), "daemon.log")
+
+def is_supported():
+    """Indique si la plateforme supporte le démon (sockets Unix et fork)"""
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "fork") and hasattr(socket.socket, "sendmsg")
+
+# ---------------------------------------------------------------------------
+# Protocole
+# ---------------------------------------------------------------------------
+
+def _recv_exact(conn, size):
+    """Lit exactement size octets ou retourne None si la connexion est fermée"""
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def _send_message(conn, kind, payload, fds=None):
+    """Envoie un message encadré : type (1 octet), longueur, JSON"""
+    body = json.dumps(payload).encode("utf-8")
+    data = kind + struct.pack("!I", len(body)) + body
+
+    if fds:
+        import array
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        sent = conn.sendmsg([data], ancillary)
+        if sent < len(data):
+            conn.sendall(data[sent:])
+    else:
+        conn.sendall(data)
+
+def _recv_message(conn, max_fds=0):
+    """
+    Reçoit un message encadré et les descripteurs éventuels
+
+    Returns:
+        Tuple (type, payload, fds) ou (None, None, []) si la connexion est fermée
+    """
+    fds = []
+
+    if max_fds:
+        import array
+        fd_array = array.array("i")
+        data, ancillary, _flags, _addr = conn.recvmsg(5, socket.CMSG_SPACE(max_fds * fd_array.itemsize))
+        for level, kind, cmsg_data in ancillary:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                usable = len(cmsg_data) - (len(cmsg_data) % fd_array.itemsize)
+                fd_array.frombytes(cmsg_data[:usable])
+        fds = list(fd_array)
+        if not data:
+            return None, None, fds
+        if len(data) < 5:
+            rest = _recv_exact(conn, 5 - len(data))
+            if rest is None:
+                return None, None, fds
+            data += rest
+    else:
+        data = _recv_exact(conn, 5)
+        if data is None:
+            return None, None, fds
+
+    kind = data[:1]
+    (length,) = struct.unpack("!I", data[1:5])
+    body = _recv_exact(conn, length)
+    if body is None:
+        return None, None, fds
+
+    return kind, json.loads(body.decode("utf-8")), fds
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+def _connect(timeout=CONNECT_TIMEOUT):
+    """Se connecte au démon ou retourne None"""
+    if not is_supported():
+        return None
+
+    socket_path = get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        return None
+    return conn
+
+def run_via_daemon(argv):
+    """
+    Exécute une commande via le démon s'il est disponible
+
+    Args:
+        argv: Arguments de la ligne de commande (sans le nom du programme)
+
+    Returns:
+        Code de sortie de la commande, ou None si le démon n'est pas
+        disponible (la commande doit alors être exécutée localement)
+    """
+    if os.environ.get("CLOUDYA_DAEMON") == "0":
+        return None
+
+    conn = _connect()
+    if conn is None:
+        return None
+
+    request = {
+        "argv": list(argv),
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "encoding": getattr(sys.stdout, "encoding", None) or "utf-8"
+    }
+
+    try:
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        _send_message(conn, b"R", request, fds=_FDS)
+        kind, payload, _ = _recv_message(conn)
+    except (OSError, ValueError):
+        conn.close()
+        return None
+
+    if kind != b"P":
+        conn.close()
+        return None
+
+    # Confirmer la prise en charge : sans cet accusé le fils n'exécute rien,
+    # ce qui évite une double exécution si le client est passé en autonome
+    try:
+        _send_message(conn, b"A", {})
+    except OSError:
+        conn.close()
+        return None
+
+    # À partir d'ici la commande s'exécute dans le démon
+    child_pid = payload.get("pid")
+    conn.settimeout(None)
+
+    while True:
+        try:
+            kind, payload, _ = _recv_message(conn)
+            break
+        except KeyboardInterrupt:
+            # Transmettre Ctrl-C au processus qui exécute la commande
+            try:
+                os.kill(child_pid, signal.SIGINT)
+            except OSError:
+                pass
+        except (OSError, ValueError):
+            kind = None
+            break
+
+    conn.close()
+
+    if kind != b"X":
+        return 1
+    return int(payload.get("code", 1))
+
+def ping():
+    """
+    Interroge le démon
+
+    Returns:
+        Dictionnaire d'état du démon ou None s'il ne répond pas
+    """
+    conn = _connect(timeout=2.0)
+    if conn is None:
+        return None
+
+    try:
+        _send_message(conn, b"S", {})
+        kind, payload, _ = _recv_message(conn)
+    except (OSError, ValueError):
+        return None
+    finally:
+        conn.close()
+
+    return payload if kind == b"S" else None
+
+# ---------------------------------------------------------------------------
+# Serveur
+# ---------------------------------------------------------------------------
+
+class CloudyaDaemon:
+    """Serveur chaud qui exécute les commandes dans des processus fils"""
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or get_socket_path()
+        self.started_at = time.time()
+        self.requests = 0
+        self.refreshes = 0
+        self.watch_signature = None
+        self.listener = None
+
+    def watched_paths(self):
+        """Fichiers et répertoires surveillés pour rafraîchir l'état chaud"""
+        cloudya_dir = get_cloudya_dir()
+        paths = [
+            os.path.join(cloudya_dir, "config.json"),
+            os.path.join(cloudya_dir, "config.ini"),
+            os.path.join(cloudya_dir, "credentials.yaml"),
+            os.path.join(cloudya_dir, "templates"),
+            os.path.join(cloudya_dir, "deployments"),
+        ]
+
+        template_manager = sys.modules.get("cloudya.template_manager")
+        if template_manager is not None:
+            manager = template_manager.template_manager
+            paths.append(str(manager.config_dir / "config.yaml"))
+            paths.extend(str(path) for path in manager.search_paths)
+
+        return paths
+
+    def compute_signature(self):
+        """Calcule la signature (mtime, taille, inode) des chemins surveillés"""
+        signature = []
+        for path in self.watched_paths():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except OSError:
+                signature.append((path, None, None, None))
+        return tuple(signature)
+
+    def warm(self):
+        """Importe les modules lourds et construit les structures partagées"""
+        from cloudya.utils.command_registry import list_commands
+
+        for module in ("typer", "click", "rich.console", "rich.table", "rich.prompt", "rich.live", "yaml", "requests", "jinja2"):
+            try:
+                __import__(module)
+            except ImportError:
+                pass
+
+        for command in list_commands():
+            if command in DAEMON_BYPASS:
+                continue
+            try:
+                __import__(f"cloudya.cli.{command}")
+            except BaseException as e:
+                # Certaines commandes quittent à l'import si une dépendance manque
+                print(f"Préchargement de '{command}' ignoré: {e}", file=sys.stderr)
+
+        self.refresh()
+
+    def refresh(self):
+        """Recharge la configuration et les templates en mémoire"""
+        from cloudya.utils import config
+
+        config.invalidate()
+        config.get_snapshot()
+
+        template_manager = sys.modules.get("cloudya.template_manager")
+        if template_manager is not None:
+            # Réinitialiser l'instance existante : les modules qui l'ont importée la conservent
+            manager = template_manager.template_manager
+            manager.setup_paths()
+            manager.load_config()
+            # Charger l'index des templates : les processus fils n'ont plus qu'à le revalider
+            manager.index.refresh(manager.config['templates']['extensions'])
+            manager.package_templates.resources()
+
+        self.watch_signature = self.compute_signature()
+        self.refreshes += 1
+
+    def refresh_if_changed(self):
+        """Rafraîchit l'état chaud si un fichier surveillé a changé"""
+        if self.compute_signature() != self.watch_signature:
+            self.refresh()
+
+    def status(self):
+        """Retourne l'état du démon"""
+        return {
+            "pid": os.getpid(),
+            "socket": self.socket_path,
+            "started_at": self.started_at,
+            "uptime": time.time() - self.started_at,
+            "requests": self.requests,
+            "refreshes": self.refreshes,
+            "python": sys.executable
+        }
+
+    def bind(self):
+        """Crée le socket d'écoute (accessible uniquement par l'utilisateur)"""
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        # Le socket peut être ailleurs (CLOUDYA_DAEMON_SOCKET) : répertoire du fichier PID
+        os.makedirs(get_cloudya_dir(), exist_ok=True)
+
+        if os.path.exists(self.socket_path):
+            if ping() is not None:
+                raise RuntimeError(f"Un démon écoute déjà sur {self.socket_path}")
+            os.unlink(self.socket_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(64)
+
+        self.listener = listener
+
+        with open(get_pid_file(), "w") as f:
+            f.write(str(os.getpid()))
+
+    def cleanup(self):
+        """Supprime le socket et le fichier PID"""
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+
+        for path in (self.socket_path, get_pid_file()):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _peer_allowed(self, conn):
+        """Vérifie que le client appartient au même utilisateur"""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _pid, uid, _gid = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def serve_forever(self):
+        """Boucle principale du démon"""
+        self.bind()
+
+        # Les fils sont récupérés automatiquement par le noyau
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        try:
+            while True:
+                conn, _addr = self.listener.accept()
+                try:
+                    self.handle(conn)
+                except Exception as e:
+                    print(f"Erreur lors du traitement d'une requête: {e}", file=sys.stderr)
+                finally:
+                    conn.close()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.cleanup()
+
+    def handle(self, conn):
+        """Traite une connexion client"""
+        conn.settimeout(HEADER_TIMEOUT)
+
+        if not self._peer_allowed(conn):
+            return
+
+        kind, request, fds = _recv_message(conn, max_fds=len(_FDS))
+
+        try:
+            if kind == b"S":
+                _send_message(conn, b"S", self.status())
+                return
+
+            if kind != b"R" or len(fds) != len(_FDS):
+                return
+
+            self.refresh_if_changed()
+            self.requests += 1
+
+            if os.fork() == 0:
+                self.listener.close()
+                os._exit(self.run_child(conn, request, fds))
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def run_child(self, conn, request, fds):
+        """Exécute une requête dans le processus fils"""
+        code = 1
+        try:
+            # Le client attend notre PID (pour Ctrl-C) puis confirme
+            _send_message(conn, b"P", {"pid": os.getpid()})
+            kind, _payload, _fds = _recv_message(conn)
+            if kind != b"A":
+                return 0
+
+            # Nouvelle session : le terminal du client n'est pas notre terminal de contrôle
+            os.setsid()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+
+            for target, fd in zip(_FDS, fds):
+                os.dup2(fd, target)
+
+            _attach_client(request)
+
+            from cloudya.cli.main import execute_command
+
+            argv = request.get("argv") or ["help"]
+            sys.argv = ["cloudya"] + argv
+            code = execute_command(argv[0], argv[1:])
+        except KeyboardInterrupt:
+            code = 1
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException as e:
+            print(f"❌ Erreur dans le démon Cloudya: {e}", file=sys.stderr)
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            except Exception:
+                pass
+
+        try:
+            conn.settimeout(None)
+            _send_message(conn, b"X", {"code": code})
+        except OSError:
+            pass
+
+        return 0
+
+def _fd_getpass(prompt="Password: ", stream=None):
+    """getpass() qui désactive l'écho directement sur stdin (sans /dev/tty)"""
+    import termios
+
+    stream = stream or sys.stderr
+    fd = sys.stdin.fileno()
+
+    if not os.isatty(fd):
+        stream.write(prompt)
+        stream.flush()
+        return sys.stdin.readline().rstrip("\n")
+
+    old_attrs = termios.tcgetattr(fd)
+    new_attrs = termios.tcgetattr(fd)
+    new_attrs[3] &= ~termios.ECHO
+
+    stream.write(prompt)
+    stream.flush()
+    try:
+        termios.tcsetattr(fd, termios.TCSAFLUSH, new_attrs)
+        line = sys.stdin.readline()
+    finally:
+        termios.tcsetattr(fd, termios.TCSAFLUSH, old_attrs)
+        stream.write("\n")
+        stream.flush()
+
+    return line.rstrip("\n")
+
+def _attach_client(request):
+    """Adopte le contexte du client : répertoire, environnement, flux standard"""
+    import getpass
+
+    os.chdir(request.get("cwd") or "/")
+    os.environ.clear()
+    os.environ.update(request.get("env") or {})
+
+    encoding = request.get("encoding") or "utf-8"
+    sys.stdin = open(0, "r", encoding=encoding, closefd=False)
+    sys.stdout = open(1, "w", encoding=encoding, closefd=False, buffering=1 if os.isatty(1) else -1)
+    sys.stderr = open(2, "w", encoding=encoding, closefd=False, buffering=1)
+
+    # getpass() ouvre /dev/tty, qui n'est plus notre terminal de contrôle
+    original_getpass = getpass.getpass
+    for module in list(sys.modules.values()):
+        if getattr(module, "getpass", None) is original_getpass:
+            module.getpass = _fd_getpass
+
+    # Les consoles rich détectent le terminal et les couleurs à leur création
+    rich_console = sys.modules.get("rich.console")
+    if rich_console is not None:
+        for module in list(sys.modules.values()):
+            console = getattr(module, "console", None)
+            if type(console) is rich_console.Console:
+                console.__init__()
+
+def start_background(timeout=5.0):
+    """
+    Démarre le démon en arrière-plan
+
+    Returns:
+        PID du démon ou None en cas d'échec
+    """
+    import subprocess
+
+    os.makedirs(get_cloudya_dir(), exist_ok=True)
+
+    with open(get_log_file(), "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "cloudya.utils.daemon"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True
+        )
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return None
+        status = ping()
+        if status:
+            return status["pid"]
+        time.sleep(0.05)
+
+    return None
+
+def stop(timeout=5.0):
+    """
+    Arrête le démon
+
+    Returns:
+        True si le démon a été arrêté
+    """
+    status = ping()
+    if not status:
+        return False
+
+    try:
+        os.kill(status["pid"], signal.SIGTERM)
+    except OSError:
+        return False
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if ping() is None:
+            return True
+        time.sleep(0.05)
+
+    return False
+
+def serve():
+    """Démarre le démon au premier plan"""
+    daemon = CloudyaDaemon()
+    daemon.warm()
+    print(f"Démon Cloudya en écoute sur {daemon.socket_path} (PID {os.getpid()})", flush=True)
+    daemon.serve_forever()
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,105 @@
+"""
+Étapes préalables au plan d'un déploiement Terraform
+
+Les étapes d'un déploiement avant le plan sont indépendantes et se
+chevauchent :
+
+- vérification des credentials du provider (check() du module provider,
+  sans interaction ni affichage) dans un thread ;
+- préparation du répertoire de déploiement puis 'terraform init' (avec la
+  vérification de la version de Terraform) dans le thread principal, qui
+  garde l'affichage de la progression.
+
+Les deux branches sont jointes avant le plan : la plus longue fixe la
+latence, pas la somme des étapes. La connexion interactive (connect()) ne
+reste nécessaire que si la vérification échoue.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from . import providers
+from .terraform import check_terraform, prepare_deployment, terraform_init
+
+# Libellés des étapes (affichage des durées)
+STAGE_LABELS = {
+    "check": "credentials",
+    "prepare": "préparation",
+    "init": "init",
+}
+
+class PipelineResult:
+    """Résultat des étapes préalables au plan"""
+
+    def __init__(self):
+        self.deployment_dir: Optional[str] = None
+        self.initialized = False
+        self.provider_ok = False
+        self.provider_message = ""
+        self.timings: Dict[str, float] = {}
+
+    def describe_timings(self):
+        """Durées des étapes, par exemple 'credentials 1.2s, init 3.4s (total 3.5s)'"""
+        stages = ", ".join(f"{label} {self.timings[stage]:.1f}s"
+                           for stage, label in STAGE_LABELS.items() if stage in self.timings)
+        return f"{stages} (total {self.timings.get('total', 0):.1f}s)"
+
+def check_provider(provider) -> Tuple[bool, str]:
+    """
+    Vérifie les credentials d'un provider sans interaction
+
+    Args:
+        provider: Nom du provider (aws, gcp...)
+
+    Returns:
+        Tuple (succès, message)
+    """
+    module = getattr(providers, provider, None)
+    if module is None or not hasattr(module, "check"):
+        return False, f"provider non supporté: {provider}"
+    try:
+        return module.check()
+    except Exception as e:
+        return False, str(e)
+
+def _timed(timings, stage, function, *args):
+    started = time.monotonic()
+    try:
+        return function(*args)
+    finally:
+        timings[stage] = time.monotonic() - started
+
+def _initialize(deployment_dir, offline):
+    return check_terraform() and terraform_init(deployment_dir, offline)
+
+def run_stages(provider, template_name, params, fingerprint=None, deployment_dir=None, offline=None) -> PipelineResult:
+    """
+    Vérifie le provider, prépare et initialise un déploiement en parallèle
+
+    Args:
+        provider: Nom du provider
+        template_name: Nom du template (provider/template)
+        params: Paramètres du déploiement
+        fingerprint: Empreinte des entrées du déploiement
+        deployment_dir: Déploiement existant à réappliquer (préparé sinon)
+        offline: Installer les providers depuis le miroir local (None = configuration)
+
+    Returns:
+        PipelineResult (deployment_dir est None si la préparation a échoué)
+    """
+    result = PipelineResult()
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        check = executor.submit(_timed, result.timings, "check", check_provider, provider)
+
+        if deployment_dir is None:
+            deployment_dir = _timed(result.timings, "prepare", prepare_deployment, template_name, params, fingerprint)
+        result.deployment_dir = deployment_dir
+        if deployment_dir:
+            result.initialized = _timed(result.timings, "init", _initialize, deployment_dir, offline)
+
+        result.provider_ok, result.provider_message = check.result()
+
+    result.timings["total"] = time.monotonic() - started
+    return result
@@ -0,0 +1,236 @@
+"""
+Journal des événements d'un déploiement
+
+Chaque répertoire de déploiement contient un journal en ajout seul
+(journal.jsonl, une ligne JSON par événement) :
+
+- {"type": "status", "status": "planning", ...} : changement de phase ;
+- {"type": "update", "fields": {...}} : autres modifications des métadonnées.
+
+Chaque événement porte sa date, une horloge monotone (time.monotonic) et
+l'identifiant de démarrage du système : les durées des phases sont exactes
+même si l'horloge murale change, y compris entre plusieurs processus.
+
+Le fichier metadata.json est l'instantané compacté : il contient l'état
+obtenu en rejouant le journal jusqu'à 'journal_offset'. L'état courant est
+cet instantané plus les événements suivants. Un changement de statut n'est
+donc qu'un ajout d'une ligne ; l'instantané est réécrit (atomiquement) lors
+des autres mises à jour ou quand trop d'événements se sont accumulés.
+
+Les écritures sont forcées sur disque (fsync) par lots : au plus une fois
+par FSYNC_INTERVAL pour les phases en cours, immédiatement pour les statuts
+finaux, et à la sortie du processus. Une ligne incomplète (arrêt brutal)
+est ignorée à la relecture.
+"""
+import os
+import json
+import time
+import atexit
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+JOURNAL_FILE = "journal.jsonl"
+METADATA_FILE = "metadata.json"
+
+FSYNC_INTERVAL = 0.5
+# Nombre d'événements après lequel l'instantané est réécrit
+COMPACT_EVENTS = 64
+# Descripteurs de journaux gardés ouverts (les plus récents)
+MAX_OPEN_JOURNALS = 32
+
+# Statuts des phases en cours (les autres sont écrits sur disque immédiatement)
+IN_PROGRESS_STATUSES = {
+    "initializing", "planning", "applying", "destroying", "deploying", "uninstalling", "updating",
+}
+
+_lock = threading.Lock()
+_journals: "OrderedDict[str, List]" = OrderedDict()
+_boot_id: Optional[str] = None
+
+def get_journal_file(deployment_dir):
+    """
+    Récupère le chemin du journal d'un déploiement
+    """
+    return os.path.join(deployment_dir, JOURNAL_FILE)
+
+def _get_boot_id():
+    global _boot_id
+    if _boot_id is None:
+        try:
+            with open("/proc/sys/kernel/random/boot_id", "r") as f:
+                _boot_id = f.read().strip()
+        except OSError:
+            _boot_id = ""
+    return _boot_id
+
+def _fsync(entry):
+    os.fsync(entry[0])
+    entry[1] = time.monotonic()
+    entry[2] = False
+
+def _close(entry):
+    if entry[2]:
+        _fsync(entry)
+    os.close(entry[0])
+
+def _open(path):
+    entry = _journals.get(path)
+    if entry is not None:
+        _journals.move_to_end(path)
+        return entry
+
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    # Terminer une ligne interrompue par un arrêt brutal
+    size = os.fstat(fd).st_size
+    if size and os.pread(fd, 1, size - 1) != b"\n":
+        os.write(fd, b"\n")
+    entry = [fd, time.monotonic(), False]
+    _journals[path] = entry
+    while len(_journals) > MAX_OPEN_JOURNALS:
+        _close(_journals.popitem(last=False)[1])
+    return entry
+
+def append(deployment_dir, event, sync=False):
+    """
+    Ajoute un événement au journal d'un déploiement
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+        event: Événement ({"type": ..., ...})
+        sync: Forcer l'écriture sur disque immédiatement
+
+    Returns:
+        Taille du journal après l'ajout
+    """
+    event = dict(event)
+    event.setdefault("at", datetime.datetime.now().isoformat())
+    event["mono"] = time.monotonic()
+    event["boot"] = _get_boot_id()
+    line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+
+    path = get_journal_file(deployment_dir)
+    with _lock:
+        entry = _open(path)
+        # Une seule écriture en mode O_APPEND : les lignes ne s'entremêlent pas
+        os.write(entry[0], line)
+        entry[2] = True
+        if sync or time.monotonic() - entry[1] >= FSYNC_INTERVAL:
+            _fsync(entry)
+        return os.fstat(entry[0]).st_size
+
+def flush():
+    """
+    Écrit sur disque les événements en attente et ferme les journaux
+    """
+    with _lock:
+        while _journals:
+            try:
+                _close(_journals.popitem(last=False)[1])
+            except OSError:
+                pass
+
+atexit.register(flush)
+
+def read_events(deployment_dir, offset=0) -> Tuple[List[Dict], int]:
+    """
+    Lit les événements du journal à partir d'une position
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+        offset: Position (octets) du premier événement à lire
+
+    Returns:
+        Tuple (événements, position après le dernier événement complet)
+    """
+    try:
+        with open(get_journal_file(deployment_dir), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except OSError:
+        return [], offset
+
+    # Ignorer une dernière ligne incomplète (écriture interrompue)
+    end = data.rfind(b"\n") + 1
+    events = []
+    for line in data[:end].splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return events, offset + end
+
+def apply_event(state, event):
+    """
+    Applique un événement à l'état d'un déploiement
+    """
+    if event.get("type") == "status":
+        state["status"] = event.get("status")
+    elif event.get("type") == "update":
+        state.update(event.get("fields") or {})
+    return state
+
+def read_snapshot(deployment_dir) -> Optional[Dict]:
+    """
+    Lit l'instantané compacté (metadata.json)
+    """
+    try:
+        with open(os.path.join(deployment_dir, METADATA_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load(deployment_dir) -> Tuple[Optional[Dict], int, int]:
+    """
+    Reconstruit l'état courant d'un déploiement
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+
+    Returns:
+        Tuple (état ou None, position du journal, nombre d'événements
+        postérieurs à l'instantané)
+    """
+    state = read_snapshot(deployment_dir)
+    if state is None:
+        return None, 0, 0
+
+    events, offset = read_events(deployment_dir, state.get("journal_offset", 0))
+    for event in events:
+        apply_event(state, event)
+    return state, offset, len(events)
+
+def load_state(deployment_dir) -> Optional[Dict]:
+    """
+    Retourne l'état courant d'un déploiement (instantané + journal)
+    """
+    return load(deployment_dir)[0]
+
+def history(deployment_dir) -> List[Dict]:
+    """
+    Historique des phases d'un déploiement
+
+    Returns:
+        Liste de {"at", "status", "duration"} ; la durée d'une phase est le
+        temps écoulé jusqu'au changement de statut suivant (None pour la
+        phase courante)
+    """
+    events, _offset = read_events(deployment_dir)
+    transitions = [event for event in events
+                   if event.get("type") == "status" or "status" in (event.get("fields") or {})]
+
+    entries = []
+    for index, event in enumerate(transitions):
+        status = event.get("status") or event["fields"]["status"]
+        duration = None
+        if index + 1 < len(transitions):
+            following = transitions[index + 1]
+            if event.get("boot") and event.get("boot") == following.get("boot"):
+                duration = following["mono"] - event["mono"]
+            else:
+                # Redémarrage entre les deux événements : horloge murale
+                duration = (datetime.datetime.fromisoformat(following["at"])
+                            - datetime.datetime.fromisoformat(event["at"])).total_seconds()
+        entries.append({"at": event.get("at"), "status": status, "duration": duration})
+    return entries
@@ -0,0 +1,593 @@
+"""
+Registre local des déploiements (Terraform et applications)
+
+Les fichiers metadata.json de chaque répertoire de déploiement restent la
+source de vérité. Le registre (~/.cloudya/deployments.db, SQLite en mode
+WAL) en conserve une copie indexée : statut, provider, dates, outputs et
+instances. Lister, filtrer, retrouver un déploiement par préfixe d'ID ou
+choisir une instance sont des requêtes indexées, sans relire tous les
+fichiers de métadonnées.
+
+Synchronisation :
+
+- Cloudya écrit les métadonnées avec write_metadata(), qui met à jour le
+  fichier puis le registre, et les fait évoluer avec update(), qui ajoute
+  un événement au journal du déploiement (voir deployment_journal) ;
+- avant chaque requête, la date de modification des répertoires racine
+  est comparée à celle mémorisée : si des déploiements ont été ajoutés ou
+  supprimés hors de Cloudya, seuls ces répertoires sont relus ;
+- sync(full=True) relit tous les fichiers dont la signature a changé
+  (modifications manuelles).
+"""
+import os
+import json
+import sqlite3
+import datetime
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from . import deployment_journal
+
+REGISTRY_NAME = "deployments.db"
+METADATA_FILE = "metadata.json"
+
+TERRAFORM = "terraform"
+APP = "app"
+KINDS = (TERRAFORM, APP)
+
+# Statuts des déploiements Terraform dont les instances sont utilisables
+ACTIVE_STATUSES = ("deployed", "updated")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deployments (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dir TEXT NOT NULL,
+    template TEXT,
+    provider TEXT,
+    status TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    metadata TEXT NOT NULL,
+    signature TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deployments_kind_created ON deployments (kind, created_at);
+CREATE INDEX IF NOT EXISTS deployments_kind_status ON deployments (kind, status, created_at);
+CREATE INDEX IF NOT EXISTS deployments_kind_provider ON deployments (kind, provider, created_at);
+CREATE TABLE IF NOT EXISTS instances (
+    deployment_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ip TEXT,
+    instance_id TEXT,
+    platform TEXT,
+    template TEXT,
+    created_at TEXT,
+    PRIMARY KEY (deployment_id, name)
+);
+CREATE INDEX IF NOT EXISTS instances_platform ON instances (lower(platform));
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Migrations appliquées selon PRAGMA user_version
+MIGRATIONS = [
+    [
+        "ALTER TABLE deployments ADD COLUMN fingerprint TEXT",
+        "CREATE INDEX IF NOT EXISTS deployments_fingerprint ON deployments (kind, fingerprint, created_at)",
+    ],
+    [
+        "ALTER TABLE instances ADD COLUMN private_ip TEXT",
+        "ALTER TABLE instances ADD COLUMN public_ip TEXT",
+        "ALTER TABLE instances ADD COLUMN tags TEXT",
+    ],
+]
+
+_local = threading.local()
+
+def get_registry_file():
+    """
+    Récupère le chemin de la base du registre
+    """
+    return os.path.join(os.path.expanduser("~/.cloudya"), REGISTRY_NAME)
+
+def get_root(kind):
+    """
+    Récupère le répertoire racine des déploiements d'un type
+
+    Args:
+        kind: 'terraform' ou 'app'
+    """
+    # Imports différés : ces modules importent eux-mêmes le registre
+    if kind == TERRAFORM:
+        from .terraform import get_deployments_dir
+        return get_deployments_dir()
+    from .ansible import get_app_deployments_dir
+    return get_app_deployments_dir()
+
+def connect() -> sqlite3.Connection:
+    """
+    Retourne la connexion du thread courant (une par thread et par processus)
+    """
+    connection = getattr(_local, "connection", None)
+    path = get_registry_file()
+    if connection is not None and _local.pid == os.getpid() and _local.path == path:
+        return connection
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    _migrate(connection)
+
+    _local.connection = connection
+    _local.pid = os.getpid()
+    _local.path = path
+    return connection
+
+def _migrate(connection):
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    for index, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with connection:
+            for statement in statements:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {index}")
+
+def _file_signature(path) -> Optional[str]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}:{stat.st_ino}"
+
+def _deployment_signature(deployment_dir) -> Optional[str]:
+    """Signature de l'instantané et du journal d'un déploiement"""
+    signature = _file_signature(os.path.join(deployment_dir, METADATA_FILE))
+    if signature is None:
+        return None
+    try:
+        journal_size = os.path.getsize(deployment_journal.get_journal_file(deployment_dir))
+    except OSError:
+        journal_size = 0
+    return f"{signature}:{journal_size}"
+
+def directory_signature(path) -> Optional[str]:
+    """
+    Signature d'un répertoire racine (change à chaque ajout ou suppression)
+    """
+    return _file_signature(path)
+
+def extract_instances(metadata: Dict) -> List[Dict]:
+    """
+    Extrait les instances d'un déploiement Terraform
+
+    Les instances lues dans le fichier d'état (clé 'instances', voir
+    tfstate.read_state) sont utilisées en priorité. À défaut, elles sont
+    déduites des outputs, dont la structure dépend du template : un output
+    est une instance s'il contient une adresse (ip, address, host) ou s'il
+    s'agit d'une adresse directe (nom se terminant par _ip, _address ou _host).
+
+    Args:
+        metadata: Métadonnées du déploiement
+
+    Returns:
+        Liste des instances
+    """
+    instances = []
+    template = metadata.get("template") or ""
+    platform = template.split("/")[0] if "/" in template else ""
+
+    if metadata.get("instances"):
+        for instance in metadata["instances"]:
+            instances.append({
+                "name": instance["name"],
+                "deployment_id": metadata.get("id"),
+                "template": template,
+                "ip": instance.get("ip") or "",
+                "id": instance.get("id") or "",
+                "platform": instance.get("platform") or platform,
+                "private_ip": instance.get("private_ip") or "",
+                "public_ip": instance.get("public_ip") or "",
+                "tags": instance.get("tags") or {},
+                "created_at": metadata.get("created_at")
+            })
+        return instances
+
+    for output_name, output_value in (metadata.get("outputs") or {}).items():
+        if isinstance(output_value, dict) and ("ip" in output_value or "address" in output_value or "host" in output_value):
+            name = output_name
+            ip = output_value.get("ip") or output_value.get("address") or output_value.get("host")
+            instance_id = output_value.get("id", "")
+        elif isinstance(output_value, str) and (output_name.endswith("_ip") or output_name.endswith("_address") or output_name.endswith("_host")):
+            name = output_name.replace("_ip", "").replace("_address", "").replace("_host", "")
+            ip = output_value
+            instance_id = ""
+        else:
+            continue
+
+        instances.append({
+            "name": name,
+            "deployment_id": metadata.get("id"),
+            "template": template,
+            "ip": ip,
+            "id": instance_id,
+            "platform": platform,
+            "private_ip": "",
+            "public_ip": "",
+            "tags": {},
+            "created_at": metadata.get("created_at")
+        })
+
+    return instances
+
+def _provider(kind, metadata):
+    if kind == APP:
+        return metadata.get("platform")
+    template = metadata.get("template") or ""
+    return template.split("/")[0] if "/" in template else None
+
+def _upsert(connection, kind, deployment_dir, metadata, signature):
+    deployment_id = metadata.get("id") or os.path.basename(deployment_dir)
+    connection.execute(
+        """
+        INSERT OR REPLACE INTO deployments
+            (id, kind, dir, template, provider, status, created_at, updated_at, metadata, signature, fingerprint)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            deployment_id,
+            kind,
+            deployment_dir,
+            metadata.get("template") if kind == TERRAFORM else metadata.get("name"),
+            _provider(kind, metadata),
+            metadata.get("status"),
+            metadata.get("created_at"),
+            datetime.datetime.now().isoformat(),
+            json.dumps(metadata),
+            signature,
+            metadata.get("fingerprint")
+        )
+    )
+
+    connection.execute("DELETE FROM instances WHERE deployment_id = ?", (deployment_id,))
+    if kind == TERRAFORM:
+        connection.executemany(
+            """
+            INSERT OR REPLACE INTO instances
+                (deployment_id, name, ip, instance_id, platform, template, created_at, private_ip, public_ip, tags)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(deployment_id, instance["name"], instance["ip"], instance["id"], instance["platform"],
+              instance["template"], instance["created_at"], instance["private_ip"], instance["public_ip"],
+              json.dumps(instance["tags"])) for instance in extract_instances(metadata)]
+        )
+
+def _read_metadata(deployment_dir):
+    return deployment_journal.load_state(deployment_dir)
+
+def record(kind, deployment_dir, metadata=None):
+    """
+    Enregistre (ou met à jour) un déploiement dans le registre
+
+    Args:
+        kind: 'terraform' ou 'app'
+        deployment_dir: Répertoire du déploiement
+        metadata: Métadonnées (relues depuis le fichier si absentes)
+    """
+    if metadata is None:
+        metadata = _read_metadata(deployment_dir)
+        if metadata is None:
+            return
+
+    connection = connect()
+    with connection:
+        _upsert(connection, kind, deployment_dir, metadata, _deployment_signature(deployment_dir) or "")
+
+def forget(deployment_id):
+    """
+    Retire un déploiement du registre
+    """
+    connection = connect()
+    with connection:
+        connection.execute("DELETE FROM instances WHERE deployment_id = ?", (deployment_id,))
+        connection.execute("DELETE FROM deployments WHERE id = ?", (deployment_id,))
+
+def write_metadata(deployment_dir, metadata, kind=TERRAFORM, root_signature=None):
+    """
+    Écrit le fichier metadata.json d'un déploiement et met à jour le registre
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+        metadata: Métadonnées complètes
+        kind: 'terraform' ou 'app'
+        root_signature: Signature du répertoire racine avant la création du
+            déploiement : évite de rebalayer la racine pour ce seul ajout
+    """
+    metadata_path = os.path.join(deployment_dir, METADATA_FILE)
+    fd, tmp_path = tempfile.mkstemp(dir=deployment_dir, prefix=f".{METADATA_FILE}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, metadata_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    try:
+        connection = connect()
+        with connection:
+            _upsert(connection, kind, deployment_dir, metadata, _deployment_signature(deployment_dir) or "")
+            if root_signature is not None:
+                key = f"root:{kind}"
+                stored = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                if stored and stored[0] == root_signature:
+                    root = os.path.dirname(deployment_dir)
+                    connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, directory_signature(root)))
+    except sqlite3.Error as e:
+        # Le fichier reste la source de vérité : le registre sera resynchronisé
+        print(f"Avertissement: registre des déploiements non mis à jour: {e}")
+
+def update(deployment_dir, updates, kind=TERRAFORM):
+    """
+    Met à jour les métadonnées d'un déploiement via son journal
+
+    Un simple changement de statut est un ajout au journal et une mise à
+    jour de la ligne du registre ; les autres modifications réécrivent
+    aussi l'instantané (metadata.json).
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+        updates: Champs modifiés
+        kind: 'terraform' ou 'app'
+
+    Returns:
+        True si la mise à jour a réussi, False si le déploiement n'existe pas
+    """
+    if not os.path.exists(os.path.join(deployment_dir, METADATA_FILE)):
+        return False
+
+    status = updates.get("status")
+    if set(updates) == {"status"}:
+        deployment_journal.append(deployment_dir, {"type": "status", "status": status},
+                                  sync=status not in deployment_journal.IN_PROGRESS_STATUSES)
+    else:
+        deployment_journal.append(deployment_dir, {"type": "update", "fields": updates}, sync=True)
+
+    metadata, offset, pending = deployment_journal.load(deployment_dir)
+    if metadata is None:
+        return False
+
+    if set(updates) != {"status"} or pending >= deployment_journal.COMPACT_EVENTS:
+        # Compacter : nouvel instantané jusqu'à la fin du journal
+        metadata["journal_offset"] = offset
+        write_metadata(deployment_dir, metadata, kind)
+        return True
+
+    try:
+        connection = connect()
+        with connection:
+            connection.execute(
+                "UPDATE deployments SET status = ?, updated_at = ?, metadata = ?, signature = ? WHERE id = ?",
+                (status, datetime.datetime.now().isoformat(), json.dumps(metadata),
+                 _deployment_signature(deployment_dir) or "", metadata.get("id") or os.path.basename(deployment_dir))
+            )
+    except sqlite3.Error as e:
+        print(f"Avertissement: registre des déploiements non mis à jour: {e}")
+    return True
+
+def sync(kind, full=False):
+    """
+    Resynchronise le registre avec les répertoires de déploiement
+
+    Args:
+        kind: 'terraform' ou 'app'
+        full: Relire tous les fichiers de métadonnées modifiés (et pas
+            seulement les déploiements ajoutés ou supprimés)
+
+    Returns:
+        Nombre de déploiements ajoutés, mis à jour et supprimés
+    """
+    root = get_root(kind)
+    key = f"root:{kind}"
+    connection = connect()
+
+    signature = directory_signature(root)
+    stored = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    if not full and stored and stored[0] == signature:
+        return {"added": 0, "updated": 0, "removed": 0}
+
+    known = dict(connection.execute("SELECT dir, signature FROM deployments WHERE kind = ?", (kind,)))
+    stats = {"added": 0, "updated": 0, "removed": 0}
+
+    present = set()
+    with connection:
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            deployment_dir = entry.path
+            present.add(deployment_dir)
+            if deployment_dir in known and not full:
+                continue
+
+            file_signature = _deployment_signature(deployment_dir)
+            if file_signature is None or known.get(deployment_dir) == file_signature:
+                continue
+
+            metadata = _read_metadata(deployment_dir)
+            if metadata is None:
+                continue
+            _upsert(connection, kind, deployment_dir, metadata, file_signature)
+            stats["updated" if deployment_dir in known else "added"] += 1
+
+        for deployment_dir in set(known) - present:
+            row = connection.execute(
+                "SELECT id FROM deployments WHERE dir = ?", (deployment_dir,)).fetchone()
+            # Répertoire déplacé : la ligne a déjà été remplacée (même ID)
+            if row is None:
+                continue
+            connection.execute("DELETE FROM instances WHERE deployment_id = ?", (row[0],))
+            connection.execute("DELETE FROM deployments WHERE id = ?", (row[0],))
+            stats["removed"] += 1
+
+        connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, signature))
+
+    return stats
+
+def parse_since(value) -> Optional[str]:
+    """
+    Convertit une durée (30m, 24h, 7d, 2w) ou une date ISO en borne de date
+
+    Returns:
+        Date ISO ou None si la valeur est invalide
+    """
+    if not value:
+        return None
+    units = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+    if value[-1] in units and value[:-1].isdigit():
+        delta = datetime.timedelta(**{units[value[-1]]: int(value[:-1])})
+        return (datetime.datetime.now() - delta).isoformat()
+    try:
+        return datetime.datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+def list_deployments(kind, status=None, provider=None, since=None, limit=None) -> List[Dict]:
+    """
+    Liste les déploiements (requête indexée)
+
+    Args:
+        kind: 'terraform' ou 'app'
+        status: Filtrer par statut
+        provider: Filtrer par provider (ou plateforme pour les applications)
+        since: Date ISO minimale de création
+        limit: Nombre maximal de résultats (les plus récents)
+
+    Returns:
+        Liste des métadonnées, de la plus ancienne à la plus récente
+    """
+    sync(kind)
+
+    clauses = ["kind = ?"]
+    params = [kind]
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if provider:
+        clauses.append("provider = ?")
+        params.append(provider)
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+
+    query = f"SELECT metadata FROM deployments WHERE {' AND '.join(clauses)} ORDER BY created_at DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(int(limit))
+
+    rows = connect().execute(query, params).fetchall()
+    return [json.loads(row[0]) for row in reversed(rows)]
+
+def find_by_prefix(kind, prefix) -> List[Dict]:
+    """
+    Recherche les déploiements dont l'ID commence par un préfixe
+
+    Returns:
+        Liste de dictionnaires {"id", "dir", "status"}
+    """
+    if not prefix:
+        return []
+    sync(kind)
+
+    # Intervalle [préfixe, préfixe suivant[ : utilise l'index de la clé primaire
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    rows = connect().execute(
+        "SELECT id, dir, status FROM deployments WHERE kind = ? AND id >= ? AND id < ? ORDER BY id LIMIT 20",
+        (kind, prefix, upper)
+    ).fetchall()
+    return [{"id": row[0], "dir": row[1], "status": row[2]} for row in rows]
+
+def resolve_dir(kind, deployment_id) -> Optional[str]:
+    """
+    Trouve le répertoire d'un déploiement par ID complet ou préfixe unique
+
+    Returns:
+        Chemin du répertoire, ou None si l'ID est inconnu ou ambigu
+    """
+    exact = os.path.join(get_root(kind), deployment_id)
+    if deployment_id and os.path.sep not in deployment_id and os.path.isdir(exact):
+        return exact
+
+    matches = find_by_prefix(kind, deployment_id)
+    if len(matches) == 1 and os.path.isdir(matches[0]["dir"]):
+        return matches[0]["dir"]
+    return None
+
+def list_instances(platform=None) -> List[Dict]:
+    """
+    Liste les instances des déploiements Terraform actifs (requête indexée)
+
+    Args:
+        platform: Filtrer par plateforme (insensible à la casse)
+
+    Returns:
+        Liste des instances
+    """
+    sync(TERRAFORM)
+
+    query = f"""
+        SELECT i.name, i.deployment_id, i.template, i.ip, i.instance_id, i.platform, i.created_at,
+               i.private_ip, i.public_ip, i.tags
+        FROM instances i JOIN deployments d ON d.id = i.deployment_id
+        WHERE d.status IN ({",".join("?" * len(ACTIVE_STATUSES))})
+    """
+    params = list(ACTIVE_STATUSES)
+    if platform:
+        query += " AND lower(i.platform) = ?"
+        params.append(platform.lower())
+    query += " ORDER BY i.created_at, i.deployment_id, i.name"
+
+    return [
+        {"name": name, "deployment_id": deployment_id, "template": template, "ip": ip,
+         "id": instance_id or "", "platform": platform_name or "", "created_at": created_at,
+         "private_ip": private_ip or "", "public_ip": public_ip or "", "tags": json.loads(tags) if tags else {}}
+        for name, deployment_id, template, ip, instance_id, platform_name, created_at, private_ip, public_ip, tags
+        in connect().execute(query, params)
+    ]
+
+def find_by_fingerprint(kind, fingerprint, statuses=ACTIVE_STATUSES) -> Optional[Dict]:
+    """
+    Recherche le déploiement le plus récent ayant une empreinte d'entrées donnée
+
+    Args:
+        kind: 'terraform' ou 'app'
+        fingerprint: Empreinte des entrées du déploiement
+        statuses: Statuts acceptés (déploiements actifs par défaut)
+
+    Returns:
+        Dictionnaire {"id", "dir", "status", "metadata"} ou None
+    """
+    if not fingerprint:
+        return None
+    sync(kind)
+
+    row = connect().execute(
+        f"""
+        SELECT id, dir, status, metadata FROM deployments
+        WHERE kind = ? AND fingerprint = ? AND status IN ({",".join("?" * len(statuses))})
+        ORDER BY created_at DESC LIMIT 1
+        """,
+        (kind, fingerprint, *statuses)
+    ).fetchone()
+    if row is None or not os.path.isdir(row[1]):
+        return None
+    return {"id": row[0], "dir": row[1], "status": row[2], "metadata": json.loads(row[3])}
@@ -0,0 +1,330 @@
+"""
+Analyse des plans Terraform sauvegardés
+
+Après 'terraform plan -out=tfplan', le plan est exporté avec
+'terraform show -json' dans le déploiement (PLAN_JSON_FILE), pour être
+consulté plus tard sans relancer Terraform. L'export est écrit directement
+sur disque puis lu en streaming (tfstate.iter_document) : chaque élément de
+'resource_changes' est décodé séparément et les sections volumineuses
+inutiles au résumé (prior_state, planned_values, configuration) sont
+parcourues sans être conservées.
+
+Le résumé compte les changements par action, par type de ressource et par
+module, et liste les changements destructifs (suppressions et
+remplacements). Il est mis en cache à côté de l'export (PLAN_SUMMARY_FILE)
+avec la taille et la date de l'export.
+"""
+import os
+import json
+import tempfile
+import subprocess
+from typing import Dict, Iterator, Optional
+
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+
+from .terraform_events import ACTION_LABELS
+from .tfstate import StateError, iter_document
+
+console = Console()
+
+PLAN_JSON_FILE = "tfplan.json"
+PLAN_SUMMARY_FILE = ".cloudya-plan.json"
+SUMMARY_VERSION = 1
+
+SHOW_TIMEOUT = 600
+
+# Sections du plan ignorées par le résumé
+SKIPPED_SECTIONS = ("prior_state", "planned_values", "configuration", "resource_drift", "relevant_attributes")
+
+# Ordre d'affichage des actions
+ACTIONS = ("create", "update", "replace", "delete", "read", "noop")
+DESTRUCTIVE_ACTIONS = ("delete", "replace")
+
+# Changements destructifs conservés dans le résumé (tous restent consultables dans l'export)
+MAX_DESTRUCTIVE = 200
+
+ROOT_MODULE = "(racine)"
+
+def change_action(actions) -> str:
+    """
+    Convertit la liste 'actions' d'un changement en action unique
+
+    Args:
+        actions: Liste Terraform, par exemple ["delete", "create"]
+
+    Returns:
+        create, update, replace, delete, read ou noop
+    """
+    actions = list(actions or [])
+    if sorted(actions) == ["create", "delete"]:
+        return "replace"
+    if actions == ["no-op"] or not actions:
+        return "noop"
+    return actions[0]
+
+def describe_change(change) -> Dict:
+    """
+    Résume un élément de 'resource_changes'
+
+    Returns:
+        Dictionnaire {"address", "type", "module", "action", "reason", "paths"}
+    """
+    details = change.get("change") or {}
+    paths = [".".join(str(part) for part in path) for path in details.get("replace_paths") or []]
+    return {
+        "address": change.get("address", ""),
+        "type": change.get("type", ""),
+        "module": change.get("module_address") or ROOT_MODULE,
+        "action": change_action(details.get("actions")),
+        "reason": change.get("action_reason") or "",
+        "paths": paths,
+    }
+
+def export_plan(terraform_path, deployment_dir, plan_file) -> Optional[str]:
+    """
+    Exporte un plan sauvegardé au format JSON dans le déploiement
+
+    Args:
+        terraform_path: Exécutable Terraform
+        deployment_dir: Répertoire du déploiement
+        plan_file: Nom du fichier de plan
+
+    Returns:
+        Chemin de l'export, ou None si 'terraform show' a échoué
+    """
+    path = os.path.join(deployment_dir, PLAN_JSON_FILE)
+    fd, tmp_path = tempfile.mkstemp(dir=deployment_dir, prefix=".tfplan.", suffix=".tmp")
+    try:
+        # Le plan peut contenir des valeurs sensibles : export lisible par le seul propriétaire
+        with os.fdopen(fd, "w") as f:
+            result = subprocess.run([terraform_path, "show", "-json", "-no-color", plan_file], cwd=deployment_dir,
+                                    stdout=f, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                                    timeout=SHOW_TIMEOUT)
+        if result.returncode == 0:
+            os.replace(tmp_path, path)
+            return path
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+    # Ne pas laisser l'export d'un plan précédent
+    for stale in (tmp_path, path):
+        if os.path.exists(stale):
+            os.unlink(stale)
+    return None
+
+def iter_changes(path, action=None, resource_type=None, module=None) -> Iterator[Dict]:
+    """
+    Parcourt les changements d'un plan exporté
+
+    Args:
+        path: Chemin de l'export JSON
+        action: Ne retenir que cette action (create, update, replace, delete...)
+        resource_type: Ne retenir que ce type de ressource
+        module: Ne retenir que ce module (ROOT_MODULE pour la racine)
+
+    Returns:
+        Itérateur de changements (voir describe_change)
+    """
+    for key, value in iter_document(path, arrays=("resource_changes",), skip=SKIPPED_SECTIONS):
+        if key != "resource_changes":
+            continue
+        change = describe_change(value)
+        if action and change["action"] != action:
+            continue
+        if resource_type and change["type"] != resource_type:
+            continue
+        if module and change["module"] != module:
+            continue
+        yield change
+
+def _count(counts, key, action):
+    bucket = counts.setdefault(key, {})
+    bucket[action] = bucket.get(action, 0) + 1
+
+def summarize(path) -> Dict:
+    """
+    Résume un plan exporté (lecture en streaming)
+
+    Args:
+        path: Chemin de l'export JSON
+
+    Returns:
+        Dictionnaire {"terraform_version", "total", "actions", "types", "modules",
+        "destructive", "destructive_count", "outputs", "errored"}
+    """
+    summary = {
+        "terraform_version": None,
+        "total": 0,
+        "actions": {},
+        "types": {},
+        "modules": {},
+        "destructive": [],
+        "destructive_count": 0,
+        "outputs": 0,
+        "errored": False,
+    }
+
+    for key, value in iter_document(path, arrays=("resource_changes",), skip=SKIPPED_SECTIONS):
+        if key == "resource_changes":
+            change = describe_change(value)
+            action = change["action"]
+            summary["total"] += 1
+            summary["actions"][action] = summary["actions"].get(action, 0) + 1
+            if action == "noop":
+                continue
+            _count(summary["types"], change["type"], action)
+            _count(summary["modules"], change["module"], action)
+            if action in DESTRUCTIVE_ACTIONS:
+                summary["destructive_count"] += 1
+                if len(summary["destructive"]) < MAX_DESTRUCTIVE:
+                    summary["destructive"].append(change)
+        elif key == "output_changes":
+            summary["outputs"] = sum(1 for output in (value or {}).values()
+                                     if change_action(output.get("actions")) != "noop")
+        elif key in ("terraform_version", "errored"):
+            summary[key] = value
+
+    return summary
+
+def _export_key(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_summary(deployment_dir) -> Optional[Dict]:
+    """
+    Retourne le résumé du plan exporté d'un déploiement (mis en cache)
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+
+    Returns:
+        Résumé (voir summarize), ou None si aucun plan n'a été exporté
+    """
+    path = os.path.join(deployment_dir, PLAN_JSON_FILE)
+    summary_path = os.path.join(deployment_dir, PLAN_SUMMARY_FILE)
+    try:
+        key = _export_key(path)
+    except OSError:
+        return None
+
+    try:
+        with open(summary_path, "r") as f:
+            cached = json.load(f)
+        if cached.get("version") == SUMMARY_VERSION and cached.get("key") == key:
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    try:
+        summary = summarize(path)
+    except (OSError, UnicodeDecodeError, StateError):
+        return None
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=deployment_dir, prefix=".plan.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(summary, version=SUMMARY_VERSION, key=key), f)
+        os.replace(tmp_path, summary_path)
+    except OSError:
+        pass
+    return summary
+
+def analyze(terraform_path, deployment_dir, plan_file) -> Optional[Dict]:
+    """
+    Exporte et résume le plan sauvegardé d'un déploiement
+
+    Args:
+        terraform_path: Exécutable Terraform
+        deployment_dir: Répertoire du déploiement
+        plan_file: Nom du fichier de plan
+
+    Returns:
+        Résumé (voir summarize), ou None si l'export a échoué
+    """
+    if export_plan(terraform_path, deployment_dir, plan_file) is None:
+        return None
+    return load_summary(deployment_dir)
+
+def _action_cells(counts):
+    cells = []
+    for action in ACTIONS[:4]:
+        count = counts.get(action, 0)
+        style = ACTION_LABELS[action][1]
+        cells.append(Text(str(count), style=style) if count else Text("-", style="dim"))
+    return cells
+
+def _ranked(counts, limit):
+    def changes(item):
+        return sum(count for action, count in item[1].items() if action != "read")
+    return sorted(counts.items(), key=lambda item: (-changes(item), item[0]))[:limit]
+
+def changes_table(changes, title=None, title_style=None) -> Table:
+    """
+    Tableau des changements (ressource, action, raison du remplacement)
+    """
+    table = Table(title=title, title_style=title_style, show_header=True, header_style="bold")
+    table.add_column("Ressource", style="cyan")
+    table.add_column("Action")
+    table.add_column("Raison", style="dim")
+    for change in changes:
+        label, style = ACTION_LABELS.get(change["action"], (change["action"], "white"))
+        reason = change["reason"].replace("_", " ")
+        if change["paths"]:
+            reason = f"{reason} ({', '.join(change['paths'][:3])})".strip()
+        table.add_row(change["address"], Text(label, style=style), reason)
+    return table
+
+def _counts_table(title, column, counts, limit):
+    table = Table(title=title, show_header=True, header_style="bold")
+    table.add_column(column, style="cyan")
+    for action in ACTIONS[:4]:
+        table.add_column(ACTION_LABELS[action][0], justify="right")
+    for key, bucket in _ranked(counts, limit):
+        table.add_row(key, *_action_cells(bucket))
+    return table
+
+def print_summary(summary, deployment_dir, limit=15):
+    """
+    Affiche le résumé d'un plan
+
+    Un petit plan est affiché ressource par ressource ; au-delà de `limit`
+    changements, seuls les totaux, les changements destructifs et les
+    comptes par type de ressource et par module sont affichés.
+
+    Args:
+        summary: Résumé (voir summarize)
+        deployment_dir: Répertoire du déploiement (export du plan)
+        limit: Nombre maximal de lignes par tableau
+    """
+    actions = summary["actions"]
+    changed = summary["total"] - actions.get("noop", 0) - actions.get("read", 0)
+
+    if 0 < changed <= limit:
+        changes = [change for change in iter_changes(os.path.join(deployment_dir, PLAN_JSON_FILE))
+                   if change["action"] not in ("noop", "read")]
+        console.print(changes_table(changes))
+    elif changed:
+        if summary["destructive_count"]:
+            console.print(changes_table(summary["destructive"][:limit],
+                                         f"⚠️  {summary['destructive_count']} changement(s) destructif(s)",
+                                         "bold red"))
+        console.print(_counts_table("Changements par type de ressource", "Type", summary["types"], limit))
+        if len(summary["types"]) > limit:
+            console.print(f"[dim]... et {len(summary['types']) - limit} autre(s) type(s)[/dim]")
+        if len(summary["modules"]) > 1:
+            console.print(_counts_table("Changements par module", "Module", summary["modules"], limit))
+            if len(summary["modules"]) > limit:
+                console.print(f"[dim]... et {len(summary['modules']) - limit} autre(s) module(s)[/dim]")
+        console.print(f"[dim]Détail des changements: cloudya deploy show-plan {os.path.basename(deployment_dir)[:8]}[/dim]")
+
+    console.print(
+        f"[green]{actions.get('create', 0)} à créer[/green], "
+        f"[yellow]{actions.get('update', 0)} à modifier[/yellow], "
+        f"[magenta]{actions.get('replace', 0)} à remplacer[/magenta], "
+        f"[red]{actions.get('delete', 0)} à supprimer[/red]"
+        f" [dim]({actions.get('noop', 0)} inchangée(s), {summary['outputs']} output(s) modifié(s))[/dim]"
+    )
+    if summary["destructive_count"]:
+        console.print(f"[bold red]⚠️  {summary['destructive_count']} ressource(s) supprimée(s) ou remplacée(s)[/bold red]")
@@ -6,7 +6,7 @@ import subprocess
 from pathlib import Path
 from rich.console import Console
 from rich.prompt import Prompt
-from ..credentials import load_credentials_config, save_credentials_config, is_command_available
+from ..credentials import load_credentials_config, save_credentials_config, is_command_available, run_check
 
 console = Console()
 
@@ -104,3 +104,18 @@ def connect(profile=None, region=None):
         
     except subprocess.CalledProcessError as e:
         console.print(f"[red]Erreur lors de la connexion à AWS: {e}[/red]")
+
+def check():
+    """
+    Vérifie les credentials AWS sans interaction (aws sts get-caller-identity)
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    settings = load_credentials_config().get("aws", {})
+    command = ["aws", "sts", "get-caller-identity", "--output", "text", "--query", "Arn"]
+    if settings.get("default_profile"):
+        command.extend(["--profile", settings["default_profile"]])
+    if settings.get("default_region"):
+        command.extend(["--region", settings["default_region"]])
+    return run_check(command)
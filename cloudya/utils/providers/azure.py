@@ -6,7 +6,7 @@ import subprocess
 import json
 from rich.console import Console
 from rich.prompt import Prompt
-from ..credentials import load_credentials_config, save_credentials_config, is_command_available
+from ..credentials import load_credentials_config, save_credentials_config, is_command_available, run_check
 
 console = Console()
 
@@ -84,3 +84,16 @@ def connect(subscription=None):
     # Exécuter az account show pour montrer que ça fonctionne
     console.print("\n[bold]Informations sur le compte Azure:[/bold]")
     subprocess.run(["az", "account", "show", "--output", "yaml"])
+
+def check():
+    """
+    Vérifie les credentials Azure sans interaction (az account show)
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    command = ["az", "account", "show", "--query", "name", "--output", "tsv"]
+    subscription = load_credentials_config().get("azure", {}).get("default_subscription")
+    if subscription:
+        command.extend(["--subscription", subscription])
+    return run_check(command)
@@ -6,7 +6,7 @@ import subprocess
 import json
 from rich.console import Console
 from rich.prompt import Prompt
-from ..credentials import load_credentials_config, save_credentials_config, is_command_available
+from ..credentials import load_credentials_config, save_credentials_config, is_command_available, run_check
 
 console = Console()
 
@@ -94,3 +94,15 @@ def connect(project=None, config_file=None):
         
     except subprocess.CalledProcessError as e:
         console.print(f"[red]Erreur lors de la connexion à GCP: {e}[/red]")
+
+def check():
+    """
+    Vérifie les credentials GCP sans interaction (compte gcloud actif)
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    success, message = run_check(["gcloud", "auth", "list", "--filter=status:ACTIVE", "--format=value(account)"])
+    if success and not message:
+        return False, "aucun compte gcloud actif"
+    return success, message
@@ -9,7 +9,7 @@ import requests
 import urllib3
 from rich.console import Console
 from rich.prompt import Prompt
-from ..credentials import load_credentials_config, save_credentials_config
+from ..credentials import load_credentials_config, save_credentials_config, http_check
 
 console = Console()
 
@@ -120,3 +120,27 @@ def connect(host=None, username=None, password=None, port=9440):
             
     except Exception as e:
         console.print(f"[red]Erreur lors de la connexion à Nutanix Prism Central: {e}[/red]")
+
+def check():
+    """
+    Vérifie l'accès à Nutanix Prism Central sans interaction
+    
+    L'authentification est vérifiée si NUTANIX_PASSWORD est défini (variable
+    lue aussi par le provider Terraform) ; sinon la vérification échoue pour
+    que la connexion interactive ait lieu.
+    Le certificat est vérifié sauf si 'verify_ssl' vaut false (ou désigne un
+    bundle CA) dans la section nutanix des credentials.
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    settings = load_credentials_config().get("nutanix", {})
+    if not settings.get("host"):
+        return False, "hôte Nutanix non configuré"
+    
+    url = f"https://{settings['host']}:{settings.get('port', 9440)}/api/nutanix/v3/users/me"
+    verify = settings.get("verify_ssl", True)
+    password = os.environ.get("NUTANIX_PASSWORD")
+    if password and settings.get("username"):
+        return http_check(url, verify=verify, auth=(settings["username"], password))
+    return False, "NUTANIX_PASSWORD non défini"
@@ -7,7 +7,7 @@ import yaml
 from pathlib import Path
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
-from ..credentials import load_credentials_config, save_credentials_config, is_command_available
+from ..credentials import load_credentials_config, save_credentials_config, is_command_available, run_check
 
 console = Console()
 
@@ -178,3 +178,21 @@ def connect(auth_url=None, username=None, password=None, project_name=None, clou
         
     except subprocess.CalledProcessError as e:
         console.print(f"[red]Erreur lors de la connexion à OpenStack: {e}[/red]")
+
+def check():
+    """
+    Vérifie les credentials OpenStack sans interaction (openstack token issue)
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    cloud_name = load_credentials_config().get("openstack", {}).get("default_cloud")
+    env = os.environ.copy()
+    if cloud_name:
+        env["OS_CLOUD"] = cloud_name
+    elif "OS_CLOUD" not in env and "OS_AUTH_URL" not in env:
+        return False, "aucun profil OpenStack configuré"
+    success, message = run_check(["openstack", "token", "issue", "-f", "value", "-c", "expires"], env=env)
+    if success:
+        message = cloud_name or env.get("OS_CLOUD") or env.get("OS_AUTH_URL")
+    return success, message
@@ -6,7 +6,7 @@ import sys
 import subprocess
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
-from ..credentials import load_credentials_config, save_credentials_config, install_python_module
+from ..credentials import load_credentials_config, save_credentials_config, install_python_module, http_check
 
 console = Console()
 
@@ -122,3 +122,27 @@ def connect(host=None, port=8006, username=None, token_name=None, token_value=No
         console.print("[red]Erreur: le module proxmoxer n'est pas disponible.[/red]")
     except Exception as e:
         console.print(f"[red]Erreur lors de la connexion à Proxmox VE: {e}[/red]")
+
+def check():
+    """
+    Vérifie l'accès à l'API Proxmox VE sans interaction
+    
+    Sans token API enregistré (mot de passe demandé à la connexion), les
+    credentials ne peuvent pas être vérifiés : la vérification échoue pour
+    que la connexion interactive ait lieu. Le certificat est vérifié sauf si
+    'verify_ssl' vaut false (ou désigne un bundle CA) dans la section proxmox
+    des credentials.
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    settings = load_credentials_config().get("proxmox", {})
+    if not settings.get("host"):
+        return False, "hôte Proxmox non configuré"
+    
+    url = f"https://{settings['host']}:{settings.get('port', 8006)}/api2/json/version"
+    verify = settings.get("verify_ssl", True)
+    if settings.get("token_name") and settings.get("token_value"):
+        token = f"{settings.get('username')}!{settings['token_name']}={settings['token_value']}"
+        return http_check(url, verify=verify, headers={"Authorization": f"PVEAPIToken={token}"})
+    return False, "aucun token API Proxmox enregistré"
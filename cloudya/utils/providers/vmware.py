@@ -6,7 +6,7 @@ import sys
 import subprocess
 from rich.console import Console
 from rich.prompt import Prompt
-from ..credentials import load_credentials_config, save_credentials_config, install_python_module
+from ..credentials import load_credentials_config, save_credentials_config, install_python_module, http_check
 
 console = Console()
 
@@ -111,3 +111,20 @@ def connect(host=None, username=None, password=None, port=443):
         console.print("[red]Erreur: le module pyVmomi n'est pas disponible.[/red]")
     except Exception as e:
         console.print(f"[red]Erreur lors de la connexion à VMware vSphere: {e}[/red]")
+
+def check():
+    """
+    Vérifie que vCenter/ESXi répond, sans interaction
+    
+    Le mot de passe n'est pas enregistré : seule l'API est interrogée. Le
+    certificat est vérifié sauf si 'verify_ssl' vaut false (ou désigne un
+    bundle CA) dans la section vmware des credentials.
+    
+    Returns:
+        Tuple (succès, message)
+    """
+    settings = load_credentials_config().get("vmware", {})
+    if not settings.get("host"):
+        return False, "hôte VMware non configuré"
+    return http_check(f"https://{settings['host']}:{settings.get('port', 443)}/sdk/vimServiceVersions.xml",
+                      verify=settings.get("verify_ssl", True))
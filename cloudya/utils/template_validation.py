@@ -0,0 +1,389 @@
+"""
+Validation du catalogue de templates Terraform
+
+Chaque template (répertoire contenant un manifest.yaml sous
+<templates>/terraform) est vérifié :
+
+- manifest : schéma (name, provider, description, parameters) et
+  cohérence des paramètres avec les variables déclarées dans les .tf ;
+- 'terraform fmt -check' : fichiers non formatés (avertissement) ;
+- 'terraform validate' : configuration invalide.
+
+Terraform travaille sur une copie du template dans un répertoire
+temporaire : le catalogue n'est jamais modifié. Le .terraform est repris du
+cache d'initialisation partagé quand un déploiement de même configuration
+l'a déjà rempli ; sinon 'terraform init -backend=false' utilise le cache
+partagé des providers (TF_PLUGIN_CACHE_DIR), sous le verrou du cache
+(terraform_cache.init_lock), et le résultat est enregistré dans le cache
+d'initialisation si le template ne déclare pas de backend.
+
+Les templates sont validés dans un pool de processus. Les résultats sont
+conservés dans ~/.cloudya/template-validation.json avec l'empreinte des
+fichiers du template et la version de Terraform : une nouvelle validation
+ne relance Terraform que pour les templates modifiés.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+import yaml
+
+from .config import get_snapshot
+from . import terraform_cache
+from .terraform import get_cloudya_dir, get_templates_dir, get_terraform_path
+from .terraform_events import get_terraform_version
+
+VALIDATION_FILE = "template-validation.json"
+# À incrémenter quand les vérifications changent (invalide le cache)
+VALIDATION_VERSION = 1
+
+MANIFEST_FILE = "manifest.yaml"
+PROVIDERS = ("aws", "gcp", "azure", "openstack", "proxmox", "vmware", "nutanix")
+
+# Durée maximale de chaque commande Terraform (secondes)
+COMMAND_TIMEOUT = 300
+
+# Ordre du rapport
+STATUS_ORDER = {"invalid": 0, "error": 1, "valid": 2}
+
+VARIABLE_PATTERN = re.compile(r'^\s*variable\s+"([^"]+)"\s*\{', re.MULTILINE)
+DEFAULT_PATTERN = re.compile(r"^\s*default\s*=", re.MULTILINE)
+
+def get_validation_file():
+    """
+    Récupère le chemin du fichier des résultats de validation
+    """
+    return os.path.join(get_cloudya_dir(), VALIDATION_FILE)
+
+def load_results() -> Dict[str, Dict]:
+    """
+    Charge les derniers résultats de validation
+
+    Returns:
+        Dictionnaire {template: {"hash", "result"}}
+    """
+    try:
+        with open(get_validation_file(), "r") as f:
+            return json.load(f).get("templates", {})
+    except (OSError, ValueError):
+        return {}
+
+def save_results(results):
+    """
+    Enregistre les résultats de validation (écriture atomique)
+    """
+    path = get_validation_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{VALIDATION_FILE}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"templates": results}, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def find_templates(names=None) -> List[Tuple[str, str]]:
+    """
+    Liste les templates du catalogue
+
+    Args:
+        names: Templates à retenir (provider/template), tous si None
+
+    Returns:
+        Liste de (nom, répertoire) triée par nom
+    """
+    terraform_dir = os.path.join(get_templates_dir(), "terraform")
+    templates = []
+    for root, dirnames, filenames in os.walk(terraform_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        if MANIFEST_FILE in filenames:
+            name = os.path.relpath(root, terraform_dir).replace(os.sep, "/")
+            if names is None or name in names:
+                templates.append((name, root))
+    return sorted(templates)
+
+def template_hash(template_dir, terraform_version=None):
+    """
+    Empreinte des fichiers d'un template et de la version de Terraform
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{VALIDATION_VERSION}\0{terraform_version!r}".encode("utf-8"))
+    for root, dirnames, filenames in os.walk(template_dir):
+        dirnames[:] = sorted(d for d in dirnames if d != terraform_cache.TERRAFORM_DIR)
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            digest.update(b"\0" + os.path.relpath(path, template_dir).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def _declared_variables(template_dir) -> Dict[str, bool]:
+    """Variables déclarées dans les .tf du template : {nom: valeur par défaut présente}"""
+    variables = {}
+    for filename in sorted(os.listdir(template_dir)):
+        if not filename.endswith(".tf"):
+            continue
+        with open(os.path.join(template_dir, filename), "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+        for match in VARIABLE_PATTERN.finditer(content):
+            # Corps du bloc : jusqu'à l'accolade fermante correspondante
+            depth, end = 1, match.end()
+            while end < len(content) and depth:
+                depth += {"{": 1, "}": -1}.get(content[end], 0)
+                end += 1
+            variables[match.group(1)] = bool(DEFAULT_PATTERN.search(content[match.end():end]))
+    return variables
+
+def check_manifest(name, template_dir) -> Tuple[List[str], List[str]]:
+    """
+    Vérifie le manifest d'un template
+
+    Args:
+        name: Nom du template (provider/template)
+        template_dir: Répertoire du template
+
+    Returns:
+        Tuple (erreurs, avertissements)
+    """
+    errors, warnings = [], []
+    try:
+        with open(os.path.join(template_dir, MANIFEST_FILE), "r") as f:
+            manifest = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        return [f"{MANIFEST_FILE} illisible: {e}"], []
+
+    if not isinstance(manifest, dict):
+        return [f"{MANIFEST_FILE} doit être un dictionnaire"], []
+
+    for key in ("name", "provider", "description"):
+        if key in manifest and not isinstance(manifest[key], str):
+            errors.append(f"'{key}' doit être une chaîne")
+
+    provider = manifest.get("provider")
+    if provider is None:
+        warnings.append("'provider' absent")
+    elif provider not in PROVIDERS:
+        errors.append(f"provider non supporté: {provider}")
+    elif provider != name.split("/")[0]:
+        warnings.append(f"provider '{provider}' différent du répertoire '{name.split('/')[0]}'")
+
+    parameters = manifest.get("parameters", [])
+    if not isinstance(parameters, list):
+        errors.append("'parameters' doit être une liste")
+        parameters = []
+
+    names = set()
+    for index, parameter in enumerate(parameters):
+        if not isinstance(parameter, dict) or not isinstance(parameter.get("name"), str):
+            errors.append(f"paramètre {index + 1}: 'name' manquant")
+            continue
+        if parameter["name"] in names:
+            errors.append(f"paramètre '{parameter['name']}' défini plusieurs fois")
+        names.add(parameter["name"])
+        if "required" in parameter and not isinstance(parameter["required"], bool):
+            errors.append(f"paramètre '{parameter['name']}': 'required' doit être un booléen")
+        if isinstance(parameter.get("default"), (dict, list)):
+            errors.append(f"paramètre '{parameter['name']}': 'default' doit être une valeur simple")
+
+    variables = _declared_variables(template_dir)
+    if not variables and not any(f.endswith(terraform_cache.CONFIG_EXTENSIONS) for f in os.listdir(template_dir)):
+        errors.append("aucun fichier .tf")
+    for parameter_name in sorted(names - set(variables)):
+        warnings.append(f"paramètre '{parameter_name}' non déclaré comme variable")
+    for variable, has_default in sorted(variables.items()):
+        if not has_default and variable not in names:
+            warnings.append(f"variable '{variable}' sans valeur par défaut absente du manifest")
+
+    return errors, warnings
+
+def _run(command, cwd, env):
+    return subprocess.run(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, capture_output=True,
+                          text=True, timeout=COMMAND_TIMEOUT)
+
+def _format_diagnostic(diagnostic):
+    message = diagnostic.get("summary", "")
+    if diagnostic.get("detail"):
+        message += f": {diagnostic['detail'].splitlines()[0]}"
+    location = diagnostic.get("range") or {}
+    if location.get("filename"):
+        message = f"{location['filename']}:{(location.get('start') or {}).get('line', '?')}: {message}"
+    return message
+
+def run_terraform_checks(job) -> Dict:
+    """
+    Exécute fmt -check et validate sur une copie d'un template (processus du pool)
+
+    Args:
+        job: Dictionnaire {"template_dir", "terraform_path", "terraform_version", "init_args", "env"}
+
+    Returns:
+        Dictionnaire {"errors", "warnings", "error", "duration"} ('error' : échec de
+        Terraform lui-même)
+    """
+    started = time.monotonic()
+    outcome = {"errors": [], "warnings": [], "error": None, "duration": 0.0}
+    env = dict(os.environ, **job["env"])
+    work_dir = tempfile.mkdtemp(dir=job["work_root"], prefix="validate.")
+    try:
+        workspace = os.path.join(work_dir, "template")
+        shutil.copytree(job["template_dir"], workspace,
+                        ignore=shutil.ignore_patterns(terraform_cache.TERRAFORM_DIR))
+
+        result = _run([job["terraform_path"], "fmt", "-check", "-recursive", "-list=true", "-no-color"],
+                      workspace, env)
+        for filename in result.stdout.split():
+            outcome["warnings"].append(f"{filename}: non formaté (terraform fmt)")
+
+        key = terraform_cache.cache_key(workspace, job["terraform_version"])
+        if not terraform_cache.restore(workspace, key):
+            # Un seul `terraform init` à la fois écrit dans le cache des providers
+            with terraform_cache.init_lock():
+                if not terraform_cache.restore(workspace, key):
+                    result = _run([job["terraform_path"]] + job["init_args"] + ["-backend=false", "-no-color"],
+                                  workspace, env)
+                    if result.returncode != 0:
+                        lines = (result.stderr or result.stdout).strip().splitlines()
+                        outcome["error"] = "terraform init: " + (next(
+                            (line for line in lines if line.startswith("Error")), lines[-1] if lines else "échec"))
+                        return outcome
+                    # Sans backend, ce .terraform est celui qu'obtiendrait un déploiement
+                    if not terraform_cache.declares_backend(workspace):
+                        terraform_cache.save(workspace, key)
+
+        result = _run([job["terraform_path"], "validate", "-json", "-no-color"], workspace, env)
+        try:
+            report = json.loads(result.stdout)
+        except ValueError:
+            lines = (result.stderr or result.stdout).strip().splitlines()
+            outcome["error"] = "terraform validate: " + (lines[-1] if lines else "sortie invalide")
+            return outcome
+        for diagnostic in report.get("diagnostics") or []:
+            target = "errors" if diagnostic.get("severity") == "error" else "warnings"
+            outcome[target].append(_format_diagnostic(diagnostic))
+        if not report.get("valid", True) and not outcome["errors"]:
+            outcome["errors"].append("configuration invalide")
+    except subprocess.TimeoutExpired as e:
+        outcome["error"] = f"{' '.join(e.cmd[1:2])}: délai de {COMMAND_TIMEOUT}s dépassé"
+    except OSError as e:
+        outcome["error"] = str(e)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        outcome["duration"] = time.monotonic() - started
+    return outcome
+
+def _result(name, errors, warnings, error=None, duration=0.0):
+    if error:
+        status = "error"
+    elif errors:
+        status = "invalid"
+    else:
+        status = "valid"
+    return {
+        "template": name,
+        "status": status,
+        "errors": errors + ([error] if error else []),
+        "warnings": warnings,
+        "duration": round(duration, 2),
+        "cached": False,
+    }
+
+def get_workers():
+    """
+    Nombre de processus de validation (configuration 'template_validate_workers')
+    """
+    return int(get_snapshot().config.get("template_validate_workers", os.cpu_count() or 4))
+
+def validate_templates(names=None, workers=None, force=False, offline=None, progress=None) -> List[Dict]:
+    """
+    Valide les templates du catalogue
+
+    Args:
+        names: Templates à valider (provider/template), tous si None
+        workers: Nombre de processus
+        force: Ignorer les résultats en cache
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        progress: Callback appelé avec chaque résultat, dès qu'il est connu
+
+    Returns:
+        Liste de résultats {"template", "status", "errors", "warnings", "duration", "cached"},
+        triée pour le rapport
+    """
+    terraform_path = get_terraform_path()
+    terraform_version = get_terraform_version(terraform_path)
+    if offline is None:
+        offline = terraform_cache.is_offline()
+
+    stored = load_results()
+    cache = {} if force else stored
+    results = []
+    jobs = {}
+
+    for name, template_dir in find_templates(names):
+        try:
+            digest = template_hash(template_dir, terraform_version)
+        except OSError as e:
+            results.append(_result(name, [], [], error=str(e)))
+            continue
+
+        entry = cache.get(name)
+        if entry and entry.get("hash") == digest:
+            results.append(dict(entry["result"], cached=True))
+            continue
+
+        errors, warnings = check_manifest(name, template_dir)
+        if terraform_version is None:
+            result = _result(name, errors, warnings + ["Terraform introuvable: terraform validate ignoré"])
+            results.append(result)
+            if progress:
+                progress(result)
+            continue
+        jobs[name] = (template_dir, digest, errors, warnings)
+
+    if jobs:
+        work_root = os.path.join(terraform_cache.get_cache_dir(), "validate")
+        os.makedirs(work_root, exist_ok=True)
+        common = {
+            "terraform_path": terraform_path,
+            "terraform_version": terraform_version,
+            "init_args": terraform_cache.init_args(offline),
+            "env": terraform_cache.terraform_env(),
+            "work_root": work_root,
+        }
+
+        with ProcessPoolExecutor(max_workers=max(1, min(workers or get_workers(), len(jobs)))) as executor:
+            futures = {
+                executor.submit(run_terraform_checks, dict(common, template_dir=template_dir)): name
+                for name, (template_dir, _digest, _errors, _warnings) in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                _template_dir, digest, errors, warnings = jobs[name]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = {"errors": [], "warnings": [], "error": str(e), "duration": 0.0}
+                result = _result(name, errors + outcome["errors"], warnings + outcome["warnings"],
+                                 outcome["error"], outcome["duration"])
+                results.append(result)
+                # Les échecs de Terraform (réseau, délai) ne sont pas mis en cache
+                if result["status"] != "error":
+                    stored[name] = {"hash": digest, "result": result}
+                    save_results(stored)
+                if progress:
+                    progress(result)
+
+    return sort_report(results)
+
+def sort_report(results):
+    """
+    Trie les résultats : templates invalides, puis erreurs, puis templates valides
+    """
+    return sorted(results, key=lambda result: (STATUS_ORDER.get(result["status"], len(STATUS_ORDER)),
+                                                result["template"]))
@@ -6,25 +6,31 @@ import subprocess
 import json
 import yaml
 from pathlib import Path
-import shutil
 import datetime
 import uuid
+import hashlib
+import time
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
 
+from . import config
+from .config import get_snapshot, ensure_dir
+from . import terraform_cache, terraform_graph, terraform_parallelism, deployment_registry, deployment_journal, tfstate
+from . import plan_summary
+from .artifacts import MUTABLE_FILES, ingest_directory, populate_directory
+from .terraform_events import run_streaming, print_failure, print_changes, get_terraform_version
+
 console = Console()
 
+PLAN_FILE = "tfplan"
+# Fichiers lus par Terraform pour construire un plan
+PLAN_INPUT_SUFFIXES = (".tf", ".tf.json", ".tfvars", ".tfvars.json")
+
 def get_terraform_path():
     """
     Récupère le chemin vers l'exécutable Terraform
     """
-    # Charger la configuration
-    config = load_config()
-    
-    # Récupérer le chemin configuré ou utiliser 'terraform' par défaut
-    terraform_path = config.get("terraform_path", "terraform")
-    
-    return terraform_path
+    return get_snapshot().terraform_path
 
 def get_cloudya_dir():
     """
@@ -36,64 +42,21 @@ def get_templates_dir():
     """
     Récupère le répertoire des templates
     """
-    config = load_config()
-    
-    templates_dir = config.get("templates_dir", os.path.expanduser("~/.cloudya/templates"))
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(templates_dir, exist_ok=True)
-    
-    return templates_dir
+    # Créer le répertoire s'il n'existe pas (une fois par processus)
+    return ensure_dir(get_snapshot().templates_dir)
 
 def get_deployments_dir():
     """
     Récupère le répertoire des déploiements
     """
-    config = load_config()
-    
-    deployments_dir = config.get("deployments_dir", os.path.expanduser("~/.cloudya/deployments"))
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(deployments_dir, exist_ok=True)
-    
-    return deployments_dir
+    # Créer le répertoire s'il n'existe pas (une fois par processus)
+    return ensure_dir(get_snapshot().deployments_dir)
 
 def load_config():
     """
     Charge la configuration générale
     """
-    config_dir = get_cloudya_dir()
-    config_file = os.path.join(config_dir, "config.json")
-    
-    # Créer le répertoire s'il n'existe pas
-    os.makedirs(config_dir, exist_ok=True)
-    
-    # Créer le fichier de configuration s'il n'existe pas
-    if not os.path.exists(config_file):
-        default_config = {
-            "terraform_path": "terraform",
-            "templates_dir": os.path.expanduser("~/.cloudya/templates"),
-            "deployments_dir": os.path.expanduser("~/.cloudya/deployments"),
-            "log_level": "INFO"
-        }
-        
-        with open(config_file, "w") as f:
-            json.dump(default_config, f, indent=2)
-        
-        return default_config
-    
-    # Charger la configuration
-    try:
-        with open(config_file, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        console.print(f"[red]Erreur lors du chargement de la configuration: {e}[/red]")
-        return {
-            "terraform_path": "terraform",
-            "templates_dir": os.path.expanduser("~/.cloudya/templates"),
-            "deployments_dir": os.path.expanduser("~/.cloudya/deployments"),
-            "log_level": "INFO"
-        }
+    return config.load_config()
 
 def get_available_templates():
     """
@@ -163,13 +126,89 @@ def get_template_info(template_path):
         console.print(f"[yellow]Erreur lors de la lecture du manifest {manifest_path}: {str(e)}[/yellow]")
         return None
 
-def prepare_deployment(template_path, params):
+def render_tfvars(params):
+    """
+    Génère le contenu du fichier terraform.tfvars
+    
+    Args:
+        params: Dictionnaire des paramètres
+        
+    Returns:
+        Contenu du fichier
+    """
+    tfvars_content = ""
+    for key, value in params.items():
+        if isinstance(value, str):
+            tfvars_content += f'{key} = "{value}"\n'
+        else:
+            tfvars_content += f'{key} = {value}\n'
+    return tfvars_content
+
+def compute_fingerprint(template_path, params):
+    """
+    Calcule l'empreinte des entrées d'un déploiement
+    
+    L'empreinte couvre les fichiers du template (empreintes du magasin
+    d'artefacts), le terraform.tfvars généré, la version de Terraform et le
+    fichier de verrouillage des providers : celui du template s'il en fournit
+    un, sinon celui qu'un nouveau déploiement recevrait du cache
+    d'initialisation (versions résolues par le dernier `terraform init` de
+    cette configuration). Deux déploiements de même empreinte produisent le
+    même plan sur une infrastructure inchangée.
+    
+    Args:
+        template_path: Chemin relatif du template (ex: aws/vpc)
+        params: Dictionnaire des paramètres
+        
+    Returns:
+        Empreinte SHA-256, ou None si le template n'existe pas localement
+    """
+    template_dir = os.path.join(get_templates_dir(), "terraform", template_path)
+    if not os.path.isdir(template_dir):
+        return None
+    
+    # Manifeste du magasin (mis en cache) : seuls les fichiers modifiés sont rehachés
+    manifest = ingest_directory(template_dir, {"manifest.yaml"} | MUTABLE_FILES)
+    files = {path: entry["sha256"] for path, entry in manifest["files"].items()}
+    terraform_version = get_terraform_version(get_terraform_path())
+    
+    lock = files.get(terraform_cache.LOCK_FILE)
+    if lock is None:
+        # Pas de verrouillage fourni : versions résolues lors de l'init de cette configuration
+        lock_file = terraform_cache.cached_lock_file(terraform_cache.cache_key(template_dir, terraform_version))
+        if lock_file:
+            with open(lock_file, "rb") as f:
+                lock = hashlib.sha256(f.read()).hexdigest()
+    
+    inputs = {
+        "template": template_path,
+        "files": files,
+        "tfvars": hashlib.sha256(render_tfvars(params).encode("utf-8")).hexdigest(),
+        "terraform": terraform_version,
+        "lock": lock,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+def find_matching_deployment(fingerprint):
+    """
+    Recherche un déploiement actif ayant la même empreinte d'entrées
+    
+    Args:
+        fingerprint: Empreinte calculée par compute_fingerprint
+        
+    Returns:
+        Dictionnaire {"id", "dir", "status", "metadata"} ou None
+    """
+    return deployment_registry.find_by_fingerprint(deployment_registry.TERRAFORM, fingerprint)
+
+def prepare_deployment(template_path, params, fingerprint=None):
     """
     Prépare un déploiement Terraform à partir d'un template
     
     Args:
         template_path: Chemin relatif du template (ex: aws/vpc)
         params: Dictionnaire des paramètres
+        fingerprint: Empreinte des entrées (enregistrée dans les métadonnées)
         
     Returns:
         Chemin du répertoire de déploiement ou None en cas d'erreur
@@ -195,6 +234,7 @@ def prepare_deployment(template_path, params):
     
     # Créer le répertoire de déploiement
     deployments_dir = get_deployments_dir()
+    root_signature = deployment_registry.directory_signature(deployments_dir)
     deployment_dir = os.path.join(deployments_dir, deployment_id)
     os.makedirs(deployment_dir, exist_ok=True)
     
@@ -203,15 +243,8 @@ def prepare_deployment(template_path, params):
     template_dir = os.path.join(templates_dir, "terraform", template_path)
     
     if os.path.exists(template_dir):
-        for item in os.listdir(template_dir):
-            if item != "manifest.yaml":  # Exclure le manifest
-                source = os.path.join(template_dir, item)
-                destination = os.path.join(deployment_dir, item)
-                
-                if os.path.isdir(source):
-                    shutil.copytree(source, destination)
-                else:
-                    shutil.copy2(source, destination)
+        # Liens vers le magasin d'artefacts (tfvars et métadonnées sont écrits ci-dessous)
+        populate_directory(template_dir, deployment_dir, exclude={"manifest.yaml"})
     else:
         # Pour des besoins de test, créer un fichier Terraform minimal
         with open(os.path.join(deployment_dir, "main.tf"), "w") as f:
@@ -222,15 +255,8 @@ def prepare_deployment(template_path, params):
             f.write('variable "region" {\n  description = "AWS region"\n  default = "us-east-1"\n}\n')
     
     # Créer le fichier de variables Terraform
-    tfvars_content = ""
-    for key, value in params.items():
-        if isinstance(value, str):
-            tfvars_content += f'{key} = "{value}"\n'
-        else:
-            tfvars_content += f'{key} = {value}\n'
-    
     with open(os.path.join(deployment_dir, "terraform.tfvars"), 'w') as f:
-        f.write(tfvars_content)
+        f.write(render_tfvars(params))
     
     # Créer le fichier de métadonnées
     metadata = {
@@ -240,112 +266,470 @@ def prepare_deployment(template_path, params):
         "created_at": datetime.datetime.now().isoformat(),
         "status": "prepared"
     }
+    if fingerprint:
+        metadata["fingerprint"] = fingerprint
     
-    with open(os.path.join(deployment_dir, "metadata.json"), 'w') as f:
-        json.dump(metadata, f, indent=2)
+    # Premier événement du journal, inclus dans l'instantané
+    metadata["journal_offset"] = deployment_journal.append(deployment_dir, {"type": "status", "status": "prepared"})
+    deployment_registry.write_metadata(deployment_dir, metadata, deployment_registry.TERRAFORM, root_signature)
     
     return deployment_dir
 
-def run_terraform(deployment_dir, auto_approve=False):
+def check_terraform():
     """
-    Exécute Terraform pour un déploiement
+    Vérifie que Terraform est installé
+    
+    Returns:
+        True si Terraform est disponible, False sinon
+    """
+    if get_terraform_version(get_terraform_path()) is None:
+        console.print("[red]Terraform n'est pas installé ou n'est pas dans le PATH.[/red]")
+        console.print("Installez Terraform via: https://www.terraform.io/downloads.html")
+        return False
+    return True
+
+def initialize(deployment_dir, offline=None, live=True):
+    """
+    Initialise Terraform sans rien afficher en dehors de la progression
+    
+    Un .terraform déjà initialisé pour la même configuration est repris du
+    cache partagé ; sinon `terraform init` utilise le cache des providers,
+    sous le verrou du cache (terraform_cache.init_lock).
     
     Args:
         deployment_dir: Chemin du répertoire de déploiement
-        auto_approve: Approuver automatiquement le plan Terraform
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        live: Afficher la progression en direct
         
     Returns:
-        True si le déploiement a réussi, False sinon
+        Tuple (TerraformResult ou None si le cache a été utilisé, succès)
     """
-    terraform_path = get_terraform_path()
+    if offline is None:
+        offline = terraform_cache.is_offline()
     
-    # Vérifier si terraform est installé
-    try:
-        subprocess.run([terraform_path, "--version"], check=True, capture_output=True, text=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        console.print("[red]Terraform n'est pas installé ou n'est pas dans le PATH.[/red]")
-        console.print("Installez Terraform via: https://www.terraform.io/downloads.html")
-        return False
+    terraform_path = get_terraform_path()
+    key = terraform_cache.cache_key(deployment_dir, get_terraform_version(terraform_path))
+    if terraform_cache.restore(deployment_dir, key):
+        terraform_cache.record("init", hits=1)
+        return None, True
+    
+    # Un seul `terraform init` à la fois écrit dans le cache des providers
+    with terraform_cache.init_lock():
+        # La même configuration a pu être initialisée pendant l'attente
+        if terraform_cache.restore(deployment_dir, key):
+            terraform_cache.record("init", hits=1)
+            return None, True
+        terraform_cache.record("init", misses=1)
+        
+        result = run_streaming(terraform_path, terraform_cache.init_args(offline), deployment_dir,
+                               "Initialisation de Terraform...", json_ui=False, live=live,
+                               env=terraform_cache.terraform_env())
+        if result.success:
+            hits, misses = terraform_cache.count_providers(result.tail, offline)
+            terraform_cache.record("providers", hits=hits, misses=misses)
+            terraform_cache.save(deployment_dir, key)
+            _refresh_fingerprint(deployment_dir)
+    
+    return result, result.success
+
+def _refresh_fingerprint(deployment_dir):
+    """
+    Recalcule l'empreinte d'un déploiement après un `terraform init`
+
+    L'empreinte calculée à la préparation ne connaissait pas encore les
+    versions des providers résolues par cet init.
+    """
+    metadata = deployment_journal.load_state(deployment_dir) or {}
+    if not metadata.get("fingerprint") or not metadata.get("template"):
+        return
+    fingerprint = compute_fingerprint(metadata["template"], metadata.get("params") or {})
+    if fingerprint and fingerprint != metadata["fingerprint"]:
+        update_deployment_metadata(deployment_dir, {"fingerprint": fingerprint})
+
+def terraform_init(deployment_dir, offline=None):
+    """
+    Initialise Terraform dans un déploiement (sortie en direct)
     
-    # Mettre à jour le statut
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        
+    Returns:
+        True si l'initialisation a réussi, False sinon
+    """
     update_deployment_status(deployment_dir, "initializing")
     
-    # Initialiser Terraform
-    with console.status("[bold green]Initialisation de Terraform...[/bold green]"):
-        try:
-            result = subprocess.run(
-                [terraform_path, "init"],
-                cwd=deployment_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            console.print("[green]Initialisation réussie![/green]")
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]Erreur lors de l'initialisation de Terraform:[/red] {e.stderr}")
-            update_deployment_status(deployment_dir, "failed_init")
-            return False
+    if offline is None:
+        offline = terraform_cache.is_offline()
     
-    # Mettre à jour le statut
+    result, success = initialize(deployment_dir, offline)
+    if not success:
+        print_failure(result, "Erreur lors de l'initialisation de Terraform:")
+        if offline:
+            console.print(f"[yellow]Mode hors ligne: miroir de providers {terraform_cache.get_mirror_dir()}[/yellow]")
+        update_deployment_status(deployment_dir, "failed_init")
+        return False
+    
+    if result is None:
+        console.print("[green]Initialisation réussie![/green] [dim](cache partagé)[/dim]")
+    else:
+        console.print("[green]Initialisation réussie![/green]")
+    return True
+
+def terraform_plan(deployment_dir, plan_file=PLAN_FILE, targets=None):
+    """
+    Crée le plan Terraform d'un déploiement (sortie en direct)
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        plan_file: Nom du fichier de plan
+        targets: Adresses des ressources à cibler (-target), toutes si None
+        
+    Returns:
+        TerraformResult si le plan a réussi, None sinon
+    """
     update_deployment_status(deployment_dir, "planning")
     
-    # Exécuter terraform plan
-    with console.status("[bold green]Planification du déploiement...[/bold green]"):
-        try:
-            result = subprocess.run(
-                [terraform_path, "plan", "-out=tfplan"],
-                cwd=deployment_dir,
-                check=True,
-                capture_output=True,
-                text=True
+    args = ["plan", "-input=false", f"-out={plan_file}"] + [f"-target={target}" for target in targets or []]
+    result = run_streaming(get_terraform_path(), args, deployment_dir, "Planification du déploiement...")
+    if not result.success:
+        print_failure(result, "Erreur lors de la planification Terraform:")
+        update_deployment_status(deployment_dir, "failed_plan")
+        return None
+    
+    console.print("[green]Plan créé avec succès![/green]")
+    console.print("\n[bold]Plan Terraform:[/bold]")
+    # Résumé depuis 'terraform show -json' (export conservé dans le déploiement)
+    summary = plan_summary.analyze(get_terraform_path(), deployment_dir, plan_file)
+    if summary is None:
+        print_changes(result)
+    else:
+        plan_summary.print_summary(summary, deployment_dir)
+    return result
+
+def terraform_apply(deployment_dir, plan_file=PLAN_FILE):
+    """
+    Applique un plan Terraform (progression par ressource en direct)
+    
+    Le -parallelism est choisi d'après les applies précédents (voir
+    terraform_parallelism) ; la durée et les erreurs de limitation de débit
+    sont enregistrées dans les métadonnées.
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        plan_file: Nom du fichier de plan
+        
+    Returns:
+        TerraformResult si l'application a réussi, None sinon
+    """
+    update_deployment_status(deployment_dir, "applying")
+    
+    metadata = deployment_journal.load_state(deployment_dir) or {}
+    parallelism = terraform_parallelism.choose(metadata)
+    console.print(f"[dim]Parallélisme: {parallelism}[/dim]")
+    
+    started = time.monotonic()
+    result = run_streaming(get_terraform_path(),
+                           ["apply", "-input=false", "-auto-approve", f"-parallelism={parallelism}", plan_file],
+                           deployment_dir, "Déploiement en cours...")
+    update_deployment_metadata(deployment_dir, terraform_parallelism.record_run(
+        metadata, parallelism, time.monotonic() - started, result))
+    if not result.success:
+        print_failure(result, "Erreur lors de l'application Terraform:")
+        update_deployment_status(deployment_dir, "failed_apply")
+        return None
+    
+    console.print("[green]Déploiement réussi![/green]")
+    print_changes(result)
+    return result
+
+def plan_fingerprint(deployment_dir):
+    """
+    Calcule l'empreinte des entrées d'un plan Terraform
+    
+    L'empreinte couvre les fichiers lus par Terraform dans le déploiement
+    (configuration, variables, verrouillage des providers) et sa version.
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        
+    Returns:
+        Empreinte SHA-256
+    """
+    digest = hashlib.sha256()
+    for root, dirnames, filenames in os.walk(deployment_dir):
+        dirnames[:] = sorted(d for d in dirnames if d != ".terraform")
+        for filename in sorted(filenames):
+            if not filename.endswith(PLAN_INPUT_SUFFIXES) and filename != terraform_cache.LOCK_FILE:
+                continue
+            path = os.path.join(root, filename)
+            digest.update(os.path.relpath(path, deployment_dir).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(repr(get_terraform_version(get_terraform_path())).encode("utf-8"))
+    return digest.hexdigest()
+
+def get_state_serial(deployment_dir):
+    """
+    Récupère le serial et le lineage de l'état local d'un déploiement
+    
+    Returns:
+        Liste [serial, lineage] ou None si le déploiement n'a pas encore d'état
+    """
+    state_path = os.path.join(deployment_dir, tfstate.STATE_FILE)
+    if not os.path.isfile(state_path):
+        return None
+    header = tfstate.read_header(state_path)
+    if header is None:
+        state = tfstate.read_state(deployment_dir) or {}
+        header = (state.get("serial"), state.get("lineage"))
+    return list(header)
+
+def save_plan(deployment_dir, result, plan_file=PLAN_FILE):
+    """
+    Enregistre le résumé d'un plan sauvegardé dans les métadonnées
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        result: TerraformResult du plan
+        plan_file: Nom du fichier de plan
+    """
+    plan = {
+        "file": plan_file,
+        "fingerprint": plan_fingerprint(deployment_dir),
+        "state": get_state_serial(deployment_dir),
+        "changes": {key: result.changes.get(key, 0) for key in ("add", "change", "remove")},
+        "resources": [
+            {"address": state.address, "action": state.action}
+            for state in result.resources.values() if state.action != "noop"
+        ],
+        "created_at": datetime.datetime.now().isoformat()
+    }
+    update_deployment_metadata(deployment_dir, {"status": "planned", "plan": plan})
+
+def check_saved_plan(deployment_dir, plan):
+    """
+    Vérifie qu'un plan sauvegardé peut encore être appliqué tel quel
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        plan: Résumé du plan (métadonnées 'plan')
+        
+    Returns:
+        Raison pour laquelle il faut planifier à nouveau, ou None si le plan est valide
+    """
+    if not plan:
+        return "aucun plan enregistré"
+    if not os.path.isfile(os.path.join(deployment_dir, plan.get("file", PLAN_FILE))):
+        return "fichier de plan absent"
+    if plan_fingerprint(deployment_dir) != plan.get("fingerprint"):
+        return "configuration, variables ou version de Terraform modifiées depuis le plan"
+    
+    state = get_state_serial(deployment_dir)
+    if state != plan.get("state"):
+        before = plan["state"][0] if plan.get("state") else "aucun"
+        after = state[0] if state else "aucun"
+        return f"état Terraform modifié depuis le plan (serial {before} → {after})"
+    return None
+
+def plan_deployment(deployment_dir, offline=None):
+    """
+    Initialise Terraform, crée le plan et l'enregistre pour une application ultérieure
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        
+    Returns:
+        TerraformResult du plan, ou None en cas d'échec
+    """
+    if not check_terraform():
+        return None
+    
+    if not terraform_init(deployment_dir, offline):
+        return None
+    
+    result = terraform_plan(deployment_dir, PLAN_FILE)
+    if result:
+        save_plan(deployment_dir, result)
+    return result
+
+def apply_deployment(deployment_dir, auto_approve=False, offline=None):
+    """
+    Applique le plan sauvegardé d'un déploiement
+    
+    Le plan est appliqué directement si l'état et les entrées n'ont pas
+    changé depuis sa création ; sinon le déploiement est planifié à nouveau.
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        auto_approve: Ne pas demander de confirmation
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        
+    Returns:
+        True si le déploiement a réussi, False sinon
+    """
+    if not check_terraform():
+        return False
+    
+    metadata = deployment_journal.load_state(deployment_dir) or {}
+    plan = metadata.get("plan")
+    reason = check_saved_plan(deployment_dir, plan)
+    
+    if reason:
+        console.print(f"[yellow]Nouvelle planification: {reason}.[/yellow]")
+        if not plan_deployment(deployment_dir, offline):
+            return False
+        plan = deployment_journal.load_state(deployment_dir).get("plan")
+    else:
+        console.print(f"[green]Plan du {plan['created_at'][:19].replace('T', ' ')} toujours valide: application directe.[/green]")
+        summary = plan_summary.load_summary(deployment_dir)
+        if summary is not None:
+            plan_summary.print_summary(summary, deployment_dir)
+        else:
+            changes = plan.get("changes", {})
+            console.print(
+                f"[green]{changes.get('add', 0)} à créer[/green], "
+                f"[yellow]{changes.get('change', 0)} à modifier[/yellow], "
+                f"[red]{changes.get('remove', 0)} à supprimer[/red]"
             )
-            console.print("[green]Plan créé avec succès![/green]")
-            # Afficher le plan
-            console.print("\n[bold]Plan Terraform:[/bold]")
-            console.print(result.stdout)
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]Erreur lors de la planification Terraform:[/red] {e.stderr}")
-            update_deployment_status(deployment_dir, "failed_plan")
+        # .terraform supprimé depuis le plan : le restaurer (cache partagé)
+        if not os.path.isdir(os.path.join(deployment_dir, ".terraform")) and not terraform_init(deployment_dir, offline):
             return False
     
-    # Demander confirmation si auto_approve n'est pas activé
     if not auto_approve:
-        proceed = Confirm.ask("Voulez-vous procéder au déploiement?")
-        if not proceed:
-            console.print("[yellow]Déploiement annulé.[/yellow]")
-            update_deployment_status(deployment_dir, "cancelled")
+        if not Confirm.ask("Voulez-vous appliquer ce plan?"):
+            console.print("[yellow]Application annulée (le plan reste enregistré).[/yellow]")
             return False
     
-    # Mettre à jour le statut
-    update_deployment_status(deployment_dir, "applying")
+    result = terraform_apply(deployment_dir, plan.get("file", PLAN_FILE))
+    if not result:
+        return False
     
-    # Exécuter terraform apply
-    with console.status("[bold green]Déploiement en cours...[/bold green]"):
-        try:
+    collect_outputs(deployment_dir, result.outputs)
+    update_deployment_metadata(deployment_dir, {"status": "deployed", "plan": None})
+    return True
+
+def update_deployment(deployment_dir, params_updates, auto_approve=False, full=False, offline=None):
+    """
+    Met à jour les paramètres d'un déploiement existant
+    
+    terraform.tfvars est réécrit, puis seules les ressources dépendant des
+    variables modifiées sont planifiées et appliquées (-target), d'après le
+    graphe de dépendances de Terraform. Un plan complet est utilisé si le
+    graphe ne permet pas de délimiter ces ressources.
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        params_updates: Paramètres modifiés
+        auto_approve: Appliquer sans confirmation
+        full: Forcer un plan complet
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        
+    Returns:
+        True si la mise à jour a réussi (ou n'était pas nécessaire), False sinon
+    """
+    if not check_terraform():
+        return False
+    
+    metadata = deployment_journal.load_state(deployment_dir) or {}
+    previous_status = metadata.get("status")
+    old_params = metadata.get("params") or {}
+    new_params = dict(old_params, **params_updates)
+    
+    changed = terraform_graph.changed_variables(old_params, new_params)
+    if not changed:
+        console.print("[green]Aucun paramètre modifié: rien à mettre à jour.[/green]")
+        return True
+    console.print(f"[bold]Variables modifiées:[/bold] {', '.join(changed)}")
+    
+    tfvars_path = os.path.join(deployment_dir, "terraform.tfvars")
+    with open(tfvars_path, "r") as f:
+        old_tfvars = f.read()
+    
+    def rollback(status):
+        with open(tfvars_path, "w") as f:
+            f.write(old_tfvars)
+        update_deployment_status(deployment_dir, status)
+    
+    with open(tfvars_path, "w") as f:
+        f.write(render_tfvars(new_params))
+    update_deployment_status(deployment_dir, "updating")
+    
+    if not os.path.isdir(os.path.join(deployment_dir, ".terraform")) and not terraform_init(deployment_dir, offline):
+        rollback(previous_status)
+        return False
+    
+    # Délimiter les ressources concernées
+    targets = None
+    if full:
+        console.print("[yellow]Plan complet demandé.[/yellow]")
+    else:
+        terraform_path = get_terraform_path()
+        with console.status("[bold green]Analyse du graphe de dépendances...[/bold green]"):
+            graph = terraform_graph.load_graph(terraform_path, deployment_dir, get_terraform_version(terraform_path))
+            target_plan = terraform_graph.find_targets(graph, changed)
+        if target_plan.targeted:
+            targets = target_plan.targets
+            console.print(f"[green]Mise à jour ciblée de {len(targets)} ressource(s):[/green] {', '.join(targets)}")
+        else:
+            console.print(f"[yellow]Plan complet: {target_plan.reason}.[/yellow]")
+    
+    result = terraform_plan(deployment_dir, PLAN_FILE, targets)
+    if not result:
+        rollback(previous_status)
+        return False
+    
+    if not auto_approve and not Confirm.ask("Voulez-vous appliquer cette mise à jour?"):
+        console.print("[yellow]Mise à jour annulée.[/yellow]")
+        rollback(previous_status)
+        return False
+    
+    result = terraform_apply(deployment_dir, PLAN_FILE)
+    if not result:
+        # L'apply a pu modifier une partie des ressources : les paramètres
+        # tentés (ceux de terraform.tfvars) sont enregistrés avec le statut failed_apply
+        update_deployment_metadata(deployment_dir, {
+            "params": new_params,
+            "fingerprint": compute_fingerprint(metadata.get("template", ""), new_params),
+            "plan": None
+        })
+        return False
+    
+    collect_outputs(deployment_dir, result.outputs)
+    update_deployment_metadata(deployment_dir, {
+        "status": "updated",
+        "params": new_params,
+        "fingerprint": compute_fingerprint(metadata.get("template", ""), new_params),
+        "updated_at": datetime.datetime.now().isoformat(),
+        "plan": None
+    })
+    return True
+
+def collect_outputs(deployment_dir, outputs=None):
+    """
+    Enregistre les outputs et les instances Terraform dans les métadonnées du déploiement
+    
+    Les outputs et les instances sont lus directement dans terraform.tfstate ;
+    'terraform output -json' n'est lancé que pour un état distant.
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        outputs: Outputs déjà reçus dans les événements de l'apply (optionnel)
+    """
+    try:
+        state = tfstate.read_state(deployment_dir)
+        if outputs is None and state is not None:
+            outputs = state["outputs"]
+        elif outputs is None:
             result = subprocess.run(
-                [terraform_path, "apply", "-auto-approve", "tfplan"],
+                [get_terraform_path(), "output", "-json"],
                 cwd=deployment_dir,
                 check=True,
                 capture_output=True,
                 text=True
             )
-            console.print("[green]Déploiement réussi![/green]")
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]Erreur lors de l'application Terraform:[/red] {e.stderr}")
-            update_deployment_status(deployment_dir, "failed_apply")
-            return False
-    
-    # Récupérer les outputs
-    try:
-        result = subprocess.run(
-            [terraform_path, "output", "-json"],
-            cwd=deployment_dir,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        
-        outputs = json.loads(result.stdout) if result.stdout.strip() else {}
+            outputs = json.loads(result.stdout) if result.stdout.strip() else {}
         
         # Simplifier les outputs (Terraform les renvoie dans un format complexe)
         simplified_outputs = {}
@@ -355,11 +739,57 @@ def run_terraform(deployment_dir, auto_approve=False):
             else:
                 simplified_outputs[key] = value
         
-        # Mettre à jour les métadonnées avec les outputs
-        update_deployment_metadata(deployment_dir, {"outputs": simplified_outputs})
+        # Mettre à jour les métadonnées avec les outputs et les instances de l'état
+        updates = {"outputs": simplified_outputs}
+        if state is not None:
+            updates["instances"] = state["instances"]
+            updates["state_serial"] = state["serial"]
+        update_deployment_metadata(deployment_dir, updates)
         
     except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
         console.print(f"[yellow]Avertissement: Erreur lors de la récupération des outputs Terraform: {str(e)}[/yellow]")
+
+def run_terraform(deployment_dir, auto_approve=False, offline=None, initialized=False):
+    """
+    Exécute Terraform pour un déploiement
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        auto_approve: Approuver automatiquement le plan Terraform
+        offline: Installer les providers depuis le miroir local (None = configuration)
+        initialized: Terraform déjà initialisé (voir deploy_pipeline)
+        
+    Returns:
+        True si le déploiement a réussi, False sinon
+    """
+    if not initialized:
+        # Vérifier si terraform est installé
+        if not check_terraform():
+            return False
+        
+        # Initialiser Terraform
+        if not terraform_init(deployment_dir, offline):
+            return False
+    
+    # Exécuter terraform plan
+    if not terraform_plan(deployment_dir):
+        return False
+    
+    # Demander confirmation si auto_approve n'est pas activé
+    if not auto_approve:
+        proceed = Confirm.ask("Voulez-vous procéder au déploiement?")
+        if not proceed:
+            console.print("[yellow]Déploiement annulé.[/yellow]")
+            update_deployment_status(deployment_dir, "cancelled")
+            return False
+    
+    # Exécuter terraform apply
+    result = terraform_apply(deployment_dir)
+    if not result:
+        return False
+    
+    # Récupérer les outputs
+    collect_outputs(deployment_dir, result.outputs)
     
     # Mettre à jour le statut
     update_deployment_status(deployment_dir, "deployed")
@@ -376,34 +806,23 @@ def destroy_deployment(deployment_dir):
     Returns:
         True si la destruction a réussi, False sinon
     """
-    terraform_path = get_terraform_path()
-    
     # Vérifier si terraform est installé
-    try:
-        subprocess.run([terraform_path, "--version"], check=True, capture_output=True, text=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        console.print("[red]Terraform n'est pas installé ou n'est pas dans le PATH.[/red]")
-        console.print("Installez Terraform via: https://www.terraform.io/downloads.html")
+    if not check_terraform():
         return False
     
     # Mettre à jour le statut
     update_deployment_status(deployment_dir, "destroying")
     
     # Exécuter terraform destroy
-    with console.status("[bold red]Destruction en cours...[/bold red]"):
-        try:
-            result = subprocess.run(
-                [terraform_path, "destroy", "-auto-approve"],
-                cwd=deployment_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            console.print("[green]Destruction réussie![/green]")
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]Erreur lors de la destruction Terraform:[/red] {e.stderr}")
-            update_deployment_status(deployment_dir, "failed_destroy")
-            return False
+    result = run_streaming(get_terraform_path(), ["destroy", "-input=false", "-auto-approve"], deployment_dir,
+                           "Destruction en cours...")
+    if not result.success:
+        print_failure(result, "Erreur lors de la destruction Terraform:")
+        update_deployment_status(deployment_dir, "failed_destroy")
+        return False
+    
+    console.print("[green]Destruction réussie![/green]")
+    print_changes(result)
     
     # Mettre à jour le statut
     update_deployment_status(deployment_dir, "destroyed")
@@ -415,18 +834,12 @@ def get_deployment_dir(deployment_id):
     Récupère le répertoire d'un déploiement
     
     Args:
-        deployment_id: ID du déploiement
+        deployment_id: ID du déploiement (ou préfixe non ambigu)
         
     Returns:
         Chemin du répertoire de déploiement ou None si non trouvé
     """
-    deployments_dir = get_deployments_dir()
-    deployment_dir = os.path.join(deployments_dir, deployment_id)
-    
-    if os.path.exists(deployment_dir):
-        return deployment_dir
-    
-    return None
+    return deployment_registry.resolve_dir(deployment_registry.TERRAFORM, deployment_id)
 
 def get_deployment_info(deployment_id):
     """
@@ -443,50 +856,23 @@ def get_deployment_info(deployment_id):
     if not deployment_dir:
         return None
     
-    # Lire le fichier de métadonnées
-    metadata_path = os.path.join(deployment_dir, "metadata.json")
-    
-    if not os.path.exists(metadata_path):
-        return None
-    
-    try:
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        
-        return metadata
-    except Exception as e:
-        console.print(f"[yellow]Erreur lors de la lecture des métadonnées {metadata_path}: {str(e)}[/yellow]")
-        return None
+    # Instantané des métadonnées et événements du journal
+    return deployment_journal.load_state(deployment_dir)
 
-def list_deployments():
+def list_deployments(status=None, provider=None, since=None, limit=None):
     """
-    Liste tous les déploiements
+    Liste les déploiements (registre indexé)
+    
+    Args:
+        status: Filtrer par statut
+        provider: Filtrer par provider
+        since: Date ISO minimale de création
+        limit: Nombre maximal de déploiements (les plus récents)
     
     Returns:
         Liste des déploiements
     """
-    deployments = []
-    deployments_dir = get_deployments_dir()
-    
-    if not os.path.exists(deployments_dir):
-        return deployments
-    
-    for item in os.listdir(deployments_dir):
-        deployment_dir = os.path.join(deployments_dir, item)
-        
-        if os.path.isdir(deployment_dir):
-            metadata_path = os.path.join(deployment_dir, "metadata.json")
-            
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                    
-                    deployments.append(metadata)
-                except Exception as e:
-                    console.print(f"[yellow]Erreur lors de la lecture des métadonnées {metadata_path}: {str(e)}[/yellow]")
-    
-    return deployments
+    return deployment_registry.list_deployments(deployment_registry.TERRAFORM, status, provider, since, limit)
 
 def update_deployment_status(deployment_dir, status):
     """
@@ -505,6 +891,9 @@ def update_deployment_metadata(deployment_dir, metadata_updates):
     """
     Met à jour les métadonnées d'un déploiement
     
+    La mise à jour est ajoutée au journal du déploiement ; un changement de
+    statut ne réécrit pas metadata.json.
+    
     Args:
         deployment_dir: Chemin du répertoire de déploiement
         metadata_updates: Dictionnaire des mises à jour
@@ -512,27 +901,24 @@ def update_deployment_metadata(deployment_dir, metadata_updates):
     Returns:
         True si la mise à jour a réussi, False sinon
     """
-    metadata_path = os.path.join(deployment_dir, "metadata.json")
-    
-    if not os.path.exists(metadata_path):
-        return False
-    
     try:
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        
-        # Mettre à jour les métadonnées
-        metadata.update(metadata_updates)
-        
-        # Enregistrer les métadonnées
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
-        
-        return True
+        return deployment_registry.update(deployment_dir, metadata_updates, deployment_registry.TERRAFORM)
     except Exception as e:
-        console.print(f"[yellow]Erreur lors de la mise à jour des métadonnées {metadata_path}: {str(e)}[/yellow]")
+        console.print(f"[yellow]Erreur lors de la mise à jour des métadonnées de {deployment_dir}: {str(e)}[/yellow]")
         return False
 
+def get_deployment_history(deployment_dir):
+    """
+    Récupère l'historique des phases d'un déploiement
+    
+    Args:
+        deployment_dir: Chemin du répertoire de déploiement
+        
+    Returns:
+        Liste de {"at", "status", "duration"}
+    """
+    return deployment_journal.history(deployment_dir)
+
 def create_template_skeleton(template_path, provider, description=""):
     """
     Crée un squelette de template Terraform
@@ -577,12 +963,18 @@ def create_template_skeleton(template_path, provider, description=""):
         console.print(f"[red]Erreur lors de la création du manifest: {str(e)}[/red]")
         return None
     
-    # Créer les fichiers de base Terraform
+    # Créer les fichiers de base Terraform (templates skeletons/terraform)
+    from cloudya.template_manager import template_manager
+    
+    context = {
+        "provider": provider,
+        "name": manifest["name"],
+        "description": manifest["description"],
+        "template_path": template_path
+    }
     files = {
-        "main.tf": f'provider "{provider}" {{\n  region = var.region\n}}\n',
-        "variables.tf": 'variable "region" {\n  description = "Region"\n}\n',
-        "outputs.tf": "# Outputs\n",
-        "README.md": f"# {manifest['name']}\n\n{manifest['description']}\n\n## Usage\n\n```bash\ncloudya deploy template {template_path} --params region=us-east-1\n```\n"
+        filename: template_manager.render(filename, "skeletons/terraform", context)
+        for filename in ("main.tf", "variables.tf", "outputs.tf", "README.md")
     }
     
     for filename, content in files.items():
@@ -0,0 +1,435 @@
+"""
+Déploiement en lot de templates Terraform
+
+Un fichier de lot (YAML ou JSON) décrit plusieurs déploiements et leurs
+dépendances :
+
+    workers: 4              # processus Terraform simultanés (optionnel)
+    policy: fail-fast       # ou continue (optionnel)
+    deployments:
+      - name: network
+        template: aws/vpc
+        params:
+          region: eu-west-1
+      - name: cluster
+        template: aws/eks
+        params:
+          region: eu-west-1
+        depends_on: [network]
+
+Tous les déploiements sont préparés en parallèle, puis chacun exécute
+init, plan et apply dès que ses dépendances ont réussi, avec au plus
+'workers' commandes Terraform simultanées. La sortie de chaque commande
+est écrite dans le terraform.log du déploiement.
+
+Un déploiement dont les entrées sont identiques à celles d'un déploiement
+actif (même empreinte) réutilise ce dernier : il passe au statut
+'unchanged' sans lancer Terraform, sauf avec refresh. Un déploiement
+réappliqué garde son statut s'il est ignoré ou s'il échoue avant l'apply.
+Les entrées identiques d'un même lot ne sont déployées qu'une fois : les
+suivantes attendent la première et réutilisent son déploiement.
+
+Politiques en cas d'échec :
+
+- fail-fast : plus aucun déploiement n'est lancé, ceux en cours terminent ;
+- continue  : seuls les déploiements dépendant (même indirectement) d'un
+  échec sont ignorés.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+import yaml
+
+from .terraform import (
+    PLAN_FILE,
+    get_terraform_path,
+    get_template_info,
+    prepare_deployment,
+    compute_fingerprint,
+    find_matching_deployment,
+    initialize,
+    collect_outputs,
+    save_plan,
+    update_deployment_status,
+    update_deployment_metadata
+)
+from .terraform_events import LOG_FILE, run_streaming
+from .deployment_journal import load_state
+from . import terraform_parallelism
+
+DEFAULT_WORKERS = 4
+POLICIES = ("fail-fast", "continue")
+PHASES = ("prepare", "init", "plan", "apply")
+SUCCESS_STATUSES = ("deployed", "planned", "unchanged")
+
+class BatchItem:
+    """Déploiement d'un lot et son état d'avancement"""
+
+    def __init__(self, name, template, params=None, depends_on=None):
+        self.name = name
+        self.template = template
+        self.params = dict(params or {})
+        self.depends_on = list(depends_on or [])
+        self.deployment_dir: Optional[str] = None
+        # Statut d'un déploiement existant réappliqué (None si créé par le lot)
+        self.previous_status: Optional[str] = None
+        self.fingerprint: Optional[str] = None
+        # Entrée identique du lot dont ce déploiement suit le résultat
+        self.duplicate_of: Optional[str] = None
+        self.status = "pending"
+        self.phase: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    @property
+    def deployment_id(self):
+        return os.path.basename(self.deployment_dir) if self.deployment_dir else None
+
+    @property
+    def log_file(self):
+        return os.path.join(self.deployment_dir, LOG_FILE) if self.deployment_dir else None
+
+class BatchError(Exception):
+    """Fichier de lot invalide"""
+
+def load_batch(path):
+    """
+    Charge et valide un fichier de lot
+
+    Args:
+        path: Chemin du fichier (YAML ou JSON)
+
+    Returns:
+        Tuple (liste de BatchItem dans un ordre topologique, options)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise BatchError(f"Impossible de lire le fichier de lot {path}: {e}")
+
+    if isinstance(data, list):
+        data = {"deployments": data}
+
+    entries = data.get("deployments") or []
+    if not entries:
+        raise BatchError("Aucun déploiement dans le fichier de lot.")
+
+    items = {}
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("template"):
+            raise BatchError(f"Entrée {index + 1}: le champ 'template' est obligatoire.")
+        name = str(entry.get("name") or entry["template"])
+        if name in items:
+            raise BatchError(f"Nom de déploiement en double: {name}")
+        depends_on = entry.get("depends_on") or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        items[name] = BatchItem(name, entry["template"], entry.get("params"), [str(d) for d in depends_on])
+
+    for item in items.values():
+        for dependency in item.depends_on:
+            if dependency not in items:
+                raise BatchError(f"{item.name}: dépendance inconnue '{dependency}'")
+
+    options = {
+        "workers": int(data.get("workers", DEFAULT_WORKERS)),
+        "policy": data.get("policy", "fail-fast"),
+    }
+    if options["policy"] not in POLICIES:
+        raise BatchError(f"Politique inconnue: {options['policy']} (attendu: {', '.join(POLICIES)})")
+
+    return topological_order(items), options
+
+def topological_order(items):
+    """
+    Trie les déploiements selon leurs dépendances (algorithme de Kahn)
+
+    Args:
+        items: Dictionnaire {nom: BatchItem}
+
+    Returns:
+        Liste de BatchItem, chaque élément après ses dépendances
+    """
+    remaining = {name: set(item.depends_on) for name, item in items.items()}
+    ordered = []
+
+    ready = [name for name, dependencies in remaining.items() if not dependencies]
+    while ready:
+        name = ready.pop(0)
+        ordered.append(items[name])
+        del remaining[name]
+        for other, dependencies in remaining.items():
+            if name in dependencies:
+                dependencies.discard(name)
+                if not dependencies and other not in ready:
+                    ready.append(other)
+
+    if remaining:
+        raise BatchError(f"Cycle de dépendances entre: {', '.join(sorted(remaining))}")
+
+    return ordered
+
+def resolve_params(item):
+    """
+    Complète les paramètres d'un déploiement avec les valeurs par défaut
+
+    Returns:
+        Message d'erreur si un paramètre requis manque, None sinon
+    """
+    template_info = get_template_info(item.template)
+    if not template_info:
+        return None
+
+    missing = []
+    for param in template_info.get("parameters", []):
+        if param["name"] in item.params:
+            continue
+        if "default" in param:
+            item.params[param["name"]] = param["default"]
+        elif param.get("required", False):
+            missing.append(param["name"])
+
+    if missing:
+        return f"paramètres requis manquants: {', '.join(missing)}"
+    return None
+
+class BatchRunner:
+    """Exécute un lot de déploiements en respectant leurs dépendances"""
+
+    def __init__(self, items: List[BatchItem], workers=DEFAULT_WORKERS, policy="fail-fast",
+                 plan_only=False, offline=None, progress=None, refresh=False):
+        """
+        Args:
+            items: Déploiements (ordre topologique)
+            workers: Nombre maximal de commandes Terraform simultanées
+            policy: 'fail-fast' ou 'continue'
+            plan_only: S'arrêter après le plan
+            offline: Installer les providers depuis le miroir local (None = configuration)
+            progress: Callback appelé avec (BatchItem, message)
+            refresh: Réappliquer aussi les déploiements aux entrées inchangées
+        """
+        self.items = items
+        self.workers = max(1, workers)
+        self.policy = policy
+        self.plan_only = plan_only
+        self.offline = offline
+        self.progress = progress
+        self.refresh = refresh
+        self._stop = threading.Event()
+
+    def _notify(self, item, message):
+        if self.progress:
+            self.progress(item, message)
+
+    def _timed(self, item, phase, function):
+        item.phase = phase
+        started = time.monotonic()
+        try:
+            return function()
+        finally:
+            item.timings[phase] = time.monotonic() - started
+
+    def _fail(self, item, status, error):
+        item.status = "failed"
+        item.error = error
+        if item.deployment_dir:
+            # Un déploiement réappliqué garde son statut tant que l'apply n'a rien modifié
+            if item.previous_status and status != "failed_apply":
+                status = item.previous_status
+            update_deployment_status(item.deployment_dir, status)
+        self._notify(item, f"échec ({item.phase}): {error}")
+        return False
+
+    def _fingerprint(self, item):
+        error = resolve_params(item)
+        if error:
+            return self._fail(item, "failed_prepare", error)
+        item.fingerprint = compute_fingerprint(item.template, item.params)
+        return True
+
+    def _follow(self, item, first):
+        """Rattache une entrée à une entrée identique déjà préparée du lot"""
+        item.duplicate_of = first.name
+        item.status = "prepared"
+        self._notify(item, f"identique à {first.name}")
+
+    def _prepare(self, item):
+        fingerprint = item.fingerprint
+        existing = find_matching_deployment(fingerprint) if fingerprint else None
+        if existing and not self.refresh:
+            item.deployment_dir = existing["dir"]
+            item.status = "unchanged"
+            self._notify(item, f"inchangé, réutilise {item.deployment_id}")
+            return True
+        if existing:
+            item.deployment_dir = existing["dir"]
+            item.previous_status = existing["status"]
+            item.status = "prepared"
+            self._notify(item, f"réapplication de {item.deployment_id}")
+            return True
+
+        item.deployment_dir = self._timed(item, "prepare", lambda: prepare_deployment(item.template, item.params, fingerprint))
+        if not item.deployment_dir:
+            return self._fail(item, "failed_prepare", f"template '{item.template}' non trouvé")
+
+        update_deployment_metadata(item.deployment_dir, {"batch_name": item.name})
+        item.status = "prepared"
+        self._notify(item, f"préparé ({item.deployment_id})")
+        return True
+
+    @staticmethod
+    def _error_message(result):
+        for diagnostic in result.diagnostics:
+            if diagnostic.get("severity") == "error":
+                return diagnostic.get("summary", "erreur Terraform")
+        return result.tail[-1] if result.tail else f"code de retour {result.returncode}"
+
+    def _run(self, item):
+        """Exécute init, plan et apply pour un déploiement (thread du pool)"""
+        terraform_path = get_terraform_path()
+        item.status = "running"
+
+        update_deployment_status(item.deployment_dir, "initializing")
+        result, success = self._timed(item, "init", lambda: initialize(item.deployment_dir, self.offline, live=False))
+        if not success:
+            return self._fail(item, "failed_init", self._error_message(result))
+        self._notify(item, "init terminé" + (" (cache)" if result is None else ""))
+
+        update_deployment_status(item.deployment_dir, "planning")
+        result = self._timed(item, "plan", lambda: run_streaming(
+            terraform_path, ["plan", "-input=false", f"-out={PLAN_FILE}"], item.deployment_dir, item.name, live=False))
+        if not result.success:
+            return self._fail(item, "failed_plan", self._error_message(result))
+        self._notify(item, "plan terminé")
+
+        if self.plan_only:
+            # Plan enregistré : 'deploy apply <id>' l'appliquera sans replanifier
+            save_plan(item.deployment_dir, result)
+            if item.previous_status:
+                update_deployment_status(item.deployment_dir, item.previous_status)
+            item.status = "planned"
+            return True
+
+        update_deployment_status(item.deployment_dir, "applying")
+        metadata = load_state(item.deployment_dir) or {}
+        parallelism = terraform_parallelism.choose(metadata)
+        result = self._timed(item, "apply", lambda: run_streaming(
+            terraform_path, ["apply", "-input=false", "-auto-approve", f"-parallelism={parallelism}", PLAN_FILE],
+            item.deployment_dir, item.name, live=False))
+        update_deployment_metadata(item.deployment_dir, terraform_parallelism.record_run(
+            metadata, parallelism, item.timings["apply"], result))
+        if not result.success:
+            return self._fail(item, "failed_apply", self._error_message(result))
+
+        collect_outputs(item.deployment_dir, result.outputs)
+        update_deployment_status(item.deployment_dir, "deployed")
+        item.status = "deployed"
+        self._notify(item, "déployé")
+        return True
+
+    def _safe_run(self, function, item):
+        try:
+            return function(item)
+        except Exception as e:
+            return self._fail(item, f"failed_{item.phase or 'prepare'}", str(e))
+
+    def prepare_all(self):
+        """
+        Prépare tous les déploiements en parallèle
+
+        Returns:
+            True si tous les déploiements ont été préparés
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            fingerprinted = list(executor.map(lambda item: self._safe_run(self._fingerprint, item), self.items))
+
+            # Entrées identiques : seule la première (ordre topologique) est
+            # préparée, sinon chacune créerait et déploierait son propre déploiement
+            first_items = {}
+            pending = []
+            for item, success in zip(self.items, fingerprinted):
+                if not success:
+                    continue
+                if item.fingerprint and item.fingerprint in first_items:
+                    self._follow(item, first_items[item.fingerprint])
+                    continue
+                if item.fingerprint:
+                    first_items[item.fingerprint] = item
+                pending.append(item)
+
+            results = list(executor.map(lambda item: self._safe_run(self._prepare, item), pending))
+        return all(fingerprinted) and all(results)
+
+    def _skip(self, item, reason):
+        item.status = "skipped"
+        item.error = reason
+        # Un déploiement réappliqué n'a pas été modifié : son statut est conservé
+        if item.deployment_dir and item.previous_status is None:
+            update_deployment_status(item.deployment_dir, "skipped")
+        self._notify(item, f"ignoré: {reason}")
+
+    def run(self):
+        """
+        Prépare puis déploie tout le lot
+
+        Returns:
+            True si tous les déploiements ont réussi
+        """
+        prepared = self.prepare_all()
+        if not prepared and self.policy == "fail-fast":
+            for item in self.items:
+                if item.status == "prepared":
+                    self._skip(item, "échec de préparation d'un autre déploiement")
+            return False
+
+        by_name = {item.name: item for item in self.items}
+        waiting = [item for item in self.items if item.status == "prepared"]
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while waiting or running:
+                # Lancer les déploiements dont toutes les dépendances ont réussi
+                followed = False
+                for item in list(waiting):
+                    if len(running) >= self.workers:
+                        break
+                    dependencies = [by_name[name] for name in item.depends_on]
+                    if item.duplicate_of:
+                        dependencies.append(by_name[item.duplicate_of])
+                    failed = [d.name for d in dependencies if d.status in ("failed", "skipped")]
+                    if failed:
+                        waiting.remove(item)
+                        self._skip(item, f"dépendance en échec: {', '.join(failed)}")
+                    elif self._stop.is_set():
+                        waiting.remove(item)
+                        self._skip(item, "arrêt après un échec (fail-fast)")
+                    elif all(d.status in SUCCESS_STATUSES for d in dependencies):
+                        waiting.remove(item)
+                        if item.duplicate_of:
+                            first = by_name[item.duplicate_of]
+                            item.deployment_dir = first.deployment_dir
+                            item.status = "unchanged"
+                            self._notify(item, f"inchangé, réutilise {item.deployment_id}")
+                            followed = True
+                        else:
+                            running[executor.submit(self._safe_run, self._run, item)] = item
+
+                if followed and not running:
+                    continue
+                if not running:
+                    # Dépendances jamais satisfaites (ne devrait pas arriver après le tri)
+                    for item in waiting:
+                        self._skip(item, "dépendances non satisfaites")
+                    break
+
+                done, _pending = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = running.pop(future)
+                    if not future.result() and self.policy == "fail-fast":
+                        self._stop.set()
+
+        return all(item.status in SUCCESS_STATUSES for item in self.items)
@@ -0,0 +1,458 @@
+"""
+Cache partagé des providers et modules Terraform
+
+Chaque déploiement a son propre répertoire : sans cache, chaque
+`terraform init` retélécharge les providers (souvent plusieurs centaines de
+Mo) et les modules. Cloudya gère donc deux niveaux de cache sous
+~/.cloudya/terraform :
+
+- plugins/ : TF_PLUGIN_CACHE_DIR partagé par tous les déploiements. Il sert
+  aussi de miroir local (-plugin-dir) en mode hors ligne, sauf si un autre
+  miroir est configuré (terraform_mirror_dir) ;
+- init/<clé>/ : un répertoire .terraform déjà initialisé et son
+  .terraform.lock.hcl. La clé est l'empreinte du fichier de verrouillage,
+  de la configuration (*.tf, y compris celle des modules locaux appelés
+  avec source = "./...") et de la version de Terraform. Un déploiement
+  de même clé reçoit une copie par liens de ce répertoire et n'exécute pas
+  `terraform init`.
+
+Terraform ne supporte pas plusieurs écritures simultanées dans plugins/ :
+les `terraform init` (lots, validation du catalogue) sont sérialisés par un
+verrou flock sur init.lock, à la racine du cache.
+
+Options de ~/.cloudya/config.json :
+
+- terraform_cache_dir   répertoire du cache (défaut : ~/.cloudya/terraform)
+- terraform_mirror_dir  miroir de providers pour le mode hors ligne
+- terraform_offline     activer le mode hors ligne par défaut
+
+Les taux de succès du cache sont enregistrés dans cache-stats.json.
+"""
+import os
+import re
+import json
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import threading
+import contextlib
+
+from .config import get_snapshot, ensure_dir
+
+LOCK_FILE = ".terraform.lock.hcl"
+TERRAFORM_DIR = ".terraform"
+STATS_FILE = "cache-stats.json"
+INIT_LOCK_FILE = "init.lock"
+
+# Extensions de la configuration prises en compte dans la clé du cache
+CONFIG_EXTENSIONS = (".tf", ".tf.json")
+# Source locale d'un bloc module (HCL ou JSON)
+LOCAL_SOURCE_PATTERN = re.compile(r'"?source"?\s*[=:]\s*"(\.\.?/[^"]*)"')
+# Backend ou Terraform Cloud déclaré dans la configuration
+BACKEND_PATTERN = re.compile(r'^\s*(backend\s+"|cloud\s*\{|"backend"\s*:|"cloud"\s*:)', re.MULTILINE)
+
+# Messages de `terraform init` indiquant l'origine d'un provider
+PROVIDER_CACHED = "from the shared cache directory"
+PROVIDER_INSTALLING = "- Installing "
+
+# Les déploiements en lot mettent à jour les statistiques depuis plusieurs threads
+_stats_lock = threading.Lock()
+
+def get_cache_dir():
+    """
+    Récupère le répertoire du cache Terraform
+    """
+    return get_snapshot().config.get("terraform_cache_dir", os.path.join(os.path.expanduser("~/.cloudya"), "terraform"))
+
+def get_plugin_cache_dir():
+    """
+    Récupère le répertoire partagé des providers (TF_PLUGIN_CACHE_DIR)
+    """
+    return ensure_dir(os.path.join(get_cache_dir(), "plugins"))
+
+def get_mirror_dir():
+    """
+    Récupère le miroir local des providers utilisé en mode hors ligne
+    """
+    return get_snapshot().config.get("terraform_mirror_dir") or get_plugin_cache_dir()
+
+def is_offline():
+    """
+    Indique si le mode hors ligne est activé dans la configuration
+    """
+    return bool(get_snapshot().config.get("terraform_offline", False))
+
+def terraform_env():
+    """
+    Variables d'environnement de Terraform pour utiliser le cache partagé
+
+    Les déploiements neufs n'ont pas encore de fichier de verrouillage :
+    sans TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE, Terraform >= 1.4
+    ignorerait le cache et retéléchargerait les providers.
+    """
+    return {
+        "TF_PLUGIN_CACHE_DIR": get_plugin_cache_dir(),
+        "TF_PLUGIN_CACHE_MAY_BREAK_DEPENDENCY_LOCK_FILE": "1",
+    }
+
+@contextlib.contextmanager
+def init_lock():
+    """
+    Sérialise les `terraform init` qui écrivent dans le cache des providers
+
+    TF_PLUGIN_CACHE_DIR ne supporte pas plusieurs écritures simultanées :
+    les threads d'un lot et les processus de validation prennent un verrou
+    exclusif (flock) sur un fichier à la racine du cache.
+    """
+    path = os.path.join(ensure_dir(get_cache_dir()), INIT_LOCK_FILE)
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def init_args(offline=False):
+    """
+    Arguments de `terraform init`
+
+    Args:
+        offline: Installer les providers depuis le miroir local uniquement
+
+    Returns:
+        Liste d'arguments
+    """
+    args = ["init", "-input=false"]
+    if offline:
+        args.append(f"-plugin-dir={get_mirror_dir()}")
+    return args
+
+def cache_key(deployment_dir, terraform_version=None):
+    """
+    Calcule la clé du cache d'initialisation d'un déploiement
+
+    Args:
+        deployment_dir: Répertoire de déploiement
+        terraform_version: Version de Terraform (tuple)
+
+    Returns:
+        Empreinte SHA-256 (hexadécimale)
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(terraform_version).encode("utf-8"))
+
+    lock_path = os.path.join(deployment_dir, LOCK_FILE)
+    if os.path.exists(lock_path):
+        with open(lock_path, "rb") as f:
+            digest.update(b"\0lock\0" + f.read())
+
+    # Configuration racine puis modules locaux : Terraform les lit en place,
+    # mais les modules distants qu'ils appellent sont installés dans .terraform
+    pending, seen = [os.path.normpath(deployment_dir)], set()
+    while pending:
+        directory = pending.pop(0)
+        if directory in seen:
+            continue
+        seen.add(directory)
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        rel = os.path.relpath(directory, deployment_dir)
+        for name in names:
+            if not name.endswith(CONFIG_EXTENSIONS):
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                content = f.read()
+            path = name if rel == os.curdir else os.path.join(rel, name)
+            digest.update(b"\0" + path.encode("utf-8") + b"\0" + content)
+            for source in LOCAL_SOURCE_PATTERN.findall(content.decode("utf-8", errors="replace")):
+                pending.append(os.path.normpath(os.path.join(directory, source)))
+
+    return digest.hexdigest()
+
+def declares_backend(directory):
+    """
+    Indique si la configuration d'un répertoire déclare un backend
+
+    Un .terraform initialisé avec -backend=false ne doit alors pas être mis
+    en cache : un déploiement qui le reprendrait n'aurait pas de backend.
+    """
+    for name in os.listdir(directory):
+        if not name.endswith(CONFIG_EXTENSIONS):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8", errors="replace") as f:
+            if BACKEND_PATTERN.search(f.read()):
+                return True
+    return False
+
+def _entry_dir(key):
+    return os.path.join(get_cache_dir(), "init", key)
+
+def _shared(rel_path):
+    """
+    Indique si un fichier de .terraform peut être partagé par lien physique
+
+    Le contenu des providers et des modules (profondeur >= 3) n'est jamais
+    modifié par Terraform ; les fichiers de premier niveau (modules.json,
+    état du backend...) sont réécrits et sont donc copiés.
+    """
+    return len(rel_path.split(os.sep)) >= 3
+
+def _clone_tree(source, destination, link=True):
+    """
+    Recopie un répertoire en conservant les liens symboliques
+
+    Args:
+        source: Répertoire source
+        destination: Répertoire de destination (inexistant)
+        link: Lier les fichiers partageables au lieu de les copier
+    """
+    for root, dirnames, filenames in os.walk(source):
+        rel_root = os.path.relpath(root, source)
+        target_root = destination if rel_root == "." else os.path.join(destination, rel_root)
+        os.makedirs(target_root, exist_ok=True)
+
+        # Les providers sont des liens symboliques vers le cache des plugins
+        for name in list(dirnames) + filenames:
+            path = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            rel_path = os.path.normpath(os.path.join(rel_root, name))
+
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), target)
+                if name in dirnames:
+                    dirnames.remove(name)
+            elif name in dirnames:
+                continue
+            elif link and _shared(rel_path):
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+            else:
+                shutil.copy2(path, target)
+
+def _links_valid(directory):
+    """Vérifie que les liens symboliques (providers) pointent vers un fichier existant"""
+    for root, dirnames, filenames in os.walk(directory):
+        for name in dirnames + filenames:
+            path = os.path.join(root, name)
+            if os.path.islink(path) and not os.path.exists(path):
+                return False
+    return True
+
+def cached_lock_file(key):
+    """
+    Fichier de verrouillage d'une entrée du cache d'initialisation
+
+    Args:
+        key: Clé retournée par cache_key
+
+    Returns:
+        Chemin du .terraform.lock.hcl de l'entrée, ou None si elle n'existe pas
+    """
+    path = os.path.join(_entry_dir(key), LOCK_FILE)
+    return path if os.path.isfile(path) else None
+
+def restore(deployment_dir, key):
+    """
+    Installe un .terraform déjà initialisé depuis le cache
+
+    Args:
+        deployment_dir: Répertoire de déploiement
+        key: Clé retournée par cache_key
+
+    Returns:
+        True si le cache a été utilisé, False sinon
+    """
+    entry = _entry_dir(key)
+    cached_terraform = os.path.join(entry, TERRAFORM_DIR)
+    target = os.path.join(deployment_dir, TERRAFORM_DIR)
+
+    if not os.path.isdir(cached_terraform) or os.path.exists(target):
+        return False
+
+    if not _links_valid(cached_terraform):
+        # Le cache des plugins a été vidé : l'entrée n'est plus utilisable
+        shutil.rmtree(entry, ignore_errors=True)
+        return False
+
+    try:
+        _clone_tree(cached_terraform, target)
+        cached_lock = os.path.join(entry, LOCK_FILE)
+        if os.path.exists(cached_lock):
+            shutil.copyfile(cached_lock, os.path.join(deployment_dir, LOCK_FILE))
+    except OSError:
+        shutil.rmtree(target, ignore_errors=True)
+        return False
+
+    return True
+
+def save(deployment_dir, key):
+    """
+    Enregistre le .terraform d'un déploiement initialisé dans le cache
+
+    Les déploiements utilisant un backend distant ne sont pas mis en cache :
+    `terraform init` doit configurer le backend à chaque fois.
+
+    Args:
+        deployment_dir: Répertoire de déploiement
+        key: Clé calculée avant l'initialisation
+
+    Returns:
+        True si une entrée a été créée, False sinon
+    """
+    source = os.path.join(deployment_dir, TERRAFORM_DIR)
+    entry = _entry_dir(key)
+
+    if os.path.exists(entry) or not os.path.isdir(source):
+        return False
+    if os.path.exists(os.path.join(source, "terraform.tfstate")):
+        return False
+
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    tmp_entry = tempfile.mkdtemp(dir=os.path.dirname(entry), prefix=f".{key[:12]}.")
+    try:
+        _clone_tree(source, os.path.join(tmp_entry, TERRAFORM_DIR), link=False)
+        lock_path = os.path.join(deployment_dir, LOCK_FILE)
+        if os.path.exists(lock_path):
+            shutil.copyfile(lock_path, os.path.join(tmp_entry, LOCK_FILE))
+        os.rename(tmp_entry, entry)
+    except OSError:
+        # Entrée créée entre-temps par un autre processus, ou disque plein
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        return False
+
+    return True
+
+def count_providers(lines, offline=False):
+    """
+    Compte les providers servis par le cache dans la sortie de `terraform init`
+
+    Args:
+        lines: Lignes de sortie de terraform init
+        offline: Les installations proviennent du miroir local
+
+    Returns:
+        Tuple (succès, échecs)
+    """
+    hits = misses = 0
+    for line in lines:
+        if PROVIDER_CACHED in line:
+            hits += 1
+        elif line.lstrip().startswith(PROVIDER_INSTALLING):
+            if offline:
+                hits += 1
+            else:
+                misses += 1
+    return hits, misses
+
+def _stats_file():
+    return os.path.join(get_cache_dir(), STATS_FILE)
+
+def load_stats():
+    """
+    Charge les statistiques du cache
+
+    Returns:
+        Dictionnaire {"init": {"hits", "misses"}, "providers": {"hits", "misses"}}
+    """
+    stats = {"init": {"hits": 0, "misses": 0}, "providers": {"hits": 0, "misses": 0}}
+    try:
+        with open(_stats_file(), "r") as f:
+            saved = json.load(f)
+        for section in stats:
+            stats[section].update(saved.get(section, {}))
+    except (OSError, ValueError):
+        pass
+    return stats
+
+def record(section, hits=0, misses=0):
+    """
+    Ajoute des succès et des échecs aux statistiques du cache
+
+    Args:
+        section: 'init' ou 'providers'
+        hits: Nombre de succès
+        misses: Nombre d'échecs
+    """
+    if not hits and not misses:
+        return
+
+    with _stats_lock:
+        stats = load_stats()
+        stats[section]["hits"] += hits
+        stats[section]["misses"] += misses
+
+        try:
+            path = _stats_file()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+def hit_rate(section_stats):
+    """
+    Calcule le taux de succès d'une section des statistiques
+
+    Returns:
+        Taux entre 0 et 1, ou None si aucune donnée
+    """
+    total = section_stats["hits"] + section_stats["misses"]
+    return section_stats["hits"] / total if total else None
+
+def _directory_size(directory):
+    total = 0
+    for root, _dirnames, filenames in os.walk(directory):
+        for name in filenames:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                try:
+                    total += os.lstat(path).st_size
+                except OSError:
+                    pass
+    return total
+
+def cache_info():
+    """
+    Résume l'état du cache
+
+    Returns:
+        Dictionnaire (répertoires, taille, nombre d'entrées, statistiques)
+    """
+    cache_dir = get_cache_dir()
+    init_dir = os.path.join(cache_dir, "init")
+    entries = [name for name in os.listdir(init_dir) if not name.startswith(".")] if os.path.isdir(init_dir) else []
+
+    return {
+        "cache_dir": cache_dir,
+        "plugin_dir": get_plugin_cache_dir(),
+        "mirror_dir": get_mirror_dir(),
+        "offline": is_offline(),
+        "plugins_size": _directory_size(get_plugin_cache_dir()),
+        "init_entries": len(entries),
+        "init_size": _directory_size(init_dir) if entries else 0,
+        "stats": load_stats(),
+    }
+
+def clear(plugins=False):
+    """
+    Vide le cache d'initialisation (et les providers si demandé)
+
+    Args:
+        plugins: Supprimer aussi le cache des providers
+    """
+    cache_dir = get_cache_dir()
+    shutil.rmtree(os.path.join(cache_dir, "init"), ignore_errors=True)
+    if plugins:
+        shutil.rmtree(os.path.join(cache_dir, "plugins"), ignore_errors=True)
+        os.makedirs(os.path.join(cache_dir, "plugins"), exist_ok=True)
+    try:
+        os.unlink(_stats_file())
+    except OSError:
+        pass
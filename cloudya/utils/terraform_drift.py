@@ -0,0 +1,254 @@
+"""
+Détection de dérive des déploiements Terraform
+
+Chaque déploiement actif est vérifié avec
+'terraform plan -refresh-only -detailed-exitcode' : l'état est comparé à
+l'infrastructure réelle sans rien modifier (code 0 : à jour, 2 : dérive).
+
+Les vérifications tournent en parallèle avec deux limites :
+
+- workers : nombre total de commandes Terraform simultanées ;
+- per_provider : nombre de vérifications simultanées par provider, pour
+  ne pas dépasser les quotas d'API d'un même cloud.
+
+Les résultats sont conservés avec leur date dans ~/.cloudya/drift.json :
+un déploiement vérifié plus récemment que max_age n'est pas revérifié et
+son dernier résultat est repris dans le rapport. La sortie de chaque
+vérification est écrite dans le drift.log du déploiement.
+"""
+import os
+import json
+import time
+import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+from .config import get_snapshot
+from . import deployment_registry
+from .terraform import get_cloudya_dir, get_terraform_path, initialize
+from .terraform_events import run_streaming
+
+DRIFT_FILE = "drift.json"
+DRIFT_LOG_FILE = "drift.log"
+
+DEFAULT_WORKERS = 8
+DEFAULT_PER_PROVIDER = 3
+DEFAULT_MAX_AGE = "6h"
+
+# Ordre du rapport
+STATUS_ORDER = {"drifted": 0, "error": 1, "in_sync": 2}
+
+class DriftCheck:
+    """Vérification de dérive d'un déploiement"""
+
+    def __init__(self, deployment_id, deployment_dir, template=None, provider=None):
+        self.deployment_id = deployment_id
+        self.deployment_dir = deployment_dir
+        self.template = template or ""
+        self.provider = provider or ""
+        self.status: Optional[str] = None
+        self.drift: List[Dict] = []
+        self.duration: Optional[float] = None
+        self.checked_at: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cached = False
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "drift": self.drift,
+            "duration": self.duration,
+            "checked_at": self.checked_at,
+            "error": self.error,
+        }
+
+    def load(self, entry):
+        self.status = entry.get("status")
+        self.drift = entry.get("drift") or []
+        self.duration = entry.get("duration")
+        self.checked_at = entry.get("checked_at")
+        self.error = entry.get("error")
+        self.cached = True
+
+def get_drift_file():
+    """
+    Récupère le chemin du fichier des résultats de dérive
+    """
+    return os.path.join(get_cloudya_dir(), DRIFT_FILE)
+
+def load_results() -> Dict[str, Dict]:
+    """
+    Charge les derniers résultats de dérive
+
+    Returns:
+        Dictionnaire {ID du déploiement: résultat}
+    """
+    try:
+        with open(get_drift_file(), "r") as f:
+            return json.load(f).get("deployments", {})
+    except (OSError, ValueError):
+        return {}
+
+def save_results(results):
+    """
+    Enregistre les résultats de dérive (écriture atomique)
+    """
+    path = get_drift_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{DRIFT_FILE}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"deployments": results}, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def get_limits():
+    """
+    Limites de parallélisme configurées
+
+    Returns:
+        Tuple (workers, per_provider)
+    """
+    config = get_snapshot().config
+    return (
+        int(config.get("drift_workers", DEFAULT_WORKERS)),
+        int(config.get("drift_per_provider", DEFAULT_PER_PROVIDER)),
+    )
+
+def select_checks(deployments, max_age=DEFAULT_MAX_AGE, force=False):
+    """
+    Prépare les vérifications et reprend les résultats récents
+
+    Args:
+        deployments: Métadonnées des déploiements (list_deployments)
+        max_age: Âge maximal d'un résultat réutilisable (30m, 24h, 7d...)
+        force: Revérifier tous les déploiements
+
+    Returns:
+        Liste de DriftCheck (les vérifications jamais faites ou les plus
+        anciennes en premier)
+    """
+    results = load_results()
+    cutoff = None if force else deployment_registry.parse_since(max_age)
+
+    checks = []
+    for deployment in deployments:
+        deployment_id = deployment.get("id")
+        deployment_dir = deployment_registry.resolve_dir(deployment_registry.TERRAFORM, deployment_id)
+        if not deployment_dir:
+            continue
+        template = deployment.get("template") or ""
+        check = DriftCheck(deployment_id, deployment_dir, template, template.split("/")[0] if "/" in template else "")
+        entry = results.get(deployment_id)
+        if entry and cutoff and (entry.get("checked_at") or "") >= cutoff:
+            check.load(entry)
+        checks.append(check)
+
+    checks.sort(key=lambda check: (check.cached, (results.get(check.deployment_id) or {}).get("checked_at") or ""))
+    return checks
+
+def _error_message(result):
+    for diagnostic in result.diagnostics:
+        if diagnostic.get("severity") == "error":
+            return diagnostic.get("summary", "erreur Terraform")
+    return result.tail[-1] if result.tail else f"code de retour {result.returncode}"
+
+def check_drift(check: DriftCheck):
+    """
+    Vérifie la dérive d'un déploiement (thread du pool)
+
+    Args:
+        check: Vérification à effectuer (mise à jour en place)
+    """
+    started = time.monotonic()
+    try:
+        # Répertoire .terraform absent (cache vidé, copie manuelle) : réinitialiser
+        if not os.path.isdir(os.path.join(check.deployment_dir, ".terraform")):
+            result, success = initialize(check.deployment_dir, live=False)
+            if not success:
+                check.status = "error"
+                check.error = _error_message(result)
+                return check
+
+        result = run_streaming(
+            get_terraform_path(),
+            ["plan", "-refresh-only", "-detailed-exitcode", "-input=false"],
+            check.deployment_dir,
+            check.deployment_id,
+            log_file=DRIFT_LOG_FILE,
+            live=False
+        )
+        errors = any(d.get("severity") == "error" for d in result.diagnostics)
+        if result.returncode == 0:
+            check.status = "in_sync"
+        elif result.returncode == 2 and not errors:
+            check.status = "drifted"
+            check.drift = result.drift
+        else:
+            check.status = "error"
+            check.error = _error_message(result)
+    except Exception as e:
+        check.status = "error"
+        check.error = str(e)
+    finally:
+        check.duration = time.monotonic() - started
+        check.checked_at = datetime.datetime.now().isoformat()
+    return check
+
+def run_checks(checks: List[DriftCheck], workers=None, per_provider=None, progress=None):
+    """
+    Exécute les vérifications en respectant les limites de parallélisme
+
+    Args:
+        checks: Vérifications (celles déjà chargées du cache sont ignorées)
+        workers: Nombre maximal de commandes Terraform simultanées
+        per_provider: Nombre maximal de vérifications simultanées par provider
+        progress: Callback appelé avec chaque DriftCheck terminé
+
+    Returns:
+        Liste des vérifications, triée pour le rapport
+    """
+    default_workers, default_per_provider = get_limits()
+    workers = max(1, workers or default_workers)
+    per_provider = max(1, per_provider or default_per_provider)
+
+    results = load_results()
+    waiting = [check for check in checks if not check.cached]
+    running = {}
+    active = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while waiting or running:
+            for check in list(waiting):
+                if len(running) >= workers:
+                    break
+                if active.get(check.provider, 0) >= per_provider:
+                    continue
+                waiting.remove(check)
+                active[check.provider] = active.get(check.provider, 0) + 1
+                running[executor.submit(check_drift, check)] = check
+
+            done, _pending = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                check = running.pop(future)
+                active[check.provider] -= 1
+                # Enregistrer au fil de l'eau : un arrêt ne perd pas les résultats obtenus
+                results[check.deployment_id] = check.to_dict()
+                save_results(results)
+                if progress:
+                    progress(check)
+
+    return sort_report(checks)
+
+def sort_report(checks):
+    """
+    Trie les vérifications : dérives, puis erreurs, puis déploiements à jour
+    """
+    return sorted(checks, key=lambda check: (
+        STATUS_ORDER.get(check.status, len(STATUS_ORDER)),
+        -len(check.drift),
+        -(check.duration or 0),
+        check.deployment_id
+    ))
@@ -0,0 +1,387 @@
+"""
+Exécution de Terraform en streaming
+
+La sortie de Terraform est lue ligne par ligne pendant l'exécution :
+
+- avec l'interface machine (-json, Terraform >= 0.15.3), chaque ligne est un
+  événement JSON (planned_change, resource_drift, apply_start,
+  apply_complete, apply_errored, diagnostic, change_summary, outputs...) transformé en
+  progression par ressource ;
+- sinon, les dernières lignes de texte sont affichées telles quelles.
+
+L'affichage en direct ne conserve que les dernières lignes (tampon
+circulaire) : la mémoire reste bornée quelle que soit la taille du journal.
+Le journal complet est écrit au fil de l'eau dans un fichier du répertoire
+de déploiement.
+"""
+import os
+import json
+import time
+import datetime
+import subprocess
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from . import toolchain
+
+console = Console()
+
+LOG_FILE = "terraform.log"
+TAIL_SIZE = 200
+VISIBLE_RESOURCES = 12
+VISIBLE_LINES = 10
+
+# Version minimale de Terraform pour l'interface -json de plan/apply
+JSON_UI_MIN_VERSION = (0, 15, 3)
+
+ACTION_LABELS = {
+    "create": ("création", "green"),
+    "update": ("modification", "yellow"),
+    "delete": ("suppression", "red"),
+    "replace": ("remplacement", "magenta"),
+    "read": ("lecture", "cyan"),
+    "noop": ("inchangé", "dim"),
+}
+
+STATUS_ICONS = {
+    "planned": "•",
+    "running": "⏳",
+    "complete": "✅",
+    "errored": "❌",
+}
+
+class ResourceState:
+    """Progression d'une ressource Terraform"""
+
+    __slots__ = ("address", "action", "status", "started_at", "elapsed", "id_value")
+
+    def __init__(self, address, action):
+        self.address = address
+        self.action = action
+        self.status = "planned"
+        self.started_at = None
+        self.elapsed = None
+        self.id_value = None
+
+    def current_elapsed(self):
+        if self.elapsed is not None:
+            return self.elapsed
+        if self.started_at is not None:
+            return time.monotonic() - self.started_at
+        return None
+
+class TerraformResult(NamedTuple):
+    """Résultat d'une commande Terraform exécutée en streaming"""
+    success: bool
+    returncode: int
+    changes: Dict[str, int]
+    resources: Dict[str, ResourceState]
+    diagnostics: List[Dict]
+    tail: List[str]
+    outputs: Optional[Dict]
+    log_file: Optional[str]
+    drift: List[Dict] = []
+
+def get_terraform_version(terraform_path):
+    """
+    Retourne la version de Terraform sous forme de tuple (ou None)
+
+    La version vient du registre des outils : elle n'est sondée qu'une fois
+    par binaire.
+    """
+    tool = toolchain.get_tool(terraform_path, name="terraform")
+    return tool.version_tuple if tool else None
+
+def supports_json_ui(terraform_path):
+    """Indique si Terraform supporte l'interface -json pour plan/apply/destroy"""
+    version = get_terraform_version(terraform_path)
+    return bool(version) and version >= JSON_UI_MIN_VERSION
+
+class TerraformEventStream:
+    """Interprète la sortie de Terraform et construit l'affichage en direct"""
+
+    def __init__(self, title, json_ui=True, tail_size=TAIL_SIZE):
+        self.title = title
+        self.json_ui = json_ui
+        self.tail = deque(maxlen=tail_size)
+        self.resources: Dict[str, ResourceState] = {}
+        self.recent = deque(maxlen=VISIBLE_RESOURCES)
+        self.diagnostics = []
+        self.changes = {}
+        self.outputs = None
+        self.drift = []
+        self.started_at = time.monotonic()
+
+    def _resource(self, hook, action=None):
+        address = hook.get("resource", {}).get("addr", "?")
+        state = self.resources.get(address)
+        if state is None:
+            state = ResourceState(address, action or hook.get("action", "noop"))
+            self.resources[address] = state
+        elif action:
+            state.action = action
+        if address in self.recent:
+            self.recent.remove(address)
+        self.recent.append(address)
+        return state
+
+    def feed(self, line):
+        """
+        Traite une ligne de sortie de Terraform
+
+        Args:
+            line: Ligne de sortie (sans le saut de ligne)
+        """
+        if not self.json_ui:
+            if line.strip():
+                self.tail.append(line)
+            return
+
+        try:
+            event = json.loads(line)
+        except ValueError:
+            if line.strip():
+                self.tail.append(line)
+            return
+
+        event_type = event.get("type")
+        message = event.get("@message", "")
+        hook = event.get("hook") or event.get("change") or {}
+
+        if event_type == "planned_change":
+            self._resource(hook, hook.get("action"))
+        elif event_type == "apply_start":
+            state = self._resource(hook, hook.get("action"))
+            state.status = "running"
+            state.started_at = time.monotonic()
+        elif event_type == "apply_progress":
+            state = self._resource(hook, hook.get("action"))
+            state.status = "running"
+            if state.started_at is None:
+                state.started_at = time.monotonic() - hook.get("elapsed_seconds", 0)
+        elif event_type == "apply_complete":
+            state = self._resource(hook, hook.get("action"))
+            state.status = "complete"
+            state.elapsed = hook.get("elapsed_seconds", state.current_elapsed())
+            state.id_value = hook.get("id_value")
+        elif event_type == "apply_errored":
+            state = self._resource(hook, hook.get("action"))
+            state.status = "errored"
+            state.elapsed = hook.get("elapsed_seconds", state.current_elapsed())
+        elif event_type == "resource_drift":
+            # Ressource modifiée hors de Terraform (plan -refresh-only)
+            self.drift.append({"address": hook.get("resource", {}).get("addr", "?"), "action": hook.get("action", "update")})
+        elif event_type == "change_summary":
+            self.changes = event.get("changes", {})
+        elif event_type == "outputs":
+            self.outputs = event.get("outputs", {})
+        elif event_type == "diagnostic":
+            diagnostic = event.get("diagnostic", {})
+            self.diagnostics.append(diagnostic)
+
+        if message:
+            self.tail.append(message)
+
+    def counts(self):
+        """Nombre de ressources par statut"""
+        counts = {"planned": 0, "running": 0, "complete": 0, "errored": 0}
+        for state in self.resources.values():
+            counts[state.status] += 1
+        return counts
+
+    def __rich__(self):
+        elapsed = time.monotonic() - self.started_at
+        header = Text.assemble((f"{self.title}", "bold green"), f"  {elapsed:.0f}s")
+
+        if not self.json_ui or not self.resources:
+            lines = list(self.tail)[-VISIBLE_LINES:]
+            return Group(header, Text("\n".join(lines), style="dim"))
+
+        counts = self.counts()
+        header.append(
+            f"  ✅ {counts['complete']}  ⏳ {counts['running']}  ❌ {counts['errored']}  • {counts['planned']}"
+        )
+
+        table = Table(show_header=True, header_style="bold", box=None, padding=(0, 1))
+        table.add_column("", width=2)
+        table.add_column("Ressource", style="cyan", overflow="fold")
+        table.add_column("Action")
+        table.add_column("Durée", justify="right")
+
+        for address in self.recent:
+            state = self.resources[address]
+            label, style = ACTION_LABELS.get(state.action, (state.action, "white"))
+            duration = state.current_elapsed()
+            table.add_row(
+                STATUS_ICONS.get(state.status, ""),
+                address,
+                Text(label, style=style),
+                f"{duration:.0f}s" if duration is not None else ""
+            )
+
+        return Group(header, table)
+
+    def result(self, returncode, log_file):
+        """Construit le TerraformResult final"""
+        errors = any(d.get("severity") == "error" for d in self.diagnostics)
+        return TerraformResult(
+            success=returncode == 0 and not errors,
+            returncode=returncode,
+            changes=self.changes,
+            resources=self.resources,
+            diagnostics=self.diagnostics,
+            tail=list(self.tail),
+            outputs=self.outputs,
+            log_file=log_file,
+            drift=self.drift
+        )
+
+def run_streaming(terraform_path, args, cwd, title, json_ui=None, log_file=LOG_FILE, live=True, env=None):
+    """
+    Exécute une commande Terraform en affichant sa progression en direct
+
+    Args:
+        terraform_path: Exécutable Terraform
+        args: Arguments (ex: ["apply", "-auto-approve", "tfplan"])
+        cwd: Répertoire de travail (répertoire de déploiement)
+        title: Titre de l'affichage en direct
+        json_ui: Utiliser l'interface -json (None = détection automatique)
+        log_file: Nom du journal dans cwd (None = pas de journal)
+        live: Afficher la progression en direct
+        env: Variables d'environnement supplémentaires
+
+    Returns:
+        TerraformResult
+    """
+    if json_ui is None:
+        json_ui = supports_json_ui(terraform_path)
+
+    # Les options doivent précéder les arguments positionnels (ex: le fichier de plan)
+    args = list(args)
+    command = [terraform_path] + args[:1] + ["-json" if json_ui else "-no-color"] + args[1:]
+
+    process_env = dict(os.environ)
+    process_env.setdefault("TF_IN_AUTOMATION", "1")
+    if env:
+        process_env.update(env)
+
+    stream = TerraformEventStream(title, json_ui=json_ui)
+    log_path = os.path.join(cwd, log_file) if log_file else None
+
+    log = open(log_path, "a", encoding="utf-8") if log_path else None
+    try:
+        if log:
+            log.write(f"\n=== {' '.join(command[1:])} ({datetime.datetime.now().isoformat()}) ===\n")
+            log.flush()
+
+        try:
+            process = subprocess.Popen(
+                command,
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                env=process_env
+            )
+        except OSError as e:
+            stream.tail.append(str(e))
+            return stream.result(127, log_path)
+
+        with Live(stream, console=console, refresh_per_second=8, transient=True) if live else _NullLive():
+            try:
+                for line in process.stdout:
+                    if log:
+                        log.write(line)
+                    stream.feed(line.rstrip("\n"))
+            except KeyboardInterrupt:
+                # Terraform reçoit aussi le SIGINT : le laisser s'arrêter proprement
+                process.wait()
+                raise
+            finally:
+                process.stdout.close()
+
+        returncode = process.wait()
+        return stream.result(returncode, log_path)
+    finally:
+        if log:
+            log.close()
+
+class _NullLive:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def print_failure(result, message):
+    """
+    Affiche l'erreur d'une commande Terraform (diagnostics et dernières lignes)
+
+    Args:
+        result: TerraformResult
+        message: Message d'erreur principal
+    """
+    console.print(f"[red]{message}[/red]")
+
+    errors = [d for d in result.diagnostics if d.get("severity") == "error"]
+    if errors:
+        for diagnostic in errors:
+            address = diagnostic.get("address")
+            prefix = f"[cyan]{address}[/cyan]: " if address else ""
+            console.print(f"  {prefix}[bold]{diagnostic.get('summary', '')}[/bold]")
+            if diagnostic.get("detail"):
+                console.print(f"    {diagnostic['detail']}")
+    else:
+        for line in result.tail[-20:]:
+            console.print(f"  {line}", markup=False, highlight=False)
+
+    if result.log_file:
+        console.print(f"Journal complet: [cyan]{result.log_file}[/cyan]")
+
+def print_changes(result):
+    """
+    Affiche les changements planifiés ou appliqués par ressource
+
+    Args:
+        result: TerraformResult
+    """
+    resources = [state for state in result.resources.values() if state.action != "noop"]
+
+    if resources:
+        table = Table(show_header=True, header_style="bold")
+        table.add_column("Ressource", style="cyan")
+        table.add_column("Action")
+        table.add_column("Durée", justify="right")
+
+        for state in resources[:50]:
+            label, style = ACTION_LABELS.get(state.action, (state.action, "white"))
+            icon = STATUS_ICONS.get(state.status, "") + " " if state.status != "planned" else ""
+            duration = f"{state.elapsed:.0f}s" if state.elapsed is not None else ""
+            table.add_row(state.address, Text(icon + label, style=style), duration)
+
+        console.print(table)
+        if len(resources) > 50:
+            console.print(f"... et {len(resources) - 50} autre(s) ressource(s)")
+    elif not result.changes and result.tail:
+        # Sortie texte (Terraform sans interface -json)
+        for line in result.tail[-VISIBLE_LINES * 3:]:
+            console.print(line, markup=False, highlight=False)
+
+    if result.changes:
+        changes = result.changes
+        if changes.get("operation") == "plan":
+            labels = ("à créer", "à modifier", "à supprimer")
+        else:
+            labels = ("créée(s)", "modifiée(s)", "supprimée(s)")
+        console.print(
+            f"[green]{changes.get('add', 0)} {labels[0]}[/green], "
+            f"[yellow]{changes.get('change', 0)} {labels[1]}[/yellow], "
+            f"[red]{changes.get('remove', 0)} {labels[2]}[/red]"
+        )
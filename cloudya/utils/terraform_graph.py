@@ -0,0 +1,219 @@
+"""
+Graphe de dépendances Terraform d'un déploiement
+
+'terraform graph -type=plan' décrit les dépendances entre ressources,
+variables, locals, modules et providers. Ce module en déduit les
+ressources affectées par la modification de variables : toutes celles qui
+dépendent (même indirectement, via des locals, des modules ou d'autres
+ressources) d'une variable modifiée. Une mise à jour peut alors être
+planifiée avec -target sur ce seul sous-ensemble.
+
+Le graphe ne dépend que de la configuration : il est mis en cache dans le
+déploiement (GRAPH_CACHE_FILE) avec l'empreinte des fichiers .tf, du
+verrouillage des providers et de la version de Terraform.
+
+Le ciblage est abandonné (plan complet) quand le graphe est ambigu :
+variable absente du graphe, variable utilisée par un provider (toutes ses
+ressources seraient concernées), aucune ressource affectée ou ciblage
+couvrant presque tout le déploiement.
+"""
+import os
+import re
+import json
+import hashlib
+import subprocess
+import tempfile
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+GRAPH_CACHE_FILE = ".cloudya-graph.json"
+# À incrémenter quand l'analyse du graphe change (invalide les graphes en cache)
+GRAPH_VERSION = 2
+GRAPH_TIMEOUT = 300
+
+# Au-delà de cette proportion des ressources, un plan complet est aussi rapide
+MAX_TARGET_RATIO = 0.5
+
+CONFIG_SUFFIXES = (".tf", ".tf.json")
+LOCK_FILE = ".terraform.lock.hcl"
+
+# Nœuds entre guillemets, qui peuvent contenir des guillemets échappés (provider[\"...\"])
+EDGE_PATTERN = re.compile(r'^\s*"((?:[^"\\]|\\.)+)"\s*->\s*"((?:[^"\\]|\\.)+)"')
+CLOSE_SUFFIX = " (close)"
+ROOT_NODE = "[root] root"
+NODE_SUFFIX_PATTERN = re.compile(r"\s+\((expand|close|prepare state|destroy|orphan)\)$")
+
+class TargetPlan:
+    """Résultat de l'analyse : cibles ou raison d'un plan complet"""
+
+    def __init__(self, targets=None, reason=None):
+        self.targets: List[str] = sorted(targets or [])
+        self.reason: Optional[str] = reason
+
+    @property
+    def targeted(self):
+        return bool(self.targets) and self.reason is None
+
+def _normalize(node):
+    node = node.replace('\\"', '"')
+    if node.startswith("[root] "):
+        node = node[len("[root] "):]
+    return NODE_SUFFIX_PATTERN.sub("", node)
+
+def parse_dot(output) -> Dict[str, List[str]]:
+    """
+    Analyse la sortie DOT de 'terraform graph'
+
+    Args:
+        output: Sortie de la commande
+
+    Returns:
+        Dictionnaire {nœud: nœuds qui en dépendent}
+    """
+    dependents: Dict[str, Set[str]] = {}
+    for line in output.splitlines():
+        match = EDGE_PATTERN.match(line)
+        if not match:
+            continue
+        # Les nœuds de fermeture (provider, module) et la racine dépendent de
+        # tout ce qu'ils ferment : ce ne sont pas des dépendances de configuration
+        if match.group(1).endswith(CLOSE_SUFFIX) or match.group(1) == ROOT_NODE:
+            continue
+        # "A" -> "B" : A dépend de B
+        source, target = _normalize(match.group(1)), _normalize(match.group(2))
+        if source == target:
+            continue
+        dependents.setdefault(target, set()).add(source)
+        dependents.setdefault(source, set())
+    return {node: sorted(nodes) for node, nodes in dependents.items()}
+
+def config_hash(deployment_dir, terraform_version=None):
+    """
+    Empreinte de la configuration d'un déploiement (sans les variables)
+    """
+    digest = hashlib.sha256()
+    for root, dirnames, filenames in os.walk(deployment_dir):
+        dirnames[:] = sorted(d for d in dirnames if d != ".terraform")
+        for filename in sorted(filenames):
+            if not filename.endswith(CONFIG_SUFFIXES) and filename != LOCK_FILE:
+                continue
+            path = os.path.join(root, filename)
+            digest.update(os.path.relpath(path, deployment_dir).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(repr(terraform_version).encode("utf-8"))
+    return digest.hexdigest()
+
+def load_graph(terraform_path, deployment_dir, terraform_version=None) -> Optional[Dict[str, List[str]]]:
+    """
+    Retourne le graphe des dépendances (mis en cache par configuration)
+
+    Args:
+        terraform_path: Exécutable Terraform
+        deployment_dir: Répertoire du déploiement (initialisé)
+        terraform_version: Version de Terraform (clé du cache)
+
+    Returns:
+        Dictionnaire {nœud: nœuds qui en dépendent} ou None si la commande échoue
+    """
+    key = config_hash(deployment_dir, terraform_version)
+    cache_path = os.path.join(deployment_dir, GRAPH_CACHE_FILE)
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+        if cached.get("version") == GRAPH_VERSION and cached.get("config") == key:
+            return cached["dependents"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    try:
+        result = subprocess.run(
+            [terraform_path, "graph", "-type=plan"],
+            cwd=deployment_dir,
+            capture_output=True,
+            text=True,
+            timeout=GRAPH_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+
+    dependents = parse_dot(result.stdout)
+    if not dependents:
+        return None
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=deployment_dir, prefix=".graph.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": GRAPH_VERSION, "config": key, "dependents": dependents}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return dependents
+
+def _is_resource(node):
+    """Ressource gérée (éventuellement dans un module), hors data sources"""
+    parts = node.split(".")
+    while len(parts) > 2 and parts[0] == "module":
+        parts = parts[2:]
+    return len(parts) == 2 and parts[0] not in ("var", "local", "output", "module", "meta") \
+        and not parts[0].startswith("provider")
+
+def _affected(dependents, start) -> Set[str]:
+    seen = set()
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for dependent in dependents.get(node, []):
+            if dependent not in seen:
+                seen.add(dependent)
+                queue.append(dependent)
+    return seen
+
+def find_targets(dependents, variables, resource_count=None) -> TargetPlan:
+    """
+    Détermine les ressources à cibler après la modification de variables
+
+    Args:
+        dependents: Graphe {nœud: nœuds qui en dépendent}
+        variables: Noms des variables modifiées
+        resource_count: Nombre de ressources du déploiement (état)
+
+    Returns:
+        TargetPlan (cibles, ou raison d'un plan complet)
+    """
+    if dependents is None:
+        return TargetPlan(reason="graphe Terraform indisponible")
+
+    targets = set()
+    for variable in variables:
+        node = f"var.{variable}"
+        if node not in dependents:
+            return TargetPlan(reason=f"variable '{variable}' absente du graphe")
+        affected = _affected(dependents, node)
+        providers = [n for n in affected if n.startswith("provider") or ".provider[" in n]
+        if providers:
+            return TargetPlan(reason=f"variable '{variable}' utilisée par la configuration d'un provider")
+        targets.update(n for n in affected if _is_resource(n))
+
+    if not targets:
+        return TargetPlan(reason="aucune ressource ne dépend des variables modifiées")
+
+    total = resource_count or sum(1 for node in dependents if _is_resource(node))
+    if total and len(targets) > total * MAX_TARGET_RATIO:
+        return TargetPlan(targets, reason=f"{len(targets)} ressource(s) sur {total} concernée(s)")
+
+    return TargetPlan(targets)
+
+def changed_variables(old_params, new_params) -> List[str]:
+    """
+    Compare deux jeux de paramètres
+
+    Returns:
+        Noms des variables modifiées, ajoutées ou supprimées (une variable
+        supprimée reprend sa valeur par défaut)
+    """
+    keys = set(old_params) | set(new_params)
+    return sorted(key for key in keys if key not in old_params or key not in new_params
+                  or str(old_params[key]) != str(new_params[key]))
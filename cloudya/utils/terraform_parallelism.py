@@ -0,0 +1,150 @@
+"""
+Réglage adaptatif du -parallelism de terraform apply
+
+Terraform applique au plus 10 ressources à la fois par défaut : trop peu
+pour de grosses piles AWS, trop pour des API qui limitent le débit
+(Proxmox, Nutanix). Chaque apply est enregistré dans les métadonnées du
+déploiement (clé 'apply_runs') : parallélisme utilisé, durée, nombre de
+ressources, erreurs de limitation de débit détectées et succès.
+
+Le parallélisme suivant est choisi à partir du dernier apply connu du même
+déploiement, à défaut du même template, à défaut du même provider
+(augmentation additive, diminution multiplicative) :
+
+- limitation de débit détectée : le parallélisme est divisé par deux ;
+- apply réussi sans limitation, avec plus de ressources que le
+  parallélisme utilisé : il augmente d'un quart ;
+- sinon il est conservé.
+
+Les bornes par provider (PROVIDER_BOUNDS) peuvent être remplacées dans
+~/.cloudya/config.json :
+
+    "terraform_parallelism": {"proxmox": {"min": 1, "max": 2, "start": 1}}
+"""
+import re
+import datetime
+from typing import Dict, List, Optional
+
+from .config import get_snapshot
+from . import deployment_registry
+
+DEFAULT_PARALLELISM = 10
+# Nombre d'applies conservés par déploiement
+MAX_RUNS = 10
+
+# Bornes par provider : min, max et valeur initiale
+PROVIDER_BOUNDS = {
+    "aws": {"min": 10, "max": 50, "start": 20},
+    "gcp": {"min": 10, "max": 40, "start": 15},
+    "azure": {"min": 5, "max": 25, "start": 10},
+    "openstack": {"min": 4, "max": 20, "start": 8},
+    "vmware": {"min": 2, "max": 10, "start": 4},
+    "proxmox": {"min": 1, "max": 4, "start": 2},
+    "nutanix": {"min": 1, "max": 4, "start": 2},
+}
+DEFAULT_BOUNDS = {"min": 1, "max": 20, "start": DEFAULT_PARALLELISM}
+
+THROTTLE_PATTERN = re.compile(
+    r"throttl|rate ?exceeded|rate limit|requestlimitexceeded|toomanyrequests|too many requests"
+    r"|\b429\b|quota exceeded|slow ?down|service unavailable|\b503\b",
+    re.IGNORECASE
+)
+
+def get_bounds(provider) -> Dict[str, int]:
+    """
+    Bornes du parallélisme d'un provider (configuration prioritaire)
+
+    Returns:
+        Dictionnaire {"min", "max", "start"}
+    """
+    bounds = dict(PROVIDER_BOUNDS.get(provider or "", DEFAULT_BOUNDS))
+    overrides = get_snapshot().config.get("terraform_parallelism", {}).get(provider or "", {})
+    for key in ("min", "max", "start"):
+        if key in overrides:
+            bounds[key] = int(overrides[key])
+    bounds["min"] = max(1, bounds["min"])
+    bounds["max"] = max(bounds["min"], bounds["max"])
+    bounds["start"] = min(max(bounds["start"], bounds["min"]), bounds["max"])
+    return bounds
+
+def _provider(metadata):
+    template = metadata.get("template") or ""
+    return template.split("/")[0] if "/" in template else ""
+
+def _last_run(metadata) -> Optional[Dict]:
+    """Dernier apply connu : déploiement, puis template, puis provider"""
+    runs = metadata.get("apply_runs") or []
+    if runs:
+        return runs[-1]
+
+    provider = _provider(metadata)
+    if not provider:
+        return None
+
+    candidates = [
+        deployment for deployment in deployment_registry.list_deployments(
+            deployment_registry.TERRAFORM, provider=provider, limit=200)
+        if deployment.get("apply_runs") and deployment.get("id") != metadata.get("id")
+    ]
+    for same_template in (True, False):
+        runs = [
+            deployment["apply_runs"][-1] for deployment in candidates
+            if not same_template or deployment.get("template") == metadata.get("template")
+        ]
+        if runs:
+            return max(runs, key=lambda run: run.get("at") or "")
+    return None
+
+def choose(metadata) -> int:
+    """
+    Choisit le -parallelism du prochain apply d'un déploiement
+
+    Args:
+        metadata: Métadonnées du déploiement
+
+    Returns:
+        Parallélisme
+    """
+    bounds = get_bounds(_provider(metadata))
+    run = _last_run(metadata)
+    if run is None:
+        return bounds["start"]
+
+    value = int(run.get("parallelism") or bounds["start"])
+    if run.get("throttled"):
+        value = value // 2
+    elif run.get("success") and run.get("resources", 0) > value:
+        value = value + max(1, value // 4)
+    return min(max(value, bounds["min"]), bounds["max"])
+
+def count_throttling(result) -> int:
+    """
+    Compte les erreurs de limitation de débit d'un TerraformResult
+    """
+    messages = [f"{d.get('summary', '')} {d.get('detail', '')}" for d in result.diagnostics]
+    messages.extend(result.tail)
+    return sum(1 for message in messages if THROTTLE_PATTERN.search(message))
+
+def record_run(metadata, parallelism, duration, result) -> Dict:
+    """
+    Construit les mises à jour des métadonnées après un apply
+
+    Args:
+        metadata: Métadonnées du déploiement (avant l'apply)
+        parallelism: Parallélisme utilisé
+        duration: Durée de l'apply (secondes)
+        result: TerraformResult de l'apply
+
+    Returns:
+        Mises à jour à appliquer ({"parallelism", "apply_runs"})
+    """
+    run = {
+        "parallelism": parallelism,
+        "duration": round(duration, 2),
+        "resources": sum(1 for state in result.resources.values() if state.action != "noop"),
+        "throttled": count_throttling(result),
+        "success": result.success,
+        "at": datetime.datetime.now().isoformat(),
+    }
+    runs: List[Dict] = list(metadata.get("apply_runs") or []) + [run]
+    return {"parallelism": parallelism, "apply_runs": runs[-MAX_RUNS:]}
@@ -0,0 +1,412 @@
+"""
+Lecture directe des fichiers terraform.tfstate
+
+Les outputs et les instances (machines virtuelles) d'un déploiement sont
+lus dans le fichier d'état local, sans lancer 'terraform output' :
+
+- le fichier est lu par blocs et chaque ressource est décodée séparément
+  (json.JSONDecoder.raw_decode) : un état de plusieurs milliers de
+  ressources n'est jamais chargé entièrement en mémoire ;
+- seules les ressources de calcul connues (COMPUTE_RESOURCES) sont
+  conservées : identifiant, nom, adresses IP privée et publique, tags ;
+- le résultat est mis en cache à côté de l'état (STATE_SUMMARY_FILE) avec
+  le 'serial' et le 'lineage' de l'état : tant que Terraform n'a pas écrit
+  un nouvel état, seul l'en-tête du fichier est relu.
+"""
+import os
+import re
+import json
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+STATE_FILE = "terraform.tfstate"
+STATE_SUMMARY_FILE = ".cloudya-state.json"
+SUMMARY_VERSION = 1
+
+CHUNK_SIZE = 1 << 20
+# Terraform écrit version, terraform_version, serial et lineage en tête du fichier
+HEADER_SIZE = 4096
+# Profondeur parcourue (sans décodage complet) des champs ignorés par iter_document
+SKIP_LEVELS = 4
+SERIAL_PATTERN = re.compile(r'"serial"\s*:\s*(\d+)')
+LINEAGE_PATTERN = re.compile(r'"lineage"\s*:\s*"([^"]*)"')
+
+# Plateforme Cloudya de chaque préfixe de type de ressource
+PLATFORMS = {
+    "aws": "aws",
+    "google": "gcp",
+    "azurerm": "azure",
+    "openstack": "openstack",
+    "proxmox": "proxmox",
+    "vsphere": "vmware",
+    "nutanix": "nutanix",
+}
+
+# Attributs des ressources de calcul : chemin (clés et index) dans 'attributes'
+COMPUTE_RESOURCES = {
+    "aws_instance": {
+        "id": ("id",),
+        "name": ("tags", "Name"),
+        "private_ip": ("private_ip",),
+        "public_ip": ("public_ip",),
+        "tags": ("tags",),
+    },
+    "aws_spot_instance_request": {
+        "id": ("spot_instance_id",),
+        "name": ("tags", "Name"),
+        "private_ip": ("private_ip",),
+        "public_ip": ("public_ip",),
+        "tags": ("tags",),
+    },
+    "google_compute_instance": {
+        "id": ("instance_id",),
+        "name": ("name",),
+        "private_ip": ("network_interface", 0, "network_ip"),
+        "public_ip": ("network_interface", 0, "access_config", 0, "nat_ip"),
+        "tags": ("labels",),
+    },
+    "azurerm_linux_virtual_machine": {
+        "id": ("id",),
+        "name": ("name",),
+        "private_ip": ("private_ip_address",),
+        "public_ip": ("public_ip_address",),
+        "tags": ("tags",),
+    },
+    "azurerm_windows_virtual_machine": {
+        "id": ("id",),
+        "name": ("name",),
+        "private_ip": ("private_ip_address",),
+        "public_ip": ("public_ip_address",),
+        "tags": ("tags",),
+    },
+    "openstack_compute_instance_v2": {
+        "id": ("id",),
+        "name": ("name",),
+        "private_ip": ("network", 0, "fixed_ip_v4"),
+        "public_ip": ("access_ip_v4",),
+        "tags": ("metadata",),
+    },
+    "proxmox_vm_qemu": {
+        "id": ("id",),
+        "name": ("name",),
+        "private_ip": ("default_ipv4_address",),
+        "public_ip": ("ssh_host",),
+        "tags": ("tags",),
+    },
+    "proxmox_virtual_environment_vm": {
+        "id": ("vm_id",),
+        "name": ("name",),
+        # La première interface est la boucle locale
+        "private_ip": ("ipv4_addresses", 1, 0),
+        "tags": ("tags",),
+    },
+    "vsphere_virtual_machine": {
+        "id": ("uuid",),
+        "name": ("name",),
+        "private_ip": ("default_ip_address",),
+        "tags": ("tags",),
+    },
+    "nutanix_virtual_machine": {
+        "id": ("id",),
+        "name": ("name",),
+        "private_ip": ("nic_list", 0, "ip_endpoint_list", 0, "ip"),
+        "tags": ("categories",),
+    },
+}
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+class StateError(Exception):
+    """Fichier d'état illisible ou invalide"""
+
+class _Reader:
+    """Lecture d'un document JSON par blocs"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Retourne le prochain caractère significatif ('' en fin de fichier)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, *chars):
+        char = self.peek()
+        if char not in chars:
+            raise StateError(f"'{'/'.join(chars)}' attendu, '{char or 'fin de fichier'}' trouvé")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Décode la valeur suivante, en lisant des blocs jusqu'à ce qu'elle soit complète"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # Un nombre en fin de tampon peut continuer dans le bloc suivant
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise StateError(f"JSON invalide: {e}")
+            self._fill()
+
+    def skip(self, levels=SKIP_LEVELS):
+        """
+        Passe la valeur suivante sans la conserver
+
+        Les conteneurs sont parcourus sur `levels` niveaux : seules les
+        valeurs plus profondes (une ressource de l'état précédent d'un plan,
+        par exemple) sont décodées, puis aussitôt libérées.
+        """
+        char = self.peek()
+        if levels <= 0 or char not in ("{", "["):
+            self.value()
+            return
+        self.expect(char)
+        closing = "}" if char == "{" else "]"
+        if self.peek() == closing:
+            self.expect(closing)
+            return
+        while True:
+            if char == "{":
+                self.value()
+                self.expect(":")
+            self.skip(levels - 1)
+            if self.expect(",", closing) == closing:
+                return
+
+def iter_document(path, arrays=(), skip=()) -> Iterator[Tuple[str, object]]:
+    """
+    Parcourt un document JSON (objet) sans le charger entièrement
+
+    Args:
+        path: Chemin du fichier
+        arrays: Champs de premier niveau (listes) dont les éléments sont
+            retournés un par un
+        skip: Champs de premier niveau ignorés sans être conservés
+
+    Returns:
+        Itérateur de (clé, valeur) pour les autres champs de premier niveau,
+        et de (clé, élément) pour chaque élément des champs de 'arrays'
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key in arrays and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield key, reader.value()
+                        if reader.expect(",", "]") == "]":
+                            break
+            elif key in skip:
+                reader.skip()
+            else:
+                yield key, reader.value()
+
+            if reader.expect(",", "}") == "}":
+                break
+
+def iter_state(path) -> Iterator[Tuple[str, object]]:
+    """
+    Parcourt un fichier d'état sans le charger entièrement
+
+    Args:
+        path: Chemin du fichier terraform.tfstate
+
+    Returns:
+        Itérateur de (clé, valeur) pour les champs de premier niveau, et de
+        ('resource', ressource) pour chaque élément de 'resources'
+    """
+    for key, value in iter_document(path, arrays=("resources",)):
+        yield ("resource" if key == "resources" else key), value
+
+def read_header(path) -> Optional[Tuple[int, str]]:
+    """
+    Lit le serial et le lineage en tête du fichier d'état
+
+    Returns:
+        Tuple (serial, lineage) ou None s'ils ne sont pas dans l'en-tête
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            head = f.read(HEADER_SIZE)
+    except OSError:
+        return None
+    # L'en-tête s'arrête avant les outputs (qui peuvent contenir ces clés)
+    head = head.split('"outputs"', 1)[0]
+    serial = SERIAL_PATTERN.search(head)
+    lineage = LINEAGE_PATTERN.search(head)
+    if not serial or not lineage:
+        return None
+    return int(serial.group(1)), lineage.group(1)
+
+def _lookup(attributes, path):
+    value = attributes
+    for key in path:
+        if isinstance(key, int):
+            if not isinstance(value, list) or len(value) <= key:
+                return None
+        elif not isinstance(value, dict):
+            return None
+        value = value[key] if isinstance(key, int) else value.get(key)
+        if value is None:
+            return None
+    return value
+
+def _address(resource, index_key):
+    address = f"{resource.get('type')}.{resource.get('name')}"
+    if resource.get("module"):
+        address = f"{resource['module']}.{address}"
+    if index_key is not None:
+        address += f'["{index_key}"]' if isinstance(index_key, str) else f"[{index_key}]"
+    return address
+
+def extract_compute(resource) -> List[Dict]:
+    """
+    Extrait les instances d'une ressource de l'état
+
+    Args:
+        resource: Élément de 'resources' du fichier d'état
+
+    Returns:
+        Liste d'instances {name, address, id, private_ip, public_ip, ip, tags, platform}
+        (vide si la ressource n'est pas une ressource de calcul connue)
+    """
+    resource_type = resource.get("type", "")
+    paths = COMPUTE_RESOURCES.get(resource_type)
+    if resource.get("mode", "managed") != "managed" or paths is None:
+        return []
+
+    platform = PLATFORMS.get(resource_type.split("_", 1)[0], "")
+    instances = []
+    for instance in resource.get("instances") or []:
+        attributes = instance.get("attributes") or {}
+        address = _address(resource, instance.get("index_key"))
+        values = {field: _lookup(attributes, path) for field, path in paths.items()}
+        private_ip = values.get("private_ip") or ""
+        public_ip = values.get("public_ip") or ""
+        instances.append({
+            "name": str(values.get("name") or address),
+            "address": address,
+            "id": str(values.get("id") or ""),
+            "private_ip": private_ip,
+            "public_ip": public_ip,
+            "ip": public_ip or private_ip,
+            "tags": values.get("tags") or {},
+            "platform": platform,
+        })
+    return instances
+
+def _simplify_outputs(outputs):
+    return {
+        key: value["value"] if isinstance(value, dict) and "value" in value else value
+        for key, value in (outputs or {}).items()
+    }
+
+def parse_state(path) -> Dict:
+    """
+    Lit un fichier d'état complet (en streaming)
+
+    Args:
+        path: Chemin du fichier terraform.tfstate
+
+    Returns:
+        Dictionnaire {"serial", "lineage", "outputs", "instances", "resources"}
+    """
+    summary = {"serial": None, "lineage": None, "outputs": {}, "instances": [], "resources": 0}
+    names = set()
+
+    for key, value in iter_state(path):
+        if key == "resource":
+            summary["resources"] += 1
+            for instance in extract_compute(value):
+                # Les noms servent de clé dans le registre : ils doivent être uniques
+                if instance["name"] in names:
+                    instance["name"] = instance["address"]
+                names.add(instance["name"])
+                summary["instances"].append(instance)
+        elif key in ("serial", "lineage"):
+            summary[key] = value
+        elif key == "outputs":
+            summary["outputs"] = _simplify_outputs(value)
+
+    return summary
+
+def _load_summary(path):
+    try:
+        with open(path, "r") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get("version") == SUMMARY_VERSION else None
+
+def _save_summary(path, summary):
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tfstate.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(summary, version=SUMMARY_VERSION), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def read_state(deployment_dir) -> Optional[Dict]:
+    """
+    Retourne les outputs et les instances de l'état local d'un déploiement
+
+    Le résumé est mis en cache par serial/lineage : le fichier d'état n'est
+    relu entièrement que si Terraform l'a réécrit.
+
+    Args:
+        deployment_dir: Répertoire du déploiement
+
+    Returns:
+        Dictionnaire {"serial", "lineage", "outputs", "instances", "resources"},
+        ou None si le déploiement n'a pas d'état local (backend distant)
+    """
+    state_path = os.path.join(deployment_dir, STATE_FILE)
+    if not os.path.isfile(state_path):
+        return None
+
+    summary_path = os.path.join(deployment_dir, STATE_SUMMARY_FILE)
+    header = read_header(state_path)
+    if header is not None:
+        cached = _load_summary(summary_path)
+        if cached and (cached.get("serial"), cached.get("lineage")) == header:
+            return cached
+
+    try:
+        summary = parse_state(state_path)
+    except (OSError, UnicodeDecodeError, StateError):
+        return None
+
+    _save_summary(summary_path, summary)
+    return summary
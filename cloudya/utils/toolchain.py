@@ -0,0 +1,213 @@
+"""
+Registre des outils externes (Terraform, Ansible, CLI des providers)
+
+Les exécutables sont résolus avec shutil.which (aucun processus lancé) et
+leur version n'est sondée qu'une seule fois. Les versions sont conservées
+dans ~/.cloudya/toolchain.json avec le chemin réel du binaire et sa
+signature (mtime, taille, inode) : elles ne sont sondées à nouveau que si
+le binaire a été remplacé (mise à jour, autre installation dans le PATH).
+"""
+import os
+import re
+import json
+import shutil
+import subprocess
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+TOOLCHAIN_FILE = "toolchain.json"
+TOOLCHAIN_VERSION = 1
+PROBE_TIMEOUT = 30
+
+# Arguments de sondage de la version (par nom de binaire)
+VERSION_ARGS = {
+    "terraform": ["version", "-json"],
+    "az": ["version", "--output", "json"],
+}
+DEFAULT_VERSION_ARGS = ["--version"]
+
+# Outils affichés par le diagnostic
+KNOWN_TOOLS = ["terraform", "ansible-playbook", "aws", "gcloud", "az", "openstack", "docker", "git"]
+
+VERSION_PATTERN = re.compile(r"(\d+\.\d+(?:\.\d+)?)")
+
+class Tool(NamedTuple):
+    """Outil résolu dans le PATH"""
+    name: str
+    path: str
+    version: Optional[str]
+
+    @property
+    def version_tuple(self) -> Optional[Tuple[int, ...]]:
+        if not self.version:
+            return None
+        return tuple(int(part) for part in self.version.split("."))
+
+_lock = threading.Lock()
+_registry: Optional[Dict] = None
+
+def get_toolchain_file():
+    """
+    Récupère le chemin du fichier du registre des outils
+    """
+    return os.path.join(os.path.expanduser("~/.cloudya"), TOOLCHAIN_FILE)
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+def _load_registry():
+    global _registry
+    if _registry is None:
+        try:
+            with open(get_toolchain_file(), "r") as f:
+                data = json.load(f)
+            _registry = data if data.get("version") == TOOLCHAIN_VERSION else None
+        except (OSError, ValueError):
+            _registry = None
+        if _registry is None:
+            _registry = {"version": TOOLCHAIN_VERSION, "tools": {}}
+    return _registry
+
+def _save_registry():
+    path = get_toolchain_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(_registry, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def parse_version(name, output):
+    """
+    Extrait la version d'un outil de la sortie de son option de version
+
+    Args:
+        name: Nom du binaire
+        output: Sortie de la commande
+
+    Returns:
+        Version (ex: '1.6.0') ou None
+    """
+    text = output.strip()
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+            for key in ("terraform_version", "azure-cli", "version"):
+                if isinstance(data.get(key), str):
+                    text = data[key]
+                    break
+        except ValueError:
+            pass
+
+    match = VERSION_PATTERN.search(text)
+    return match.group(1) if match else None
+
+def _probe_version(name, path):
+    """Lance l'outil pour connaître sa version (une fois par binaire)"""
+    for args in (VERSION_ARGS.get(name), DEFAULT_VERSION_ARGS):
+        if not args:
+            continue
+        try:
+            result = subprocess.run([path] + args, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode == 0:
+            version = parse_version(name, result.stdout or result.stderr)
+            if version:
+                return version
+    return None
+
+def which(command):
+    """
+    Résout un exécutable sans lancer de processus
+
+    Args:
+        command: Nom ou chemin de l'exécutable
+
+    Returns:
+        Chemin absolu ou None
+    """
+    return shutil.which(command)
+
+def is_available(command):
+    """
+    Vérifie si une commande est disponible sur le système
+    """
+    return which(command) is not None
+
+def get_tool(command, name=None, probe=True) -> Optional[Tool]:
+    """
+    Résout un outil et sa version (mise en cache par binaire)
+
+    Args:
+        command: Nom ou chemin de l'exécutable (ex: 'terraform')
+        name: Nom de l'outil si le chemin ne le reflète pas (ex: chemin configuré)
+        probe: Sonder la version si elle n'est pas en cache
+
+    Returns:
+        Tool ou None si l'outil n'est pas installé
+    """
+    global _registry
+
+    path = which(command)
+    if path is None:
+        return None
+
+    name = name or os.path.basename(command)
+    real_path = os.path.realpath(path)
+    try:
+        signature = _signature(real_path)
+    except OSError:
+        return None
+
+    with _lock:
+        registry = _load_registry()
+        cached = registry["tools"].get(real_path)
+        if cached and cached.get("signature") == signature:
+            return Tool(name, path, cached.get("version"))
+
+    if not probe:
+        return Tool(name, path, None)
+
+    # Sondage hors du verrou : la commande peut prendre plusieurs secondes
+    version = _probe_version(name, real_path)
+
+    with _lock:
+        # Relire le fichier : un autre processus a pu y ajouter des outils
+        _registry = None
+        registry = _load_registry()
+        registry["tools"][real_path] = {"name": name, "signature": signature, "version": version}
+        _save_registry()
+
+    return Tool(name, path, version)
+
+def get_version(command) -> Optional[str]:
+    """
+    Retourne la version d'un outil (ou None s'il n'est pas installé)
+    """
+    tool = get_tool(command)
+    return tool.version if tool else None
+
+def list_tools(commands: Optional[List[str]] = None) -> Dict[str, Optional[Tool]]:
+    """
+    Résout plusieurs outils (diagnostic)
+
+    Args:
+        commands: Noms des outils (défaut: KNOWN_TOOLS)
+
+    Returns:
+        Dictionnaire {nom: Tool ou None}
+    """
+    return {command: get_tool(command) for command in (commands or KNOWN_TOOLS)}
+
+def invalidate():
+    """
+    Oublie les versions connues (elles seront sondées à nouveau)
+    """
+    global _registry
+    with _lock:
+        _registry = {"version": TOOLCHAIN_VERSION, "tools": {}}
+        _save_registry()
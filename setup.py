@@ -5,6 +5,7 @@ Installation recommandée : pip install .
 """
 
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
 import os
 
 # Lire le README pour la description longue
@@ -42,6 +43,15 @@ def read_requirements():
         'textual>=0.40.0'
     ]
 
+# Générer le registre des commandes CLI au moment du build
+class BuildPyWithCommandRegistry(build_py):
+    def run(self):
+        super().run()
+        from cloudya.utils.command_registry import write_manifest
+        cli_build_dir = os.path.join(self.build_lib, 'cloudya', 'cli')
+        if os.path.isdir(cli_build_dir):
+            write_manifest(os.path.join(cli_build_dir, 'commands.json'), cli_dir=cli_build_dir)
+
 setup(
     name="cloudya",
     version="1.0.0",
@@ -60,6 +70,7 @@ setup(
     # Configuration des packages
     packages=find_packages(),
     include_package_data=True,
+    cmdclass={'build_py': BuildPyWithCommandRegistry},
     
     # Point d'entrée de la CLI - CORRECT
     entry_points={
@@ -106,6 +117,7 @@ setup(
             'templates/**/*.yaml',
             'config/*.yaml',
             'config/*.yml',
+            'cli/commands.json',
         ],
     },
     
@@ -0,0 +1,93 @@
+"""
+Tests du magasin d'artefacts adressé par contenu
+"""
+import os
+import stat
+
+import pytest
+
+from cloudya.utils import artifacts
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """Template avec configuration Terraform, script exécutable et fichiers réécrits par Cloudya"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    source = tmp_path / "template"
+    (source / "scripts").mkdir(parents=True)
+    (source / "main.tf").write_text('resource "null_resource" "a" {}\n')
+    (source / "scripts" / "setup.sh").write_text("#!/bin/sh\necho setup\n")
+    (source / "scripts" / "setup.sh").chmod(0o755)
+    (source / "files.txt").write_text("data\n")
+    (source / "manifest.yaml").write_text("name: test\n")
+    (source / "terraform.tfvars").write_text('x = "template"\n')
+    return source
+
+def _listing(directory):
+    return sorted(os.path.relpath(os.path.join(root, name), directory)
+                  for root, _dirs, files in os.walk(directory) for name in files)
+
+def test_populate_directory(source, tmp_path):
+    destination = tmp_path / "deployment"
+    methods = artifacts.populate_directory(str(source), str(destination), exclude={"manifest.yaml"})
+
+    # Fichiers réécrits par Cloudya et exclusions : jamais matérialisés
+    assert _listing(destination) == ["files.txt", "main.tf", os.path.join("scripts", "setup.sh")]
+    assert sum(methods.values()) == 3
+    assert (destination / "main.tf").read_text() == (source / "main.tf").read_text()
+    assert os.access(destination / "scripts" / "setup.sh", os.X_OK)
+
+def test_terraform_files_are_never_hardlinked(source, tmp_path):
+    destination = tmp_path / "deployment"
+    artifacts.populate_directory(str(source), str(destination))
+
+    main_tf = destination / "main.tf"
+    assert os.stat(main_tf).st_nlink == 1
+    assert stat.S_IMODE(os.stat(main_tf).st_mode) == 0o644
+    # Réécriture en place (éditeur, terraform fmt) : le magasin n'est pas touché
+    main_tf.write_text("# modifié\n")
+    other = tmp_path / "other"
+    artifacts.populate_directory(str(source), str(other))
+    assert (other / "main.tf").read_text() == (source / "main.tf").read_text()
+
+def test_unchanged_files_are_not_rehashed(source, tmp_path, monkeypatch):
+    artifacts.populate_directory(str(source), str(tmp_path / "first"))
+
+    stored = []
+    original = artifacts.store_file
+
+    def store_file(path, executable=False):
+        stored.append(path)
+        return original(path, executable)
+
+    monkeypatch.setattr(artifacts, "store_file", store_file)
+    artifacts.populate_directory(str(source), str(tmp_path / "second"))
+    assert stored == []
+
+    (source / "files.txt").write_text("new data\n")
+    artifacts.populate_directory(str(source), str(tmp_path / "third"))
+    assert stored == [str(source / "files.txt")]
+    assert (tmp_path / "third" / "files.txt").read_text() == "new data\n"
+    assert (tmp_path / "second" / "files.txt").read_text() == "data\n"
+
+def test_altered_blob_is_replaced(source, tmp_path):
+    manifest = artifacts.ingest_directory(str(source))
+    entry = manifest["files"]["files.txt"]
+    blob = artifacts._blob_path(entry["sha256"])
+
+    # Blob modifié sur place malgré la lecture seule (root, lien physique)
+    os.chmod(blob, 0o644)
+    with open(blob, "w") as f:
+        f.write("corrupted\n")
+
+    destination = tmp_path / "deployment"
+    artifacts.populate_directory(str(source), str(destination))
+    assert (destination / "files.txt").read_text() == "data\n"
+    assert artifacts._hash_file(blob) == entry["sha256"]
+    assert stat.S_IMODE(os.stat(blob).st_mode) == 0o444
+
+def test_identical_files_share_a_blob(source, tmp_path):
+    (source / "copy.txt").write_text("data\n")
+    manifest = artifacts.ingest_directory(str(source))
+    assert manifest["files"]["copy.txt"]["sha256"] == manifest["files"]["files.txt"]["sha256"]
+    # Le bit d'exécution fait partie de l'identité du blob
+    assert artifacts._blob_path("ab" * 32, executable=True) != artifacts._blob_path("ab" * 32)
@@ -0,0 +1,116 @@
+"""
+Tests du protocole du démon Cloudya (socket Unix)
+"""
+import os
+import time
+import shutil
+import signal
+import socket
+import tempfile
+
+import pytest
+
+from cloudya.utils import daemon
+
+pytestmark = pytest.mark.skipif(not daemon.is_supported(), reason="sockets Unix et fork requis")
+
+def test_message_roundtrip_with_descriptors():
+    client, server = socket.socketpair()
+    read_fd, write_fd = os.pipe()
+    try:
+        daemon._send_message(client, b"R", {"argv": ["list"]}, fds=[write_fd])
+        kind, payload, fds = daemon._recv_message(server, max_fds=3)
+        assert (kind, payload) == (b"R", {"argv": ["list"]})
+        assert len(fds) == 1
+
+        # Le descripteur reçu désigne le même tube
+        os.write(fds[0], b"ok")
+        os.close(fds[0])
+        assert os.read(read_fd, 2) == b"ok"
+
+        client.close()
+        assert daemon._recv_message(server) == (None, None, [])
+    finally:
+        for fd in (read_fd, write_fd):
+            os.close(fd)
+        server.close()
+
+def test_peer_credentials(monkeypatch):
+    client, server = socket.socketpair()
+    try:
+        assert daemon.CloudyaDaemon("unused")._peer_allowed(server)
+        if hasattr(socket, "SO_PEERCRED"):
+            # Client d'un autre utilisateur
+            uid = os.getuid()
+            monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+            assert not daemon.CloudyaDaemon("unused")._peer_allowed(server)
+    finally:
+        client.close()
+        server.close()
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Démon (sans préchargement) dont la commande écrit ses arguments dans un fichier"""
+    # Chemin court : les sockets Unix sont limités à ~100 caractères
+    socket_dir = tempfile.mkdtemp(prefix="cy-")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("CLOUDYA_DAEMON_SOCKET", os.path.join(socket_dir, "daemon.sock"))
+    monkeypatch.delenv("CLOUDYA_DAEMON", raising=False)
+    marker = tmp_path / "executed.txt"
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            import cloudya.cli.main as cli_main
+
+            def execute_command(command, args):
+                marker.write_text(" ".join([command] + list(args)))
+                return 3
+
+            cli_main.execute_command = execute_command
+            daemon.CloudyaDaemon().serve_forever()
+        finally:
+            os._exit(0)
+
+    deadline = time.time() + 10
+    while daemon.ping() is None:
+        assert time.time() < deadline, "le démon ne répond pas"
+        time.sleep(0.05)
+
+    yield marker
+
+    os.kill(pid, signal.SIGTERM)
+    os.waitpid(pid, 0)
+    shutil.rmtree(socket_dir, ignore_errors=True)
+
+def _wait_for(path, timeout=5.0):
+    deadline = time.time() + timeout
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    return path.exists()
+
+def test_status(server):
+    status = daemon.ping()
+    assert status["socket"] == os.environ["CLOUDYA_DAEMON_SOCKET"]
+    assert status["requests"] == 0
+
+def test_command_runs_after_ack(server):
+    assert daemon.run_via_daemon(["deploy", "list"]) == 3
+    assert server.read_text() == "deploy list"
+    assert daemon.ping()["requests"] == 1
+
+def test_command_not_run_without_ack(server):
+    # Client passé en autonome après l'envoi de la requête : il ne confirme pas
+    conn = daemon._connect()
+    request = {"argv": ["deploy", "list"], "cwd": os.getcwd(), "env": dict(os.environ)}
+    daemon._send_message(conn, b"R", request, fds=daemon._FDS)
+    kind, payload, _fds = daemon._recv_message(conn)
+    assert kind == b"P" and payload["pid"]
+    conn.close()
+
+    assert not _wait_for(server, timeout=1.0)
+
+def test_disabled_by_environment(server, monkeypatch):
+    monkeypatch.setenv("CLOUDYA_DAEMON", "0")
+    assert daemon.run_via_daemon(["deploy", "list"]) is None
+    assert not server.exists()
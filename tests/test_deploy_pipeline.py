@@ -0,0 +1,131 @@
+"""
+Tests des étapes préalables au plan (credentials, préparation, init)
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cloudya.utils import deploy_pipeline, providers
+
+STAGE_DELAY = 0.2
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Étapes factices qui enregistrent leurs appels"""
+    calls = []
+    state = SimpleNamespace(calls=calls, check=(True, "ok"), prepared="/tmp/dep", terraform_ok=True)
+
+    def check():
+        calls.append("check")
+        time.sleep(STAGE_DELAY)
+        if isinstance(state.check, Exception):
+            raise state.check
+        return state.check
+
+    def prepare_deployment(template_name, params, fingerprint):
+        calls.append(("prepare", template_name, params, fingerprint))
+        time.sleep(STAGE_DELAY / 2)
+        return state.prepared
+
+    def check_terraform():
+        calls.append("check_terraform")
+        return state.terraform_ok
+
+    def terraform_init(deployment_dir, offline):
+        calls.append(("init", deployment_dir, offline))
+        time.sleep(STAGE_DELAY / 2)
+        return True
+
+    monkeypatch.setattr(providers, "fakecloud", SimpleNamespace(check=check), raising=False)
+    monkeypatch.setattr(deploy_pipeline, "prepare_deployment", prepare_deployment)
+    monkeypatch.setattr(deploy_pipeline, "check_terraform", check_terraform)
+    monkeypatch.setattr(deploy_pipeline, "terraform_init", terraform_init)
+    return state
+
+def test_stages_overlap(stages):
+    result = deploy_pipeline.run_stages("fakecloud", "fakecloud/vm", {"size": 1}, fingerprint="f1", offline=True)
+
+    assert result.deployment_dir == "/tmp/dep"
+    assert result.initialized
+    assert (result.provider_ok, result.provider_message) == (True, "ok")
+    assert ("prepare", "fakecloud/vm", {"size": 1}, "f1") in stages.calls
+    assert ("init", "/tmp/dep", True) in stages.calls
+
+    # La vérification tourne pendant la préparation et l'init : la plus longue branche fixe la durée
+    assert set(result.timings) == {"check", "prepare", "init", "total"}
+    assert result.timings["total"] < result.timings["check"] + result.timings["prepare"] + result.timings["init"]
+    assert result.describe_timings().startswith("credentials ")
+    assert "(total " in result.describe_timings()
+
+def test_failed_preparation_skips_init(stages):
+    stages.prepared = None
+    result = deploy_pipeline.run_stages("fakecloud", "fakecloud/vm", {})
+
+    assert result.deployment_dir is None
+    assert not result.initialized
+    assert "check_terraform" not in stages.calls
+    # La vérification du provider est tout de même jointe
+    assert result.provider_ok
+    assert "init" not in result.timings
+
+def test_existing_deployment_is_not_prepared(stages):
+    result = deploy_pipeline.run_stages("fakecloud", "fakecloud/vm", {}, deployment_dir="/tmp/existing")
+
+    assert result.deployment_dir == "/tmp/existing"
+    assert not any(isinstance(call, tuple) and call[0] == "prepare" for call in stages.calls)
+    assert "prepare" not in result.timings
+    assert result.describe_timings().startswith("credentials ")
+
+def test_missing_terraform(stages):
+    stages.terraform_ok = False
+    result = deploy_pipeline.run_stages("fakecloud", "fakecloud/vm", {})
+    assert not result.initialized
+    assert not any(isinstance(call, tuple) and call[0] == "init" for call in stages.calls)
+
+def test_check_failures(stages):
+    stages.check = RuntimeError("connexion refusée")
+    result = deploy_pipeline.run_stages("fakecloud", "fakecloud/vm", {})
+    assert (result.provider_ok, result.provider_message) == (False, "connexion refusée")
+    assert result.initialized
+
+    assert deploy_pipeline.check_provider("nocloud") == (False, "provider non supporté: nocloud")
+
+def _fake_credentials(monkeypatch, module, settings):
+    """Credentials du provider et requêtes HTTP enregistrées (réponse 401)"""
+    requests = []
+
+    def http_check(url, **kwargs):
+        requests.append(kwargs)
+        return False, "HTTP 401"
+
+    name = module.__name__.rsplit(".", 1)[1]
+    monkeypatch.setattr(module, "load_credentials_config", lambda: {name: settings})
+    monkeypatch.setattr(module, "http_check", http_check)
+    return requests
+
+def test_unverifiable_credentials_fail_check(monkeypatch):
+    from cloudya.utils.providers import nutanix, proxmox
+
+    monkeypatch.delenv("NUTANIX_PASSWORD", raising=False)
+    for module, settings in ((proxmox, {"host": "pve", "username": "root@pam"}),
+                             (nutanix, {"host": "prism", "username": "admin"})):
+        requests = _fake_credentials(monkeypatch, module, settings)
+        # Sans token ni mot de passe : échec, pour que connect() soit proposé
+        ok, _message = module.check()
+        assert not ok
+        assert requests == []
+
+def test_credentials_checked_when_available(monkeypatch):
+    from cloudya.utils.providers import nutanix, proxmox
+
+    monkeypatch.setenv("NUTANIX_PASSWORD", "secret")
+    requests = _fake_credentials(monkeypatch, proxmox,
+                                 {"host": "pve", "username": "root@pam", "token_name": "t", "token_value": "v"})
+    assert proxmox.check() == (False, "HTTP 401")
+    # Seul le code 200 est accepté (valeur par défaut de http_check)
+    assert requests == [{"verify": True, "headers": {"Authorization": "PVEAPIToken=root@pam!t=v"}}]
+
+    requests = _fake_credentials(monkeypatch, nutanix, {"host": "prism", "username": "admin", "verify_ssl": False})
+    assert nutanix.check() == (False, "HTTP 401")
+    assert requests == [{"verify": False, "auth": ("admin", "secret")}]
@@ -0,0 +1,99 @@
+"""
+Tests du journal des événements d'un déploiement
+"""
+import json
+
+import pytest
+
+from cloudya.utils import deployment_journal as journal
+from cloudya.utils import deployment_registry as registry
+
+@pytest.fixture
+def deployment_dir(tmp_path, monkeypatch):
+    """Déploiement avec un instantané initial, registre dans un HOME temporaire"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    deployment_dir = tmp_path / "dep-a"
+    deployment_dir.mkdir()
+    (deployment_dir / journal.METADATA_FILE).write_text(json.dumps({"id": "dep-a", "status": "created"}))
+    yield str(deployment_dir)
+    journal.flush()
+
+def test_status_events_replayed_over_snapshot(deployment_dir):
+    journal.append(deployment_dir, {"type": "status", "status": "planning"})
+    journal.append(deployment_dir, {"type": "update", "fields": {"outputs": {"ip": "10.0.0.1"}}})
+    journal.flush()
+
+    state, offset, pending = journal.load(deployment_dir)
+    assert state["status"] == "planning"
+    assert state["outputs"] == {"ip": "10.0.0.1"}
+    assert pending == 2
+    assert offset == len(open(journal.get_journal_file(deployment_dir), "rb").read())
+    # L'instantané lui-même n'est pas réécrit
+    assert journal.read_snapshot(deployment_dir)["status"] == "created"
+
+def test_compaction_moves_journal_offset(deployment_dir, monkeypatch):
+    monkeypatch.setattr(journal, "COMPACT_EVENTS", 3)
+
+    for status in ("initializing", "planning"):
+        registry.update(deployment_dir, {"status": status})
+    assert "journal_offset" not in journal.read_snapshot(deployment_dir)
+
+    registry.update(deployment_dir, {"status": "applying"})
+    snapshot = journal.read_snapshot(deployment_dir)
+    assert snapshot["status"] == "applying"
+    assert snapshot["journal_offset"] == len(open(journal.get_journal_file(deployment_dir), "rb").read())
+    assert journal.load(deployment_dir)[2] == 0
+
+    # Les événements suivants sont rejoués à partir de la position compactée
+    registry.update(deployment_dir, {"status": "deployed"})
+    state, _offset, pending = journal.load(deployment_dir)
+    assert (state["status"], pending) == ("deployed", 1)
+
+def test_field_update_rewrites_snapshot(deployment_dir):
+    registry.update(deployment_dir, {"params": {"size": "small"}, "status": "updated"})
+    snapshot = journal.read_snapshot(deployment_dir)
+    assert snapshot["params"] == {"size": "small"}
+    assert snapshot["status"] == "updated"
+    assert journal.load(deployment_dir)[2] == 0
+
+def test_torn_line_ignored_and_terminated(deployment_dir):
+    journal.append(deployment_dir, {"type": "status", "status": "planning"}, sync=True)
+    journal.flush()
+    # Arrêt brutal au milieu d'une écriture
+    with open(journal.get_journal_file(deployment_dir), "ab") as f:
+        f.write(b'{"type":"status","sta')
+
+    state, _offset, pending = journal.load(deployment_dir)
+    assert (state["status"], pending) == ("planning", 1)
+
+    # La réouverture termine la ligne interrompue : l'événement suivant reste lisible
+    journal.append(deployment_dir, {"type": "status", "status": "deployed"}, sync=True)
+    journal.flush()
+    state, _offset, pending = journal.load(deployment_dir)
+    assert (state["status"], pending) == ("deployed", 2)
+
+def _write_events(deployment_dir, events):
+    with open(journal.get_journal_file(deployment_dir), "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+def test_history_durations_use_monotonic_clock(deployment_dir):
+    # Horloge murale reculée entre deux phases : la durée vient de l'horloge monotone
+    _write_events(deployment_dir, [
+        {"type": "status", "status": "planning", "at": "2024-01-01T10:00:00", "mono": 100.0, "boot": "b1"},
+        {"type": "update", "fields": {"plan": "x"}, "at": "2024-01-01T09:00:00", "mono": 101.0, "boot": "b1"},
+        {"type": "status", "status": "applying", "at": "2024-01-01T09:00:05", "mono": 105.5, "boot": "b1"},
+        {"type": "update", "fields": {"status": "deployed"}, "at": "2024-01-01T09:01:05", "mono": 165.5, "boot": "b1"},
+    ])
+    assert journal.history(deployment_dir) == [
+        {"at": "2024-01-01T10:00:00", "status": "planning", "duration": 5.5},
+        {"at": "2024-01-01T09:00:05", "status": "applying", "duration": 60.0},
+        {"at": "2024-01-01T09:01:05", "status": "deployed", "duration": None},
+    ]
+
+def test_history_durations_across_reboot(deployment_dir):
+    _write_events(deployment_dir, [
+        {"type": "status", "status": "applying", "at": "2024-01-01T10:00:00", "mono": 500.0, "boot": "b1"},
+        {"type": "status", "status": "failed", "at": "2024-01-01T10:02:00", "mono": 3.0, "boot": "b2"},
+    ])
+    assert [entry["duration"] for entry in journal.history(deployment_dir)] == [120.0, None]
@@ -0,0 +1,137 @@
+"""
+Tests du registre local des déploiements
+"""
+import os
+import json
+import datetime
+
+import pytest
+
+from cloudya.utils import deployment_journal
+from cloudya.utils import deployment_registry as registry
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    """Racine des déploiements Terraform et registre dans un HOME temporaire"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    root = tmp_path / "deployments"
+    root.mkdir()
+    monkeypatch.setattr(registry, "get_root", lambda kind: str(root))
+    yield root
+    deployment_journal.flush()
+
+def _create(root, deployment_id, status="deployed", template="aws/vpc", created_at=None, **fields):
+    """Crée un déploiement (metadata.json) sans passer par le registre"""
+    deployment_dir = root / deployment_id
+    deployment_dir.mkdir()
+    metadata = {
+        "id": deployment_id,
+        "template": template,
+        "status": status,
+        "created_at": created_at or datetime.datetime.now().isoformat(),
+        **fields
+    }
+    (deployment_dir / registry.METADATA_FILE).write_text(json.dumps(metadata))
+    return deployment_dir
+
+def _touch(root):
+    """Avance la date de la racine (horloge grossière de certains systèmes de fichiers)"""
+    stat = os.stat(root)
+    os.utime(root, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def _ids(deployments):
+    return [deployment["id"] for deployment in deployments]
+
+def test_sync_adds_and_removes_deployments(root):
+    _create(root, "dep-a")
+    _create(root, "dep-b")
+    assert registry.sync(registry.TERRAFORM) == {"added": 2, "updated": 0, "removed": 0}
+    # Racine inchangée : rien à relire
+    assert registry.sync(registry.TERRAFORM) == {"added": 0, "updated": 0, "removed": 0}
+
+    (root / "dep-a" / registry.METADATA_FILE).unlink()
+    (root / "dep-a").rmdir()
+    _touch(root)
+    assert registry.sync(registry.TERRAFORM)["removed"] == 1
+    assert _ids(registry.list_deployments(registry.TERRAFORM)) == ["dep-b"]
+
+def test_full_sync_rereads_manual_edits(root):
+    deployment_dir = _create(root, "dep-a", status="deployed")
+    registry.sync(registry.TERRAFORM)
+
+    metadata_path = deployment_dir / registry.METADATA_FILE
+    metadata = json.loads(metadata_path.read_text())
+    metadata["status"] = "destroyed"
+    metadata_path.write_text(json.dumps(metadata, indent=2))
+
+    # Seul un rescan complet relit les fichiers modifiés sur place
+    assert registry.list_deployments(registry.TERRAFORM)[0]["status"] == "deployed"
+    assert registry.sync(registry.TERRAFORM, full=True)["updated"] == 1
+    assert registry.list_deployments(registry.TERRAFORM)[0]["status"] == "destroyed"
+
+def test_moved_directory_keeps_a_single_row(root):
+    _create(root, "dep-a")
+    registry.sync(registry.TERRAFORM)
+
+    os.rename(root / "dep-a", root / "renamed")
+    _touch(root)
+    stats = registry.sync(registry.TERRAFORM)
+    assert stats["removed"] == 0
+
+    matches = registry.find_by_prefix(registry.TERRAFORM, "dep")
+    assert matches == [{"id": "dep-a", "dir": str(root / "renamed"), "status": "deployed"}]
+
+def test_list_filters(root):
+    old = (datetime.datetime.now() - datetime.timedelta(days=10)).isoformat()
+    _create(root, "dep-old", template="aws/vpc", created_at=old)
+    _create(root, "dep-gcp", template="gcp/vm", status="failed")
+    _create(root, "dep-aws", template="aws/ec2")
+
+    assert _ids(registry.list_deployments(registry.TERRAFORM, status="failed")) == ["dep-gcp"]
+    assert _ids(registry.list_deployments(registry.TERRAFORM, provider="aws")) == ["dep-old", "dep-aws"]
+    recent = registry.list_deployments(registry.TERRAFORM, since=registry.parse_since("7d"))
+    assert sorted(_ids(recent)) == ["dep-aws", "dep-gcp"]
+    assert _ids(registry.list_deployments(registry.TERRAFORM, limit=1)) == ["dep-aws"]
+
+def test_parse_since():
+    assert registry.parse_since("2024-01-02") == "2024-01-02T00:00:00"
+    assert registry.parse_since("3x") is None
+    assert registry.parse_since("") is None
+    assert registry.parse_since("2h") < datetime.datetime.now().isoformat()
+
+def test_prefix_lookup(root):
+    _create(root, "abc-1")
+    _create(root, "abc-2")
+    _create(root, "abd-1")
+
+    assert _ids(registry.find_by_prefix(registry.TERRAFORM, "abc")) == ["abc-1", "abc-2"]
+    assert registry.find_by_prefix(registry.TERRAFORM, "") == []
+    # Préfixe unique, ambigu ou ID complet
+    assert registry.resolve_dir(registry.TERRAFORM, "abd") == str(root / "abd-1")
+    assert registry.resolve_dir(registry.TERRAFORM, "ab") is None
+    assert registry.resolve_dir(registry.TERRAFORM, "abc-2") == str(root / "abc-2")
+
+def test_find_by_fingerprint(root):
+    old = (datetime.datetime.now() - datetime.timedelta(hours=1)).isoformat()
+    _create(root, "dep-old", fingerprint="f1", created_at=old)
+    _create(root, "dep-new", fingerprint="f1")
+    _create(root, "dep-failed", fingerprint="f2", status="failed")
+
+    match = registry.find_by_fingerprint(registry.TERRAFORM, "f1")
+    assert match["id"] == "dep-new"
+    assert match["metadata"]["fingerprint"] == "f1"
+    # Seuls les déploiements actifs sont réutilisables par défaut
+    assert registry.find_by_fingerprint(registry.TERRAFORM, "f2") is None
+    assert registry.find_by_fingerprint(registry.TERRAFORM, "f2", statuses=("failed",))["id"] == "dep-failed"
+    assert registry.find_by_fingerprint(registry.TERRAFORM, None) is None
+
+def test_update_records_status_and_instances(root):
+    deployment_dir = _create(root, "dep-a", status="planning",
+                             outputs={"web": {"ip": "10.0.0.1", "id": "i-1"}})
+    registry.sync(registry.TERRAFORM)
+    assert registry.list_instances() == []
+
+    assert registry.update(str(deployment_dir), {"status": "deployed"})
+    instances = registry.list_instances(platform="AWS")
+    assert [(instance["name"], instance["ip"]) for instance in instances] == [("web", "10.0.0.1")]
+    assert registry.list_deployments(registry.TERRAFORM, status="deployed")[0]["id"] == "dep-a"
@@ -0,0 +1,118 @@
+"""
+Tests du résumé des plans Terraform exportés
+"""
+import json
+
+import pytest
+
+from cloudya.utils import plan_summary, tfstate
+
+def _change(address, actions, module=None, reason=None, replace_paths=None):
+    resource_type = address.split(".")[-2]
+    change = {
+        "address": address,
+        "type": resource_type,
+        "change": {"actions": actions},
+    }
+    if module:
+        change["module_address"] = module
+    if reason:
+        change["action_reason"] = reason
+    if replace_paths:
+        change["change"]["replace_paths"] = replace_paths
+    return change
+
+@pytest.fixture
+def plan_path(tmp_path, monkeypatch):
+    """Export JSON d'un plan, lu par petits blocs"""
+    monkeypatch.setattr(tfstate, "CHUNK_SIZE", 16)
+    path = tmp_path / plan_summary.PLAN_JSON_FILE
+    path.write_text(json.dumps({
+        "format_version": "1.2",
+        "terraform_version": "1.7.0",
+        "planned_values": {"root_module": {"resources": [{"values": {"big": "x" * 500}}]}},
+        "resource_changes": [
+            _change("aws_instance.web", ["create"]),
+            _change("aws_instance.db", ["delete", "create"], reason="replace_because_cannot_update",
+                    replace_paths=[["ami"], ["network_interface", 0]]),
+            _change("module.net.aws_subnet.a", ["update"], module="module.net"),
+            _change("module.net.aws_subnet.b", ["delete"], module="module.net"),
+            _change("aws_vpc.main", ["no-op"]),
+            _change("data.aws_ami.ubuntu", ["read"]),
+        ],
+        "output_changes": {
+            "ip": {"actions": ["update"]},
+            "name": {"actions": ["no-op"]},
+        },
+        "prior_state": {"values": {"root_module": {}}},
+        "configuration": {"provider_config": {"aws": {"name": "aws"}}},
+        "errored": False,
+    }))
+    return str(path)
+
+def test_change_action():
+    assert plan_summary.change_action(["create", "delete"]) == "replace"
+    assert plan_summary.change_action(["delete", "create"]) == "replace"
+    assert plan_summary.change_action(["no-op"]) == "noop"
+    assert plan_summary.change_action(None) == "noop"
+    assert plan_summary.change_action(["update"]) == "update"
+
+def test_summarize_counts(plan_path):
+    summary = plan_summary.summarize(plan_path)
+
+    assert summary["terraform_version"] == "1.7.0"
+    assert summary["total"] == 6
+    assert summary["actions"] == {"create": 1, "replace": 1, "update": 1, "delete": 1, "noop": 1, "read": 1}
+    # Les ressources inchangées ne sont comptées ni par type ni par module
+    assert summary["types"] == {
+        "aws_instance": {"create": 1, "replace": 1},
+        "aws_subnet": {"update": 1, "delete": 1},
+        "aws_ami": {"read": 1},
+    }
+    assert summary["modules"][plan_summary.ROOT_MODULE] == {"create": 1, "replace": 1, "read": 1}
+    assert summary["modules"]["module.net"] == {"update": 1, "delete": 1}
+    assert summary["outputs"] == 1
+    assert summary["errored"] is False
+
+def test_summarize_destructive_changes(plan_path, monkeypatch):
+    summary = plan_summary.summarize(plan_path)
+    assert summary["destructive_count"] == 2
+    assert summary["destructive"][0] == {
+        "address": "aws_instance.db",
+        "type": "aws_instance",
+        "module": plan_summary.ROOT_MODULE,
+        "action": "replace",
+        "reason": "replace_because_cannot_update",
+        "paths": ["ami", "network_interface.0"],
+    }
+
+    # La liste est bornée, le compte reste exact
+    monkeypatch.setattr(plan_summary, "MAX_DESTRUCTIVE", 1)
+    summary = plan_summary.summarize(plan_path)
+    assert (len(summary["destructive"]), summary["destructive_count"]) == (1, 2)
+
+def test_iter_changes_filters(plan_path):
+    def addresses(**filters):
+        return [change["address"] for change in plan_summary.iter_changes(plan_path, **filters)]
+
+    assert len(addresses()) == 6
+    assert addresses(action="delete") == ["module.net.aws_subnet.b"]
+    assert addresses(resource_type="aws_instance") == ["aws_instance.web", "aws_instance.db"]
+    assert addresses(module="module.net", action="update") == ["module.net.aws_subnet.a"]
+    assert addresses(module=plan_summary.ROOT_MODULE, action="noop") == ["aws_vpc.main"]
+
+def test_load_summary_cached_by_export(plan_path, tmp_path):
+    deployment_dir = str(tmp_path)
+    summary = plan_summary.load_summary(deployment_dir)
+    assert summary["total"] == 6
+    cached = json.loads((tmp_path / plan_summary.PLAN_SUMMARY_FILE).read_text())
+    assert cached["version"] == plan_summary.SUMMARY_VERSION
+
+    # Nouvel export : le résumé est recalculé
+    with open(plan_path, "w") as f:
+        json.dump({"terraform_version": "1.8.0", "resource_changes": []}, f)
+    summary = plan_summary.load_summary(deployment_dir)
+    assert (summary["terraform_version"], summary["total"]) == ("1.8.0", 0)
+
+def test_load_summary_without_export(tmp_path):
+    assert plan_summary.load_summary(str(tmp_path)) is None
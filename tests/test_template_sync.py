@@ -0,0 +1,75 @@
+"""
+Tests de la synchronisation des dépôts de templates (serveur HTTP local)
+"""
+import json
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+from cloudya.template_sync import TemplateSync
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def repository(tmp_path):
+    """Dépôt publié par un serveur HTTP statique local"""
+    root = tmp_path / "repo"
+    (root / "terraform" / "aws").mkdir(parents=True)
+    (root / "terraform" / "aws" / "vpc.tf").write_text('resource "aws_vpc" "main" {}\n')
+    (root / "apps").mkdir()
+    (root / "apps" / "wordpress.yml").write_text("name: wordpress\n")
+    (tmp_path / "secret.tf").write_text("hors du dépôt\n")
+
+    def publish(files):
+        (root / "index.json").write_text(json.dumps({"files": files}))
+
+    publish(["terraform/aws/vpc.tf", "apps/wordpress.yml"])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield {"name": "local", "url": f"http://127.0.0.1:{server.server_address[1]}"}, publish
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _syncer(tmp_path):
+    return TemplateSync(tmp_path / "templates", tmp_path / "cache" / "sync-state.json", workers=2)
+
+def test_fresh_download(tmp_path, repository):
+    repo, _publish = repository
+    [stats] = _syncer(tmp_path).sync([repo])
+
+    assert stats["downloaded"] == 2
+    assert stats["failed"] == 0
+    assert stats["bytes"] > 0
+    assert (tmp_path / "templates" / "terraform" / "aws" / "vpc.tf").read_text() == 'resource "aws_vpc" "main" {}\n'
+    assert (tmp_path / "templates" / "apps" / "wordpress.yml").read_text() == "name: wordpress\n"
+
+def test_unchanged_rerun(tmp_path, repository):
+    repo, _publish = repository
+    _syncer(tmp_path).sync([repo])
+
+    # Nouvelle instance : les validateurs sont relus depuis le fichier d'état
+    [stats] = _syncer(tmp_path).sync([repo])
+
+    assert stats["unchanged"] == 2
+    assert stats["downloaded"] == 0
+    assert stats["bytes"] == 0
+
+def test_rejects_parent_paths(tmp_path, repository):
+    repo, publish = repository
+    publish(["../secret.tf", "terraform/../../secret.tf", "/etc/passwd", "apps/wordpress.yml"])
+
+    [stats] = _syncer(tmp_path).sync([repo])
+
+    assert stats["failed"] == 3
+    assert stats["downloaded"] == 1
+    assert len([error for error in stats["errors"] if "chemin refusé" in error]) == 3
+    assert (tmp_path / "secret.tf").read_text() == "hors du dépôt\n"
+    assert sorted(p.name for p in (tmp_path / "templates").rglob("*") if p.is_file()) == ["wordpress.yml"]
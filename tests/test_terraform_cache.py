@@ -0,0 +1,140 @@
+"""
+Tests du cache d'initialisation Terraform
+"""
+import os
+
+import pytest
+
+from cloudya.utils import terraform_cache
+
+PROVIDER_DIR = os.path.join("providers", "registry.terraform.io", "hashicorp", "aws", "5.0.0", "linux_amd64")
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(terraform_cache, "get_cache_dir", lambda: str(cache_dir))
+    return cache_dir
+
+def _template(directory):
+    """Configuration avec un module local, qui appelle lui-même un module local"""
+    (directory / "modules" / "net" / "sub").mkdir(parents=True)
+    (directory / "main.tf").write_text('module "net" {\n  source = "./modules/net"\n}\n')
+    (directory / "modules" / "net" / "main.tf").write_text('module "sub" {\n  source = "./sub"\n}\n')
+    (directory / "modules" / "net" / "sub" / "main.tf").write_text('resource "null_resource" "a" {}\n')
+    (directory / terraform_cache.LOCK_FILE).write_text('provider "registry.terraform.io/hashicorp/aws" {}\n')
+    return directory
+
+def _initialized(directory, plugin_cache):
+    """Déploiement tel que laissé par `terraform init` (providers liés au cache des plugins)"""
+    _template(directory)
+    binary = plugin_cache / "terraform-provider-aws"
+    binary.parent.mkdir(parents=True, exist_ok=True)
+    binary.write_text("binary")
+    provider_dir = directory / terraform_cache.TERRAFORM_DIR / PROVIDER_DIR
+    provider_dir.parent.mkdir(parents=True)
+    os.symlink(str(binary.parent), str(provider_dir))
+    modules = directory / terraform_cache.TERRAFORM_DIR / "modules"
+    (modules / "remote" / "nested").mkdir(parents=True)
+    (modules / "modules.json").write_text('{"Modules": []}')
+    (modules / "remote" / "nested" / "main.tf").write_text("# module distant\n")
+    return directory
+
+def test_cache_key_inputs(tmp_path):
+    directory = _template(tmp_path / "tpl")
+    key = terraform_cache.cache_key(str(directory), (1, 7, 0))
+    assert terraform_cache.cache_key(str(directory), (1, 7, 0)) == key
+    assert terraform_cache.cache_key(str(directory), (1, 8, 0)) != key
+
+    # Fichiers hors configuration : sans effet
+    (directory / "README.md").write_text("doc")
+    (directory / "modules" / "net" / "notes.txt").write_text("notes")
+    assert terraform_cache.cache_key(str(directory), (1, 7, 0)) == key
+
+    changes = [
+        (directory / terraform_cache.LOCK_FILE, 'provider "registry.terraform.io/hashicorp/aws" { version = "5.1.0" }\n'),
+        (directory / "variables.tf", 'variable "x" {}\n'),
+        (directory / "modules" / "net" / "main.tf", 'module "sub" {\n  source = "./sub"\n}\n# changé\n'),
+        (directory / "modules" / "net" / "sub" / "main.tf", 'resource "null_resource" "b" {}\n'),
+    ]
+    keys = {key}
+    for path, content in changes:
+        path.write_text(content)
+        keys.add(terraform_cache.cache_key(str(directory), (1, 7, 0)))
+    assert len(keys) == len(changes) + 1
+
+def test_cache_key_json_module_source(tmp_path):
+    directory = tmp_path / "tpl"
+    (directory / "mod").mkdir(parents=True)
+    (directory / "main.tf.json").write_text('{"module": {"m": {"source": "./mod"}}}')
+    (directory / "mod" / "main.tf").write_text("# v1\n")
+    key = terraform_cache.cache_key(str(directory))
+    (directory / "mod" / "main.tf").write_text("# v2\n")
+    assert terraform_cache.cache_key(str(directory)) != key
+
+def test_save_and_restore(tmp_path, cache_dir):
+    source = _initialized(tmp_path / "dep1", tmp_path / "plugins")
+    key = terraform_cache.cache_key(str(source))
+    assert terraform_cache.cached_lock_file(key) is None
+
+    assert terraform_cache.save(str(source), key)
+    # Entrée déjà présente
+    assert not terraform_cache.save(str(source), key)
+    assert terraform_cache.cached_lock_file(key) == str(cache_dir / "init" / key / terraform_cache.LOCK_FILE)
+
+    target = _template(tmp_path / "dep2")
+    (target / terraform_cache.LOCK_FILE).unlink()
+    assert terraform_cache.restore(str(target), key)
+
+    restored = target / terraform_cache.TERRAFORM_DIR
+    assert os.readlink(restored / PROVIDER_DIR) == str(tmp_path / "plugins")
+    assert (target / terraform_cache.LOCK_FILE).read_text() == (source / terraform_cache.LOCK_FILE).read_text()
+    # Modules : fichiers profonds liés, fichiers de premier niveau copiés
+    cached_modules = cache_dir / "init" / key / terraform_cache.TERRAFORM_DIR / "modules"
+    assert os.path.samefile(restored / "modules" / "remote" / "nested" / "main.tf",
+                            cached_modules / "remote" / "nested" / "main.tf")
+    assert not os.path.samefile(restored / "modules" / "modules.json", cached_modules / "modules.json")
+
+    # Déjà initialisé : rien à restaurer
+    assert not terraform_cache.restore(str(target), key)
+
+def test_restore_drops_entry_with_broken_provider_links(tmp_path, cache_dir):
+    source = _initialized(tmp_path / "dep1", tmp_path / "plugins")
+    key = terraform_cache.cache_key(str(source))
+    terraform_cache.save(str(source), key)
+
+    (tmp_path / "plugins" / "terraform-provider-aws").unlink()
+    (tmp_path / "plugins").rmdir()
+    target = _template(tmp_path / "dep2")
+    assert not terraform_cache.restore(str(target), key)
+    assert not (cache_dir / "init" / key).exists()
+    assert not (target / terraform_cache.TERRAFORM_DIR).exists()
+
+def test_save_skips_remote_backend(tmp_path, cache_dir):
+    source = _initialized(tmp_path / "dep1", tmp_path / "plugins")
+    (source / terraform_cache.TERRAFORM_DIR / "terraform.tfstate").write_text('{"backend": {"type": "s3"}}')
+    key = terraform_cache.cache_key(str(source))
+    assert not terraform_cache.save(str(source), key)
+    assert not (cache_dir / "init" / key).exists()
+
+def test_declares_backend(tmp_path):
+    directory = _template(tmp_path / "tpl")
+    assert not terraform_cache.declares_backend(str(directory))
+
+    (directory / "backend.tf").write_text('terraform {\n  backend "s3" {\n    bucket = "b"\n  }\n}\n')
+    assert terraform_cache.declares_backend(str(directory))
+
+    (directory / "backend.tf").unlink()
+    (directory / "cloud.tf.json").write_text('{"terraform": [{\n  "cloud": {"organization": "o"}\n}]}')
+    assert terraform_cache.declares_backend(str(directory))
+
+def test_count_providers():
+    lines = [
+        "Initializing provider plugins...",
+        "- Using hashicorp/aws v5.0.0 from the shared cache directory",
+        "- Installing hashicorp/random v3.6.0...",
+        "- Installed hashicorp/random v3.6.0 (signed by HashiCorp)",
+    ]
+    assert terraform_cache.count_providers(lines) == (1, 1)
+    assert terraform_cache.count_providers(lines, offline=True) == (2, 0)
+    assert terraform_cache.hit_rate({"hits": 3, "misses": 1}) == 0.75
+    assert terraform_cache.hit_rate({"hits": 0, "misses": 0}) is None
@@ -0,0 +1,105 @@
+"""
+Tests de l'ordonnancement des vérifications de dérive
+"""
+import time
+import datetime
+import threading
+
+import pytest
+
+from cloudya.utils import terraform_drift
+from cloudya.utils.terraform_drift import DriftCheck
+
+@pytest.fixture
+def drift_file(tmp_path, monkeypatch):
+    path = tmp_path / terraform_drift.DRIFT_FILE
+    monkeypatch.setattr(terraform_drift, "get_drift_file", lambda: str(path))
+    monkeypatch.setattr(terraform_drift, "get_limits", lambda: (8, 3))
+    return path
+
+class FakeTerraform:
+    """Remplace check_drift et mesure la concurrence par provider"""
+
+    def __init__(self, duration=0.05):
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+        self.checked = []
+
+    def __call__(self, check):
+        with self.lock:
+            self.active[check.provider] = self.active.get(check.provider, 0) + 1
+            self.peak[check.provider] = max(self.peak.get(check.provider, 0), self.active[check.provider])
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+            self.checked.append(check.deployment_id)
+        time.sleep(self.duration)
+        with self.lock:
+            self.active[check.provider] -= 1
+        check.status = "drifted" if check.deployment_id.endswith("-0") else "in_sync"
+        check.drift = [{"address": "aws_instance.web"}] if check.status == "drifted" else []
+        check.duration = self.duration
+        check.checked_at = datetime.datetime.now().isoformat()
+        return check
+
+def _checks(provider, count):
+    return [DriftCheck(f"{provider}-{index}", f"/tmp/{provider}-{index}", f"{provider}/vm", provider)
+            for index in range(count)]
+
+def test_per_provider_limit(drift_file, monkeypatch):
+    fake = FakeTerraform()
+    monkeypatch.setattr(terraform_drift, "check_drift", fake)
+
+    checks = _checks("aws", 6) + _checks("gcp", 3)
+    terraform_drift.run_checks(checks, workers=4, per_provider=2)
+
+    assert sorted(fake.checked) == sorted(check.deployment_id for check in checks)
+    assert fake.peak == {"aws": 2, "gcp": 2}
+    # Les providers se partagent les workers : gcp n'attend pas la fin d'aws
+    assert fake.peak_total == 4
+
+def test_total_worker_limit(drift_file, monkeypatch):
+    fake = FakeTerraform()
+    monkeypatch.setattr(terraform_drift, "check_drift", fake)
+
+    checks = _checks("aws", 3) + _checks("gcp", 3) + _checks("azure", 3)
+    terraform_drift.run_checks(checks, workers=2, per_provider=5)
+    assert fake.peak_total == 2
+
+def test_cached_checks_skipped_and_results_saved(drift_file, monkeypatch):
+    fake = FakeTerraform(duration=0)
+    monkeypatch.setattr(terraform_drift, "check_drift", fake)
+
+    cached = DriftCheck("old", "/tmp/old", "aws/vm", "aws")
+    cached.load({"status": "in_sync", "checked_at": "2024-01-01T00:00:00", "duration": 1.0})
+    checks = _checks("aws", 2) + [cached]
+    reported = []
+
+    report = terraform_drift.run_checks(checks, progress=reported.append)
+
+    assert fake.checked == ["aws-0", "aws-1"]
+    assert [check.deployment_id for check in reported] == ["aws-0", "aws-1"]
+    # Dérives d'abord, puis déploiements à jour (les plus longs d'abord)
+    assert [check.deployment_id for check in report] == ["aws-0", "old", "aws-1"]
+    results = terraform_drift.load_results()
+    assert set(results) == {"aws-0", "aws-1"}
+    assert results["aws-0"]["status"] == "drifted"
+
+def test_select_checks_reuses_recent_results(drift_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(terraform_drift.deployment_registry, "resolve_dir",
+                        lambda kind, deployment_id: None if deployment_id == "gone" else str(tmp_path / deployment_id))
+    now = datetime.datetime.now()
+    terraform_drift.save_results({
+        "recent": {"status": "drifted", "checked_at": now.isoformat(), "drift": [{"address": "a"}]},
+        "stale": {"status": "in_sync", "checked_at": (now - datetime.timedelta(days=1)).isoformat()},
+    })
+    deployments = [{"id": name, "template": "aws/vm"} for name in ("recent", "stale", "never", "gone")]
+
+    checks = terraform_drift.select_checks(deployments, max_age="6h")
+    # Jamais vérifiés puis plus anciens en premier ; résultats récents repris
+    assert [(check.deployment_id, check.cached) for check in checks] == [
+        ("never", False), ("stale", False), ("recent", True)]
+    assert checks[-1].status == "drifted" and checks[-1].provider == "aws"
+
+    assert not any(check.cached for check in terraform_drift.select_checks(deployments, force=True))
@@ -0,0 +1,133 @@
+"""
+Tests de l'exécution de Terraform en streaming
+"""
+import os
+import sys
+import json
+import stat
+
+from cloudya.utils.terraform_events import VISIBLE_RESOURCES, TerraformEventStream, run_streaming
+
+def _fake_terraform(tmp_path):
+    """Terraform factice qui enregistre ses arguments dans argv.txt"""
+    script = tmp_path / "terraform"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "with open('argv.txt', 'w') as f:\n"
+        "    f.write('\\n'.join(sys.argv[1:]))\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+def _run(tmp_path, args, json_ui):
+    terraform_path = _fake_terraform(tmp_path)
+    result = run_streaming(terraform_path, args, str(tmp_path), "test", json_ui=json_ui, log_file=None, live=False)
+    assert result.returncode == 0
+    return (tmp_path / "argv.txt").read_text().split("\n")
+
+def test_saved_plan_apply_flag_before_plan_file(tmp_path):
+    argv = _run(tmp_path, ["apply", "-input=false", "-auto-approve", "-parallelism=10", "tfplan"], json_ui=True)
+    assert argv == ["apply", "-json", "-input=false", "-auto-approve", "-parallelism=10", "tfplan"]
+    assert argv[-1] == "tfplan"
+
+def test_no_color_without_json_ui(tmp_path):
+    argv = _run(tmp_path, ["apply", "-input=false", "tfplan"], json_ui=False)
+    assert argv == ["apply", "-no-color", "-input=false", "tfplan"]
+
+def _event(event_type, message="", **fields):
+    return json.dumps(dict({"type": event_type, "@message": message}, **fields))
+
+def _hook(address, action, **fields):
+    return dict({"resource": {"addr": address}, "action": action}, **fields)
+
+def test_apply_events():
+    stream = TerraformEventStream("apply")
+    for line in [
+        _event("planned_change", "aws_instance.web: Plan to create", change=_hook("aws_instance.web", "create")),
+        _event("planned_change", "aws_s3_bucket.logs: Plan to replace", change=_hook("aws_s3_bucket.logs", "replace")),
+        _event("apply_start", "aws_instance.web: Creating...", hook=_hook("aws_instance.web", "create")),
+        _event("apply_progress", hook=_hook("aws_instance.web", "create", elapsed_seconds=10)),
+        _event("apply_complete", hook=_hook("aws_instance.web", "create", elapsed_seconds=42, id_value="i-123")),
+        _event("apply_errored", hook=_hook("aws_s3_bucket.logs", "delete", elapsed_seconds=3)),
+        _event("diagnostic", "Error: bucket not empty",
+               diagnostic={"severity": "error", "summary": "bucket not empty", "address": "aws_s3_bucket.logs"}),
+        _event("change_summary", "Apply complete!", changes={"add": 1, "change": 0, "remove": 0, "operation": "apply"}),
+        _event("outputs", outputs={"ip": {"value": "10.0.0.1"}}),
+        "not json",
+        "",
+    ]:
+        stream.feed(line)
+
+    web = stream.resources["aws_instance.web"]
+    assert (web.action, web.status, web.elapsed, web.id_value) == ("create", "complete", 42, "i-123")
+    logs = stream.resources["aws_s3_bucket.logs"]
+    # L'action de l'événement le plus récent remplace celle du plan
+    assert (logs.action, logs.status, logs.elapsed) == ("delete", "errored", 3)
+    assert stream.counts() == {"planned": 0, "running": 0, "complete": 1, "errored": 1}
+
+    result = stream.result(0, None)
+    # Diagnostic d'erreur : échec même avec un code de retour nul
+    assert not result.success
+    assert result.changes["add"] == 1
+    assert result.outputs == {"ip": {"value": "10.0.0.1"}}
+    assert result.tail == ["aws_instance.web: Plan to create", "aws_s3_bucket.logs: Plan to replace",
+                           "aws_instance.web: Creating...", "Error: bucket not empty", "Apply complete!", "not json"]
+
+def test_drift_events():
+    stream = TerraformEventStream("drift")
+    stream.feed(_event("resource_drift", change=_hook("aws_instance.web", "update")))
+    stream.feed(_event("resource_drift", change={"resource": {"addr": "aws_eip.ip"}}))
+    result = stream.result(2, None)
+    assert result.drift == [{"address": "aws_instance.web", "action": "update"},
+                            {"address": "aws_eip.ip", "action": "update"}]
+    assert result.resources == {}
+
+def test_ring_buffers_are_bounded():
+    stream = TerraformEventStream("plan", json_ui=False, tail_size=5)
+    for index in range(100):
+        stream.feed(f"line {index}")
+        stream.feed("   ")
+    assert list(stream.tail) == [f"line {index}" for index in range(95, 100)]
+    assert stream.result(0, None).success
+
+    stream = TerraformEventStream("apply")
+    count = VISIBLE_RESOURCES + 5
+    for index in range(count):
+        stream.feed(_event("planned_change", change=_hook(f"null_resource.r{index}", "create")))
+    # Une ressource active revient en tête des lignes visibles
+    stream.feed(_event("apply_start", hook=_hook("null_resource.r0", "create")))
+    assert len(stream.resources) == count
+    assert len(stream.recent) == VISIBLE_RESOURCES
+    assert list(stream.recent)[-1] == "null_resource.r0"
+    assert "null_resource.r5" not in stream.recent
+
+def test_streaming_run_with_log(tmp_path):
+    script = tmp_path / "terraform"
+    events = [
+        _event("planned_change", "aws_instance.web: Plan to create", change=_hook("aws_instance.web", "create")),
+        _event("change_summary", "Plan: 1 to add", changes={"add": 1, "operation": "plan"}),
+    ]
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"print({json.dumps(chr(10).join(events))})\n"
+        "sys.exit(2)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+
+    result = run_streaming(str(script), ["plan"], str(tmp_path), "plan", json_ui=True, live=False)
+    assert (result.success, result.returncode) == (False, 2)
+    assert result.resources["aws_instance.web"].action == "create"
+    assert result.changes == {"add": 1, "operation": "plan"}
+    assert result.log_file == os.path.join(str(tmp_path), "terraform.log")
+    with open(result.log_file) as f:
+        log = f.read()
+    assert "=== plan -json" in log
+    assert "Plan: 1 to add" in log
+
+def test_missing_executable(tmp_path):
+    result = run_streaming(str(tmp_path / "missing"), ["plan"], str(tmp_path), "plan", json_ui=True, log_file=None, live=False)
+    assert result.returncode == 127
+    assert not result.success
+    assert result.tail
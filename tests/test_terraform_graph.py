@@ -0,0 +1,64 @@
+"""
+Tests de l'analyse du graphe de dépendances Terraform
+"""
+from cloudya.utils.terraform_graph import parse_dot, find_targets
+
+# Sortie de 'terraform graph -type=plan' (Terraform 1.6)
+PLAN_GRAPH = r'''digraph {
+	compound = "true"
+	newrank = "true"
+	subgraph "root" {
+		"[root] aws_instance.web (expand)" [label = "aws_instance.web", shape = "box"]
+		"[root] aws_subnet.a (expand)" [label = "aws_subnet.a", shape = "box"]
+		"[root] aws_vpc.main (expand)" [label = "aws_vpc.main", shape = "box"]
+		"[root] module.dns.aws_route53_record.www (expand)" [label = "module.dns.aws_route53_record.www", shape = "box"]
+		"[root] provider[\"registry.terraform.io/hashicorp/aws\"]" [label = "provider[\"registry.terraform.io/hashicorp/aws\"]", shape = "diamond"]
+		"[root] var.cidr" [label = "var.cidr", shape = "note"]
+		"[root] var.instance_type" [label = "var.instance_type", shape = "note"]
+		"[root] var.region" [label = "var.region", shape = "note"]
+		"[root] aws_instance.web (expand)" -> "[root] aws_subnet.a (expand)"
+		"[root] aws_instance.web (expand)" -> "[root] var.instance_type"
+		"[root] aws_subnet.a (expand)" -> "[root] aws_vpc.main (expand)"
+		"[root] aws_vpc.main (expand)" -> "[root] provider[\"registry.terraform.io/hashicorp/aws\"]"
+		"[root] aws_vpc.main (expand)" -> "[root] var.cidr"
+		"[root] module.dns (close)" -> "[root] module.dns.aws_route53_record.www (expand)"
+		"[root] module.dns.aws_route53_record.www (expand)" -> "[root] module.dns.var.ip (expand)"
+		"[root] module.dns.aws_route53_record.www (expand)" -> "[root] provider[\"registry.terraform.io/hashicorp/aws\"]"
+		"[root] module.dns.var.ip (expand)" -> "[root] aws_instance.web (expand)"
+		"[root] provider[\"registry.terraform.io/hashicorp/aws\"] (close)" -> "[root] module.dns.aws_route53_record.www (expand)"
+		"[root] provider[\"registry.terraform.io/hashicorp/aws\"]" -> "[root] var.region"
+		"[root] root" -> "[root] module.dns (close)"
+		"[root] root" -> "[root] provider[\"registry.terraform.io/hashicorp/aws\"] (close)"
+	}
+}
+'''
+
+PROVIDER = 'provider["registry.terraform.io/hashicorp/aws"]'
+
+def test_parse_dot_keeps_escaped_quotes_in_nodes():
+    dependents = parse_dot(PLAN_GRAPH)
+
+    assert not any(node.endswith("[\\") or node == "provider[" for node in dependents)
+    assert dependents[PROVIDER] == ["aws_vpc.main", "module.dns.aws_route53_record.www"]
+    assert dependents["var.region"] == [PROVIDER]
+    assert dependents["aws_subnet.a"] == ["aws_instance.web"]
+    assert dependents["var.instance_type"] == ["aws_instance.web"]
+
+def test_parse_dot_ignores_close_and_root_nodes():
+    dependents = parse_dot(PLAN_GRAPH)
+
+    assert dependents["module.dns.aws_route53_record.www"] == []
+    assert "root" not in dependents
+    assert "module.dns" not in dependents
+
+def test_find_targets_follows_modules():
+    plan = find_targets(parse_dot(PLAN_GRAPH), ["instance_type"], resource_count=10)
+
+    assert plan.targeted
+    assert plan.targets == ["aws_instance.web", "module.dns.aws_route53_record.www"]
+
+def test_find_targets_rejects_provider_variables():
+    plan = find_targets(parse_dot(PLAN_GRAPH), ["region"])
+
+    assert not plan.targeted
+    assert "provider" in plan.reason
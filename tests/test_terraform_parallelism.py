@@ -0,0 +1,92 @@
+"""
+Tests du réglage adaptatif du -parallelism de terraform apply
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from cloudya.utils import terraform_parallelism as parallelism
+
+@pytest.fixture
+def config(monkeypatch):
+    """Configuration modifiable et registre sans autres déploiements"""
+    config = {}
+    monkeypatch.setattr(parallelism, "get_snapshot", lambda: SimpleNamespace(config=config))
+    monkeypatch.setattr(parallelism.deployment_registry, "list_deployments", lambda *args, **kwargs: [])
+    return config
+
+def _metadata(template, **run):
+    metadata = {"id": "dep", "template": template}
+    if run:
+        metadata["apply_runs"] = [dict({"success": True, "resources": 0, "throttled": 0}, **run)]
+    return metadata
+
+def test_start_without_history(config):
+    assert parallelism.choose(_metadata("aws/vpc")) == 20
+    assert parallelism.choose(_metadata("proxmox/vm")) == 2
+    assert parallelism.choose(_metadata("unknown/x")) == parallelism.DEFAULT_PARALLELISM
+    assert parallelism.choose({"template": "local"}) == parallelism.DEFAULT_PARALLELISM
+
+def test_throttling_halves_down_to_min(config):
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=40, throttled=3)) == 20
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=12, throttled=1)) == 10
+    assert parallelism.choose(_metadata("proxmox/vm", parallelism=1, throttled=1)) == 1
+
+def test_growth_capped_at_max(config):
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=20, resources=100)) == 25
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=48, resources=500)) == 50
+    # Augmentation d'au moins 1
+    assert parallelism.choose(_metadata("proxmox/vm", parallelism=2, resources=10)) == 3
+    assert parallelism.choose(_metadata("proxmox/vm", parallelism=4, resources=10)) == 4
+
+def test_kept_without_signal(config):
+    # Peu de ressources, ou échec sans limitation de débit
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=30, resources=5)) == 30
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=30, resources=100, success=False)) == 30
+    # Valeur enregistrée hors bornes (configuration modifiée depuis)
+    assert parallelism.choose(_metadata("aws/vpc", parallelism=200, resources=5)) == 50
+
+def test_bounds_from_config(config):
+    config["terraform_parallelism"] = {
+        "proxmox": {"min": 2, "max": 6, "start": 3},
+        "nutanix": {"min": 0, "max": -1, "start": 9},
+        "gcp": {"max": 12},
+    }
+    assert parallelism.get_bounds("proxmox") == {"min": 2, "max": 6, "start": 3}
+    # Bornes incohérentes normalisées : min >= 1, max >= min, start dans [min, max]
+    assert parallelism.get_bounds("nutanix") == {"min": 1, "max": 1, "start": 1}
+    assert parallelism.get_bounds("gcp") == {"min": 10, "max": 12, "start": 12}
+    assert parallelism.choose(_metadata("proxmox/vm", parallelism=5, resources=50)) == 6
+
+def test_history_of_same_template_then_provider(config, monkeypatch):
+    def run(value, at):
+        return [{"parallelism": value, "success": True, "resources": 0, "throttled": 0, "at": at}]
+
+    others = [
+        {"id": "dep", "template": "aws/vpc", "apply_runs": run(11, "2024-01-05")},
+        {"id": "a", "template": "aws/vpc", "apply_runs": run(30, "2024-01-01")},
+        {"id": "b", "template": "aws/eks", "apply_runs": run(40, "2024-01-03")},
+        {"id": "c", "template": "aws/vpc"},
+    ]
+    monkeypatch.setattr(parallelism.deployment_registry, "list_deployments", lambda *args, **kwargs: others)
+
+    # Le déploiement lui-même est ignoré, le même template est préféré au plus récent
+    assert parallelism.choose(_metadata("aws/vpc")) == 30
+    assert parallelism.choose(_metadata("aws/rds")) == 40
+
+def test_record_run():
+    result = SimpleNamespace(
+        diagnostics=[{"summary": "Error: creating instance", "detail": "RequestLimitExceeded: Request limit exceeded"}],
+        tail=["Error 429: Too Many Requests", "done"],
+        resources={"a": SimpleNamespace(action="create"), "b": SimpleNamespace(action="noop")},
+        success=False,
+    )
+    assert parallelism.count_throttling(result) == 2
+
+    metadata = {"apply_runs": [{"parallelism": index} for index in range(parallelism.MAX_RUNS)]}
+    updates = parallelism.record_run(metadata, 8, 12.345, result)
+    assert updates["parallelism"] == 8
+    assert len(updates["apply_runs"]) == parallelism.MAX_RUNS
+    last = updates["apply_runs"][-1]
+    assert (last["parallelism"], last["duration"], last["resources"], last["throttled"], last["success"]) == \
+        (8, 12.35, 1, 2, False)
@@ -0,0 +1,146 @@
+"""
+Tests de la lecture en streaming des fichiers d'état Terraform
+"""
+import io
+import json
+
+import pytest
+
+from cloudya.utils import tfstate
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    """Blocs de quelques octets : les valeurs chevauchent les limites de blocs"""
+    monkeypatch.setattr(tfstate, "CHUNK_SIZE", 7)
+
+def _reader(text):
+    return tfstate._Reader(io.StringIO(text))
+
+def _state(resources, serial=3, lineage="abc-123", outputs=None):
+    return {
+        "version": 4,
+        "terraform_version": "1.7.0",
+        "serial": serial,
+        "lineage": lineage,
+        "outputs": outputs or {},
+        "resources": resources,
+    }
+
+def _instance(name, ip, resource_name="web", index_key=None):
+    return {
+        "mode": "managed",
+        "type": "aws_instance",
+        "name": resource_name,
+        "instances": [{
+            "index_key": index_key,
+            "attributes": {"id": f"i-{name}", "tags": {"Name": name}, "private_ip": ip, "public_ip": None},
+        }],
+    }
+
+def test_reader_values_straddle_chunks():
+    reader = _reader('  {"name": "a long string value", "nested": [1, 2, {"x": null}]}  123456789 ')
+    assert reader.value() == {"name": "a long string value", "nested": [1, 2, {"x": None}]}
+    # Un nombre coupé en fin de bloc n'est pas décodé trop tôt
+    assert reader.value() == 123456789
+    assert reader.peek() == ""
+
+def test_reader_invalid_json():
+    with pytest.raises(tfstate.StateError):
+        _reader('{"a": [1, 2').value()
+    with pytest.raises(tfstate.StateError):
+        _reader('{"a" 1}').skip()
+
+def test_reader_skip_nested_containers():
+    deep = {"a": {"b": {"c": {"d": {"e": ["deep", {"f": 1}]}}}}, "g": []}
+    reader = _reader(json.dumps([deep, {}, []]) + ' "after"')
+    reader.skip()
+    assert reader.value() == "after"
+
+    reader = _reader('{} [] "after"')
+    reader.skip()
+    reader.skip(levels=0)
+    assert reader.value() == "after"
+
+def test_iter_document_arrays_and_skip(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text(json.dumps({
+        "format_version": "1.2",
+        "prior_state": {"values": {"root_module": {"resources": [{"big": "x" * 100}]}}},
+        "resource_changes": [{"address": "a"}, {"address": "b"}],
+        "empty": [],
+        "errored": False,
+    }))
+
+    items = list(tfstate.iter_document(str(path), arrays=("resource_changes", "empty"), skip=("prior_state",)))
+    assert items == [
+        ("format_version", "1.2"),
+        ("resource_changes", {"address": "a"}),
+        ("resource_changes", {"address": "b"}),
+        ("errored", False),
+    ]
+
+def test_iter_document_empty_object(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text(" { } ")
+    assert list(tfstate.iter_document(str(path))) == []
+
+def test_read_header_stops_at_outputs(tmp_path):
+    path = tmp_path / tfstate.STATE_FILE
+    path.write_text(json.dumps(_state([], serial=12, lineage="lin-1")))
+    assert tfstate.read_header(str(path)) == (12, "lin-1")
+
+    # Des clés 'serial' et 'lineage' dans les outputs ne comptent pas
+    path.write_text(json.dumps({
+        "version": 4,
+        "outputs": {"serial": {"value": 1}, "x": {"value": '"serial": 9, "lineage": "fake"'}},
+        "serial": 2,
+        "lineage": "real",
+    }))
+    assert tfstate.read_header(str(path)) is None
+    assert tfstate.read_header(str(tmp_path / "missing")) is None
+
+def test_parse_state_instances_and_outputs(tmp_path):
+    path = tmp_path / tfstate.STATE_FILE
+    path.write_text(json.dumps(_state(
+        [
+            _instance("web", "10.0.0.1", index_key=0),
+            _instance("web", "10.0.0.2", resource_name="other"),
+            {"mode": "data", "type": "aws_instance", "name": "lookup", "instances": [{"attributes": {}}]},
+            {"mode": "managed", "type": "aws_vpc", "name": "main", "instances": [{"attributes": {"id": "vpc"}}]},
+        ],
+        outputs={"ip": {"value": "10.0.0.1", "type": "string"}},
+    )))
+
+    summary = tfstate.parse_state(str(path))
+    assert summary["resources"] == 4
+    assert summary["outputs"] == {"ip": "10.0.0.1"}
+    assert (summary["serial"], summary["lineage"]) == (3, "abc-123")
+    # Nom en double : l'adresse de la ressource sert de nom
+    assert [(i["name"], i["ip"], i["platform"]) for i in summary["instances"]] == [
+        ("web", "10.0.0.1", "aws"),
+        ("aws_instance.other", "10.0.0.2", "aws"),
+    ]
+    assert summary["instances"][0]["address"] == "aws_instance.web[0]"
+
+def test_read_state_cached_by_serial_and_lineage(tmp_path):
+    path = tmp_path / tfstate.STATE_FILE
+    path.write_text(json.dumps(_state([_instance("web", "10.0.0.1")], serial=1)))
+    assert tfstate.read_state(str(tmp_path))["instances"][0]["ip"] == "10.0.0.1"
+    assert (tmp_path / tfstate.STATE_SUMMARY_FILE).exists()
+
+    # Même serial et lineage : le résumé en cache est utilisé sans relire l'état
+    path.write_text(json.dumps(_state([_instance("web", "10.0.0.9")], serial=1)))
+    assert tfstate.read_state(str(tmp_path))["instances"][0]["ip"] == "10.0.0.1"
+
+    # Nouvel état écrit par Terraform
+    path.write_text(json.dumps(_state([_instance("web", "10.0.0.9")], serial=2)))
+    assert tfstate.read_state(str(tmp_path))["instances"][0]["ip"] == "10.0.0.9"
+
+    path.write_text(json.dumps(_state([_instance("web", "10.0.0.7")], serial=2, lineage="other")))
+    assert tfstate.read_state(str(tmp_path))["instances"][0]["ip"] == "10.0.0.7"
+
+def test_read_state_without_local_state(tmp_path):
+    assert tfstate.read_state(str(tmp_path)) is None
+
+    (tmp_path / tfstate.STATE_FILE).write_text('{"serial": 1, "resources": [')
+    assert tfstate.read_state(str(tmp_path)) is None